@@ -13,9 +13,10 @@ AioTest - 异步负载测试框架
 - 完善的错误处理和日志系统
 """
 
-from .clients import HTTPClient, configure_connector
+from .clients import HTTPClient, configure_connector, configure_request_logging
 from .distributed_coordinator import DistributedLock, RedisConnection
 from .events import (
+    BatchEventHook,
     EventHook,
     Events,
     events,
@@ -27,10 +28,16 @@ from .events import (
     test_stop,
     worker_request_metrics,
 )
-from .exception import InvalidRateError, InvalidUserCountError, RunnerError
+from .exception import (
+    InvalidRateError,
+    InvalidUserCountError,
+    MetricsBackpressureError,
+    MetricsPublishError,
+    RunnerError,
+)
 from .logger import logger
 from .main import main
-from .shape import LoadUserShape
+from .shape import ArrivalRateShape, LoadUserShape
 from .users import ExecutionMode, HttpUser, User, WaitTimeResolver, WaitTimeType, weight
 
 __version__ = "1.0.7"
@@ -43,6 +50,7 @@ __all__ = [
     "HttpUser",
     "HTTPClient",
     "LoadUserShape",
+    "ArrivalRateShape",
 
     # Utilities
     "WaitTimeType",
@@ -50,10 +58,12 @@ __all__ = [
     "weight",
     "ExecutionMode",
     "configure_connector",
+    "configure_request_logging",
 
     # Event system
     "events",
     "EventHook",
+    "BatchEventHook",
     "Events",
     "init_events",
     "test_start",
@@ -72,6 +82,8 @@ __all__ = [
     "RunnerError",
     "InvalidUserCountError",
     "InvalidRateError",
+    "MetricsBackpressureError",
+    "MetricsPublishError",
 
     # Main entry point
     "main",
@@ -0,0 +1,251 @@
+# encoding: utf-8
+"""
+开放负载模型执行器，按固定到达率派发场景迭代
+
+与 UserManager 的封闭模型（每个用户循环执行任务并等待 wait_time）不同，
+ArrivalRateExecutor 按精确的时间表派发迭代：第 n 次迭代的计划时间为
+start + n / rate，与被测服务的响应时间无关。迭代由预分配的用户池执行，
+到达计划时间时没有空闲用户则该次迭代记为丢弃；事件循环延迟导致实际派发
+时间晚于计划时间超过容忍度时记为迟到。
+
+每次迭代都以计划时间作为请求的计划开始时间（schedule_lag），请求指标中会附带
+协调遗漏校正耗时。
+"""
+
+import asyncio
+from collections import deque
+from typing import TYPE_CHECKING, Deque, Dict, List, Optional, Set
+
+from aiotest.clients import schedule_lag
+from aiotest.logger import logger
+
+if TYPE_CHECKING:
+    from aiotest.user_manager import UserManager
+    from aiotest.users import User
+
+# 默认迟到容忍度（秒）：实际派发时间晚于计划时间超过此值时记为迟到
+DEFAULT_LATE_TOLERANCE = 0.01
+
+
+class ArrivalRateExecutor:
+    """
+    固定到达率执行器
+
+    属性：
+        rate (float): 当前到达率（次/秒）
+        pool_size (int): 用户池大小
+        scheduled (int): 累计计划派发的迭代数
+        dropped (int): 因无空闲用户而丢弃的迭代数
+        late (int): 派发时间晚于计划时间的迭代数
+        completed (int): 已完成的迭代数
+
+    示例：
+        >>> executor = ArrivalRateExecutor(user_manager)
+        >>> await executor.apply(pool_size=100, rate=50.0)
+        >>> executor.get_stats()["arrival_dropped"]
+    """
+
+    def __init__(self, user_manager: 'UserManager',
+                 late_tolerance: float = DEFAULT_LATE_TOLERANCE):
+        """
+        初始化执行器
+
+        参数：
+            user_manager: 用户管理器，用于按权重分配用户类型并创建用户实例
+            late_tolerance: 迟到容忍度（秒）
+        """
+        self.user_manager = user_manager
+        self.late_tolerance = late_tolerance
+        self.rate = 0.0
+        self.pool_size = 0
+
+        self._pool: List['User'] = []
+        self._idle: Deque['User'] = deque()
+        self._retire_count = 0  # 缩容时等待归还后退役的用户数
+        self._inflight: Set[asyncio.Task] = set()
+        self._scheduler_task: Optional[asyncio.Task] = None
+        self._paused = False
+
+        self.scheduled = 0
+        self.dropped = 0
+        self.late = 0
+        self.completed = 0
+
+    @property
+    def busy_count(self) -> int:
+        """正在执行迭代的用户数"""
+        return len(self._pool) - len(self._idle)
+
+    async def apply(self, pool_size: int, rate: float,
+                    start_at: Optional[float] = None) -> None:
+        """
+        应用新的用户池大小和到达率
+
+        参数：
+            pool_size: 目标用户池大小
+            rate: 目标到达率（次/秒）
+            start_at: 可选的时间表起点（事件循环时间），None 表示立即开始
+        """
+        await self._resize_pool(pool_size)
+        self.pool_size = pool_size
+
+        if rate != self.rate or self._scheduler_task is None or start_at is not None:
+            self.rate = rate
+            # 重启调度循环，以计划时刻（默认为当前时刻）作为新时间表的起点
+            await self._stop_scheduler()
+            self._scheduler_task = asyncio.create_task(
+                self._schedule(start_at), name="arrival_rate_scheduler")
+
+        logger.info(
+            "到达率更新: %.2f 次/秒，用户池: %d", self.rate, self.pool_size)
+
+    async def _resize_pool(self, pool_size: int) -> None:
+        """扩容时预创建并初始化用户，缩容时优先退役空闲用户"""
+        current = len(self._pool) - self._retire_count
+        if pool_size > current:
+            grow = pool_size - current
+            # 先抵消尚未完成的退役
+            cancelled = min(grow, self._retire_count)
+            self._retire_count -= cancelled
+            grow -= cancelled
+
+            new_users = [
+                self.user_manager.create_user(user_class)
+                for user_class in self.user_manager.distribute_users_by_weight(grow)]
+            await asyncio.gather(*(user.on_start() for user in new_users))
+            self._pool.extend(new_users)
+            self._idle.extend(new_users)
+        elif pool_size < current:
+            shrink = current - pool_size
+            while shrink and self._idle:
+                await self._retire(self._idle.pop())
+                shrink -= 1
+            # 剩余部分由正在执行的用户完成迭代后退役
+            self._retire_count += shrink
+
+    async def _retire(self, user: 'User') -> None:
+        """将用户移出用户池并清理资源"""
+        self._pool.remove(user)
+        try:
+            await user.on_stop()
+        except Exception as e:
+            logger.warning("用户退役清理失败: %s", e)
+
+    async def _schedule(self, start_at: Optional[float] = None) -> None:
+        """
+        按时间表派发迭代
+
+        参数：
+            start_at: 时间表起点（事件循环时间），None 表示当前时刻
+
+        说明：
+            - 第 n 次迭代的计划时间为 start + n / rate
+            - 事件循环被阻塞时，醒来后一次性补派所有已到期的迭代（计入迟到），
+              保证长时间平均到达率不变
+        """
+        loop = asyncio.get_running_loop()
+        interval = 1.0 / self.rate if self.rate > 0 else 0.0
+        next_at = loop.time() if start_at is None else start_at
+        if next_at > loop.time():
+            await asyncio.sleep(next_at - loop.time())
+        while True:
+            if interval <= 0 or self._paused:
+                await asyncio.sleep(0.1)
+                next_at = loop.time()
+                continue
+
+            now = loop.time()
+            while next_at <= now:
+                self._dispatch(next_at, now)
+                next_at += interval
+            await asyncio.sleep(next_at - loop.time())
+
+    def _dispatch(self, scheduled_at: float, now: float) -> None:
+        """派发一次迭代给空闲用户，无空闲用户时记为丢弃"""
+        self.scheduled += 1
+        if now - scheduled_at > self.late_tolerance:
+            self.late += 1
+
+        if not self._idle:
+            self.dropped += 1
+            return
+
+        user = self._idle.popleft()
+        task = asyncio.create_task(self._run_iteration(user, scheduled_at))
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+
+    async def _run_iteration(self, user: 'User', scheduled_at: float) -> None:
+        """执行一次迭代并将用户归还用户池"""
+        # 迭代在独立任务中运行，设置的延迟只对本次迭代内的请求生效
+        schedule_lag.set(max(0.0, asyncio.get_running_loop().time() - scheduled_at))
+        try:
+            await user.run_iteration()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("迭代执行失败: %s", e)
+        finally:
+            self.completed += 1
+            if self._retire_count > 0:
+                self._retire_count -= 1
+                await self._retire(user)
+            else:
+                self._idle.append(user)
+
+    def pause(self) -> None:
+        """暂停派发（正在执行的迭代不受影响）"""
+        self._paused = True
+
+    def resume(self) -> None:
+        """恢复派发，以恢复时刻作为新时间表的起点"""
+        self._paused = False
+
+    async def _stop_scheduler(self) -> None:
+        """停止调度循环"""
+        if self._scheduler_task and not self._scheduler_task.done():
+            self._scheduler_task.cancel()
+            try:
+                await self._scheduler_task
+            except asyncio.CancelledError:
+                pass
+        self._scheduler_task = None
+
+    async def stop(self) -> None:
+        """停止派发，取消正在执行的迭代并清理全部用户"""
+        await self._stop_scheduler()
+
+        # 先清零退役计数，被取消的迭代归还用户后统一清理
+        self._retire_count = 0
+        inflight = list(self._inflight)
+        for task in inflight:
+            task.cancel()
+        if inflight:
+            await asyncio.gather(*inflight, return_exceptions=True)
+
+        pool, self._pool = self._pool, []
+        self._idle.clear()
+        await asyncio.gather(*(user.on_stop() for user in pool), return_exceptions=True)
+
+        self.rate = 0.0
+        self.pool_size = 0
+        logger.info(
+            "到达率执行器已停止: 计划 %d 次，丢弃 %d 次，迟到 %d 次",
+            self.scheduled, self.dropped, self.late)
+
+    def get_stats(self) -> Dict[str, float]:
+        """
+        获取执行统计
+
+        返回：
+            dict: 到达率、用户池大小、忙碌用户数以及累计计划/丢弃/迟到/完成次数
+        """
+        return {
+            "arrival_rate": self.rate,
+            "arrival_pool": self.pool_size,
+            "arrival_busy": self.busy_count,
+            "arrival_scheduled": self.scheduled,
+            "arrival_dropped": self.dropped,
+            "arrival_late": self.late,
+            "arrival_completed": self.completed,
+        }
@@ -110,6 +110,51 @@ def parse_options(args=None):
         help="设置aiotest以分布式模式运行，此进程作为工作节点"
     )
 
+    group_distributed.add_argument(
+        '--aggregator',
+        action='store_true',
+        help="设置aiotest以分布式模式运行，此进程作为聚合节点，汇总同组工作节点的指标和心跳后转发给主节点"
+    )
+
+    group_distributed.add_argument(
+        '--aggregator-group',
+        default=None,
+        help="聚合分组名称，聚合节点与其所辖工作节点使用相同的分组 (默认: 无，工作节点直接连接主节点)"
+    )
+
+    group_distributed.add_argument(
+        '--coordinator',
+        choices=['redis', 'tcp'],
+        default='redis',
+        help="协调后端：redis 经由 Redis 通信，tcp 由工作节点直接连接主节点，无需 Redis (默认: redis)"
+    )
+
+    group_distributed.add_argument(
+        '--master-host',
+        default='127.0.0.1',
+        help="tcp 协调后端下工作节点连接的主节点地址 (默认: 127.0.0.1)"
+    )
+
+    group_distributed.add_argument(
+        '--master-bind-host',
+        default='0.0.0.0',
+        help="tcp 协调后端下主节点监听的地址 (默认: 0.0.0.0)"
+    )
+
+    group_distributed.add_argument(
+        '--master-port',
+        type=int,
+        default=5557,
+        help="tcp 协调后端下主节点监听和工作节点连接的端口 (默认: 5557)"
+    )
+
+    group_distributed.add_argument(
+        '--processes',
+        type=int,
+        default=1,
+        help="本地模式下启动的 Worker 子进程数，大于 1 时本进程作为主节点经本机 tcp 协调子进程，-1 表示按 CPU 核数 (默认: 1)"
+    )
+
     group_distributed.add_argument(
         '--expect-workers',
         type=int,
@@ -117,6 +162,13 @@ def parse_options(args=None):
         help="主节点在开始测试前期望连接的工作节点数量"
     )
 
+    group_distributed.add_argument(
+        '--worker-capacity',
+        type=float,
+        default=1.0,
+        help="工作节点的相对负载能力（例如实测最大 RPS），主节点按该权重分配用户数和速率 (默认: 1.0)"
+    )
+
     # loglevel logfile
     group_logging.add_argument(
         '--loglevel', '-L',
@@ -166,6 +218,56 @@ def parse_options(args=None):
         help="指标缓冲区大小 (默认: 10000)",
     )
 
+    group_metrics.add_argument(
+        '--metrics-mode',
+        default='raw',
+        choices=['raw', 'aggregate'],
+        help="Worker 指标上报模式：raw 逐条转发，aggregate 按刷新间隔聚合后转发 (默认: raw)",
+    )
+
+    group_metrics.add_argument(
+        '--metrics-encoding',
+        default='binary',
+        choices=['json', 'binary'],
+        help="Worker 原始指标的传输编码：binary 为列式二进制（Master 通告支持时使用，否则回退 JSON），json 为逐条 JSON (默认: binary)",
+    )
+
+    group_metrics.add_argument(
+        '--metrics-transport',
+        default='pubsub',
+        choices=['pubsub', 'stream'],
+        help="Worker 指标传输方式：pubsub 为 Redis 频道（Master 不在线时丢失），stream 为 Redis Stream 消费组（确认后删除，Master 滞后时 Worker 暂缓发送） (默认: pubsub)",
+    )
+
+    group_metrics.add_argument(
+        '--metrics-stream-maxlen',
+        type=int,
+        default=10000,
+        help="Stream 传输时保留的最大消息数，消费滞后达到一半时 Worker 暂缓发送 (默认: 10000)",
+    )
+
+    group_metrics.add_argument(
+        '--latency-precision',
+        type=int,
+        default=3,
+        choices=[1, 2, 3, 4, 5],
+        help="接口耗时直方图的有效数字位数，越大百分位越精确、内存占用越多 (默认: 3)",
+    )
+
+    group_metrics.add_argument(
+        '--loop-lag-threshold',
+        type=float,
+        default=0.2,
+        help="事件循环延迟告警阈值（秒），超过时提示负载生成器可能已饱和 (默认: 0.2)",
+    )
+
+    group_metrics.add_argument(
+        '--loop-lag-gate',
+        action='store_true',
+        default=False,
+        help="事件循环延迟超过阈值时暂缓启动新用户 (默认: False)",
+    )
+
     return parser.parse_args(args=args)
 
 
@@ -6,13 +6,17 @@ HTTP客户端模块，提供异步HTTP请求功能
 """
 
 import asyncio
+import itertools
 import json
+import logging
+import random
 import re
 import time
 import traceback
 import uuid
+from contextvars import ContextVar
 from functools import lru_cache
-from typing import Any, Callable, Dict, List, Optional, Union
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
 import aiohttp
 import backoff
@@ -27,17 +31,64 @@ CONNECTOR_SETTINGS = {
     'limit_per_host': 100,  # 默认每个主机最大连接数（适合单主机压测）
     'force_close': False,  # 默认是否强制关闭空闲连接
     'enable_cleanup_closed': True,  # 默认是否清理已关闭的连接
+    'shared': False,  # 默认每个客户端独占连接池；True 时进程内所有客户端共享连接池
 }
 
+# 请求明细日志配置
+REQUEST_LOG_SETTINGS = {
+    'sample_rate': 0.0,  # 未开启 DEBUG 时按比例以 INFO 级别记录请求明细日志，0 表示不记录
+}
+
+# 请求 ID：进程级随机前缀 + 单调递增计数，避免每次请求生成 uuid
+_REQUEST_ID_PREFIX = uuid.uuid4().hex[:8]
+_request_counter = itertools.count(1)
+
+# 响应体处理模式
+BODY_MODE_FULL = "full"        # 读取全部响应体并立即解析为 JSON/文本（默认）
+BODY_MODE_LAZY = "lazy"        # 读取原始字节，首次调用 json()/text() 时解析并缓存
+BODY_MODE_BYTES = "bytes"      # 读取原始字节，不做任何解析，json()/text() 每次调用时解码
+BODY_MODE_DISCARD = "discard"  # 分块读取并丢弃，只统计字节数
+BODY_MODE_STREAM = "stream"    # 不预读响应体，由调用方通过 content/iter_chunked() 流式消费
+BODY_MODES = (BODY_MODE_FULL, BODY_MODE_LAZY, BODY_MODE_BYTES, BODY_MODE_DISCARD, BODY_MODE_STREAM)
+
+# 丢弃模式下每次读取的块大小（字节）
+DISCARD_CHUNK_SIZE = 64 * 1024
+
+# 日志脱敏使用的敏感字段正则（进程内编译一次）
+_SENSITIVE_FIELD_PATTERN = re.compile(
+    r'(password|secret|token|credit_card|cvv|api[_-]key|auth)', re.IGNORECASE
+)
+_SENSITIVE_STR_PATTERN = re.compile(
+    r'(password|token|api[_-]key|auth)=[^&]+', re.IGNORECASE
+)
+
+# 当前任务相对计划开始时间的延迟（秒），由用户节奏调度（pacing）或到达率执行器设置；
+# 非 None 时请求的计划开始时间 = 实际开始时间 - 延迟，并额外记录校正耗时（消除协调遗漏）
+schedule_lag: ContextVar[Optional[float]] = ContextVar("aiotest_schedule_lag", default=None)
+
+# 共享连接池：按 (事件循环, verify_ssl) 区分，同一事件循环内的客户端复用同一个连接池
+_shared_connectors: Dict[Tuple[int, bool], aiohttp.TCPConnector] = {}
+
 
 def configure_connector(limit=None, limit_per_host=None,
-                        force_close=None, enable_cleanup_closed=None):
-    """动态配置连接池参数"""
+                        force_close=None, enable_cleanup_closed=None,
+                        shared=None):
+    """
+    动态配置连接池参数
+
+    参数：
+        limit: 最大连接数
+        limit_per_host: 每个主机最大连接数
+        force_close: 是否强制关闭空闲连接
+        enable_cleanup_closed: 是否清理已关闭的连接
+        shared: 是否在进程内所有 HTTPClient 之间共享连接池
+    """
     for key, value in {
         'limit': limit,
         'limit_per_host': limit_per_host,
         'force_close': force_close,
-        'enable_cleanup_closed': enable_cleanup_closed
+        'enable_cleanup_closed': enable_cleanup_closed,
+        'shared': shared
     }.items():
         if value is not None:
             CONNECTOR_SETTINGS[key] = value
@@ -45,6 +96,82 @@ def configure_connector(limit=None, limit_per_host=None,
     logger.info("当前连接池配置: %s", CONNECTOR_SETTINGS)
 
 
+def configure_request_logging(sample_rate=None):
+    """
+    配置请求明细日志（请求开始/完成日志，包括脱敏后的请求头和请求体）
+
+    日志级别为 DEBUG 时记录全部请求；否则只记录按 sample_rate 采样的请求（INFO 级别），
+    未被采样的请求不做任何日志和脱敏工作。请求失败日志不受影响，始终记录。
+
+    参数：
+        sample_rate: 采样比例（0-1）
+
+    异常：
+        ValueError: 采样比例不在 0-1 之间
+    """
+    if sample_rate is not None:
+        if not 0.0 <= sample_rate <= 1.0:
+            raise ValueError(f"采样比例必须在 0-1 之间，得到: {sample_rate}")
+        REQUEST_LOG_SETTINGS['sample_rate'] = sample_rate
+
+    logger.info("当前请求日志配置: %s", REQUEST_LOG_SETTINGS)
+
+
+def _request_log_level() -> Optional[int]:
+    """确定本次请求明细日志的级别，None 表示不记录"""
+    if logger.isEnabledFor(logging.DEBUG):
+        return logging.DEBUG
+    sample_rate = REQUEST_LOG_SETTINGS['sample_rate']
+    if sample_rate and random.random() < sample_rate and logger.isEnabledFor(logging.INFO):
+        return logging.INFO
+    return None
+
+
+def _create_connector(verify_ssl: bool) -> aiohttp.TCPConnector:
+    """按 CONNECTOR_SETTINGS 创建 TCP 连接池"""
+    return aiohttp.TCPConnector(
+        limit=CONNECTOR_SETTINGS['limit'],
+        limit_per_host=CONNECTOR_SETTINGS['limit_per_host'],
+        force_close=CONNECTOR_SETTINGS['force_close'],
+        enable_cleanup_closed=CONNECTOR_SETTINGS['enable_cleanup_closed'],
+        verify_ssl=verify_ssl
+    )
+
+
+def get_shared_connector(verify_ssl: bool = True) -> aiohttp.TCPConnector:
+    """
+    获取当前事件循环的共享连接池，不存在或已关闭时创建
+
+    参数：
+        verify_ssl: 是否验证SSL证书
+
+    返回：
+        aiohttp.TCPConnector: 共享连接池
+    """
+    key = (id(asyncio.get_running_loop()), verify_ssl)
+    connector = _shared_connectors.get(key)
+    if connector is None or connector.closed:
+        connector = _create_connector(verify_ssl)
+        _shared_connectors[key] = connector
+    return connector
+
+
+def _check_body_mode(body_mode: str) -> str:
+    """校验响应体处理模式"""
+    if body_mode not in BODY_MODES:
+        raise ValueError(f"无效的响应体处理模式: {body_mode}，可选: {', '.join(BODY_MODES)}")
+    return body_mode
+
+
+async def close_shared_connectors() -> None:
+    """关闭当前事件循环创建的共享连接池"""
+    loop_id = id(asyncio.get_running_loop())
+    for key in [k for k in _shared_connectors if k[0] == loop_id]:
+        connector = _shared_connectors.pop(key)
+        if not connector.closed:
+            await connector.close()
+
+
 class HTTPClient:
     """
     异步HTTP客户端类，封装了基于aiohttp的异步HTTP请求功能。
@@ -68,11 +195,16 @@ class HTTPClient:
         timeout (int): 请求超时时间（秒）。默认为30秒。
         max_retries (int): 最大重试次数。默认为3次。
         verify_ssl (bool): 是否验证SSL证书。默认为True。
+        body_mode (str): 响应体处理模式（full/lazy/bytes/discard/stream）。默认为full。
 
     异常：
         ValueError: 如果参数值无效（如超时时间为负数）。
     """
 
+    # 敏感字段正则在模块加载时编译一次，所有客户端共享
+    _sensitive_field_pattern = _SENSITIVE_FIELD_PATTERN
+    _sensitive_str_pattern = _SENSITIVE_STR_PATTERN
+
     def __init__(
         self,
         base_url: str = "",
@@ -80,6 +212,7 @@ class HTTPClient:
         timeout: int = 30,
         max_retries: int = 3,
         verify_ssl: bool = True,
+        body_mode: str = BODY_MODE_FULL,
     ):
         """
         初始化HTTP客户端。
@@ -90,9 +223,10 @@ class HTTPClient:
             timeout (int): 请求超时时间（秒）。默认为30秒。
             max_retries (int): 最大重试次数。默认为3次。
             verify_ssl (bool): 是否验证SSL证书。默认为True。
+            body_mode (str): 响应体处理模式，可在单个请求中通过 body_mode 参数覆盖。默认为full。
 
         异常：
-            ValueError: 如果参数值无效（如超时时间为负数）。
+            ValueError: 如果参数值无效（如超时时间为负数、响应体处理模式无效）。
         """
 
         self.base_url = base_url
@@ -100,15 +234,9 @@ class HTTPClient:
         self.timeout = aiohttp.ClientTimeout(total=timeout)
         self.max_retries = max_retries
         self.verify_ssl = verify_ssl
+        self.body_mode = _check_body_mode(body_mode)
         self._session = None
         self._connector = None
-        # 预编译敏感字段正则
-        self._sensitive_field_pattern = re.compile(
-            r'(password|secret|token|credit_card|cvv|api[_-]key|auth)', re.IGNORECASE
-        )
-        self._sensitive_str_pattern = re.compile(
-            r'(password|token|api[_-]key|auth)=[^&]+', re.IGNORECASE
-        )
 
         # 设置默认请求头
         self.default_headers.update({
@@ -122,8 +250,8 @@ class HTTPClient:
         异步上下文管理器入口，用于初始化HTTP会话和连接池。
 
         功能：
-        - 初始化TCP连接池。
-        - 创建ClientSession实例。
+        - 初始化TCP连接池（共享模式下复用进程级连接池）。
+        - 创建ClientSession实例，Cookie和默认请求头仍按客户端隔离。
 
         返回：
             HTTPClient: 当前实例，支持链式调用。
@@ -131,18 +259,17 @@ class HTTPClient:
         异常：
             ClientError: 如果会话初始化失败。
         """
-        self._connector = aiohttp.TCPConnector(
-            limit=CONNECTOR_SETTINGS['limit'],
-            limit_per_host=CONNECTOR_SETTINGS['limit_per_host'],
-            force_close=CONNECTOR_SETTINGS['force_close'],
-            enable_cleanup_closed=CONNECTOR_SETTINGS['enable_cleanup_closed'],
-            verify_ssl=self.verify_ssl
-        )
+        shared = CONNECTOR_SETTINGS['shared']
+        if shared:
+            self._connector = get_shared_connector(self.verify_ssl)
+        else:
+            self._connector = _create_connector(self.verify_ssl)
         self._session = aiohttp.ClientSession(
             base_url=self.base_url,
             headers=self.default_headers,
             timeout=self.timeout,
             connector=self._connector,
+            connector_owner=not shared,  # 共享连接池不随会话关闭
             json_serialize=json.dumps  # 使用标准json序列化
         )
         return self
@@ -203,6 +330,7 @@ class HTTPClient:
         method: str,
         endpoint: str,
         name: Optional[str] = None,
+        body_mode: Optional[str] = None,
         **kwargs
     ) -> "ResponseContextManager":
         """
@@ -212,14 +340,14 @@ class HTTPClient:
             method: HTTP方法 (GET, POST, PUT, DELETE等)
             endpoint: API端点 (不包含基础URL)
             name: 请求名称
+            body_mode: 本次请求的响应体处理模式，None 时使用客户端默认模式
             **kwargs: 其他aiohttp请求参数
 
         返回：
             ResponseContextManager: 响应上下文管理器对象
         """
 
-        # 使用高精度时间戳 + 随机数确保唯一性
-        request_id = f"req-{int(time.monotonic() * 1000000)}-{uuid.uuid4().hex[:8]}"
+        request_id = f"req-{_REQUEST_ID_PREFIX}-{next(_request_counter)}"
         # 保留原始 endpoint 用于实际请求
         request_endpoint = endpoint
         # 处理日志和标准化
@@ -232,21 +360,23 @@ class HTTPClient:
         kwargs.setdefault('headers', {}).update(self.default_headers)
         kwargs['ssl'] = self.verify_ssl
 
-        # 结构化日志
+        # 结构化日志：未开启请求明细日志时跳过脱敏和日志记录
         log = RequestMetrics(
             request_id=request_id,
             method=method,
             endpoint=name if name else normalized_endpoint,
-            extra={
+        )
+        log_level = _request_log_level()
+        if log_level is not None:
+            log.extra = {
                 "headers": self._sanitize_headers(kwargs.get('headers', {})),
                 "params": kwargs.get('params', {}),
                 "body": self._sanitize_body(kwargs.get('data', kwargs.get('json', None)))
             }
-        )
-
-        self._log_request(log, "start")
+            self._log_request(log, "start", log_level)
 
         start_time = time.monotonic()
+        lag = schedule_lag.get()
 
         # 返回上下文管理器
         return ResponseContextManager(
@@ -255,7 +385,10 @@ class HTTPClient:
             log=log,
             start_time=start_time,
             metrics_callback=self._record_request_metrics,
-            log_request=self._log_request
+            log_request=self._log_request,
+            intended_start=start_time - lag if lag is not None else None,
+            body_mode=_check_body_mode(body_mode) if body_mode else self.body_mode,
+            log_level=log_level
         )
 
     def get(self, endpoint: str,
@@ -299,7 +432,8 @@ class HTTPClient:
         duration: float,
         response_size: int,
         error: Optional[Dict[str, Any]] = None,
-        assertion_result: str = "unknown"
+        assertion_result: str = "unknown",
+        corrected_duration: Optional[float] = None
     ):
         """
         记录接口请求性能数据
@@ -319,7 +453,8 @@ class HTTPClient:
                 duration=duration,
                 response_size=response_size,
                 error=error,
-                assertion_result=assertion_result
+                assertion_result=assertion_result,
+                corrected_duration=corrected_duration
             )
 
             # 通过事件系统上传请求数据
@@ -333,13 +468,14 @@ class HTTPClient:
         except Exception as e:
             logger.warning("记录请求指标失败: %s", e)
 
-    def _log_request(self, log: RequestMetrics, status: str):
+    def _log_request(self, log: RequestMetrics, status: str, level: int = logging.DEBUG):
         """
         统一记录请求日志
 
         参数：
         - log: 请求指标对象
         - status: 请求状态（start/complete/failed）
+        - level: 开始/完成日志的级别，失败日志始终为 ERROR
         """
         log_data = {
             "method": log.method,
@@ -349,19 +485,21 @@ class HTTPClient:
         log_prefix = f"request_{status} {log.method} {log.endpoint}"
 
         if status == "start":
-            self._log_request_start(log, log_data, log_prefix)
+            self._log_request_start(log, log_data, log_prefix, level)
         elif status == "complete":
-            self._log_request_complete(log, log_data, log_prefix)
+            self._log_request_complete(log, log_data, log_prefix, level)
         elif status == "failed":
             self._log_request_failed(log, log_data, log_prefix)
 
-    def _log_request_start(self, log: RequestMetrics, log_data: Dict[str, Any], log_prefix: str):
+    def _log_request_start(self, log: RequestMetrics, log_data: Dict[str, Any], log_prefix: str,
+                           level: int = logging.DEBUG):
         """记录请求开始日志"""
         log_data["request_start"] = log.extra if isinstance(
             log.extra, dict) else {}
-        logger.debug(log_prefix, extra=log_data)
+        logger.log(level, log_prefix, extra=log_data)
 
-    def _log_request_complete(self, log: RequestMetrics, log_data: Dict[str, Any], log_prefix: str):
+    def _log_request_complete(self, log: RequestMetrics, log_data: Dict[str, Any], log_prefix: str,
+                              level: int = logging.DEBUG):
         """记录请求完成日志"""
         # 过滤掉headers，避免日志过大
         if log.extra and isinstance(log.extra, dict):
@@ -369,7 +507,7 @@ class HTTPClient:
         else:
             filtered_extra = {}
         log_data["response_data"] = filtered_extra
-        logger.debug(log_prefix, extra=log_data)
+        logger.log(level, log_prefix, extra=log_data)
 
     def _log_request_failed(self, log: RequestMetrics, log_data: Dict[str, Any], log_prefix: str):
         """记录请求失败日志"""
@@ -435,6 +573,14 @@ class ResponseContextManager:
     - 封装响应处理逻辑
     - 支持异步上下文管理
     - 提供统一的响应处理方法
+
+    响应体处理模式：
+    - full: 读取并立即解析响应体，复制响应头和 Cookie（默认，兼容旧行为）
+    - lazy: 只读取原始字节，json()/text() 首次调用时解析并缓存
+    - bytes: 只读取原始字节，read() 直接返回，json()/text() 每次调用时解码
+    - discard: 分块读取并丢弃响应体，只统计字节数，适合下载类场景
+    - stream: 不预读响应体，通过 content/iter_chunked() 流式消费，耗时记录到收到响应头为止
+    非 full 模式下响应头和 Cookie 在首次访问时才复制；所有模式的响应大小均为实际接收的字节数
     """
 
     def __init__(
@@ -444,6 +590,9 @@ class ResponseContextManager:
         start_time: float,
         metrics_callback: Callable,
         log_request: Callable,
+        intended_start: Optional[float] = None,
+        body_mode: str = BODY_MODE_FULL,
+        log_level: Optional[int] = logging.DEBUG,
     ):
         """
         初始化响应上下文管理器
@@ -454,14 +603,21 @@ class ResponseContextManager:
         - start_time: 请求开始时间
         - metrics_callback: 指标回调函数
         - log_request: 请求日志回调函数
+        - intended_start: 按节奏调度计划的开始时间，None 表示不记录校正耗时
+        - body_mode: 响应体处理模式
+        - log_level: 请求完成日志的级别，None 表示不记录请求明细日志（失败日志不受影响）
         """
         self._request_coroutine = request_coroutine
         self.log = log
         self.start_time = start_time
+        self.intended_start = intended_start
+        self.body_mode = body_mode
+        self.log_level = log_level
         self._metrics_callback = metrics_callback
         self._log_request = log_request
         self._response = None
         self._processed_data = None
+        self._parsed = None  # lazy 模式下缓存的解析结果
         self._error_handled = False
 
     async def __aenter__(self) -> Dict[str, Any]:
@@ -469,17 +625,19 @@ class ResponseContextManager:
         try:
             self._response = await self._request_coroutine
             self._processed_data = await self._process_response(self._response)
-            duration = time.monotonic() - self.start_time
+            end_time = time.monotonic()
+            duration = end_time - self.start_time
 
             # 更新日志
             self.log.status_code = self._response.status
             self.log.duration = duration
-            self.log.response_size = self._estimate_size(
-                self._processed_data.get('data'))
-            # 确保 extra 不为 None
-            if self.log.extra is None:
-                self.log.extra = {}
-            self.log.extra["response_data"] = self._processed_data.get('data')
+            self._set_corrected_duration(end_time)
+            self.log.response_size = self._processed_data.get('size', 0)
+            if self.log_level is not None:
+                # 确保 extra 不为 None
+                if self.log.extra is None:
+                    self.log.extra = {}
+                self.log.extra["response_data"] = self._processed_data.get('data')
         except Exception as e:
             # 处理请求错误（如超时、连接错误等）
             self.log.assertion_result = "fail"
@@ -498,6 +656,9 @@ class ResponseContextManager:
         异常：asyncio.TimeoutError - 如果关闭操作超时。
         """
         if self._response:
+            if self.body_mode == BODY_MODE_STREAM:
+                # 流式模式的响应大小为调用方实际消费期间接收的字节数
+                self.log.response_size = self._received_bytes(self._response, 0)
             self._response.close()
 
         if exc_type:
@@ -509,10 +670,6 @@ class ResponseContextManager:
         # 断言成功时，设置断言结果为pass
         self.log.assertion_result = "pass"
         # 记录成功指标
-        logger.debug(
-            "调用指标回调函数，方法: %s, 端点: %s",
-            self.log.method, self.log.endpoint
-        )
         await self._metrics_callback(
             request_id=self.log.request_id,
             method=self.log.method,
@@ -520,12 +677,19 @@ class ResponseContextManager:
             status_code=self.log.status_code,
             duration=self.log.duration,
             response_size=self.log.response_size,
-            assertion_result=self.log.assertion_result
+            assertion_result=self.log.assertion_result,
+            corrected_duration=self.log.corrected_duration
         )
         # 记录成功日志
-        self._log_request(self.log, "complete")
+        if self.log_level is not None:
+            self._log_request(self.log, "complete", self.log_level)
         return True
 
+    def _set_corrected_duration(self, end_time: float) -> None:
+        """按计划开始时间计算校正耗时（实际结束时间 - 计划开始时间）"""
+        if self.intended_start is not None:
+            self.log.corrected_duration = end_time - self.intended_start
+
     @property
     def status(self) -> int:
         """提供 status 属性，保持和aiohttp一致的操作"""
@@ -534,32 +698,85 @@ class ResponseContextManager:
     @property
     def headers(self) -> Dict[str, str]:
         """提供 headers 属性，保持和aiohttp一致的操作"""
+        if self._processed_data['headers'] is None:
+            self._processed_data['headers'] = self._safe_get_headers(self._response)
         return self._processed_data['headers']
 
+    @property
+    def cookies(self) -> Dict[str, Any]:
+        """响应 Cookie 字典"""
+        if self._processed_data['cookies'] is None:
+            self._processed_data['cookies'] = self._safe_get_cookies(self._response)
+        return self._processed_data['cookies']
+
+    @property
+    def content(self) -> aiohttp.StreamReader:
+        """原始响应流（stream 模式下用于流式消费）"""
+        return self._response.content
+
+    async def iter_chunked(self, chunk_size: int = DISCARD_CHUNK_SIZE):
+        """
+        按块迭代响应体（stream 模式）
+
+        参数：
+        - chunk_size: 每块最大字节数
+        """
+        async for chunk in self._response.content.iter_chunked(chunk_size):
+            yield chunk
+
+    async def read(self) -> bytes:
+        """获取原始响应字节（discard 模式下为空）"""
+        if self.body_mode in (BODY_MODE_FULL, BODY_MODE_STREAM):
+            return await self._response.read()
+        return self._processed_data['data'] or b""
+
     async def text(self) -> str:
         """提供 text() 方法,保持和aiohttp一致的操作"""
-        return self._processed_data['data']
+        if self.body_mode == BODY_MODE_FULL:
+            return self._processed_data['data']
+        return (await self.read()).decode('utf-8', errors='replace')
 
     async def json(self) -> dict:
         """提供 json() 方法,保持和aiohttp一致的操作"""
-        return self._processed_data['data']
+        if self.body_mode == BODY_MODE_FULL:
+            return self._processed_data['data']
+        if self._parsed is not None:
+            return self._parsed
+        raw_bytes = await self.read()
+        data = self._parse_response_data(raw_bytes) if raw_bytes else None
+        if self.body_mode == BODY_MODE_LAZY:
+            self._parsed = data
+        return data
 
     async def _process_response(
             self, response: aiohttp.ClientResponse) -> Dict[str, Any]:
         """处理响应数据"""
         try:
-            raw_bytes = await response.read()
-            data = self._parse_response_data(raw_bytes)
-
-            # 统一处理 headers 和 cookies 转换
-            headers_dict = self._safe_get_headers(response)
-            cookies_dict = self._safe_get_cookies(response)
-
+            if self.body_mode == BODY_MODE_FULL:
+                raw_bytes = await response.read()
+                return {
+                    'status': response.status,
+                    'headers': self._safe_get_headers(response),
+                    'data': self._parse_response_data(raw_bytes),
+                    'cookies': self._safe_get_cookies(response),
+                    'size': self._received_bytes(response, len(raw_bytes)),
+                }
+
+            # 非 full 模式：不解析响应体，响应头和 Cookie 在首次访问时复制
+            raw_bytes = None
+            size = 0
+            if self.body_mode == BODY_MODE_DISCARD:
+                async for chunk in response.content.iter_chunked(DISCARD_CHUNK_SIZE):
+                    size += len(chunk)
+            elif self.body_mode != BODY_MODE_STREAM:
+                raw_bytes = await response.read()
+                size = self._received_bytes(response, len(raw_bytes))
             return {
                 'status': response.status,
-                'headers': headers_dict,
-                'data': data,
-                'cookies': cookies_dict,
+                'headers': None,
+                'data': raw_bytes,
+                'cookies': None,
+                'size': size,
             }
         except Exception as e:
             logger.error("处理响应数据失败: %s", e)
@@ -580,6 +797,13 @@ class ResponseContextManager:
             # JSON 解析失败，尝试作为文本读取
             return raw_bytes.decode('utf-8', errors='replace')
 
+    @staticmethod
+    def _received_bytes(response, default: int) -> int:
+        """获取已接收的响应体字节数（解压后），无法获取时返回默认值"""
+        content = getattr(response, 'content', None)
+        total_bytes = getattr(content, 'total_bytes', None)
+        return total_bytes if isinstance(total_bytes, int) else default
+
     @staticmethod
     def _safe_get_headers(response) -> Dict[str, str]:
         """安全获取headers字典"""
@@ -615,13 +839,15 @@ class ResponseContextManager:
             exc_val, exc_type, exc_tb = exc_type, type(
                 exc_type), exc_type.__traceback__
 
-        duration = time.monotonic() - self.start_time
+        end_time = time.monotonic()
+        duration = end_time - self.start_time
 
         # 断言失败时，设置断言结果为fail
         self.log.assertion_result = "fail"
 
         # 更新日志
         self.log.duration = duration
+        self._set_corrected_duration(end_time)
         self.log.endpoint = self.log.endpoint or "unknown"
 
         # 获取简化的堆栈信息
@@ -653,7 +879,8 @@ class ResponseContextManager:
             duration=self.log.duration,
             response_size=0,
             error=self.log.error,
-            assertion_result=self.log.assertion_result
+            assertion_result=self.log.assertion_result,
+            corrected_duration=self.log.corrected_duration
         )
 
         # 记录失败日志
@@ -691,18 +918,3 @@ class ResponseContextManager:
             error_message = f"{error_message} | Response: {response_str}"
 
         return error_message
-
-    @staticmethod
-    def _estimate_size(data: Any) -> int:
-        """
-        估算数据大小
-
-        参数：
-        - data: 数据对象
-
-        返回：
-        - int: 估算的字节大小
-        """
-        if data is None:
-            return 0
-        return len(str(data).encode('utf-8'))
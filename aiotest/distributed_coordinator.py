@@ -2,21 +2,148 @@
 
 import asyncio
 import json
-from typing import Optional
+import time
+from typing import Awaitable, Callable, Dict, Iterable, Optional
 from uuid import uuid4
 
 from redis.asyncio import Redis
 from redis.asyncio.connection import ConnectionPool
+from redis.exceptions import ResponseError
 
+from aiotest.exception import MetricsBackpressureError, MetricsPublishError
 from aiotest.logger import logger
+from aiotest.metrics_codec import (
+    SUPPORTED_ENCODINGS,
+    WIRE_BINARY,
+    WIRE_JSON,
+    decode_metrics_message,
+    encode_metrics_batch,
+    negotiate_encoding,
+)
 
 # 心跳相关常量
 HEARTBEAT_INTERVAL = 1.0  # 心跳监控时间间隔(秒)
 HEARTBEAT_LIVENESS = 5    # 心跳存活检查次数
+HEARTBEAT_TTL = int(HEARTBEAT_INTERVAL * HEARTBEAT_LIVENESS * 2)  # 心跳数据过期时间(秒)
+
+# 心跳注册表：有序集合，成员为 Worker ID，分值为最近一次心跳的 Redis 服务器时间
+HEARTBEAT_REGISTRY_KEY = "aiotest:heartbeats"
 
 # 批量传输相关常量
 MAX_BATCH_SIZE = 1000     # 最大批量大小，防止消息过大
 
+# Master 通告支持的指标编码的键
+METRICS_ENCODINGS_KEY = "aiotest:metrics:encodings"
+
+# 指标传输方式：pub/sub 频道或 Redis Stream
+METRICS_CHANNEL = "aiotest:metrics"
+METRICS_TRANSPORT_PUBSUB = "pubsub"
+METRICS_TRANSPORT_STREAM = "stream"
+METRICS_STREAM_KEY = "aiotest:metrics:stream"
+METRICS_STREAM_GROUP = "aiotest-master"
+METRICS_STREAM_CONSUMER = "master"  # 固定名称，Master 重启后可以接管未确认的消息
+METRICS_STREAM_MAXLEN = 10000       # Stream 保留的最大消息数（每条为一个批次）
+METRICS_STREAM_READ_COUNT = 100     # Master 每次读取的最大消息数
+METRICS_STREAM_MAX_ATTEMPTS = 3     # 处理失败的消息最多尝试次数，之后转入死信 Stream
+METRICS_STREAM_RETRY_DELAY = 0.1    # 处理失败后重新读取未确认消息前的等待(秒)
+METRICS_DEAD_LETTER_KEY = "aiotest:metrics:stream:dead"
+METRICS_LAG_CHECK_INTERVAL = 1.0    # Worker 查询消费滞后的最小间隔(秒)
+
+# 协调后端：经由 Redis（默认），或 Master 与 Worker 通过 TCP 直连（见 tcp_coordinator）
+COORDINATOR_REDIS = "redis"
+COORDINATOR_TCP = "tcp"
+
+
+def _redis_seconds(redis_time) -> float:
+    """将 Redis TIME 命令的返回值（秒, 微秒）转换为秒"""
+    return int(redis_time[0]) + int(redis_time[1]) / 1_000_000
+
+
+async def send_metrics_chunks(data: list,
+                              encode_chunk: Callable[[list, int, int], str],
+                              send: Callable[[str], Awaitable[None]]) -> None:
+    """
+    按 MAX_BATCH_SIZE 分块编码并依次发送原始请求指标（各协调后端共用）
+
+    参数：
+        data: 原始请求指标
+        encode_chunk: 编码一个分块，格式为 encode_chunk(chunk, chunk_index, total_chunks) -> str
+        send: 发送一条消息的协程函数
+
+    异常：
+        MetricsPublishError: 已有分块送达后后续分块发送失败，sent 为已送达的条数；
+                             第一个分块就失败时原样抛出发送异常
+    """
+    total_chunks = max(1, (len(data) + MAX_BATCH_SIZE - 1) // MAX_BATCH_SIZE)
+    for chunk_index in range(total_chunks):
+        start = chunk_index * MAX_BATCH_SIZE
+        message = encode_chunk(data[start:start + MAX_BATCH_SIZE], chunk_index, total_chunks)
+        try:
+            await send(message)
+        except Exception as e:
+            if start == 0:
+                raise
+            raise MetricsPublishError(
+                f"指标分块 {chunk_index + 1}/{total_chunks} 发送失败，前 {start} 条已送达: {e}",
+                sent=start) from e
+
+
+async def dispatch_metrics_message(payload, callback=None, aggregate_callback=None,
+                                   batch_callback=None) -> bool:
+    """
+    解码一条指标消息并调用对应的回调（各协调后端共用）
+
+    参数：
+        payload: 指标消息（JSON 或二进制编码）
+        callback: 逐条回调，格式为 async def callback(metrics_data: dict, worker_id: str)
+        aggregate_callback: 聚合数据回调，格式为 async def aggregate_callback(aggregates: list, worker_id: str)
+        batch_callback: 批量回调，格式为 async def batch_callback(batch: list, worker_id: str)
+
+    返回：
+        bool: 消息处理成功为 True，解析失败时记录警告并返回 False
+
+    说明：
+        - 回调抛出的异常不在此处捕获，由调用方按传输方式处理（记录日志或重试）
+    """
+    try:
+        message_data = decode_metrics_message(payload)
+
+        # 处理区间聚合数据
+        if 'aggregates' in message_data:
+            if aggregate_callback:
+                await aggregate_callback(
+                    message_data['aggregates'],
+                    message_data.get('worker_id', 'unknown'))
+            return True
+
+        # 处理批量数据
+        batch = message_data.get('batch', [])
+        worker_id = message_data.get(
+            'worker_id', 'unknown')
+        chunk_index = message_data.get('chunk_index', 0)
+        total_chunks = message_data.get('total_chunks', 1)
+
+        # 记录分块信息（如果是分块传输）
+        if total_chunks > 1:
+            logger.debug(
+                "处理指标分块 %d/%d，来自 %s",
+                chunk_index + 1, total_chunks, worker_id)
+
+        # 整批交给批量回调，否则遍历批量数据并调用回调
+        if batch_callback:
+            if batch:
+                await batch_callback(batch, worker_id)
+        elif callback:
+            for metrics_data in batch:
+                await callback(metrics_data, worker_id)
+        return True
+
+    except (ValueError, KeyError) as e:
+        logger.warning(
+            "解析请求指标失败: %s",
+            str(e))
+        return False
+
 
 class RedisConnection:
     """
@@ -299,7 +426,10 @@ class DistributedCoordinator:
     """
 
     def __init__(self, redis: Redis, role: str = "master",
-                 node_id: str = None):
+                 node_id: str = None, metrics_encoding: str = WIRE_BINARY,
+                 metrics_transport: str = METRICS_TRANSPORT_PUBSUB,
+                 stream_maxlen: int = METRICS_STREAM_MAXLEN,
+                 namespace: Optional[str] = None):
         """
         初始化分布式协调器。
 
@@ -307,34 +437,71 @@ class DistributedCoordinator:
             redis: Redis 客户端实例，用于发布/订阅消息。
             role: 节点角色，可选值为 "master" 或 "worker"。
             node_id: 节点ID，可选。
+            metrics_encoding: Worker 期望的原始指标编码（json/binary），
+                              二进制编码仅在 Master 通告支持时使用。
+            metrics_transport: 指标传输方式，"pubsub"（默认）或 "stream"。
+                               Stream 模式下 Master 通过消费组读取并确认，
+                               Master 重启或处理变慢时数据不会丢失。
+            stream_maxlen: Stream 保留的最大消息数，消费滞后达到一半时 Worker 暂缓发送。
+            namespace: 命名空间，聚合节点与所辖 Worker 之间使用独立的频道和键；
+                       None 表示与 Master 通信的默认命名空间。
         """
+        if metrics_transport not in (METRICS_TRANSPORT_PUBSUB, METRICS_TRANSPORT_STREAM):
+            raise ValueError(f"无效的指标传输方式: {metrics_transport}")
         self.redis = redis
         self.role = role
         self.node_id = node_id or f"{role}_{id(self)}"
         self.pubsub = None
         self.handler = None
+        self.metrics_encoding = metrics_encoding
+        self._negotiated_encoding = None  # 协商结果，Master 通告前为 None
+        self.metrics_transport = metrics_transport
+        self.stream_maxlen = stream_maxlen
+        self.stream_lag = 0  # 最近一次查询到的 Stream 消费滞后（消息数）
+        self._lag_checked_at = float('-inf')
+        self._clock_offset = None  # Redis 服务器时间与本地时间之差，首次心跳或同步时获取
+        self.clock_rtt = 0.0  # 最近一次测量时钟偏移的往返耗时（秒），偏移误差不超过其一半
+
+        # 命名空间内的指标与心跳键
+        self.namespace = namespace
+        self.metrics_channel = self._key(METRICS_CHANNEL)
+        self.metrics_stream_key = self._key(METRICS_STREAM_KEY)
+        self.metrics_dead_letter_key = self._key(METRICS_DEAD_LETTER_KEY)
+        self.metrics_encodings_key = self._key(METRICS_ENCODINGS_KEY)
+        self.heartbeat_registry_key = self._key(HEARTBEAT_REGISTRY_KEY)
+        self.heartbeat_key_prefix = self._key("aiotest:heartbeat:")
 
         # 根据角色确定订阅和发布的频道
         if role == "master":
-            self.subscribe_channel = "aiotest:command:worker_to_master"  # 订阅Worker发来的消息
-            self.publish_channel = "aiotest:command:master_to_worker"  # 发布给Worker的消息
+            self.subscribe_channel = self._key("aiotest:command:worker_to_master")  # 订阅Worker发来的消息
+            self.publish_channel = self._key("aiotest:command:master_to_worker")  # 发布给Worker的消息
         elif role == "worker":
-            self.subscribe_channel = "aiotest:command:master_to_worker"  # 订阅Master发来的消息
-            self.publish_channel = "aiotest:command:worker_to_master"  # 发布给Master的消息
+            self.subscribe_channel = self._key("aiotest:command:master_to_worker")  # 订阅Master发来的消息
+            self.publish_channel = self._key("aiotest:command:worker_to_master")  # 发布给Master的消息
         else:
             raise ValueError("无效的角色。必须是 'master' 或 'worker'。")
 
+    def _key(self, name: str) -> str:
+        """返回命名空间内的键或频道名，默认命名空间保持原名，例如 aiotest:metrics -> aiotest:g1:metrics"""
+        if not self.namespace:
+            return name
+        return f"aiotest:{self.namespace}:{name[len('aiotest:'):]}"
+
+    async def close(self) -> None:
+        """与 TcpCoordinator 接口一致；Redis 连接由 RedisConnection 统一管理，此处无需关闭"""
+
     async def publish(self, channel_type: str, data: dict,
                       worker_id: str = None, **kwargs):
         """
         统一的数据发布方法，支持多种数据类型的发布
 
         参数：
-            channel_type: 频道类型，支持 "command", "request_metrics", "heartbeat"
+            channel_type: 频道类型，支持 "command", "request_metrics", "request_aggregates", "heartbeat"
             data: 要发布的数据字典
             worker_id: Worker节点ID
                        - command: 可选，用于指定目标worker
                        - request_metrics: 必需
+                       - request_aggregates: 必需
                        - heartbeat: 不使用（使用self.node_id）
             **kwargs: 额外参数，如command参数用于命令发布
 
@@ -348,6 +515,9 @@ class DistributedCoordinator:
             # 发布批量请求指标
             await coordinator.publish("request_metrics", batch_data, worker_id="worker_1")
 
+            # 发布区间聚合指标
+            await coordinator.publish("request_aggregates", aggregates, worker_id="worker_1")
+
             # 发送心跳
             await coordinator.publish("heartbeat", {"cpu_percent": 45.0, "active_users": 100})
         """
@@ -371,45 +541,192 @@ class DistributedCoordinator:
                 raise ValueError(
                     "请求指标批量发布需要 'worker_id'")
 
+            if self.metrics_transport == METRICS_TRANSPORT_STREAM:
+                await self._check_stream_backpressure()
+
+            if await self._request_metrics_encoding() == WIRE_BINARY:
+                await self._publish_binary_metrics(data, worker_id)
+                return
+
             # 如果批量数据过大，拆分成多个小批次发送
-            if isinstance(data, list) and len(data) > MAX_BATCH_SIZE:
-                for i in range(0, len(data), MAX_BATCH_SIZE):
-                    batch_chunk = data[i:i + MAX_BATCH_SIZE]
-                    batch_dict = {
-                        'batch': batch_chunk,
-                        'worker_id': worker_id,
-                        'timestamp': asyncio.get_event_loop().time(),
-                        'chunk_index': i // MAX_BATCH_SIZE,
-                        'total_chunks': (len(data) + MAX_BATCH_SIZE - 1) // MAX_BATCH_SIZE
-                    }
-                    await self.redis.publish("aiotest:metrics", json.dumps(batch_dict))
-            else:
+            timestamp = asyncio.get_event_loop().time()
+
+            def encode_chunk(chunk, chunk_index, total_chunks):
                 batch_dict = {
-                    'batch': data,
+                    'batch': chunk,
                     'worker_id': worker_id,
-                    'timestamp': asyncio.get_event_loop().time()
+                    'timestamp': timestamp
                 }
-                await self.redis.publish("aiotest:metrics", json.dumps(batch_dict))
+                if total_chunks > 1:
+                    batch_dict['chunk_index'] = chunk_index
+                    batch_dict['total_chunks'] = total_chunks
+                return json.dumps(batch_dict)
 
-        elif channel_type == "heartbeat":
-            # 发送心跳数据（存储到Redis hash，不是发布）
-            # 使用 Redis 的 TIME 命令获取时间戳，确保 Master 和 Worker 的时间一致
-            redis_time = await self.redis.time()
-            timestamp = int(redis_time[0]) + redis_time[1] / 1_000_000  # 秒 + 微秒
+            await send_metrics_chunks(data, encode_chunk, self._send_metrics)
+
+        elif channel_type == "request_aggregates":
+            # 发布区间聚合数据到请求指标频道（每个刷新间隔一条消息）
+            if not worker_id:
+                raise ValueError(
+                    "请求指标聚合发布需要 'worker_id'")
 
-            heartbeat_data = {
-                **data,
-                "timestamp": timestamp
+            aggregates_dict = {
+                'aggregates': data,
+                'worker_id': worker_id,
+                'timestamp': asyncio.get_event_loop().time()
             }
+            await self._send_metrics(json.dumps(aggregates_dict))
 
-            # 将心跳数据存储到Redis，设置过期时间
-            heartbeat_key = f"aiotest:heartbeat:{self.node_id}"
-            await self.redis.hset(heartbeat_key, mapping=heartbeat_data)
-            await self.redis.expire(heartbeat_key, int(HEARTBEAT_INTERVAL * HEARTBEAT_LIVENESS * 2))
+        elif channel_type == "heartbeat":
+            await self._publish_heartbeat(data)
 
         else:
             raise ValueError("不支持的 channel_type: %s", channel_type)
 
+    async def _publish_heartbeat(self, data: dict) -> None:
+        """
+        写入心跳数据与心跳注册表（一次往返）
+
+        时间戳使用 Redis 服务器时间，确保 Master 和 Worker 的时间一致。服务器时间与本地时间之差
+        只在首次心跳时单独查询，之后随每次心跳的 TIME 一起返回并更新。
+        """
+        if self._clock_offset is None:
+            await self.sync_clock()
+        timestamp = self.server_time()
+
+        heartbeat_key = f"{self.heartbeat_key_prefix}{self.node_id}"
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.hset(heartbeat_key, mapping={**data, "timestamp": timestamp})
+        pipe.expire(heartbeat_key, HEARTBEAT_TTL)
+        pipe.zadd(self.heartbeat_registry_key, {self.node_id: timestamp})
+        pipe.time()
+        before = time.time()
+        results = await pipe.execute()
+        self._update_clock_offset(results[-1], before, time.time())
+
+    async def sync_clock(self) -> float:
+        """
+        测量 Redis 服务器时间与本地时间之差
+
+        返回：
+            float: 本次测量的往返耗时（秒）
+        """
+        before = time.time()
+        redis_time = await self.redis.time()
+        self._update_clock_offset(redis_time, before, time.time())
+        return self.clock_rtt
+
+    def _update_clock_offset(self, redis_time, before: float, after: float) -> None:
+        """按往返中点估算服务器时间对应的本地时间，更新时钟偏移"""
+        self._clock_offset = _redis_seconds(redis_time) - (before + after) / 2
+        self.clock_rtt = after - before
+
+    @property
+    def clock_synced(self) -> bool:
+        """是否已测量过时钟偏移"""
+        return self._clock_offset is not None
+
+    def server_time(self) -> float:
+        """
+        按最近一次测量的时钟偏移估算当前 Redis 服务器时间（不访问 Redis）
+
+        返回：
+            float: Redis 服务器时间（秒）；尚未测量时钟偏移时返回本地时间
+        """
+        return time.time() + (self._clock_offset or 0.0)
+
+    def server_to_loop_time(self, server_timestamp: float) -> float:
+        """
+        将 Redis 服务器时间换算为当前事件循环的时间
+
+        参数：
+            server_timestamp: Redis 服务器时间（秒）
+
+        返回：
+            float: 对应的 loop.time() 时刻
+        """
+        return asyncio.get_running_loop().time() + server_timestamp - self.server_time()
+
+    async def _publish_binary_metrics(self, data: list, worker_id: str) -> None:
+        """按 MAX_BATCH_SIZE 分块，以二进制编码发布原始请求指标"""
+        timestamp = asyncio.get_event_loop().time()
+
+        def encode_chunk(chunk, chunk_index, total_chunks):
+            return encode_metrics_batch(
+                chunk, worker_id, timestamp=timestamp,
+                chunk_index=chunk_index, total_chunks=total_chunks)
+
+        await send_metrics_chunks(data, encode_chunk, self._send_metrics)
+
+    async def _send_metrics(self, payload: str) -> None:
+        """按传输方式发送一条指标消息"""
+        if self.metrics_transport == METRICS_TRANSPORT_STREAM:
+            await self.redis.xadd(self.metrics_stream_key, {"data": payload},
+                                  maxlen=self.stream_maxlen, approximate=True)
+        else:
+            await self.redis.publish(self.metrics_channel, payload)
+
+    async def get_stream_lag(self) -> int:
+        """
+        查询 Stream 中 Master 尚未确认的消息数
+
+        返回：
+            int: 未读取（lag）与已读取未确认（pending）的消息数之和；
+                 消费组尚未创建时为 Stream 长度
+        """
+        groups = []
+        try:
+            groups = await self.redis.xinfo_groups(self.metrics_stream_key)
+        except ResponseError:
+            # Stream 尚不存在
+            return 0
+        for group in groups:
+            if group.get('name') == METRICS_STREAM_GROUP:
+                lag = group.get('lag')
+                if lag is None:
+                    # Redis 7 之前没有 lag 字段，用 Stream 长度作为上界
+                    lag = await self.redis.xlen(self.metrics_stream_key)
+                return int(lag) + int(group.get('pending', 0))
+        return int(await self.redis.xlen(self.metrics_stream_key))
+
+    async def _check_stream_backpressure(self) -> None:
+        """
+        Master 消费滞后达到 Stream 容量一半时拒绝发送
+
+        异常：
+            MetricsBackpressureError: 消费滞后过高，调用方应保留数据稍后重试
+        """
+        now = asyncio.get_event_loop().time()
+        if now - self._lag_checked_at >= METRICS_LAG_CHECK_INTERVAL:
+            self._lag_checked_at = now
+            self.stream_lag = await self.get_stream_lag()
+        if self.stream_lag >= self.stream_maxlen // 2:
+            raise MetricsBackpressureError(
+                f"Master 消费滞后 {self.stream_lag} 条消息，暂缓发送指标", self.stream_lag)
+
+    async def advertise_metrics_encodings(self) -> None:
+        """Master 通告支持的原始指标编码，Worker 据此协商"""
+        await self.redis.set(self.metrics_encodings_key, SUPPORTED_ENCODINGS)
+        logger.debug("已通告支持的指标编码: %s", SUPPORTED_ENCODINGS)
+
+    async def _request_metrics_encoding(self) -> str:
+        """
+        获取发布原始指标使用的编码
+
+        Master 尚未通告时暂用 JSON，并在下次发布时重新协商。
+        """
+        if self._negotiated_encoding is None:
+            try:
+                advertised = await self.redis.get(self.metrics_encodings_key)
+            except Exception as e:
+                logger.warning("读取指标编码通告失败: %s", e)
+                return WIRE_JSON
+            self._negotiated_encoding = negotiate_encoding(self.metrics_encoding, advertised)
+            if self._negotiated_encoding is None:
+                return WIRE_JSON
+            logger.info("指标编码协商结果: %s", self._negotiated_encoding)
+        return self._negotiated_encoding
+
     async def check_worker_heartbeat(self, worker_id: str) -> bool:
         """
         检查特定Worker的心跳状态（Master端使用）
@@ -420,7 +737,7 @@ class DistributedCoordinator:
         返回：
             bool: Worker是否存活
         """
-        heartbeat_key = f"aiotest:heartbeat:{worker_id}"
+        heartbeat_key = f"{self.heartbeat_key_prefix}{worker_id}"
         heartbeat_data = await self.redis.hgetall(heartbeat_key)
 
         if not heartbeat_data:
@@ -429,7 +746,7 @@ class DistributedCoordinator:
         try:
             # 使用 Redis 服务器时间进行比较，避免跨进程事件循环时间不一致的问题
             redis_time = await self.redis.time()
-            current_time = redis_time[0] + redis_time[1] / 1_000_000  # 秒 + 微秒
+            current_time = _redis_seconds(redis_time)
 
             last_heartbeat = float(heartbeat_data.get("timestamp", 0))
             return (current_time - last_heartbeat) <= HEARTBEAT_INTERVAL * \
@@ -437,6 +754,73 @@ class DistributedCoordinator:
         except (ValueError, TypeError):
             return False
 
+    async def check_workers_heartbeat(self, worker_ids: Iterable[str]) -> Dict[str, bool]:
+        """
+        批量检查 Worker 心跳状态（Master端使用）
+
+        通过一次流水线读取 Redis 服务器时间与心跳注册表中各 Worker 的最近心跳时间，
+        往返次数与 Worker 数量无关。
+
+        参数：
+            worker_ids: Worker节点ID列表
+
+        返回：
+            dict: Worker ID -> 是否存活
+        """
+        worker_ids = list(worker_ids)
+        if not worker_ids:
+            return {}
+
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.time()
+        for worker_id in worker_ids:
+            pipe.zscore(self.heartbeat_registry_key, worker_id)
+        redis_time, *scores = await pipe.execute()
+
+        deadline = _redis_seconds(redis_time) - HEARTBEAT_INTERVAL * HEARTBEAT_LIVENESS
+        return {
+            worker_id: score is not None and score >= deadline
+            for worker_id, score in zip(worker_ids, scores)
+        }
+
+    async def _poll_heartbeats(self, last_seen: Dict[str, float]) -> Dict[str, dict]:
+        """
+        读取心跳注册表，返回自上次读取后有新心跳的 Worker 数据
+
+        第一次往返读取服务器时间与注册表，第二次往返只读取有新心跳的 Worker，
+        同时移除超过心跳过期时间仍未更新的注册表成员。
+
+        参数：
+            last_seen: Worker ID -> 上次处理的心跳时间，原地更新
+
+        返回：
+            dict: Worker ID -> 心跳数据
+        """
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.time()
+        pipe.zrange(self.heartbeat_registry_key, 0, -1, withscores=True)
+        redis_time, registry = await pipe.execute()
+        expired_before = _redis_seconds(redis_time) - HEARTBEAT_TTL
+
+        registry = dict(registry)
+        updated = [(worker_id, score) for worker_id, score in registry.items()
+                   if score >= expired_before and last_seen.get(worker_id) != score]
+        for worker_id in set(last_seen) - registry.keys():
+            del last_seen[worker_id]
+
+        pipe = self.redis.pipeline(transaction=False)
+        for worker_id, _ in updated:
+            pipe.hgetall(f"{self.heartbeat_key_prefix}{worker_id}")
+        pipe.zremrangebyscore(self.heartbeat_registry_key, "-inf", f"({expired_before}")
+        *heartbeats, _ = await pipe.execute()
+
+        changed = {}
+        for (worker_id, score), heartbeat_data in zip(updated, heartbeats):
+            if heartbeat_data:
+                last_seen[worker_id] = score
+                changed[worker_id] = heartbeat_data
+        return changed
+
     async def listen_heartbeats(self, callback=None):
         """
         监听Worker心跳数据变化（Master端使用）
@@ -445,32 +829,16 @@ class DistributedCoordinator:
             callback: 可选的回调函数，格式为 async def callback(heartbeat_data: dict, worker_id: str)
         """
         # 注意：Redis的心跳数据是存储在hash中的，不是通过pub/sub发布的
-        # 所以这里提供轮询检查心跳变化的机制
-        worker_status = {}  # 记录上一次的worker状态
+        # 所以这里轮询心跳注册表，每个周期固定两次往返，只读取心跳时间有变化的Worker
+        last_seen = {}  # 记录每个worker上一次处理的心跳时间
 
         try:
             while True:
                 try:
-                    heartbeat_keys = []
-                    cursor = 0
-                    while True:
-                        cursor, keys = await self.redis.scan(cursor, match="aiotest:heartbeat:*", count=100)
-                        heartbeat_keys.extend(keys)
-                        if cursor == 0:
-                            break
-
-                    for key in heartbeat_keys:
-                        worker_id = key.replace("aiotest:heartbeat:", "")
-                        heartbeat_data = await self.redis.hgetall(key)
-
-                        if heartbeat_data:
-                            # 检查状态是否发生变化
-                            if worker_id not in worker_status or worker_status[worker_id] != heartbeat_data:
-                                worker_status[worker_id] = heartbeat_data
-
-                                # 调用回调函数（如果提供）
-                                if callback:
-                                    await callback(heartbeat_data, worker_id)
+                    changed = await self._poll_heartbeats(last_seen)
+                    if callback:
+                        for worker_id, heartbeat_data in changed.items():
+                            await callback(heartbeat_data, worker_id)
 
                     await asyncio.sleep(HEARTBEAT_INTERVAL)
 
@@ -486,20 +854,35 @@ class DistributedCoordinator:
             logger.info("心跳监听器已停止")
             raise
 
-    async def listen_request_metrics(self, callback=None):
+    async def listen_request_metrics(self, callback=None, aggregate_callback=None,
+                                     batch_callback=None):
         """
         监听Worker上报的请求数据
 
         参数：
             callback: 可选的回调函数，格式为 async def callback(metrics_data: dict, worker_id: str)
                       如果不提供，数据将只通过事件系统处理
+            aggregate_callback: 可选的聚合数据回调函数，格式为
+                      async def aggregate_callback(aggregates: list, worker_id: str)
+                      用于处理 Worker 聚合模式上报的区间聚合记录
+            batch_callback: 可选的批量回调函数，格式为
+                      async def batch_callback(batch: list, worker_id: str)
+                      提供时每条消息只调用一次，不再逐条调用 callback
         """
+        async def dispatch(payload):
+            return await self._dispatch_metrics_message(
+                payload, callback, aggregate_callback, batch_callback)
+
+        if self.metrics_transport == METRICS_TRANSPORT_STREAM:
+            await self._listen_metrics_stream(dispatch)
+            return
+
         request_pubsub = None
         try:
             request_pubsub = self.redis.pubsub()
 
             # 订阅请求数据channel
-            await request_pubsub.subscribe("aiotest:metrics")
+            await request_pubsub.subscribe(self.metrics_channel)
             logger.info(
                 "%s 开始从 Redis 监听请求指标", self.role)
 
@@ -510,36 +893,7 @@ class DistributedCoordinator:
 
                     # 处理请求数据
                     if request_message and request_message['type'] == 'message':
-                        try:
-                            message_data = json.loads(request_message['data'])
-
-                            # 处理批量数据
-                            batch = message_data.get('batch', [])
-                            worker_id = message_data.get(
-                                'worker_id', 'unknown')
-                            chunk_index = message_data.get('chunk_index', 0)
-                            total_chunks = message_data.get('total_chunks', 1)
-
-                            # 记录分块信息（如果是分块传输）
-                            if total_chunks > 1:
-                                logger.debug(
-                                    "处理指标分块 %d/%d，来自 %s",
-                                    chunk_index + 1, total_chunks, worker_id)
-
-                            # 遍历批量数据并调用回调
-                            for metrics_data in batch:
-                                if callback:
-                                    await callback(metrics_data, worker_id)
-
-                        except (json.JSONDecodeError, KeyError, Exception) as e:
-                            if isinstance(e, (json.JSONDecodeError, KeyError)):
-                                logger.warning(
-                                    "从 Redis 解析请求指标失败: %s",
-                                    str(e))
-                            else:
-                                logger.warning(
-                                    "处理请求指标回调失败: %s",
-                                    str(e))
+                        await dispatch(request_message['data'])
 
                 except asyncio.CancelledError:
                     # 任务被取消，记录日志并退出
@@ -559,7 +913,7 @@ class DistributedCoordinator:
             # 清理pubsub连接
             if request_pubsub:
                 try:
-                    await request_pubsub.unsubscribe("aiotest:metrics")
+                    await request_pubsub.unsubscribe(self.metrics_channel)
                     await request_pubsub.close()
                 except Exception as e:
                     logger.warning(
@@ -567,6 +921,145 @@ class DistributedCoordinator:
                         str(e))
             logger.info("Redis请求指标监听器已停止")
 
+    async def _listen_metrics_stream(self, dispatch) -> None:
+        """
+        通过 Redis Stream 消费组读取请求指标
+
+        说明：
+            - 启动时先处理本消费者已投递但未确认的消息（Master 重启前未处理完的数据），
+              再读取新消息
+            - 每批消息中处理成功的统一确认（XACK），处理期间中断的消息会在下次启动时重新投递
+            - 处理失败的消息保持未确认并重新读取，尝试 METRICS_STREAM_MAX_ATTEMPTS 次后
+              转入死信 Stream 再确认，不会被静默丢弃
+            - 未确认期间已被 maxlen 裁剪删除的消息（字段为空）直接确认跳过
+        """
+        try:
+            await self._ensure_metrics_group()
+            logger.info(
+                "%s 开始从 Redis Stream 读取请求指标", self.role)
+
+            stream_id = "0"  # "0" 读取未确认的消息，">" 读取新消息
+            attempts: Dict[str, int] = {}  # 处理失败的消息 ID -> 已尝试次数
+            while True:
+                try:
+                    try:
+                        response = await self.redis.xreadgroup(
+                            METRICS_STREAM_GROUP, METRICS_STREAM_CONSUMER,
+                            {self.metrics_stream_key: stream_id},
+                            count=METRICS_STREAM_READ_COUNT, block=1000)
+                    except TypeError:
+                        # 较旧的 redis-py 解析已删除消息（[id, nil]）时抛出 TypeError
+                        if stream_id != "0":
+                            raise
+                        await self._ack_trimmed_pending()
+                        continue
+                    entries = response[0][1] if response else []
+                    if not entries:
+                        stream_id = ">"
+                        continue
+
+                    if await self._process_stream_entries(entries, dispatch, attempts):
+                        # 有消息处理失败：稍后从头重新读取未确认的消息
+                        stream_id = "0"
+                        await asyncio.sleep(METRICS_STREAM_RETRY_DELAY)
+
+                except asyncio.CancelledError:
+                    logger.info("请求指标 Stream 读取任务已取消")
+                    raise
+                except ResponseError as e:
+                    # Stream 或消费组被删除（如 Redis 重启）时重新创建
+                    logger.warning("读取指标 Stream 失败，重新创建消费组: %s", e)
+                    await self._ensure_metrics_group()
+                    await asyncio.sleep(0.1)
+                except Exception as e:
+                    logger.warning("Redis消息处理错误: %s", str(e))
+                    await asyncio.sleep(0.1)
+
+        except asyncio.CancelledError:
+            logger.info("请求指标监听器已停止")
+            raise
+        except Exception as e:
+            logger.error("Redis请求指标监听器失败: %s", str(e))
+
+    async def _process_stream_entries(self, entries, dispatch,
+                                      attempts: Dict[str, int]) -> bool:
+        """
+        处理一批 Stream 消息，确认处理成功、转入死信或已被裁剪的消息
+
+        参数：
+            entries: XREADGROUP 返回的 (消息 ID, 字段) 列表
+            dispatch: 处理单条指标消息的协程函数，返回是否成功；抛出异常视为处理失败
+            attempts: 处理失败的消息 ID 到已尝试次数的映射，原地更新
+
+        返回：
+            bool: 有消息处理失败且仍需重试时为 True
+        """
+        done = []
+        retry = False
+        for entry_id, fields in entries:
+            payload = fields.get("data") if fields else None
+            if payload is None:
+                logger.warning("指标消息 %s 已被 Stream 裁剪删除，跳过", entry_id)
+                done.append(entry_id)
+                continue
+            try:
+                ok = await dispatch(payload)
+            except Exception as e:
+                logger.warning("处理请求指标回调失败: %s", str(e))
+                ok = False
+            if ok:
+                attempts.pop(entry_id, None)
+                done.append(entry_id)
+                continue
+
+            count = attempts.pop(entry_id, 0) + 1
+            if count < METRICS_STREAM_MAX_ATTEMPTS:
+                attempts[entry_id] = count
+                retry = True
+                continue
+            logger.error(
+                "指标消息 %s 处理 %d 次仍失败，转入死信 Stream %s",
+                entry_id, count, self.metrics_dead_letter_key)
+            await self.redis.xadd(
+                self.metrics_dead_letter_key,
+                {"data": payload, "entry_id": entry_id, "attempts": count},
+                maxlen=self.stream_maxlen, approximate=True)
+            done.append(entry_id)
+
+        if done:
+            await self.redis.xack(
+                self.metrics_stream_key, METRICS_STREAM_GROUP, *done)
+        return retry
+
+    async def _ack_trimmed_pending(self) -> None:
+        """确认本消费者未确认、但已被 maxlen 裁剪删除的消息，避免其阻塞未确认消息的读取"""
+        pending = await self.redis.xpending_range(
+            self.metrics_stream_key, METRICS_STREAM_GROUP, min="-", max="+",
+            count=METRICS_STREAM_READ_COUNT, consumername=METRICS_STREAM_CONSUMER)
+        trimmed = []
+        for item in pending:
+            entry_id = item["message_id"]
+            if not await self.redis.xrange(self.metrics_stream_key, min=entry_id, max=entry_id):
+                trimmed.append(entry_id)
+        if trimmed:
+            logger.warning("%d 条未确认的指标消息已被 Stream 裁剪删除，跳过", len(trimmed))
+            await self.redis.xack(
+                self.metrics_stream_key, METRICS_STREAM_GROUP, *trimmed)
+
+    async def _ensure_metrics_group(self) -> None:
+        """创建指标 Stream 的消费组（已存在时忽略），从 Stream 开头读取保留的消息"""
+        try:
+            await self.redis.xgroup_create(
+                self.metrics_stream_key, METRICS_STREAM_GROUP, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def _dispatch_metrics_message(self, payload, callback, aggregate_callback,
+                                        batch_callback) -> bool:
+        """解码一条指标消息并调用对应的回调，解析失败时记录警告并返回 False"""
+        return await dispatch_metrics_message(payload, callback, aggregate_callback, batch_callback)
+
     async def listen_commands(self, command_handler):
         """
         统一的命令监听器
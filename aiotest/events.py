@@ -1,9 +1,8 @@
 # encoding: utf-8
 
 import asyncio
-import sys
 import traceback
-from typing import Any, Callable, Dict, List, Tuple
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Type
 
 from aiotest.logger import logger
 
@@ -30,10 +29,23 @@ class EventHook:
 
     def __init__(self):
         self._handlers: List[Tuple[int, Callable[..., Any]]] = []
+        # 按优先级排序的 (处理器, 是否协程函数) 缓存，注册/移除时重建，触发时直接使用
+        self._entries: Tuple[Tuple[Callable[..., Any], bool], ...] = ()
         self._lock = asyncio.Lock()
         # 待注册的装饰器处理器
         self._pending_handlers: List[Tuple[Callable[..., Any], int]] = []
 
+    @staticmethod
+    def _build_entries(
+            handlers: List[Tuple[int, Callable[..., Any]]]) -> Tuple[Tuple[Callable[..., Any], bool], ...]:
+        """根据排序后的处理器列表生成触发缓存"""
+        return tuple((h, asyncio.iscoroutinefunction(h)) for _, h in handlers)
+
+    @property
+    def has_handlers(self) -> bool:
+        """是否注册了处理器，调用方可据此跳过事件参数的构造"""
+        return bool(self._entries)
+
     def handler(self, priority: int = 0):
         """
         事件处理器装饰器 - 用于声明式注册事件处理器
@@ -80,6 +92,7 @@ class EventHook:
             # 使用优先级作为排序键，避免直接比较函数对象
             self._handlers.append((-priority, handler))
             self._handlers.sort(key=lambda x: x[0])
+            self._entries = self._build_entries(self._handlers)
             logger.info(
                 "已添加处理器 %s，优先级: %d", handler_name, priority)
 
@@ -105,6 +118,7 @@ class EventHook:
         """
         async with self._lock:
             self._handlers = [h for h in self._handlers if h[1] != handler]
+            self._entries = self._build_entries(self._handlers)
 
     async def fire(self, **kwargs: Any) -> None:
         """
@@ -113,8 +127,13 @@ class EventHook:
         参数：
             **kwargs (Any): 传递给事件处理器的参数。
         """
-        handlers = [h[1] for h in self._handlers]  # 提取排序后的处理器
-        tasks = [self._safe_execute(h, **kwargs) for h in handlers]  # 创建任务
+        entries = self._entries
+        if not entries:
+            return
+        if len(entries) == 1:
+            await self._safe_execute(entries[0][0], **kwargs)
+            return
+        tasks = [self._safe_execute(h, **kwargs) for h, _ in entries]
         await asyncio.gather(*tasks, return_exceptions=True)  # 并发执行
 
     async def fire_batch(self, events: List[Dict[str, Any]]) -> None:
@@ -151,20 +170,10 @@ class EventHook:
             **kwargs (Any): 传递给处理器的参数。
         """
         try:
-            # 检查处理器类型
-            if asyncio.iscoroutinefunction(handler):
-                # 协程函数，直接调用并等待
-                await asyncio.wait_for(handler(**kwargs), timeout=5.0)
-            else:
-                # 调用处理器
-                result = handler(**kwargs)
-                # 如果返回协程对象，等待它
-                if asyncio.iscoroutine(result):
-                    await asyncio.wait_for(result, timeout=5.0)
-                else:
-                    # 同步函数，在执行器中运行
-                    loop = asyncio.get_event_loop()
-                    await loop.run_in_executor(None, lambda: handler(**kwargs))
+            # 同步处理器直接调用一次；协程函数或返回协程的处理器带超时等待
+            result = handler(**kwargs)
+            if asyncio.iscoroutine(result):
+                await asyncio.wait_for(result, timeout=5.0)
         except asyncio.TimeoutError:
             logger.warning(
                 "处理器超时: %s",
@@ -173,12 +182,142 @@ class EventHook:
                     '__name__',
                     repr(handler)))
         except Exception as e:
-            logger.error(
-                "事件处理器 %s 发生错误:\n错误: %s\n堆栈: %s",
-                getattr(handler, '__name__', repr(handler)),
-                e,
-                ''.join(traceback.format_tb(sys.exc_info()[2]))
-            )
+            self._log_handler_error(handler, e)
+
+    @staticmethod
+    def _log_handler_error(handler: Callable[..., Any], error: BaseException) -> None:
+        """记录处理器异常"""
+        logger.error(
+            "事件处理器 %s 发生错误:\n错误: %s\n堆栈: %s",
+            getattr(handler, '__name__', repr(handler)),
+            error,
+            ''.join(traceback.format_tb(error.__traceback__))
+        )
+
+
+class BatchEventHook(EventHook):
+    """
+    高频事件钩子，用于每个请求都会触发的事件（如 request_metrics）。
+
+    与 EventHook 的区别：
+        - 普通处理器按优先级顺序直接调用：同步处理器直接调用，异步处理器直接 await，
+          不创建任务，也不设置超时（处理器必须足够快）。
+        - 批量处理器：同一事件循环周期内触发的事件参数合并为一个列表，
+          在下一个周期一次性交付，每个周期每个处理器只调用一次。
+
+    使用示例：
+        def on_requests(records):
+            for record in records:
+                print(record["metrics"])
+
+        await request_metrics.add_batch_handler(on_requests)
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._batch_handlers: List[Tuple[int, Callable[..., Any]]] = []
+        self._batch_entries: Tuple[Tuple[Callable[..., Any], bool], ...] = ()
+        self._pending_records: List[Dict[str, Any]] = []
+        self._deliver_handle: Optional[asyncio.Handle] = None
+        self._batch_tasks: Set[asyncio.Task] = set()
+
+    async def add_batch_handler(
+        self,
+        handler: Callable[[List[Dict[str, Any]]], Any],
+        priority: int = 0
+    ) -> None:
+        """
+        添加批量处理器。
+
+        参数：
+            handler: 批量处理器，接收本周期内所有事件参数组成的列表；
+                     同步处理器在交付时直接调用，异步处理器每个周期创建一个任务。
+            priority (int, 可选): 处理器的优先级，数值越高越先执行。默认为 0。
+        """
+        if not callable(handler):
+            raise TypeError("处理器必须是可调用的")
+        handler_name = getattr(handler, "__name__", repr(handler))
+        async with self._lock:
+            for _, existing_handler in self._batch_handlers:
+                if existing_handler is handler:
+                    logger.warning("批量处理器 %s 已存在", handler_name)
+                    return
+            self._batch_handlers.append((-priority, handler))
+            self._batch_handlers.sort(key=lambda x: x[0])
+            self._batch_entries = self._build_entries(self._batch_handlers)
+            logger.info(
+                "已添加批量处理器 %s，优先级: %d", handler_name, priority)
+
+    async def remove_handler(self, handler: Callable[..., Any]) -> None:
+        """
+        移除事件处理器（普通处理器和批量处理器）。
+
+        参数：
+            handler (Callable[..., Any]): 要移除的事件处理器函数。
+        """
+        await super().remove_handler(handler)
+        async with self._lock:
+            self._batch_handlers = [h for h in self._batch_handlers if h[1] != handler]
+            self._batch_entries = self._build_entries(self._batch_handlers)
+
+    @property
+    def has_handlers(self) -> bool:
+        """是否注册了普通处理器或批量处理器"""
+        return bool(self._entries or self._batch_entries)
+
+    async def fire(self, **kwargs: Any) -> None:
+        """
+        触发事件：直接调用普通处理器，并将参数加入本周期的批量列表。
+
+        参数：
+            **kwargs (Any): 传递给事件处理器的参数。
+        """
+        for handler, is_coroutine in self._entries:
+            try:
+                if is_coroutine:
+                    await handler(**kwargs)
+                else:
+                    result = handler(**kwargs)
+                    if asyncio.iscoroutine(result):
+                        await result
+            except Exception as e:
+                self._log_handler_error(handler, e)
+
+        if self._batch_entries:
+            self._pending_records.append(kwargs)
+            if self._deliver_handle is None:
+                self._deliver_handle = asyncio.get_running_loop().call_soon(self._deliver)
+
+    def _deliver(self) -> None:
+        """将本周期累积的事件交付给批量处理器"""
+        self._deliver_handle = None
+        records, self._pending_records = self._pending_records, []
+        if not records:
+            return
+
+        for handler, is_coroutine in self._batch_entries:
+            try:
+                result = handler(records)
+                if is_coroutine or asyncio.iscoroutine(result):
+                    task = asyncio.ensure_future(result)
+                    self._batch_tasks.add(task)
+                    task.add_done_callback(self._on_batch_task_done)
+            except Exception as e:
+                self._log_handler_error(handler, e)
+
+    def _on_batch_task_done(self, task: asyncio.Task) -> None:
+        """异步批量处理器完成回调"""
+        self._batch_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("批量处理器发生错误: %s", task.exception())
+
+    async def flush(self) -> None:
+        """立即交付尚未交付的事件，并等待异步批量处理器完成（停止前调用）"""
+        if self._deliver_handle is not None:
+            self._deliver_handle.cancel()
+        self._deliver()
+        if self._batch_tasks:
+            await asyncio.gather(*self._batch_tasks, return_exceptions=True)
 
 
 class Events:
@@ -195,18 +334,19 @@ class Events:
     def __init__(self):
         self._events: Dict[str, EventHook] = {}
 
-    def register(self, name: str) -> EventHook:
+    def register(self, name: str, hook_class: Type[EventHook] = EventHook) -> EventHook:
         """
         注册新事件类型。
 
         参数：
             name (str): 事件类型名称。
+            hook_class (Type[EventHook], 可选): 事件钩子类型，高频事件使用 BatchEventHook。
 
         返回：
             EventHook: 注册事件的事件钩子实例。
         """
         if name not in self._events:
-            self._events[name] = EventHook()
+            self._events[name] = hook_class()
         return self._events[name]
 
     async def register_all_pending_handlers(self):
@@ -253,7 +393,7 @@ startup_completed = events.register("startup_completed")  # 启动完成事件
 
 # 性能指标事件
 # 请求指标事件(local节点：性能数据报告给prometheus，worker节点: 性能数据推送给redis)
-request_metrics = events.register("request_metrics")
+request_metrics = events.register("request_metrics", BatchEventHook)
 worker_request_metrics = events.register(
     "worker_request_metrics")  # master节点接收worker请求指标事件
 
@@ -265,6 +405,7 @@ __all__ = [
     # 全局事件系统
     'events',
     'EventHook',
+    'BatchEventHook',
 
     # 测试生命周期事件
     'init_events',
@@ -51,10 +51,29 @@ class InvalidRateError(RunnerError):
         self.rate = rate
 
 
+class MetricsBackpressureError(AioTestError):
+    """指标传输背压异常，Master 消费滞后时 Worker 暂缓发送指标"""
+
+    def __init__(self, message: str, backlog: int = None):
+        context = {'backlog': backlog} if backlog is not None else {}
+        super().__init__(message, "METRICS_BACKPRESSURE", context)
+        self.backlog = backlog
+
+
+class MetricsPublishError(AioTestError):
+    """指标部分发送异常，分块发送中途失败时前 sent 条指标已送达，调用方只应重发其余部分"""
+
+    def __init__(self, message: str, sent: int = 0):
+        super().__init__(message, "METRICS_PUBLISH", {'sent': sent})
+        self.sent = sent
+
+
 # 异常映射表，用于错误码到异常类的转换
 EXCEPTION_MAP = {
     "INVALID_USER_COUNT": InvalidUserCountError,
     "INVALID_RATE": InvalidRateError,
+    "METRICS_BACKPRESSURE": MetricsBackpressureError,
+    "METRICS_PUBLISH": MetricsPublishError,
 }
 
 
@@ -86,5 +105,9 @@ def create_exception(error_code: str, message: str,
         return exception_class(message, user_count=context.get('user_count'))
     elif exception_class == InvalidRateError:
         return exception_class(message, rate=context.get('rate'))
+    elif exception_class == MetricsBackpressureError:
+        return exception_class(message, backlog=context.get('backlog'))
+    elif exception_class == MetricsPublishError:
+        return exception_class(message, sent=context.get('sent', 0))
     else:
         return exception_class(message, error_code, context)
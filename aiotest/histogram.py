@@ -0,0 +1,309 @@
+# encoding: utf-8
+"""
+可合并的对数线性延迟直方图（HDR 风格）
+
+固定桶边界的 Prometheus 直方图无法区分 100ms 以内的请求，快接口的 p50/p95/p99
+几乎没有意义。LatencyHistogram 以微秒为单位记录整数值，按“2 的幂分段 + 段内线性子桶”
+划分桶：每段内有 2^(b-1) 个等宽子桶，相对误差不超过 10^-significant_figures。
+
+特性：
+    - 计数存放在按需增长的 array 中，只占用到已记录最大值为止的空间
+    - 相同精度的直方图可以逐桶相加，用于跨 Worker / 跨区间合并
+    - to_dict()/from_dict() 只序列化非零桶，便于通过 Redis 传输
+    - bucket_counts() 将计数折算到任意边界，用于派生 Prometheus 直方图
+
+使用示例：
+    histogram = LatencyHistogram(significant_figures=3)
+    histogram.record(0.0123)
+    histogram.percentile(99)
+"""
+
+import math
+from array import array
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# 记录单位：每秒的单位数（微秒）
+UNITS_PER_SECOND = 1_000_000
+
+# 可记录的最大值（秒），超过时按最大值记录
+HIGHEST_TRACKABLE_VALUE = 3600.0
+
+# 默认有效数字位数
+DEFAULT_SIGNIFICANT_FIGURES = 3
+
+# 报告与统计接口默认输出的百分位
+DEFAULT_PERCENTILES = (50.0, 90.0, 95.0, 99.0, 99.9)
+
+
+def derive_prometheus_buckets(lowest: float, highest: float,
+                              steps: Sequence[float] = (1.0, 2.0, 5.0)) -> Tuple[float, ...]:
+    """
+    按 1-2-5 序列在 [lowest, highest] 区间内生成 Prometheus 桶边界
+
+    参数：
+        lowest: 最小边界（秒），必须为正数
+        highest: 最大边界（秒），总会作为最后一个边界
+        steps: 每个十进制数量级内的倍数
+
+    返回：
+        tuple: 递增的桶边界
+    """
+    if lowest <= 0 or highest < lowest:
+        raise ValueError("桶边界范围无效")
+
+    boundaries: List[float] = []
+    exponent = math.floor(math.log10(lowest))
+    while True:
+        for step in steps:
+            # round 消除浮点误差，得到 0.001、0.002、0.005 等整洁边界
+            boundary = round(step * 10 ** exponent, 12)
+            if boundary < lowest:
+                continue
+            if boundary >= highest:
+                boundaries.append(highest)
+                return tuple(boundaries)
+            boundaries.append(boundary)
+        exponent += 1
+
+
+class LatencyHistogram:
+    """
+    对数线性延迟直方图
+
+    属性：
+        significant_figures (int): 有效数字位数（1-5）
+        count (int): 记录总数
+        total (float): 记录值总和（秒）
+        min (float): 最小记录值（秒）
+        max (float): 最大记录值（秒）
+    """
+
+    __slots__ = (
+        "significant_figures", "_sub_bucket_bits", "_sub_bucket_count", "_half_count",
+        "_counts", "count", "total", "min", "max",
+    )
+
+    def __init__(self, significant_figures: int = DEFAULT_SIGNIFICANT_FIGURES):
+        """
+        初始化直方图
+
+        参数：
+            significant_figures: 有效数字位数，决定相对精度与内存占用
+
+        异常：
+            ValueError: 有效数字位数不在 1-5 之间
+        """
+        if not 1 <= significant_figures <= 5:
+            raise ValueError(f"有效数字位数必须在 1-5 之间，得到: {significant_figures}")
+
+        self.significant_figures = significant_figures
+        # 每段子桶数取不小于 2 * 10^sf 的 2 的幂，保证半段内的线性分辨率满足精度
+        self._sub_bucket_bits = math.ceil(math.log2(2 * 10 ** significant_figures))
+        self._sub_bucket_count = 1 << self._sub_bucket_bits
+        self._half_count = self._sub_bucket_count >> 1
+        self._counts = array('q')
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+
+    def _index(self, units: int) -> int:
+        """计算整数值所在的桶下标"""
+        if units < self._sub_bucket_count:
+            return units
+        shift = units.bit_length() - self._sub_bucket_bits
+        return (self._sub_bucket_count + (shift - 1) * self._half_count
+                + (units >> shift) - self._half_count)
+
+    def _bounds(self, index: int) -> Tuple[int, int]:
+        """计算桶下标对应的整数区间 [low, high)"""
+        if index < self._sub_bucket_count:
+            return index, index + 1
+        offset = index - self._sub_bucket_count
+        shift = offset // self._half_count + 1
+        low = (offset % self._half_count + self._half_count) << shift
+        return low, low + (1 << shift)
+
+    def record(self, value: float, count: int = 1) -> None:
+        """
+        记录一个值
+
+        参数：
+            value: 记录值（秒），负数按 0 记录，超过上限按上限记录
+            count: 记录次数
+        """
+        value = min(max(value, 0.0), HIGHEST_TRACKABLE_VALUE)
+        index = self._index(int(value * UNITS_PER_SECOND))
+        counts = self._counts
+        if index >= len(counts):
+            counts.extend([0] * (index + 1 - len(counts)))
+        counts[index] += count
+
+        self.count += count
+        self.total += value * count
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other: 'LatencyHistogram') -> None:
+        """
+        合并另一个直方图
+
+        参数：
+            other: 待合并的直方图，精度不同时按桶下界重新记录
+        """
+        if other.count == 0:
+            return
+
+        if other.significant_figures == self.significant_figures:
+            counts = self._counts
+            if len(other._counts) > len(counts):
+                counts.extend([0] * (len(other._counts) - len(counts)))
+            for index, bucket_count in enumerate(other._counts):
+                if bucket_count:
+                    counts[index] += bucket_count
+            self.count += other.count
+            self.total += other.total
+        else:
+            total = self.total
+            for low, bucket_count in other._iter_buckets():
+                self.record(low, bucket_count)
+            # 重新记录会引入桶内误差，总和以原始值为准
+            self.total = total + other.total
+
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def _iter_buckets(self) -> Iterable[Tuple[float, int]]:
+        """遍历非零桶，返回 (桶下界秒数, 计数)"""
+        for index, bucket_count in enumerate(self._counts):
+            if bucket_count:
+                yield self._bounds(index)[0] / UNITS_PER_SECOND, bucket_count
+
+    @property
+    def mean(self) -> float:
+        """平均值（秒）"""
+        return self.total / self.count if self.count else 0.0
+
+    def percentiles(self, percents: Iterable[float] = DEFAULT_PERCENTILES) -> Dict[float, float]:
+        """
+        一次遍历计算多个百分位
+
+        参数：
+            percents: 百分位列表（0-100）
+
+        返回：
+            dict: 百分位 -> 值（秒），取所在桶的上界并限制在 [min, max] 内
+        """
+        ordered = sorted(percents)
+        result = {percent: 0.0 for percent in ordered}
+        if self.count == 0:
+            return result
+
+        targets = [
+            (percent, max(1, math.ceil(percent / 100.0 * self.count)))
+            for percent in ordered
+        ]
+        position = 0
+        cumulative = 0
+        for index, bucket_count in enumerate(self._counts):
+            if not bucket_count:
+                continue
+            cumulative += bucket_count
+            while position < len(targets) and cumulative >= targets[position][1]:
+                high = (self._bounds(index)[1] - 1) / UNITS_PER_SECOND
+                result[targets[position][0]] = min(max(high, self.min), self.max)
+                position += 1
+            if position == len(targets):
+                break
+        return result
+
+    def percentile(self, percent: float) -> float:
+        """
+        计算单个百分位
+
+        参数：
+            percent: 百分位（0-100）
+
+        返回：
+            float: 百分位值（秒）
+        """
+        return self.percentiles((percent,))[percent]
+
+    def bucket_counts(self, boundaries: Sequence[float]) -> List[int]:
+        """
+        将计数折算到指定边界（用于派生 Prometheus 直方图）
+
+        参数：
+            boundaries: 递增的桶边界（秒）
+
+        返回：
+            list: 各桶（非累积）计数，长度为 len(boundaries) + 1，最后一个为 +Inf 桶
+        """
+        result = [0] * (len(boundaries) + 1)
+        for low, bucket_count in self._iter_buckets():
+            result[bisect_left(boundaries, low)] += bucket_count
+        return result
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为可序列化的字典，只包含非零桶（[下标, 计数, 下标, 计数, ...]）"""
+        counts: List[int] = []
+        for index, bucket_count in enumerate(self._counts):
+            if bucket_count:
+                counts.extend((index, bucket_count))
+        return {
+            'significant_figures': self.significant_figures,
+            'counts': counts,
+            'count': self.count,
+            'total': self.total,
+            'min': self.min if self.count else 0.0,
+            'max': self.max,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'LatencyHistogram':
+        """
+        从 to_dict 的输出还原直方图
+
+        参数：
+            data: 序列化字典
+
+        返回：
+            LatencyHistogram: 还原的直方图
+        """
+        histogram = cls(data.get('significant_figures', DEFAULT_SIGNIFICANT_FIGURES))
+        pairs = data.get('counts', [])
+        if pairs:
+            histogram._counts.extend([0] * (max(pairs[0::2]) + 1))
+            for index, bucket_count in zip(pairs[0::2], pairs[1::2]):
+                histogram._counts[index] += bucket_count
+        histogram.count = data.get('count', 0)
+        histogram.total = data.get('total', 0.0)
+        if histogram.count:
+            histogram.min = data.get('min', 0.0)
+        histogram.max = data.get('max', 0.0)
+        return histogram
+
+    def summary(self, percents: Iterable[float] = DEFAULT_PERCENTILES) -> Optional[Dict[str, float]]:
+        """
+        汇总统计
+
+        参数：
+            percents: 需要输出的百分位
+
+        返回：
+            dict: count/min/mean/max 以及 p50、p99、p99.9 等百分位（秒），无数据时返回 None
+        """
+        if self.count == 0:
+            return None
+        stats = {
+            'count': self.count,
+            'min': self.min,
+            'mean': self.mean,
+            'max': self.max,
+        }
+        for percent, value in self.percentiles(percents).items():
+            stats[f"p{percent:g}"] = value
+        return stats
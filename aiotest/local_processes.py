@@ -0,0 +1,171 @@
+# encoding: utf-8
+"""
+本地多进程模式：单机启动多个 Worker 子进程以利用全部 CPU 核心
+
+``aiotest -f aiotestfile --processes N`` 时，当前进程转为 Master，使用 tcp 协调后端
+监听本机回环地址的随机端口；再以相同的命令行参数启动 N 个 ``--worker`` 子进程连接回来。
+用户数与速率由 Master 按 Worker 能力拆分，各子进程的指标汇总到 Master，
+只由 Master 提供一个 Prometheus 端点。
+
+使用示例：
+    count = resolve_process_count(options.processes)
+    configure_local_master(options, count)
+    processes = await start_worker_processes(sys.argv[1:], master_port, count)
+    ...
+    await stop_worker_processes(processes)
+"""
+
+import asyncio
+import os
+import sys
+from typing import List, Sequence
+
+from aiotest.distributed_coordinator import COORDINATOR_TCP
+from aiotest.logger import logger
+
+LOCAL_HOST = "127.0.0.1"  # 子进程与 Master 之间只走本机回环地址
+PROCESSES_ALL_CORES = -1  # --processes -1 表示按 CPU 核数启动
+WORKER_EXIT_TIMEOUT = 10.0  # 测试结束后等待子进程自行退出的秒数
+
+
+def resolve_process_count(processes: int) -> int:
+    """
+    解析 --processes 参数为实际的子进程数
+
+    参数：
+        processes: 命令行传入的进程数，-1 表示 CPU 核数
+
+    返回：
+        int: 子进程数，1 表示不启用多进程模式
+
+    异常：
+        ValueError: 进程数既不是正整数也不是 -1
+    """
+    if processes == PROCESSES_ALL_CORES:
+        return os.cpu_count() or 1
+    if processes < 1:
+        raise ValueError(f"进程数必须为正整数或 -1，当前值: {processes}")
+    return processes
+
+
+def configure_local_master(options, process_count: int) -> None:
+    """
+    把本地模式的配置改写为本机 tcp 协调的 Master
+
+    参数：
+        options: 命令行解析结果，原地修改
+        process_count: Worker 子进程数
+    """
+    options.master = True
+    options.coordinator = COORDINATOR_TCP
+    options.master_bind_host = LOCAL_HOST
+    options.master_port = 0  # 由系统分配空闲端口，避免多个本地测试互相冲突
+    options.expect_workers = process_count
+
+
+def build_worker_args(argv: Sequence[str], master_port: int) -> List[str]:
+    """
+    由当前进程的命令行参数生成 Worker 子进程的参数
+
+    去掉 --processes，追加连接本机 Master 的 Worker 参数（argparse 以后出现的值为准）。
+
+    参数：
+        argv: 当前进程的命令行参数（不含程序名）
+        master_port: Master 实际监听的端口
+
+    返回：
+        List[str]: 子进程参数
+    """
+    args = []
+    skip_value = False
+    for arg in argv:
+        if skip_value:
+            skip_value = False
+            continue
+        if arg == "--processes":
+            skip_value = True
+            continue
+        if arg.startswith("--processes="):
+            continue
+        args.append(arg)
+    args.extend([
+        "--worker",
+        "--coordinator", COORDINATOR_TCP,
+        "--master-host", LOCAL_HOST,
+        "--master-port", str(master_port),
+    ])
+    return args
+
+
+async def start_worker_processes(
+    argv: Sequence[str],
+    master_port: int,
+    process_count: int
+) -> List[asyncio.subprocess.Process]:
+    """
+    启动 Worker 子进程，子进程继承当前进程的标准输出和环境变量
+
+    参数：
+        argv: 当前进程的命令行参数（不含程序名）
+        master_port: Master 实际监听的端口
+        process_count: 子进程数
+
+    返回：
+        List[asyncio.subprocess.Process]: 已启动的子进程
+    """
+    args = build_worker_args(argv, master_port)
+    processes = []
+    for _ in range(process_count):
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, "-m", "aiotest", *args)
+        processes.append(process)
+    logger.info("已启动 %d 个 Worker 子进程，连接本机端口 %d", process_count, master_port)
+    return processes
+
+
+def has_exited_process(processes: Sequence[asyncio.subprocess.Process]) -> bool:
+    """
+    检查是否有子进程已经退出
+
+    参数：
+        processes: 子进程列表
+
+    返回：
+        bool: 任一子进程已退出时为 True
+    """
+    return any(process.returncode is not None for process in processes)
+
+
+async def stop_worker_processes(
+    processes: Sequence[asyncio.subprocess.Process],
+    timeout: float = WORKER_EXIT_TIMEOUT
+) -> None:
+    """
+    等待子进程退出，超时仍未退出的先终止、再强制结束
+
+    参数：
+        processes: 子进程列表
+        timeout: 等待子进程自行退出的秒数
+    """
+    if not processes:
+        return
+
+    async def wait_all(wait_timeout: float) -> None:
+        _, pending = await asyncio.wait(
+            [asyncio.create_task(process.wait()) for process in processes],
+            timeout=wait_timeout)
+        for task in pending:
+            task.cancel()
+
+    await wait_all(timeout)
+    for signal_process in ("terminate", "kill"):
+        running = [process for process in processes if process.returncode is None]
+        if not running:
+            return
+        logger.warning("%d 个 Worker 子进程未退出，执行 %s", len(running), signal_process)
+        for process in running:
+            try:
+                getattr(process, signal_process)()
+            except ProcessLookupError:
+                pass
+        await wait_all(timeout)
@@ -12,8 +12,16 @@ from aiotest.cli import (
     parse_options,
     validate_file_exists,
 )
+from aiotest.clients import close_shared_connectors
 from aiotest.distributed_coordinator import RedisConnection
 from aiotest.events import events, init_events
+from aiotest.local_processes import (
+    configure_local_master,
+    has_exited_process,
+    resolve_process_count,
+    start_worker_processes,
+    stop_worker_processes,
+)
 from aiotest.logger import logger
 from aiotest.runner_factory import RunnerFactory
 
@@ -26,7 +34,7 @@ async def main():
     1. 解析命令行参数
     2. 配置日志系统
     3. 加载测试文件
-    4. 根据参数启动对应的运行器(本地/主节点/工作节点)
+    4. 根据参数启动对应的运行器(本地/主节点/工作节点)，--processes 大于 1 时启动本机 Worker 子进程
     5. 运行测试并处理结果
 
     Raises:
@@ -44,10 +52,21 @@ async def main():
     # 配置日志系统
     logger.setLevel(options.loglevel)
 
-    # 初始化redis（仅在分布式模式下）
+    # 本地多进程模式：本进程作为主节点，经本机 tcp 协调 Worker 子进程
+    try:
+        process_count = resolve_process_count(options.processes)
+    except ValueError as e:
+        handle_error_and_exit(str(e))
+    if process_count > 1:
+        if options.master or options.worker or options.aggregator:
+            handle_error_and_exit("--processes 仅用于本地模式，不能与 --master/--worker/--aggregator 同时使用")
+        configure_local_master(options, process_count)
+
+    # 初始化redis（仅在使用 Redis 协调后端的分布式模式下）
     redis_connection = None
     redis_client = None
-    if options.master or options.worker:
+    if (options.master or options.worker or options.aggregator) and \
+            (options.coordinator == "redis" or options.aggregator):
         redis_connection = RedisConnection()
         redis_client = await redis_connection.get_client(
             path=options.redis_path,
@@ -101,12 +120,20 @@ async def main():
 
     # 使用局部变量替代全局变量
     runner = None
+    worker_processes = []
     if options.master:
         runner = await RunnerFactory.create("master", user_classes, shape_instance, options, redis_client)
+        if process_count > 1:
+            worker_processes = await start_worker_processes(
+                sys.argv[1:], runner.coordinator.port, process_count)
         while True:
             healthy_workers = await runner.get_healthy_workers()
             if len(healthy_workers) >= options.expect_workers:
                 break
+            if has_exited_process(worker_processes):
+                await runner.quit()
+                await stop_worker_processes(worker_processes)
+                handle_error_and_exit("Worker 子进程启动失败，请检查子进程输出")
             logger.info(
                 "等待Worker节点准备就绪，已连接 %d/%d",
                 len(healthy_workers), options.expect_workers
@@ -114,12 +141,14 @@ async def main():
             await asyncio.sleep(2)
     elif options.worker:
         runner = await RunnerFactory.create("worker", user_classes, shape_instance, options, redis_client)
+    elif options.aggregator:
+        runner = await RunnerFactory.create("aggregator", user_classes, shape_instance, options, redis_client)
     else:
         runner = await RunnerFactory.create("local", user_classes, shape_instance, options)
 
     try:
         async with asyncio.TaskGroup() as tg:
-            if not options.worker:
+            if not (options.worker or options.aggregator):
                 # 启动测试
                 await runner.start()
                 # 运行测试直到完成
@@ -129,7 +158,7 @@ async def main():
                 # 给Worker节点足够的时间来接收和处理quit命令
                 await asyncio.sleep(3.0)
             else:
-                # Worker 模式持续运行
+                # Worker / 聚合节点模式持续运行，直到收到上游的 quit 命令
                 async def worker_run():
                     while not runner.state_manager.is_in_quit_state():
                         await asyncio.sleep(1)
@@ -139,11 +168,15 @@ async def main():
         await runner.quit()
         # 给Worker节点足够的时间来接收和处理quit命令
         await asyncio.sleep(3.0)
+        await close_shared_connectors()
         if redis_connection:
             await redis_connection.close()
         await asyncio.sleep(0.2)
         sys.exit(0)
     finally:
-        # 正常流程结束后关闭 Redis 连接
+        # 正常流程结束后关闭共享连接池和 Redis 连接
+        await close_shared_connectors()
         if redis_connection:
             await redis_connection.close()
+        # 本地多进程模式下等待 Worker 子进程退出
+        await stop_worker_processes(worker_processes)
@@ -32,12 +32,23 @@ AioTest性能指标模块
 
     # 停止指标收集器
     await collector.stop()
+
+Worker 聚合模式（metrics_mode="aggregate"）：
+    Worker 不再逐条转发请求数据，而是按 (method, endpoint, status_code, assertion_result)
+    在每个刷新间隔内折叠为聚合记录（计数、耗时/大小的 sum/min/max 及可合并的直方图），
+    Master 收到后直接合并进 Prometheus 指标。
+
+接口耗时统计：
+    Local/Master 为每个 (method, endpoint) 维护一个 LatencyHistogram（见 histogram.py），
+    get_latency_stats() 返回按精度准确的 p50/p90/p95/p99/p99.9，测试结束时输出耗时报告。
 """
 
 import asyncio
 import time
+from bisect import bisect_left
+from collections import deque
 from dataclasses import dataclass, field
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 from prometheus_client import (
     CollectorRegistry,
@@ -48,11 +59,29 @@ from prometheus_client import (
 )
 
 from aiotest.events import request_metrics
+from aiotest.exception import MetricsPublishError
+from aiotest.histogram import (
+    DEFAULT_SIGNIFICANT_FIGURES,
+    LatencyHistogram,
+    derive_prometheus_buckets,
+)
 from aiotest.logger import logger
+from aiotest.metrics_codec import MetricsBatch
 
 # 自定义指标注册表，用于隔离指标
 REGISTRY = CollectorRegistry()
 
+# 指标上报模式
+METRICS_MODE_RAW = "raw"  # Worker 逐条转发请求数据
+METRICS_MODE_AGGREGATE = "aggregate"  # Worker 按区间聚合后转发
+
+# 直方图桶边界：耗时桶按 1-2-5 序列覆盖 1ms-30s，聚合模式下由 LatencyHistogram 折算得到
+DURATION_BUCKETS = derive_prometheus_buckets(0.001, 30.0)
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1e6)
+
+# 错误消息最大长度，避免标签过长
+MAX_ERROR_MESSAGE_LENGTH = 200
+
 
 @dataclass
 class RequestMetrics:
@@ -67,6 +96,7 @@ class RequestMetrics:
     extra: Optional[Dict[str, Any]] = None
     timestamp: float = field(default_factory=time.time)
     assertion_result: str = "unknown"  # "pass" 或 "fail"
+    corrected_duration: Optional[float] = None  # 按计划开始时间校正的耗时（秒），未启用节奏调度时为 None
 
 
 # Prometheus 指标定义
@@ -81,7 +111,17 @@ REQUEST_DURATION = Histogram(
     'aiotest_http_request_duration_seconds',
     'HTTP request duration in seconds',
     ['method', 'endpoint'],
-    buckets=[0.1, 0.25, 0.5, 0.8, 1.0, 2.5, 5.0, 10.0, 30.0],
+    buckets=DURATION_BUCKETS,
+    registry=REGISTRY
+)
+
+# 协调遗漏校正后的耗时：实际结束时间 - 按节奏调度计划的开始时间
+# 仅在启用节奏调度（User.pacing）或到达率执行器时记录，与 REQUEST_DURATION 对照可看出服务端停顿被掩盖的排队时间
+REQUEST_CORRECTED_DURATION = Histogram(
+    'aiotest_http_request_corrected_duration_seconds',
+    'HTTP request latency measured from the intended start time in seconds',
+    ['method', 'endpoint'],
+    buckets=DURATION_BUCKETS,
     registry=REGISTRY
 )
 
@@ -89,7 +129,7 @@ RESPONSE_SIZE = Histogram(
     'aiotest_http_response_size_bytes',
     'HTTP response size in bytes',
     ['method', 'endpoint'],
-    buckets=(100, 1000, 10000, 100000, 1e6),
+    buckets=SIZE_BUCKETS,
     registry=REGISTRY
 )
 
@@ -107,6 +147,154 @@ WORKER_ACTIVE_USERS = Gauge(
     registry=REGISTRY
 )
 
+WORKER_PROCESS_CPU_USAGE = Gauge(
+    'aiotest_worker_process_cpu_percent',
+    'Worker process CPU usage percentage',
+    ['worker_id'],
+    registry=REGISTRY
+)
+
+WORKER_MEMORY_RSS = Gauge(
+    'aiotest_worker_memory_rss_bytes',
+    'Worker process resident memory in bytes',
+    ['worker_id'],
+    registry=REGISTRY
+)
+
+WORKER_OPEN_FDS = Gauge(
+    'aiotest_worker_open_fds',
+    'Worker process open file descriptors',
+    ['worker_id'],
+    registry=REGISTRY
+)
+
+WORKER_SOCKETS = Gauge(
+    'aiotest_worker_sockets',
+    'Worker process inet socket count',
+    ['worker_id'],
+    registry=REGISTRY
+)
+
+WORKER_LOOP_LAG = Gauge(
+    'aiotest_worker_loop_lag_seconds',
+    'Worker event loop wakeup lag in seconds',
+    ['worker_id'],
+    registry=REGISTRY
+)
+
+WORKER_LOOP_LAG_P50 = Gauge(
+    'aiotest_worker_loop_lag_p50_seconds',
+    'Worker event loop lag median over the last sampling window',
+    ['worker_id'],
+    registry=REGISTRY
+)
+
+WORKER_LOOP_LAG_P99 = Gauge(
+    'aiotest_worker_loop_lag_p99_seconds',
+    'Worker event loop lag p99 over the last sampling window',
+    ['worker_id'],
+    registry=REGISTRY
+)
+
+WORKER_LOOP_LAG_MAX = Gauge(
+    'aiotest_worker_loop_lag_max_seconds',
+    'Worker event loop lag maximum over the last sampling window',
+    ['worker_id'],
+    registry=REGISTRY
+)
+
+WORKER_READY_QUEUE = Gauge(
+    'aiotest_worker_loop_ready_queue',
+    'Worker event loop ready callback queue depth',
+    ['worker_id'],
+    registry=REGISTRY
+)
+
+WORKER_TASKS = Gauge(
+    'aiotest_worker_loop_tasks',
+    'Worker event loop pending task count',
+    ['worker_id'],
+    registry=REGISTRY
+)
+
+# 节点指标中的资源字段与 Gauge 的对应关系
+RESOURCE_GAUGES = {
+    'process_cpu_percent': WORKER_PROCESS_CPU_USAGE,
+    'memory_rss': WORKER_MEMORY_RSS,
+    'open_fds': WORKER_OPEN_FDS,
+    'sockets': WORKER_SOCKETS,
+    'loop_lag': WORKER_LOOP_LAG,
+    'loop_lag_p50': WORKER_LOOP_LAG_P50,
+    'loop_lag_p99': WORKER_LOOP_LAG_P99,
+    'loop_lag_max': WORKER_LOOP_LAG_MAX,
+    'ready_queue': WORKER_READY_QUEUE,
+    'tasks': WORKER_TASKS,
+}
+
+WORKER_ARRIVAL_RATE = Gauge(
+    'aiotest_worker_arrival_rate',
+    'Target iteration arrival rate of the open-workload executor',
+    ['worker_id'],
+    registry=REGISTRY
+)
+
+WORKER_ARRIVAL_BUSY = Gauge(
+    'aiotest_worker_arrival_busy_users',
+    'Users in the arrival-rate pool currently running an iteration',
+    ['worker_id'],
+    registry=REGISTRY
+)
+
+WORKER_ARRIVAL_SCHEDULED = Gauge(
+    'aiotest_worker_arrival_scheduled',
+    'Total iterations scheduled by the arrival-rate executor',
+    ['worker_id'],
+    registry=REGISTRY
+)
+
+WORKER_ARRIVAL_DROPPED = Gauge(
+    'aiotest_worker_arrival_dropped',
+    'Total scheduled iterations dropped because no pooled user was idle',
+    ['worker_id'],
+    registry=REGISTRY
+)
+
+WORKER_ARRIVAL_LATE = Gauge(
+    'aiotest_worker_arrival_late',
+    'Total iterations dispatched later than their scheduled time',
+    ['worker_id'],
+    registry=REGISTRY
+)
+
+# 节点指标中的到达率执行器字段与 Gauge 的对应关系
+ARRIVAL_GAUGES = {
+    'arrival_rate': WORKER_ARRIVAL_RATE,
+    'arrival_busy': WORKER_ARRIVAL_BUSY,
+    'arrival_scheduled': WORKER_ARRIVAL_SCHEDULED,
+    'arrival_dropped': WORKER_ARRIVAL_DROPPED,
+    'arrival_late': WORKER_ARRIVAL_LATE,
+}
+
+WORKER_METRICS_BACKLOG = Gauge(
+    'aiotest_worker_metrics_backlog',
+    'Number of request metrics waiting in worker buffer',
+    ['worker_id'],
+    registry=REGISTRY
+)
+
+WORKER_METRICS_DROPPED = Gauge(
+    'aiotest_worker_metrics_dropped',
+    'Total request metrics dropped by worker buffer overflow',
+    ['worker_id'],
+    registry=REGISTRY
+)
+
+METRICS_STREAM_LAG = Gauge(
+    'aiotest_metrics_stream_lag',
+    'Metric batches in the Redis stream not yet acknowledged by the master',
+    registry=REGISTRY
+)
+
 # 记录断言失败的信息 ：当请求中的断言失败时，会触发 ERROR_COUNTER 记录
 # 记录其他类型的错误 ：包括网络错误、超时错误、HTTP 错误 ：4xx、5xx 状态码（当这些被断言为失败时）等
 # 提供详细的错误分类 ：通过多个标签提供错误的详细信息
@@ -119,12 +307,234 @@ ERROR_COUNTER = Counter(
 )
 
 
+def _truncate_error_message(message: Any) -> str:
+    """截断错误消息，避免标签过长"""
+    error_message = str(message)
+    if len(error_message) > MAX_ERROR_MESSAGE_LENGTH:
+        error_message = error_message[:MAX_ERROR_MESSAGE_LENGTH]
+    return error_message
+
+
+def _merge_histogram(child, bucket_counts: List[int], total: float) -> None:
+    """
+    将按桶统计的计数直接合并到 Prometheus 直方图子指标
+
+    参数：
+        child: Histogram.labels(...) 返回的子指标
+        bucket_counts: 各桶（非累积）计数，最后一个为 +Inf 桶
+        total: 观测值总和
+    """
+    buckets = child._buckets
+    for index, count in enumerate(bucket_counts[:len(buckets)]):
+        if count:
+            buckets[index].inc(count)
+    child._sum.inc(total)
+
+
+class _EndpointSeries:
+    """
+    接口维度缓存的 Prometheus 子指标句柄与耗时直方图
+
+    labels() 每次调用都要拼接标签元组并加锁查找子指标，缓存句柄后
+    每条请求记录只需直接 observe/record。
+    """
+
+    __slots__ = ('duration', 'response_size', 'latency', 'corrected_duration', 'corrected_latency')
+
+    def __init__(self, duration, response_size, latency: LatencyHistogram):
+        self.duration = duration
+        self.response_size = response_size
+        self.latency = latency
+        # 校正耗时只在节奏调度/到达率模式下出现，首次记录时再创建
+        self.corrected_duration = None
+        self.corrected_latency: Optional[LatencyHistogram] = None
+
+
+class RequestAggregate:
+    """
+    单个 (method, endpoint, status_code, assertion_result) 组合的区间聚合数据
+
+    耗时使用 LatencyHistogram 记录，大小直方图与 Prometheus 使用相同的桶边界，
+    多个 Worker / 多个区间的聚合结果可以直接相加。
+    """
+
+    __slots__ = (
+        "count", "duration_sum", "duration_min", "duration_max", "latency", "corrected",
+        "size_sum", "size_min", "size_max", "size_buckets", "errors",
+    )
+
+    def __init__(self, latency_precision: int = DEFAULT_SIGNIFICANT_FIGURES):
+        self.count = 0
+        self.duration_sum = 0.0
+        self.duration_min = float("inf")
+        self.duration_max = 0.0
+        self.latency = LatencyHistogram(latency_precision)
+        self.corrected = LatencyHistogram(latency_precision)
+        self.size_sum = 0
+        self.size_min = float("inf")
+        self.size_max = 0
+        self.size_buckets = [0] * (len(SIZE_BUCKETS) + 1)
+        # (error_type, error_message) -> 次数
+        self.errors: Dict[Tuple[str, str], int] = {}
+
+    def add(self, duration: float, response_size: int,
+            error: Optional[Dict[str, Any]] = None,
+            corrected_duration: Optional[float] = None) -> None:
+        """折叠一条请求数据"""
+        self.count += 1
+        self.duration_sum += duration
+        if duration < self.duration_min:
+            self.duration_min = duration
+        if duration > self.duration_max:
+            self.duration_max = duration
+        self.latency.record(duration)
+
+        if corrected_duration is not None:
+            self.corrected.record(corrected_duration)
+
+        self.size_sum += response_size
+        if response_size < self.size_min:
+            self.size_min = response_size
+        if response_size > self.size_max:
+            self.size_max = response_size
+        self.size_buckets[bisect_left(SIZE_BUCKETS, response_size)] += 1
+
+        if error:
+            error_key = (
+                error.get('exc_type', 'unknown'),
+                _truncate_error_message(error.get('message', 'unknown')))
+            self.errors[error_key] = self.errors.get(error_key, 0) + 1
+
+    def merge(self, data: Dict[str, Any]) -> None:
+        """合并一条聚合记录（to_dict 的输出）"""
+        self.count += data['count']
+        self.duration_sum += data['duration_sum']
+        self.duration_min = min(self.duration_min, data['duration_min'])
+        self.duration_max = max(self.duration_max, data['duration_max'])
+        self.latency.merge(LatencyHistogram.from_dict(data['latency']))
+        if data.get('corrected'):
+            self.corrected.merge(LatencyHistogram.from_dict(data['corrected']))
+        self.size_sum += data['size_sum']
+        self.size_min = min(self.size_min, data['size_min'])
+        self.size_max = max(self.size_max, data['size_max'])
+        for index, count in enumerate(data['size_buckets']):
+            self.size_buckets[index] += count
+        for error in data.get('errors', []):
+            error_key = (error['error_type'], error['error_message'])
+            self.errors[error_key] = self.errors.get(error_key, 0) + error['count']
+
+    def to_dict(self, method: str, endpoint: str, status_code: int,
+                assertion_result: str) -> Dict[str, Any]:
+        """转换为可序列化的字典"""
+        return {
+            'method': method,
+            'endpoint': endpoint,
+            'status_code': status_code,
+            'assertion_result': assertion_result,
+            'count': self.count,
+            'duration_sum': self.duration_sum,
+            'duration_min': self.duration_min,
+            'duration_max': self.duration_max,
+            'latency': self.latency.to_dict(),
+            'corrected': self.corrected.to_dict() if self.corrected.count else None,
+            'size_sum': self.size_sum,
+            'size_min': self.size_min,
+            'size_max': self.size_max,
+            'size_buckets': self.size_buckets,
+            'errors': [
+                {'error_type': error_type, 'error_message': error_message, 'count': count}
+                for (error_type, error_message), count in self.errors.items()
+            ],
+        }
+
+
+class RequestAggregator:
+    """
+    请求指标区间聚合器（Worker 聚合模式使用）
+
+    功能：
+        - 将请求数据按 (method, endpoint, status_code, assertion_result) 折叠
+        - drain() 取出当前区间的聚合记录并开始新区间
+        - merge() 将发送失败的聚合记录合并回来，等待下次发送
+    """
+
+    def __init__(self, latency_precision: int = DEFAULT_SIGNIFICANT_FIGURES):
+        self.latency_precision = latency_precision
+        self._aggregates: Dict[Tuple[str, str, int, str], RequestAggregate] = {}
+
+    def add(self, metrics: RequestMetrics) -> None:
+        """折叠一条请求数据"""
+        key = (metrics.method, metrics.endpoint,
+               metrics.status_code, metrics.assertion_result)
+        aggregate = self._aggregates.get(key)
+        if aggregate is None:
+            aggregate = self._aggregates[key] = RequestAggregate(self.latency_precision)
+        aggregate.add(metrics.duration, metrics.response_size, metrics.error,
+                      metrics.corrected_duration)
+
+    def add_batch(self, batch: Union[List[Dict[str, Any]], MetricsBatch]) -> int:
+        """
+        折叠 Worker 上报的一批原始请求数据（聚合节点使用）
+
+        参数：
+            batch: 请求数据字典列表（_convert_metrics_to_dict 格式），
+                   或二进制消息解码得到的 MetricsBatch
+
+        返回：
+            int: 成功折叠的记录数
+        """
+        if isinstance(batch, MetricsBatch):
+            rows = batch.rows()
+        else:
+            rows = (
+                (data.get('method', 'unknown'), data.get('endpoint', 'unknown'),
+                 data.get('status_code', 0), data.get('assertion_result', 'unknown'),
+                 data.get('duration') or 0.0, data.get('corrected_duration'),
+                 data.get('response_size') or 0, data.get('error'))
+                for data in batch if isinstance(data, dict)
+            )
+
+        processed = 0
+        for method, endpoint, status_code, assertion_result, duration, corrected, size, error in rows:
+            try:
+                key = (method, endpoint, int(status_code), assertion_result)
+                aggregate = self._aggregates.get(key)
+                if aggregate is None:
+                    aggregate = self._aggregates[key] = RequestAggregate(self.latency_precision)
+                aggregate.add(duration, size, error, corrected)
+                processed += 1
+            except (AttributeError, TypeError, ValueError) as e:
+                logger.warning("折叠 Worker 请求数据失败: %s", e)
+        return processed
+
+    def merge(self, records: List[Dict[str, Any]]) -> None:
+        """合并聚合记录"""
+        for record in records:
+            key = (record['method'], record['endpoint'],
+                   record['status_code'], record['assertion_result'])
+            aggregate = self._aggregates.get(key)
+            if aggregate is None:
+                aggregate = self._aggregates[key] = RequestAggregate(self.latency_precision)
+            aggregate.merge(record)
+
+    def drain(self) -> List[Dict[str, Any]]:
+        """取出当前区间的全部聚合记录"""
+        aggregates, self._aggregates = self._aggregates, {}
+        return [
+            aggregate.to_dict(*key) for key, aggregate in aggregates.items()
+        ]
+
+    def __len__(self) -> int:
+        return len(self._aggregates)
+
+
 class MetricsCollector:
     """统一的指标收集器"""
 
     def __init__(self, node_type: str = "local", redis_client=None, node_id: str = "local",
                  coordinator=None, batch_size: int = 100, flush_interval: float = 1.0,
-                 buffer_size: int = 10000):
+                 buffer_size: int = 10000, metrics_mode: str = METRICS_MODE_RAW,
+                 latency_precision: int = DEFAULT_SIGNIFICANT_FIGURES):
         """
         初始化指标收集器
 
@@ -135,8 +545,13 @@ class MetricsCollector:
             coordinator: 分布式协调器
             batch_size: 批量上传的大小
             flush_interval: 刷新间隔（秒）
-            buffer_size: 本地缓冲区大小
+            buffer_size: 本地缓冲区大小（环形缓冲区，满时丢弃最旧数据）
+            metrics_mode: Worker 上报模式 (raw: 逐条转发 / aggregate: 区间聚合后转发)
+            latency_precision: 耗时直方图有效数字位数（1-5）
         """
+        if metrics_mode not in (METRICS_MODE_RAW, METRICS_MODE_AGGREGATE):
+            raise ValueError(f"无效的指标上报模式: {metrics_mode}")
+
         self.node_type = node_type
         self.node_id = node_id
         self.redis_client = redis_client
@@ -146,12 +561,31 @@ class MetricsCollector:
         self.batch_size = batch_size
         self.flush_interval = flush_interval
         self.buffer_size = buffer_size
+        self.metrics_mode = metrics_mode
 
-        # 本地缓冲区
-        self._metrics_buffer: List[Dict[str, Any]] = []
+        # 本地环形缓冲区：追加与淘汰均为 O(1)
+        self._metrics_buffer: deque = deque(maxlen=buffer_size)
         self._buffer_lock = asyncio.Lock()
         self._flush_task = None
 
+        # 缓冲区统计
+        self.dropped_count = 0
+        self.published_count = 0
+        self._dropped_since_flush = 0
+
+        # 区间聚合器（仅 Worker 聚合模式使用）
+        self._aggregator = RequestAggregator(latency_precision)
+
+        # 按 (method, endpoint) 统计的耗时直方图（Local/Master 使用）
+        self.latency_precision = latency_precision
+        self._latency: Dict[Tuple[str, str], LatencyHistogram] = {}
+        self._corrected_latency: Dict[Tuple[str, str], LatencyHistogram] = {}
+        self._reported_count = 0  # 上次输出耗时报告时的请求总数
+
+        # 缓存的 Prometheus 子指标句柄（Local/Master 使用）
+        self._series: Dict[Tuple[str, str], _EndpointSeries] = {}
+        self._counter_children: Dict[Tuple[str, str, str, str], Any] = {}
+
     async def start(self):
         """启动指标收集器"""
         await self._register_event_handlers()
@@ -172,10 +606,13 @@ class MetricsCollector:
             except asyncio.CancelledError:
                 pass
 
-        # 最后一次刷新缓冲区
-        if self.node_type == "worker" and self._metrics_buffer:
+        # 交付本周期尚未交付的请求事件，再最后一次刷新缓冲区
+        await request_metrics.flush()
+        if self.node_type == "worker" and (self._metrics_buffer or self._aggregator):
             await self._do_flush()
 
+        self._log_latency_report()
+
         logger.info("指标收集器已停止，节点ID: %s", self.node_id)
 
     async def _flush_buffer(self):
@@ -191,32 +628,97 @@ class MetricsCollector:
 
     async def _do_flush(self):
         """执行缓冲区刷新"""
+        if self.metrics_mode == METRICS_MODE_AGGREGATE:
+            await self._flush_aggregates()
+            return
+
         async with self._buffer_lock:
+            if self._dropped_since_flush:
+                logger.warning(
+                    "指标缓冲区已满，本周期丢弃 %d 条最旧的指标（累计 %d 条）",
+                    self._dropped_since_flush, self.dropped_count)
+                self._dropped_since_flush = 0
+
             if not self._metrics_buffer:
                 return
 
-            # 批量处理缓冲区数据
-            # 如果缓冲区数据量 >= batch_size，取 batch_size 条数据
-            # 如果缓冲区数据量 < batch_size，取所有数据（避免延迟）
-            batch_size = min(len(self._metrics_buffer), self.batch_size)
-            batch = self._metrics_buffer[:batch_size]
-            self._metrics_buffer = self._metrics_buffer[batch_size:]
+            # 每个周期取出缓冲区全部数据，按 batch_size 切块依次发送，
+            # 发送能力随负载伸缩，不再受 batch_size / flush_interval 的上限约束；
+            # 依次发送保证分块按顺序到达 Master，且只占用一个连接
+            pending = list(self._metrics_buffer)
+            self._metrics_buffer.clear()
+
+            for start in range(0, len(pending), self.batch_size):
+                chunk = pending[start:start + self.batch_size]
+                try:
+                    await self._forward_batch_to_redis(chunk)
+                except Exception as e:
+                    # 停止本周期发送，失败批次中未送达的部分及其后的数据放回缓冲区；
+                    # 协调器分块发送中途失败时已送达的分块不再重发，避免 Master 重复计数
+                    sent = e.sent if isinstance(e, MetricsPublishError) else 0
+                    self.published_count += sent
+                    unsent = pending[start + sent:]
+                    logger.warning("转发指标批次失败，%d 条指标放回缓冲区: %s",
+                                   len(unsent), e)
+                    self._requeue(unsent)
+                    return
+                self.published_count += len(chunk)
+
+    def _requeue(self, records: List[Dict[str, Any]]) -> None:
+        """
+        将发送失败的数据放回缓冲区头部
 
-        if batch:
-            try:
-                await self._forward_batch_to_redis(batch)
-            except Exception as e:
-                logger.warning("转发指标批次失败: %s", e)
-                # 失败时将数据放回缓冲区
-                async with self._buffer_lock:
-                    self._metrics_buffer = batch + self._metrics_buffer
+        参数：
+            records: 发送失败的指标记录（按时间顺序）
+        """
+        # 超出容量时 deque.extendleft 会从右端淘汰最新的数据，与追加时淘汰最旧数据的策略相反，
+        # 因此先丢弃放回数据中最旧的部分（放回数据早于缓冲区中的数据）
+        overflow = len(records) + len(self._metrics_buffer) - self.buffer_size
+        if overflow > 0:
+            self.dropped_count += overflow
+            self._dropped_since_flush += overflow
+            records = records[overflow:]
+        # extendleft 会逆序插入，因此先反转以保持原始顺序
+        self._metrics_buffer.extendleft(reversed(records))
+
+    def get_buffer_stats(self) -> Dict[str, int]:
+        """
+        获取缓冲区统计信息
+
+        返回：
+            dict: metrics_backlog（待发送条数）、metrics_dropped（累计丢弃条数）
+                  与 metrics_published（累计发送条数）
+        """
+        return {
+            "metrics_backlog": len(self._metrics_buffer),
+            "metrics_dropped": self.dropped_count,
+            "metrics_published": self.published_count,
+        }
+
+    async def _flush_aggregates(self):
+        """发送当前区间的聚合记录"""
+        aggregates = self._aggregator.drain()
+        if not aggregates or not self.coordinator:
+            return
+
+        try:
+            await self.coordinator.publish(
+                "request_aggregates", aggregates, worker_id=self.node_id)
+        except Exception as e:
+            logger.warning("转发指标聚合数据失败: %s", e)
+            # 失败时合并回聚合器，等待下次发送
+            self._aggregator.merge(aggregates)
 
     async def record_node_metrics(self, metrics_data: dict) -> None:
         """
         记录节点指标数据（统一接口，支持分布式和本地模式）
 
         参数：
-            metrics_data: 节点指标数据字典，包含cpu_percent, active_users, status等
+            metrics_data: 节点指标数据字典，包含cpu_percent, active_users, status等，
+                      以及可选的资源采样字段（process_cpu_percent, memory_rss, open_fds, sockets,
+                      loop_lag, loop_lag_p50, loop_lag_p99, loop_lag_max, ready_queue, tasks）
+                      和到达率执行器字段（arrival_rate, arrival_busy, arrival_scheduled,
+                      arrival_dropped, arrival_late）
                       - 对于Local/Master节点：定期上报的CPU和用户数
                       - 对于Worker节点：心跳系统传递的数据
 
@@ -234,6 +736,17 @@ class MetricsCollector:
             # 记录到Prometheus
             self._record_cpu_usage(worker_id, machine_id, cpu_percent)
             self._record_active_users(worker_id, active_users)
+            self._record_resource_usage(worker_id, metrics_data)
+            self._record_arrival_stats(worker_id, metrics_data)
+
+            # Worker 心跳携带的缓冲区统计
+            if 'metrics_backlog' in metrics_data:
+                WORKER_METRICS_BACKLOG.labels(worker_id=worker_id).set(
+                    int(metrics_data['metrics_backlog']))
+                WORKER_METRICS_DROPPED.labels(worker_id=worker_id).set(
+                    int(metrics_data.get('metrics_dropped', 0)))
+            if 'metrics_stream_lag' in metrics_data:
+                METRICS_STREAM_LAG.set(int(metrics_data['metrics_stream_lag']))
 
         except (ValueError, TypeError) as e:
             logger.warning("记录节点指标失败: %s", e)
@@ -248,9 +761,21 @@ class MetricsCollector:
         """记录活跃用户数指标"""
         WORKER_ACTIVE_USERS.labels(worker_id=worker_id).set(active_users)
 
+    def _record_resource_usage(self, worker_id: str, metrics_data: dict) -> None:
+        """记录资源采样指标（进程CPU、内存、文件描述符、套接字、事件循环延迟）"""
+        for key, gauge in RESOURCE_GAUGES.items():
+            if key in metrics_data:
+                gauge.labels(worker_id=worker_id).set(float(metrics_data[key]))
+
+    def _record_arrival_stats(self, worker_id: str, metrics_data: dict) -> None:
+        """记录到达率执行器指标（到达率、忙碌用户、计划/丢弃/迟到次数）"""
+        for key, gauge in ARRIVAL_GAUGES.items():
+            if key in metrics_data:
+                gauge.labels(worker_id=worker_id).set(float(metrics_data[key]))
+
     async def _register_event_handlers(self):
-        """注册指标事件处理器"""
-        await request_metrics.add_handler(self.process_request_metrics)
+        """注册指标事件处理器（批量处理器，每个事件循环周期调用一次）"""
+        await request_metrics.add_batch_handler(self.process_request_batch)
 
     async def process_request_metrics(self, **kwargs) -> None:
         """
@@ -263,19 +788,36 @@ class MetricsCollector:
         参数：
             metrics: RequestMetrics 对象
         """
-        try:
-            # 获取metrics数据
-            metrics = kwargs.get('metrics')
-            if not metrics:
-                return
+        metrics = kwargs.get('metrics')
+        if metrics:
+            self._handle_request_metrics(metrics)
+
+    def process_request_batch(self, records: List[Dict[str, Any]]) -> None:
+        """
+        批量处理一个事件循环周期内的请求数据（request_metrics 批量处理器）
+
+        参数：
+            records: 事件参数列表，每项包含 metrics 字段
+        """
+        for record in records:
+            metrics = record.get('metrics')
+            if metrics:
+                self._handle_request_metrics(metrics)
 
+    def _handle_request_metrics(self, metrics: RequestMetrics) -> None:
+        """按节点类型上报单条请求数据"""
+        try:
             # 数据上报（根据节点类型）
             if self.node_type in ("local", "master"):
                 # Local 或 Master 节点：直接上报到 Prometheus
                 self._report_to_prometheus_from_metrics(metrics)
             elif self.node_type == "worker":
-                # Worker 节点：添加到本地缓冲区，等待批量发送到 Redis
-                await self._add_metrics_to_buffer(metrics)
+                if self.metrics_mode == METRICS_MODE_AGGREGATE:
+                    # Worker 聚合模式：折叠进区间聚合，按刷新间隔发送
+                    self._aggregator.add(metrics)
+                elif self.coordinator:
+                    # Worker 节点：添加到本地缓冲区，等待批量发送到 Redis
+                    self._append_to_buffer(self._convert_metrics_to_dict(metrics))
 
         except Exception as e:
             logger.warning("处理请求指标失败: %s", e)
@@ -283,78 +825,226 @@ class MetricsCollector:
     def _report_to_prometheus_from_metrics(
             self, metrics: RequestMetrics) -> None:
         """从 RequestMetrics 对象上报数据到 Prometheus"""
-        method = metrics.method
-        endpoint = metrics.endpoint
         status_code = str(metrics.status_code)
-        duration = metrics.duration
-        response_size = metrics.response_size
-        assertion_result = metrics.assertion_result
-
-        # 记录 Prometheus 指标
-        self._record_request_counter(method, endpoint, status_code, assertion_result)
-        self._record_request_duration(method, endpoint, duration)
-        self._record_response_size(method, endpoint, response_size)
+        self._observe_request(
+            metrics.method, metrics.endpoint, status_code, metrics.assertion_result,
+            metrics.duration, metrics.corrected_duration, metrics.response_size)
 
         # 记录错误指标
         if metrics.error:
-            self._record_error_metrics(metrics, method, endpoint, status_code)
+            self._record_error_metrics(metrics.error, metrics.method, metrics.endpoint, status_code)
 
-    def _record_request_counter(self, method: str, endpoint: str, status_code: str,
-                               assertion_result: str) -> None:
-        """记录请求计数指标"""
-        REQUEST_COUNTER.labels(
-            method=method,
-            endpoint=endpoint,
-            status_code=status_code,
-            assertion_result=assertion_result
-        ).inc()
+    def ingest_worker_batch(self, batch: Union[List[Dict[str, Any]], MetricsBatch]) -> int:
+        """
+        一次性处理 Worker 上报的一批原始请求数据（Master 使用）
 
-    def _record_request_duration(self, method: str, endpoint: str, duration: float) -> None:
-        """记录请求耗时指标"""
-        REQUEST_DURATION.labels(
-            method=method,
-            endpoint=endpoint
-        ).observe(duration)
+        直接读取字典字段并更新缓存的 Prometheus 子指标，不逐条构造 RequestMetrics，
+        也不经过事件系统。
 
-    def _record_response_size(self, method: str, endpoint: str, response_size: int) -> None:
-        """记录响应大小指标"""
-        RESPONSE_SIZE.labels(
-            method=method,
-            endpoint=endpoint
-        ).observe(response_size)
+        参数：
+            batch: Worker 上报的请求数据字典列表（_convert_metrics_to_dict 格式），
+                   或二进制消息解码得到的 MetricsBatch
 
-    def _record_error_metrics(self, metrics: RequestMetrics, method: str, endpoint: str,
+        返回：
+            int: 成功处理的记录数
+        """
+        if isinstance(batch, MetricsBatch):
+            for (method, endpoint, status_code, assertion_result,
+                 duration, corrected, size, error) in batch.rows():
+                status_code = str(status_code)
+                self._observe_request(method, endpoint, status_code, assertion_result,
+                                      duration, corrected, size)
+                if error:
+                    self._record_error_metrics(error, method, endpoint, status_code)
+            return len(batch)
+
+        processed = 0
+        for data in batch:
+            try:
+                method = data.get('method', 'unknown')
+                endpoint = data.get('endpoint', 'unknown')
+                status_code = str(data.get('status_code', 0))
+                self._observe_request(
+                    method, endpoint, status_code, data.get('assertion_result', 'unknown'),
+                    data.get('duration') or 0.0, data.get('corrected_duration'),
+                    data.get('response_size') or 0)
+                error = data.get('error')
+                if error:
+                    self._record_error_metrics(error, method, endpoint, status_code)
+                processed += 1
+            except (AttributeError, TypeError, ValueError) as e:
+                logger.warning("处理 Worker 请求数据失败: %s", e)
+        return processed
+
+    def _observe_request(self, method: str, endpoint: str, status_code: str,
+                         assertion_result: str, duration: float,
+                         corrected_duration: Optional[float], response_size: int) -> None:
+        """使用缓存的子指标句柄记录一条请求的计数、耗时和响应大小"""
+        counter_key = (method, endpoint, status_code, assertion_result)
+        counter = self._counter_children.get(counter_key)
+        if counter is None:
+            counter = self._counter_children[counter_key] = REQUEST_COUNTER.labels(
+                method=method,
+                endpoint=endpoint,
+                status_code=status_code,
+                assertion_result=assertion_result
+            )
+        counter.inc()
+
+        series = self._series.get((method, endpoint))
+        if series is None:
+            series = self._endpoint_series(method, endpoint)
+        series.duration.observe(duration)
+        series.latency.record(duration)
+        series.response_size.observe(response_size)
+
+        if corrected_duration is not None:
+            if series.corrected_duration is None:
+                series.corrected_duration = REQUEST_CORRECTED_DURATION.labels(
+                    method=method, endpoint=endpoint)
+                series.corrected_latency = self._endpoint_histogram(
+                    self._corrected_latency, method, endpoint)
+            series.corrected_duration.observe(corrected_duration)
+            series.corrected_latency.record(corrected_duration)
+
+    def _endpoint_series(self, method: str, endpoint: str) -> _EndpointSeries:
+        """创建并缓存接口对应的子指标句柄"""
+        series = self._series[(method, endpoint)] = _EndpointSeries(
+            REQUEST_DURATION.labels(method=method, endpoint=endpoint),
+            RESPONSE_SIZE.labels(method=method, endpoint=endpoint),
+            self._endpoint_histogram(self._latency, method, endpoint),
+        )
+        return series
+
+    def _record_error_metrics(self, error: Dict[str, Any], method: str, endpoint: str,
                              status_code: str) -> None:
         """记录错误指标"""
-        error_message = str(metrics.error.get('message', 'unknown'))
-
         # 限制错误消息长度，避免过长
-        if len(error_message) > 200:
-            error_message = error_message[:200]
+        error_message = _truncate_error_message(
+            error.get('message', 'unknown'))
 
         ERROR_COUNTER.labels(
-            error_type=metrics.error.get('exc_type', 'unknown'),
+            error_type=error.get('exc_type', 'unknown'),
             method=method,
             endpoint=endpoint,
             status_code=status_code,
             error_message=error_message
         ).inc()
 
-    async def _add_metrics_to_buffer(self, metrics: RequestMetrics) -> None:
+    def merge_aggregates(self, aggregates: List[Dict[str, Any]]) -> None:
         """
-        从 RequestMetrics 对象转换数据并添加到本地缓冲区，等待批量发送到 Redis
+        将 Worker 上报的聚合记录直接合并到 Prometheus 指标（Master 使用）
 
         参数：
-            metrics: RequestMetrics 对象，包含请求相关的指标数据
+            aggregates: RequestAggregate.to_dict 格式的聚合记录列表
         """
-        if not self.coordinator:
-            return
+        for record in aggregates:
+            try:
+                method = record['method']
+                endpoint = record['endpoint']
+                status_code = str(record['status_code'])
+                count = record['count']
+                if count <= 0:
+                    continue
+
+                REQUEST_COUNTER.labels(
+                    method=method,
+                    endpoint=endpoint,
+                    status_code=status_code,
+                    assertion_result=record['assertion_result']
+                ).inc(count)
+                # Prometheus 耗时桶由合并后的 LatencyHistogram 折算
+                latency = LatencyHistogram.from_dict(record['latency'])
+                _merge_histogram(
+                    REQUEST_DURATION.labels(method=method, endpoint=endpoint),
+                    latency.bucket_counts(DURATION_BUCKETS), record['duration_sum'])
+                self._endpoint_histogram(self._latency, method, endpoint).merge(latency)
+                if record.get('corrected'):
+                    corrected = LatencyHistogram.from_dict(record['corrected'])
+                    _merge_histogram(
+                        REQUEST_CORRECTED_DURATION.labels(method=method, endpoint=endpoint),
+                        corrected.bucket_counts(DURATION_BUCKETS), corrected.total)
+                    self._endpoint_histogram(
+                        self._corrected_latency, method, endpoint).merge(corrected)
+                _merge_histogram(
+                    RESPONSE_SIZE.labels(method=method, endpoint=endpoint),
+                    record['size_buckets'], record['size_sum'])
+
+                for error in record.get('errors', []):
+                    ERROR_COUNTER.labels(
+                        error_type=error['error_type'],
+                        method=method,
+                        endpoint=endpoint,
+                        status_code=status_code,
+                        error_message=error['error_message']
+                    ).inc(error['count'])
+            except (KeyError, TypeError, ValueError) as e:
+                logger.warning("合并指标聚合数据失败: %s", e)
+
+    def _endpoint_histogram(self, histograms: Dict[Tuple[str, str], LatencyHistogram],
+                            method: str, endpoint: str) -> LatencyHistogram:
+        """获取（必要时创建）接口对应的耗时直方图"""
+        key = (method, endpoint)
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = LatencyHistogram(self.latency_precision)
+        return histogram
+
+    def get_latency_stats(self) -> List[Dict[str, Any]]:
+        """
+        获取各接口的耗时统计
+
+        返回：
+            list: 每个接口一条记录，包含 method、endpoint、count、min、mean、max
+                  以及 p50/p90/p95/p99/p99.9（秒）；启用协调遗漏校正时附带 corrected 统计
+        """
+        stats = []
+        for (method, endpoint), histogram in sorted(self._latency.items()):
+            summary = histogram.summary()
+            if summary is None:
+                continue
+            entry = {'method': method, 'endpoint': endpoint, **summary}
+            corrected = self._corrected_latency.get((method, endpoint))
+            if corrected is not None and corrected.count:
+                entry['corrected'] = corrected.summary()
+            stats.append(entry)
+        return stats
+
+    def format_latency_report(self) -> str:
+        """
+        生成耗时报告文本（毫秒）
 
-        # 转换为字典格式并添加 worker 信息
-        metrics_dict = self._convert_metrics_to_dict(metrics)
+        返回：
+            str: 按接口排列的耗时统计表，无数据时返回空字符串
+        """
+        stats = self.get_latency_stats()
+        if not stats:
+            return ""
 
-        # 添加到缓冲区
-        await self._append_to_buffer(metrics_dict)
+        header = (f"{'Method':<8}{'Endpoint':<40}{'Count':>10}{'Mean':>10}{'p50':>10}"
+                  f"{'p90':>10}{'p95':>10}{'p99':>10}{'p99.9':>10}{'Max':>10}")
+        lines = [header, "-" * len(header)]
+        for entry in stats:
+            rows = [(entry['method'], entry['endpoint'], entry)]
+            if 'corrected' in entry:
+                rows.append(("", "  (corrected)", entry['corrected']))
+            for method, endpoint, values in rows:
+                lines.append(
+                    f"{method:<8}{endpoint[:39]:<40}{values['count']:>10}"
+                    + "".join(
+                        f"{values[key] * 1000:>10.2f}"
+                        for key in ('mean', 'p50', 'p90', 'p95', 'p99', 'p99.9', 'max')))
+        return "\n".join(lines)
+
+    def _log_latency_report(self) -> None:
+        """输出耗时报告（自上次报告后有新数据时）"""
+        if self.node_type not in ("local", "master"):
+            return
+        total = sum(histogram.count for histogram in self._latency.values())
+        if total == self._reported_count:
+            return
+        self._reported_count = total
+        logger.info("接口耗时统计（毫秒）:\n%s", self.format_latency_report())
 
     def _convert_metrics_to_dict(self, metrics: RequestMetrics) -> Dict[str, Any]:
         """将RequestMetrics对象转换为字典格式"""
@@ -364,6 +1054,7 @@ class MetricsCollector:
             'endpoint': metrics.endpoint,
             'status_code': metrics.status_code,
             'duration': metrics.duration,
+            'corrected_duration': metrics.corrected_duration,
             'response_size': metrics.response_size,
             'error': metrics.error,
             'timestamp': metrics.timestamp,
@@ -371,16 +1062,13 @@ class MetricsCollector:
             'worker_id': self.node_id
         }
 
-    async def _append_to_buffer(self, metrics_dict: Dict[str, Any]) -> None:
+    def _append_to_buffer(self, metrics_dict: Dict[str, Any]) -> None:
         """将指标数据添加到缓冲区"""
-        async with self._buffer_lock:
-            if len(self._metrics_buffer) < self.buffer_size:
-                self._metrics_buffer.append(metrics_dict)
-            else:
-                # 缓冲区已满，丢弃最旧的数据
-                self._metrics_buffer.pop(0)
-                self._metrics_buffer.append(metrics_dict)
-                logger.warning("指标缓冲区已满，丢弃最旧的指标")
+        # deque 追加为原子操作，无需加锁；缓冲区已满时自动淘汰最旧的数据
+        if len(self._metrics_buffer) >= self.buffer_size:
+            self.dropped_count += 1
+            self._dropped_since_flush += 1
+        self._metrics_buffer.append(metrics_dict)
 
     async def _forward_batch_to_redis(
             self, batch: List[Dict[str, Any]]) -> None:
@@ -415,7 +1103,9 @@ def get_unified_collector() -> MetricsCollector:
 
 def init_unified_collector(node_type: str = "local", redis_client=None, node_id: str = "local",
                            coordinator=None, batch_size: int = 100, flush_interval: float = 1.0,
-                           buffer_size: int = 10000) -> MetricsCollector:
+                           buffer_size: int = 10000,
+                           metrics_mode: str = METRICS_MODE_RAW,
+                           latency_precision: int = DEFAULT_SIGNIFICANT_FIGURES) -> MetricsCollector:
     """初始化统一的指标收集器"""
     global _UNIFIED_COLLECTOR
     _UNIFIED_COLLECTOR = MetricsCollector(
@@ -425,7 +1115,9 @@ def init_unified_collector(node_type: str = "local", redis_client=None, node_id:
         coordinator,
         batch_size=batch_size,
         flush_interval=flush_interval,
-        buffer_size=buffer_size
+        buffer_size=buffer_size,
+        metrics_mode=metrics_mode,
+        latency_precision=latency_precision
     )
     return _UNIFIED_COLLECTOR
 
@@ -0,0 +1,227 @@
+# encoding: utf-8
+"""
+资源采样模块，定期采集负载生成进程与系统的资源使用情况
+
+所有 psutil 调用都在线程池中执行，CPU 使用率使用两次采样之间的增量计算
+（cpu_percent(interval=None)），不会阻塞事件循环。
+
+LoopLagMonitor 以较短周期探测事件循环唤醒延迟，用于区分“负载生成器饱和”
+与“被测服务变慢”：生成器事件循环过载时，所有请求的耗时都会被虚高。
+"""
+
+import asyncio
+from collections import deque
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import psutil
+
+from aiotest.logger import logger
+
+# 默认采样间隔（秒）
+DEFAULT_SAMPLE_INTERVAL = 5.0
+
+# 事件循环延迟探测间隔（秒）
+DEFAULT_LAG_PROBE_INTERVAL = 0.1
+
+# 事件循环延迟告警阈值（秒）
+DEFAULT_LAG_THRESHOLD = 0.2
+
+
+class ResourceSampler:
+    """
+    非阻塞资源采样器
+
+    采集字段：
+        cpu_percent: 系统 CPU 使用率（%）
+        process_cpu_percent: 当前进程 CPU 使用率（%，多核可超过 100）
+        memory_rss: 当前进程常驻内存（字节）
+        open_fds: 当前进程打开的文件描述符数（Windows 为句柄数）
+        sockets: 当前进程的 inet 套接字数
+        loop_lag: 采样周期内事件循环唤醒延迟（秒）
+
+    示例：
+        >>> sampler = ResourceSampler(interval=5.0)
+        >>> asyncio.create_task(sampler.run(callback))
+    """
+
+    def __init__(self, interval: float = DEFAULT_SAMPLE_INTERVAL):
+        """
+        初始化资源采样器
+
+        参数：
+            interval: 采样间隔（秒）
+        """
+        self.interval = interval
+        self.latest: Dict[str, float] = {}
+        self._process = psutil.Process()
+
+        # 建立 CPU 使用率基线，后续调用返回与上次调用之间的增量
+        psutil.cpu_percent(interval=None)
+        self._process.cpu_percent(interval=None)
+
+    def sample(self) -> Dict[str, float]:
+        """
+        同步采集一次资源快照（会执行系统调用，应在线程中运行）
+
+        返回：
+            dict: 资源快照，不含 loop_lag
+        """
+        with self._process.oneshot():
+            snapshot = {
+                "cpu_percent": psutil.cpu_percent(interval=None),
+                "process_cpu_percent": self._process.cpu_percent(interval=None),
+                "memory_rss": self._process.memory_info().rss,
+                "open_fds": self._count_fds(),
+                "sockets": self._count_sockets(),
+            }
+        return snapshot
+
+    def _count_fds(self) -> int:
+        """统计打开的文件描述符（Windows 为句柄数）"""
+        try:
+            if hasattr(self._process, "num_fds"):
+                return self._process.num_fds()
+            return self._process.num_handles()
+        except psutil.Error:
+            return 0
+
+    def _count_sockets(self) -> int:
+        """统计 inet 套接字数量"""
+        # psutil 6.0 起 connections 更名为 net_connections
+        connections = getattr(self._process, "net_connections", None) \
+            or self._process.connections
+        try:
+            return len(connections(kind="inet"))
+        except psutil.Error:
+            return 0
+
+    async def run(
+            self, callback: Optional[Callable[[Dict[str, float]], Awaitable[None]]] = None) -> None:
+        """
+        周期采样循环，直到任务被取消
+
+        参数：
+            callback: 可选的异步回调，每次采样后以快照字典调用
+        """
+        loop = asyncio.get_running_loop()
+        loop_lag = 0.0
+        while True:
+            try:
+                snapshot = await asyncio.to_thread(self.sample)
+                snapshot["loop_lag"] = loop_lag
+                self.latest = snapshot
+                if callback:
+                    await callback(snapshot)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("资源采样失败: %s", str(e))
+
+            # 实际唤醒时间与预期唤醒时间之差即为事件循环延迟
+            expected_wakeup = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            loop_lag = max(0.0, loop.time() - expected_wakeup)
+
+
+def _percentile(sorted_values: List[float], quantile: float) -> float:
+    """计算已排序序列的分位数（最近秩法）"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(quantile * len(sorted_values)))
+    return sorted_values[index]
+
+
+class LoopLagMonitor:
+    """
+    事件循环延迟监控器
+
+    以固定周期休眠，比较预期唤醒时间与实际唤醒时间，差值即为事件循环延迟。
+    每次 snapshot() 汇总自上次汇总以来的延迟分布，并附带就绪队列长度和任务数。
+
+    示例：
+        >>> monitor = LoopLagMonitor(threshold=0.2)
+        >>> asyncio.create_task(monitor.run())
+        >>> monitor.snapshot()["loop_lag_p99"]
+    """
+
+    def __init__(self, interval: float = DEFAULT_LAG_PROBE_INTERVAL,
+                 threshold: float = DEFAULT_LAG_THRESHOLD, window: int = 1000):
+        """
+        初始化事件循环延迟监控器
+
+        参数：
+            interval: 探测间隔（秒）
+            threshold: 延迟阈值（秒），超过时视为负载生成器饱和
+            window: 两次汇总之间最多保留的探测样本数
+        """
+        self.interval = interval
+        self.threshold = threshold
+        self.current_lag = 0.0
+        self._lags: deque = deque(maxlen=window)
+        self._healthy = asyncio.Event()
+        self._healthy.set()
+
+    @property
+    def saturated(self) -> bool:
+        """最近一次探测的延迟是否超过阈值"""
+        return self.current_lag > self.threshold
+
+    def record(self, lag: float) -> None:
+        """
+        记录一次探测结果
+
+        参数：
+            lag: 事件循环延迟（秒）
+        """
+        self.current_lag = lag
+        self._lags.append(lag)
+        if lag > self.threshold:
+            self._healthy.clear()
+        else:
+            self._healthy.set()
+
+    async def wait_until_healthy(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待事件循环延迟回落到阈值以下
+
+        参数：
+            timeout: 最长等待时间（秒），None 表示一直等待
+
+        返回：
+            bool: 延迟已回落返回 True，等待超时返回 False
+        """
+        if self._healthy.is_set():
+            return True
+        try:
+            await asyncio.wait_for(self._healthy.wait(), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def snapshot(self) -> Dict[str, float]:
+        """
+        汇总自上次汇总以来的延迟分布，并清空样本窗口
+
+        返回：
+            dict: loop_lag_p50 / loop_lag_p99 / loop_lag_max（秒）、
+                  ready_queue（就绪回调数）、tasks（未完成任务数）
+        """
+        lags = sorted(self._lags)
+        self._lags.clear()
+        loop = asyncio.get_running_loop()
+        return {
+            "loop_lag_p50": _percentile(lags, 0.5),
+            "loop_lag_p99": _percentile(lags, 0.99),
+            "loop_lag_max": lags[-1] if lags else 0.0,
+            # _ready 为 CPython 事件循环的就绪回调队列，其他实现不可用时记为 0
+            "ready_queue": len(getattr(loop, "_ready", ())),
+            "tasks": len(asyncio.all_tasks(loop)),
+        }
+
+    async def run(self) -> None:
+        """探测循环，直到任务被取消"""
+        loop = asyncio.get_running_loop()
+        while True:
+            expected_wakeup = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.record(max(0.0, loop.time() - expected_wakeup))
@@ -3,14 +3,19 @@
 import asyncio
 from typing import TYPE_CHECKING, Any, Dict, List, Optional, Type
 
-import psutil
 from redis.asyncio import Redis
 
-from aiotest.events import startup_completed, test_start, worker_request_metrics
+from aiotest.arrival_executor import ArrivalRateExecutor
+from aiotest.events import startup_completed, test_start
 from aiotest.exception import InvalidRateError, InvalidUserCountError
 from aiotest.load_shape_manager import LoadShapeManager
 from aiotest.logger import logger
-from aiotest.metrics import RequestMetrics
+from aiotest.resource_sampler import (
+    DEFAULT_LAG_THRESHOLD,
+    LoopLagMonitor,
+    ResourceSampler,
+)
+from aiotest.shape import ArrivalRateShape
 from aiotest.state_manager import RunnerState, StateManager
 from aiotest.task_manager import TaskManager
 from aiotest.user_manager import UserManager
@@ -21,6 +26,11 @@ from aiotest.user_manager import UserManager
 NODE_TYPE_LOCAL = "local"
 NODE_TYPE_MASTER = "master"
 NODE_TYPE_WORKER = "worker"
+NODE_TYPE_AGGREGATOR = "aggregator"
+
+# 负载执行器类型：封闭模型（用户循环执行）与开放模型（固定到达率）
+EXECUTOR_USERS = "users"
+EXECUTOR_ARRIVAL_RATE = "arrival_rate"
 if TYPE_CHECKING:
     from aiotest.users import User
 
@@ -45,10 +55,25 @@ def validate_load_params(user_count: int, rate: float) -> None:
         raise InvalidRateError(
             f"速率必须在 0 和 {user_count} 之间，当前值: {rate}")
 
-    # 速率过高警告
-    if rate > 100:
-        logger.warning(
-            "高生成率（>100 用户/秒）可能导致性能问题")
+
+def validate_arrival_params(pool_size: int, rate: float) -> None:
+    """
+    验证到达率负载参数
+
+    参数:
+        pool_size: 用户池大小，必须为正整数
+        rate: 到达率（次/秒），必须大于0
+
+    异常:
+        InvalidUserCountError: 当pool_size不是正整数时抛出
+        InvalidRateError: 当rate不大于0时抛出
+    """
+    if not isinstance(pool_size, int) or pool_size <= 0:
+        raise InvalidUserCountError(
+            f"用户池大小必须是正整数，当前值: {pool_size}")
+
+    if rate <= 0:
+        raise InvalidRateError(f"到达率必须大于 0，当前值: {rate}")
 
 
 def validate_params(func):
@@ -81,13 +106,11 @@ class EventHandlerRegistry:
         if runner_key in self._registered_handlers:
             return  # 避免重复注册
 
-        # 注册通用事件处理器（仅非Worker节点）
-        if not hasattr(runner, 'node') or runner.node != NODE_TYPE_WORKER:
+        # 注册通用事件处理器（仅非Worker节点，聚合节点由上游 Master 统一处理）
+        if getattr(runner, 'node', None) not in (NODE_TYPE_WORKER, NODE_TYPE_AGGREGATOR):
             await startup_completed.add_handler(on_startup_completed)
 
-        # 仅Master节点需要注册worker相关事件处理器，用于收集Worker上报的指标
-        if hasattr(runner, 'node') and runner.node == NODE_TYPE_MASTER:
-            await worker_request_metrics.add_handler(on_worker_request_metrics)
+        # Worker上报的指标由MasterRunner整批写入指标收集器，无需注册处理器
 
         self._registered_handlers.add(runner_key)
         logger.debug(
@@ -111,7 +134,7 @@ class RunnerFactory:
         创建指定类型的运行器实例
 
         参数：
-            runner_type: 运行器类型 ("local", "master", "worker")
+            runner_type: 运行器类型 ("local", "master", "worker", "aggregator")
             user_types: 用户类列表
             load_shape: 负载形状类
             config: 配置参数
@@ -135,9 +158,12 @@ class RunnerFactory:
         elif runner_type == "worker":
             from aiotest.runners import WorkerRunner
             runner = WorkerRunner(user_types, load_shape, config, redis_client)
+        elif runner_type == "aggregator":
+            from aiotest.runners import AggregatorRunner
+            runner = AggregatorRunner(user_types, load_shape, config, redis_client)
         else:
             raise ValueError(
-                f"未知的运行器类型: {runner_type}。可用类型: local, master, worker")
+                f"未知的运行器类型: {runner_type}。可用类型: local, master, worker, aggregator")
 
         # 初始化运行器
         await runner.initialize()
@@ -169,18 +195,27 @@ class BaseRunner:
         self.config = config
         self.node = None  # 节点类型，由子类设置
         self.cpu_usage = 0
+        self.resource_stats: Dict[str, float] = {}  # 最近一次资源采样快照
+        # 事件循环延迟监控（区分负载生成器饱和与被测服务变慢）
+        self.loop_monitor = LoopLagMonitor(
+            threshold=getattr(config, 'loop_lag_threshold', DEFAULT_LAG_THRESHOLD))
         self.machine_id = None  # 机器标识符，用于区分不同机器上的Worker
+        self.start_skew = 0.0  # 最近一次按计划时刻启动时，实际开始时间与计划时刻之差（秒）
 
         # 延迟初始化组件（避免循环导入）
         self._user_manager = None
         self._state_manager = None
         self._task_manager = None
         self._load_shape_manager = None
+        self._arrival_executor = None
 
     @property
     def user_manager(self):
         if self._user_manager is None:
             self._user_manager = UserManager(self.user_types, self.config)
+            # 开启后，事件循环延迟超过阈值时暂缓启动新用户
+            if getattr(self.config, 'loop_lag_gate', False):
+                self._user_manager.spawn_gate = self.loop_monitor
         return self._user_manager
 
     @property
@@ -195,12 +230,24 @@ class BaseRunner:
             self._task_manager = TaskManager()
         return self._task_manager
 
+    @property
+    def arrival_executor(self) -> ArrivalRateExecutor:
+        """获取到达率执行器（开放负载模型）"""
+        if self._arrival_executor is None:
+            self._arrival_executor = ArrivalRateExecutor(self.user_manager)
+        return self._arrival_executor
+
     @property
     def load_shape_manager(self):
         """获取负载形状管理器"""
         if self._load_shape_manager is None and self.load_shape:
+            # 到达率形状使用开放模型执行器，其余形状按用户数管理
+            if isinstance(self.load_shape, ArrivalRateShape):
+                callback = self.apply_arrival_rate
+            else:
+                callback = self.apply_load
             self._load_shape_manager = LoadShapeManager(
-                self.load_shape, self.apply_load)
+                self.load_shape, callback)
         return self._load_shape_manager
 
     async def initialize(self):
@@ -239,6 +286,8 @@ class BaseRunner:
         try:
             # 停止所有用户
             await self.user_manager.stop_all_users()
+            if self._arrival_executor:
+                await self._arrival_executor.stop()
 
             # 取消所有后台任务
             await self.task_manager.cancel_all_tasks()
@@ -261,6 +310,8 @@ class BaseRunner:
             self.load_shape.pause()
         # 暂停用户活动
         await self.user_manager.pause_all_users()
+        if self._arrival_executor:
+            self._arrival_executor.pause()
         logger.info("测试已暂停")
 
     async def resume(self) -> None:
@@ -276,23 +327,39 @@ class BaseRunner:
             self.load_shape.resume()
         # 恢复用户活动
         await self.user_manager.resume_all_users()
+        if self._arrival_executor:
+            self._arrival_executor.resume()
         logger.info("测试已恢复")
 
     @validate_params
-    async def apply_load(self, user_count: int, rate: float) -> None:
-        """应用负载配置：直接管理用户并更新状态"""
+    async def apply_load(self, user_count: int, rate: float,
+                         start_at: Optional[float] = None) -> None:
+        """
+        应用负载配置：直接管理用户并更新状态
+
+        参数：
+            user_count: 目标用户数
+            rate: 启动/停止速率（个/秒）
+            start_at: 可选的计划开始时刻（事件循环时间），到达该时刻后才开始增减用户
+        """
         # 初始状态处理
         if self.state_manager.can_start():
             await test_start.fire(runner=self)
             await self.state_manager.transition_state(RunnerState.STARTING)
 
+        if start_at is not None:
+            loop = asyncio.get_running_loop()
+            delay = start_at - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self.start_skew = loop.time() - start_at
+
         # 直接管理用户
         current_count = self.active_user_count
         if user_count > current_count:
             await self.user_manager.manage_users(user_count - current_count, rate, "start")
         elif user_count < current_count:
             await self.user_manager.manage_users(current_count - user_count, rate, "stop")
-            self.user_manager.cleanup_inactive_users()
 
         # 首次启动设置运行状态
         if self.state_manager.get_current_state() == RunnerState.STARTING:
@@ -301,14 +368,51 @@ class BaseRunner:
             if self.node != NODE_TYPE_WORKER:
                 await startup_completed.fire(runner=self, node_type=self.node)
 
+    async def apply_arrival_rate(self, pool_size: int, rate: float,
+                                 start_at: Optional[float] = None) -> None:
+        """
+        应用到达率负载配置（开放负载模型）
+
+        参数：
+            pool_size: 预分配用户池大小
+            rate: 每秒派发的场景迭代次数
+            start_at: 可选的计划开始时刻（事件循环时间），派发时间表以该时刻为起点
+        """
+        validate_arrival_params(pool_size, rate)
+
+        # 初始状态处理
+        if self.state_manager.can_start():
+            await test_start.fire(runner=self)
+            await self.state_manager.transition_state(RunnerState.STARTING)
+
+        await self.arrival_executor.apply(pool_size, rate, start_at=start_at)
+        if start_at is not None:
+            # 用户池准备超过计划时刻时，派发时间表会补派已到期的迭代，偏差即超出的时间
+            self.start_skew = max(0.0, asyncio.get_running_loop().time() - start_at)
+        # 首次启动设置运行状态
+        if self.state_manager.get_current_state() == RunnerState.STARTING:
+            await self.state_manager.transition_state(RunnerState.RUNNING)
+            # 只有非Worker节点才触发全局启动完成事件
+            if self.node != NODE_TYPE_WORKER:
+                await startup_completed.fire(runner=self, node_type=self.node)
+
     async def stop(self) -> None:
         """停止负载测试（由子类重写）"""
         raise NotImplementedError("Subclass must implement stop method")
 
     @property
     def active_user_count(self) -> int:
-        """获取当前活跃用户数量"""
-        return self.user_manager.active_user_count
+        """获取当前活跃用户数量（含到达率执行器的用户池）"""
+        count = self.user_manager.active_user_count
+        if self._arrival_executor:
+            count += self._arrival_executor.pool_size
+        return count
+
+    def get_arrival_stats(self) -> Dict[str, float]:
+        """获取到达率执行器统计，未使用开放负载模型时返回空字典"""
+        if self._arrival_executor is None:
+            return {}
+        return self._arrival_executor.get_stats()
 
     @property
     def state(self):
@@ -317,26 +421,44 @@ class BaseRunner:
 
     async def _collect_cpu_metrics(self):
         """
-        收集CPU使用率的通用方法
+        收集CPU等资源使用情况的通用方法
 
         适用于LocalRunner和WorkerRunner节点
-        定期采集CPU使用率并更新self.cpu_usage属性
+        通过 ResourceSampler 在线程中定期采样，不阻塞事件循环，
+        同时运行 LoopLagMonitor 探测事件循环延迟，
+        更新 self.cpu_usage 与 self.resource_stats 属性
         """
-        while not self.state_manager.is_in_quit_state():
-            try:
-                self.cpu_usage = psutil.cpu_percent(interval=1)
-
-                # 性能预警
-                if self.cpu_usage > 90:
-                    logger.warning(
-                        "%s CPU 使用率超过 90%%！(当前: %.1f%%)",
-                        self.__class__.__name__, self.cpu_usage)
-            except Exception as e:
-                logger.error(
-                    "%s 收集 CPU 指标失败: %s",
-                    self.__class__.__name__, str(e))
-            finally:
-                await asyncio.sleep(5)
+        monitor_task = asyncio.create_task(
+            self.loop_monitor.run(), name="loop_lag_monitor")
+        sampler = ResourceSampler(interval=5)
+        try:
+            await sampler.run(self._on_resource_sample)
+        finally:
+            monitor_task.cancel()
+
+    async def _on_resource_sample(self, snapshot: Dict[str, float]) -> None:
+        """
+        处理一次资源采样结果
+
+        参数：
+            snapshot: ResourceSampler 采集的资源快照
+        """
+        snapshot.update(self.loop_monitor.snapshot())
+        self.resource_stats = snapshot
+        self.cpu_usage = snapshot["cpu_percent"]
+
+        # 性能预警
+        if self.cpu_usage > 90:
+            logger.warning(
+                "%s CPU 使用率超过 90%%！(当前: %.1f%%)",
+                self.__class__.__name__, self.cpu_usage)
+
+        if snapshot["loop_lag_max"] > self.loop_monitor.threshold:
+            logger.warning(
+                "%s 事件循环延迟超过阈值 %.3fs (p99: %.3fs, 最大: %.3fs, 任务数: %d)，"
+                "负载生成器可能已饱和，请求耗时可能偏高",
+                self.__class__.__name__, self.loop_monitor.threshold,
+                snapshot["loop_lag_p99"], snapshot["loop_lag_max"], snapshot["tasks"])
 
 
 # ============================================================================
@@ -370,30 +492,3 @@ async def on_startup_completed(node_type: str, **kwargs: Any) -> None:
                 "启动完成事件: 已启动 %d 个用户",
                 runner.active_user_count)
     # Worker不在此处理startup_completed事件，避免死锁
-
-
-async def on_worker_request_metrics(node_type: str, **kwargs: Any) -> None:
-    """处理接收到的工作节点请求指标数据事件"""
-    # 只在Master节点处理Worker请求指标
-    if node_type != NODE_TYPE_MASTER:
-        return
-
-    runner = kwargs.get("runner")
-    data = kwargs.get("data")
-    if runner is None or not data:
-        return
-
-    collector = getattr(runner, 'metrics_collector', None)
-
-    if collector:
-        # 从字典创建 RequestMetrics 对象
-        metrics = RequestMetrics(
-            request_id=data.get("request_id", ""),
-            method=data.get("method", "unknown"),
-            endpoint=data.get("endpoint", "unknown"),
-            status_code=data.get("status_code", 0),
-            duration=data.get("duration", 0),
-            response_size=data.get("response_size", 0),
-            error=data.get("error", None)
-        )
-        await collector.process_request_metrics(metrics=metrics)
@@ -1,14 +1,23 @@
 # encoding: utf-8
 
 import asyncio
+import os
 import time
-from typing import Dict, List
+from typing import Dict, List, Optional, Sequence
 from uuid import uuid4
 
 from aiohttp import web
 from prometheus_client import generate_latest
 
-from aiotest.distributed_coordinator import HEARTBEAT_INTERVAL, DistributedCoordinator
+from aiotest.distributed_coordinator import (
+    COORDINATOR_REDIS,
+    COORDINATOR_TCP,
+    HEARTBEAT_INTERVAL,
+    METRICS_STREAM_MAXLEN,
+    METRICS_TRANSPORT_PUBSUB,
+    METRICS_TRANSPORT_STREAM,
+    DistributedCoordinator,
+)
 from aiotest.events import (
     startup_completed,
     test_start,
@@ -16,16 +25,38 @@ from aiotest.events import (
     worker_request_metrics,
 )
 from aiotest.exception import RunnerError
+from aiotest.histogram import DEFAULT_SIGNIFICANT_FIGURES
 from aiotest.load_shape_manager import LoadShapeManager
 from aiotest.logger import logger
-from aiotest.metrics import REGISTRY, init_unified_collector
+from aiotest.metrics import (
+    METRICS_MODE_RAW,
+    REGISTRY,
+    RequestAggregator,
+    init_unified_collector,
+)
+from aiotest.metrics_codec import WIRE_BINARY, MetricsBatch
 from aiotest.runner_factory import (
+    EXECUTOR_ARRIVAL_RATE,
+    EXECUTOR_USERS,
+    NODE_TYPE_AGGREGATOR,
     NODE_TYPE_LOCAL,
     NODE_TYPE_MASTER,
     NODE_TYPE_WORKER,
     BaseRunner,
 )
+from aiotest.shape import ArrivalRateShape
 from aiotest.state_manager import RunnerState
+from aiotest.tcp_coordinator import DEFAULT_MASTER_PORT, TcpCoordinator
+
+# Worker 报告饱和时分配系数的下调比例与下限
+SATURATION_BACKOFF = 0.75
+MIN_LOAD_FACTOR = 0.1
+# Worker 恢复正常后，每持续健康该时长（秒）分配系数回升一级（除以 SATURATION_BACKOFF），直到 1.0
+LOAD_FACTOR_RECOVERY_INTERVAL = 10.0
+
+# 协调启动：计划开始时刻距广播的提前量（秒），每个 Worker 额外增加的提前量（秒）
+STARTUP_LEAD_TIME = 0.5
+STARTUP_LEAD_PER_WORKER = 0.002
 
 # =============================================================================
 # 辅助函数
@@ -49,6 +80,13 @@ def create_prometheus_app(runner=None):
             logger.error(traceback.format_exc())
             return web.Response(body=b'Internal Server Error', status=500)
 
+    async def stats_handler(_):
+        """处理/stats端点，返回各接口的耗时百分位统计（JSON）"""
+        collector = getattr(runner, 'metrics_collector', None)
+        if collector is None:
+            return web.json_response([])
+        return web.json_response(collector.get_latency_stats())
+
     async def control_handler(request):
         """处理控制请求"""
         action = request.match_info['action']
@@ -87,13 +125,15 @@ def create_prometheus_app(runner=None):
             return web.Response(body=b'Error loading control page', status=500)
 
     app.router.add_get('/metrics', metrics_handler)
+    app.router.add_get('/stats', stats_handler)
     app.router.add_get('/control/{action}', control_handler)
     app.router.add_get('/', index_handler)
     return app
 
 
 async def init_metrics_collector(
-        node, redis_client, node_id, coordinator, batch_size=100, flush_interval=1.0, buffer_size=10000):
+        node, redis_client, node_id, coordinator, batch_size=100, flush_interval=1.0, buffer_size=10000,
+        metrics_mode=METRICS_MODE_RAW, latency_precision=DEFAULT_SIGNIFICANT_FIGURES):
     """
     初始化指标收集器的通用方法
 
@@ -105,6 +145,8 @@ async def init_metrics_collector(
         batch_size: 批量大小
         flush_interval: 刷新间隔
         buffer_size: 缓冲区大小
+        metrics_mode: Worker 指标上报模式（raw/aggregate）
+        latency_precision: 耗时直方图有效数字位数
     """
     metrics_collector = init_unified_collector(
         node,
@@ -113,7 +155,9 @@ async def init_metrics_collector(
         coordinator,
         batch_size=batch_size,
         flush_interval=flush_interval,
-        buffer_size=buffer_size
+        buffer_size=buffer_size,
+        metrics_mode=metrics_mode,
+        latency_precision=latency_precision
     )
     # 启动指标收集器（注册事件处理器）
     await metrics_collector.start()
@@ -137,6 +181,37 @@ async def start_prometheus_service(config, runner=None):
     return prometheus_runner, True
 
 
+def create_coordinator(config, redis_client, role, node_id=None, namespace=None):
+    """
+    按配置创建协调器：默认经由 Redis，coordinator 为 tcp 时 Master 与 Worker 直连
+
+    参数：
+        config: 配置对象
+        redis_client: Redis客户端（TCP 后端不使用）
+        role: 节点角色（master/worker）
+        node_id: 节点ID
+        namespace: Redis 命名空间（聚合分组）
+
+    返回：
+        DistributedCoordinator 或 TcpCoordinator
+    """
+    metrics_encoding = getattr(config, 'metrics_encoding', WIRE_BINARY)
+    if getattr(config, 'coordinator', COORDINATOR_REDIS) == COORDINATOR_TCP:
+        if role == NODE_TYPE_MASTER:
+            host = getattr(config, 'master_bind_host', '0.0.0.0')
+        else:
+            host = getattr(config, 'master_host', '127.0.0.1')
+        return TcpCoordinator(
+            host, getattr(config, 'master_port', DEFAULT_MASTER_PORT), role=role,
+            node_id=node_id, metrics_encoding=metrics_encoding)
+    return DistributedCoordinator(
+        redis_client, role=role, node_id=node_id,
+        metrics_encoding=metrics_encoding,
+        metrics_transport=getattr(config, 'metrics_transport', METRICS_TRANSPORT_PUBSUB),
+        stream_maxlen=getattr(config, 'metrics_stream_maxlen', METRICS_STREAM_MAXLEN),
+        namespace=namespace)
+
+
 # =============================================================================
 # 数据类
 # =============================================================================
@@ -163,19 +238,53 @@ class WorkerNode:
         self.active_users = 0  # 活跃用户数
         self.last_update = 0.0  # 最后更新时间（本地缓存）
         self.machine_id = None  # 机器标识符，用于区分不同机器上的Worker
+        self.capacity = 1.0  # Worker 通告的相对负载能力
+        self.saturated = False  # Worker 事件循环是否饱和
+        self.load_factor = 1.0  # 分配系数，每次进入饱和时下调，持续健康后逐级回升
+        self.healthy_since = 0.0  # 最近一次饱和或分配系数回升的时间，用于计算回升间隔
+        self.start_skew = 0.0  # 最近一次协调启动的实际开始时间与计划时刻之差（秒）
 
-    def update_from_heartbeat(self, heartbeat_data: dict) -> None:
+    @property
+    def weight(self) -> float:
+        """分配用户数和速率时使用的权重"""
+        return self.capacity * self.load_factor
+
+    def update_from_heartbeat(self, heartbeat_data: dict) -> bool:
         """
         从心跳数据更新节点状态
 
         参数：
             heartbeat_data: 从 Redis 获取的心跳数据
+
+        返回：
+            bool: 分配系数是否发生变化（调用方据此重新分配负载）
         """
         self.cpu_usage = float(heartbeat_data.get("cpu_percent", 0.0))
         self.active_users = int(heartbeat_data.get("active_users", 0))
         self.machine_id = heartbeat_data.get("machine_id")
         self.last_update = time.time()
 
+        try:
+            capacity = float(heartbeat_data.get("capacity", self.capacity))
+        except (TypeError, ValueError):
+            capacity = self.capacity
+        if capacity > 0:
+            self.capacity = capacity
+
+        # 从未饱和进入饱和时下调分配系数；恢复正常后每持续健康
+        # LOAD_FACTOR_RECOVERY_INTERVAL 秒回升一级，短暂的饱和不会永久缩小份额
+        previous_factor = self.load_factor
+        saturated = str(heartbeat_data.get("saturated", "0")) == "1"
+        if saturated:
+            if not self.saturated:
+                self.load_factor = max(MIN_LOAD_FACTOR, self.load_factor * SATURATION_BACKOFF)
+            self.healthy_since = self.last_update
+        elif self.load_factor < 1.0 and \
+                self.last_update - self.healthy_since >= LOAD_FACTOR_RECOVERY_INTERVAL:
+            self.load_factor = min(1.0, self.load_factor / SATURATION_BACKOFF)
+            self.healthy_since = self.last_update
+        self.saturated = saturated
+
         # 更新状态（如果心跳数据包含状态信息）
         status_str = heartbeat_data.get("status")
         if status_str:
@@ -184,6 +293,8 @@ class WorkerNode:
             except ValueError:
                 pass  # 保持原状态
 
+        return self.load_factor != previous_factor
+
     def is_stale(self, timeout_seconds: float = 10.0) -> bool:
         """
         检查节点是否处于过期状态（用于清理长期失联的Worker）
@@ -280,7 +391,9 @@ class LocalRunner(BaseRunner):
             None,
             batch_size=self.metrics_batch_size,
             flush_interval=self.metrics_flush_interval,
-            buffer_size=self.metrics_buffer_size
+            buffer_size=self.metrics_buffer_size,
+            latency_precision=getattr(
+                self.config, 'latency_precision', DEFAULT_SIGNIFICANT_FIGURES)
         )
 
         # 启动 Prometheus HTTP 服务（使用通用方法）
@@ -314,7 +427,9 @@ class LocalRunner(BaseRunner):
                 self.prometheus_server_started = False
 
             # 停止所有用户
-            await self.user_manager.manage_users(user_count=self.active_user_count, rate=100, action="stop")
+            if self._arrival_executor:
+                await self._arrival_executor.stop()
+            await self.user_manager.stop_all_users()
 
             # 取消所有后台任务（包括监控任务）
             await self.task_manager.cancel_all_tasks()
@@ -329,7 +444,7 @@ class LocalRunner(BaseRunner):
             raise
 
     async def _collect_node_metrics(self):
-        """本地节点指标收集任务（包含CPU收集和指标上报）"""
+        """本地节点指标收集任务（包含资源采样和指标上报）"""
         # 启动CPU收集任务
         cpu_task = asyncio.create_task(
             self._collect_cpu_metrics(),
@@ -341,6 +456,8 @@ class LocalRunner(BaseRunner):
                 if hasattr(
                         self, 'metrics_collector') and self.metrics_collector:
                     node_metrics = {
+                        **self.resource_stats,
+                        **self.get_arrival_stats(),
                         "cpu_percent": self.cpu_usage,
                         "active_users": self.active_user_count,  # LocalRunner直接获取活跃用户数
                         "worker_id": self.node,
@@ -390,11 +507,19 @@ class WorkerRunner(BaseRunner):
         self.node = NODE_TYPE_WORKER
         self.redis_client = redis_client
         self.client_id = str(uuid4())
-        self.coordinator = DistributedCoordinator(
-            redis_client, role=NODE_TYPE_WORKER, node_id=self.client_id)
+        self.coordinator = create_coordinator(
+            config, redis_client, NODE_TYPE_WORKER, node_id=self.client_id,
+            namespace=getattr(config, 'aggregator_group', None))
+        # 相对负载能力（例如实测最大 RPS），Master 按该权重分配用户数和速率
+        self.capacity = getattr(config, 'worker_capacity', 1.0)
+
+    @property
+    def saturated(self) -> bool:
+        """最近一个采样周期的事件循环延迟 p99 是否超过阈值"""
+        return self.resource_stats.get("loop_lag_p99", 0.0) > self.loop_monitor.threshold
 
     async def _collect_worker_metrics(self) -> None:
-        """收集Worker节点的CPU使用率（使用BaseRunner的通用方法）"""
+        """收集Worker节点的CPU等资源使用情况（使用BaseRunner的通用方法）"""
         await self._collect_cpu_metrics()
 
     @property
@@ -412,6 +537,7 @@ class WorkerRunner(BaseRunner):
         self.metrics_batch_size = self.config.metrics_batch_size  # 默认批量大小 100
         self.metrics_flush_interval = self.config.metrics_flush_interval  # 默认刷新间隔 1秒
         self.metrics_buffer_size = self.config.metrics_buffer_size  # 默认缓冲区大小 10000
+        self.metrics_mode = getattr(self.config, 'metrics_mode', METRICS_MODE_RAW)  # 默认逐条上报
 
         # 初始化统一的指标收集器（Worker模式：需要传递redis_client、node_id和coordinator）
         self.metrics_collector = await init_metrics_collector(
@@ -421,7 +547,10 @@ class WorkerRunner(BaseRunner):
             self.coordinator,
             batch_size=self.metrics_batch_size,
             flush_interval=self.metrics_flush_interval,
-            buffer_size=self.metrics_buffer_size
+            buffer_size=self.metrics_buffer_size,
+            metrics_mode=self.metrics_mode,
+            latency_precision=getattr(
+                self.config, 'latency_precision', DEFAULT_SIGNIFICANT_FIGURES)
         )
 
         # 启动命令监听任务
@@ -463,6 +592,8 @@ class WorkerRunner(BaseRunner):
 
             # 停止所有用户
             await self.user_manager.stop_all_users()
+            if self._arrival_executor:
+                await self._arrival_executor.stop()
 
             await self.state_manager.transition_state(RunnerState.READY)
             await self._send_stop()
@@ -479,12 +610,21 @@ class WorkerRunner(BaseRunner):
             try:
                 # 统一使用StateManager的状态，保持一致性
                 heartbeat_data = {
+                    **self.resource_stats,
+                    **self.get_arrival_stats(),
                     "cpu_percent": int(self.cpu_usage),
                     "active_users": int(self.active_user_count),
                     "status": str(self.state_manager.get_current_state()),
                     "worker_id": self.client_id,
-                    "machine_id": self.machine_id
+                    "machine_id": self.machine_id,
+                    "capacity": self.capacity,
+                    "cpu_count": os.cpu_count() or 1,
+                    "saturated": int(self.saturated),
                 }
+                if self.metrics_collector:
+                    heartbeat_data.update(self.metrics_collector.get_buffer_stats())
+                if self.coordinator.metrics_transport == METRICS_TRANSPORT_STREAM:
+                    heartbeat_data["metrics_stream_lag"] = self.coordinator.stream_lag
 
                 # 发送心跳到Redis
                 await self.coordinator.publish("heartbeat", heartbeat_data)
@@ -494,14 +634,31 @@ class WorkerRunner(BaseRunner):
                 await asyncio.sleep(HEARTBEAT_INTERVAL)
 
     async def _send_startup_completed(self):
-        """发送启动完成确认"""
+        """发送启动完成确认（附带实际开始时间相对计划时刻的偏差与时钟同步误差）"""
         await self.coordinator.publish(
             "command",
-            {"user_count": self.active_user_count},
+            {
+                "user_count": self.active_user_count,
+                "start_skew": self.start_skew,
+                "clock_error": self.coordinator.clock_rtt / 2,
+            },
             worker_id=self.client_id,
             command="startup_completed"
         )
 
+    async def _to_loop_time(self, start_at: Optional[float]) -> Optional[float]:
+        """将 Master 下发的计划时刻（Redis 服务器时间）换算为本地事件循环时间"""
+        if start_at is None:
+            return None
+        try:
+            # 时钟偏移随每次心跳更新，尚未发送过心跳时先同步一次
+            if not self.coordinator.clock_synced:
+                await self.coordinator.sync_clock()
+            return self.coordinator.server_to_loop_time(float(start_at))
+        except Exception as e:
+            logger.warning("换算计划启动时刻失败，立即启动: %s", e)
+            return None
+
     async def _send_stop(self):
         """发送停止确认"""
         await self.coordinator.publish("command", {}, worker_id=self.client_id, command="stop")
@@ -524,7 +681,14 @@ class WorkerRunner(BaseRunner):
         if command == "startup":
             user_count = data.get("user_count", 0) if data else 0
             rate = data.get("rate", 1.0) if data else 1.0
-            await self.apply_load(user_count, rate)
+            executor = data.get("executor", EXECUTOR_USERS) if data else EXECUTOR_USERS
+            start_at = await self._to_loop_time(data.get("start_at") if data else None)
+            if user_count <= 0:
+                await self._release_load()
+            elif executor == EXECUTOR_ARRIVAL_RATE:
+                await self.apply_arrival_rate(user_count, rate, start_at=start_at)
+            else:
+                await self.apply_load(user_count, rate, start_at=start_at)
         elif command == "stop":
             await self.stop()
         elif command == "quit":
@@ -536,11 +700,26 @@ class WorkerRunner(BaseRunner):
         else:
             logger.warning("未知命令: %s", command)
 
-    async def apply_load(self, user_count: int, rate: float) -> None:
+    async def _release_load(self) -> None:
+        """
+        Master 按权重分配时本 Worker 的份额为 0：停止正在运行的用户，并照常确认启动
+
+        说明：
+            - 份额为 0 不是参数错误，不经过 validate_load_params / validate_arrival_params 校验
+            - 仍发送启动完成通知，Master 等待全部 Worker 完成启动时不会超时
+        """
+        if self._arrival_executor:
+            await self._arrival_executor.stop()
+        await self.user_manager.stop_all_users()
+        logger.info("Master 分配的份额为 0，本 Worker 暂不运行用户")
+        await self._send_startup_completed()
+
+    async def apply_load(self, user_count: int, rate: float,
+                         start_at: Optional[float] = None) -> None:
         """重写基类方法，添加Worker特定的启动完成通知"""
         try:
             # 调用基类实现
-            await super().apply_load(user_count, rate)
+            await super().apply_load(user_count, rate, start_at=start_at)
 
             # Worker需要发送特定的启动完成通知（补充基类的全局事件）
             await self._send_startup_completed()
@@ -550,6 +729,17 @@ class WorkerRunner(BaseRunner):
             await self._send_startup_completed()
             raise
 
+    async def apply_arrival_rate(self, pool_size: int, rate: float,
+                                 start_at: Optional[float] = None) -> None:
+        """重写基类方法，添加Worker特定的启动完成通知"""
+        try:
+            await super().apply_arrival_rate(pool_size, rate, start_at=start_at)
+            await self._send_startup_completed()
+        except Exception as e:
+            logger.error("Worker启动失败: %s", str(e))
+            await self._send_startup_completed()
+            raise
+
     async def quit(self):
         """Worker退出"""
         if self.state_manager.is_in_quit_state():
@@ -563,10 +753,13 @@ class WorkerRunner(BaseRunner):
         async def stop_tasks():
             try:
                 # 停止所有用户
-                await self.user_manager.manage_users(user_count=self.active_user_count, rate=100, action="stop")
+                if self._arrival_executor:
+                    await self._arrival_executor.stop()
+                await self.user_manager.stop_all_users()
 
                 # 取消所有后台任务
                 await self.task_manager.cancel_all_tasks()
+                await self.coordinator.close()
 
                 logger.info("Worker %s 已成功退出", self.client_id)
             except Exception as e:
@@ -609,14 +802,14 @@ class MasterRunner:
         self.config = config
         self.node = NODE_TYPE_MASTER
         self.redis_client = redis_client
-        self.coordinator = DistributedCoordinator(
-            redis_client, role=NODE_TYPE_MASTER)
+        self.coordinator = create_coordinator(config, redis_client, NODE_TYPE_MASTER)
 
         # 状态管理（使用统一的StateManager）
         self._state_manager = None
 
         # Worker 节点管理（使用Redis作为数据源）
         self.workers: Dict[str, WorkerNode] = {}
+        self._current_load = None  # 最近一次广播的 (用户数, 速率, 执行器)，用于重新分配
 
         # 指标收集
         self.metrics_collector = None
@@ -644,8 +837,13 @@ class MasterRunner:
     def load_shape_manager(self):
         """获取负载形状管理器"""
         if self._load_shape_manager is None and self.load_shape:
+            # 到达率形状按开放负载模型分发到 Worker
+            if isinstance(self.load_shape, ArrivalRateShape):
+                callback = self.apply_arrival_rate
+            else:
+                callback = self.apply_load
             self._load_shape_manager = LoadShapeManager(
-                self.load_shape, self.apply_load)
+                self.load_shape, callback)
         return self._load_shape_manager
 
     async def initialize(self):
@@ -662,16 +860,25 @@ class MasterRunner:
             self.coordinator,
             batch_size=metrics_batch_size,
             flush_interval=metrics_flush_interval,
-            buffer_size=metrics_buffer_size
+            buffer_size=metrics_buffer_size,
+            latency_precision=getattr(
+                self.config, 'latency_precision', DEFAULT_SIGNIFICANT_FIGURES)
         )
 
         # 启动 Prometheus HTTP 服务（使用通用方法）
         self.prometheus_runner, self.prometheus_server_started = await start_prometheus_service(self.config, self)
 
+        # 通告支持的指标编码，失败时 Worker 回退到 JSON 编码
+        try:
+            await self.coordinator.advertise_metrics_encodings()
+        except Exception as e:
+            logger.warning("通告指标编码失败，Worker 将使用 JSON 编码: %s", e)
+
         # 添加后台任务（使用DistributedCoordinator的统一监听器）
         request_listener_task = asyncio.create_task(
             self.coordinator.listen_request_metrics(
-                callback=self._handle_worker_request_metrics),
+                batch_callback=self._handle_worker_request_batch,
+                aggregate_callback=self._handle_worker_request_aggregates),
             name="request_metrics_listener"
         )
 
@@ -699,22 +906,43 @@ class MasterRunner:
             "Master节点初始化完成，ID: %s",
             self.coordinator.node_id)
 
-    async def _handle_worker_request_metrics(
-            self, metrics_data: dict, worker_id: str):
+    async def _handle_worker_request_batch(
+            self, batch: list, worker_id: str):
         """
-        处理Worker上报的请求数据
+        处理Worker上报的一批请求数据，整批写入指标收集器
 
         参数：
-            metrics_data: 请求数据
+            batch: 请求数据字典列表，或二进制消息解码得到的 MetricsBatch
             worker_id: Worker节点ID
         """
-        # 触发worker_request_metrics事件
-        await worker_request_metrics.fire(
-            data=metrics_data,
-            worker_id=worker_id,
-            node_type=self.node,
-            runner=self
-        )
+        if self.metrics_collector:
+            self.metrics_collector.ingest_worker_batch(batch)
+
+        # 仅在用户注册了处理器时逐条触发worker_request_metrics事件
+        if worker_request_metrics.has_handlers:
+            if isinstance(batch, MetricsBatch):
+                batch = batch.to_records()
+            for metrics_data in batch:
+                await worker_request_metrics.fire(
+                    data=metrics_data,
+                    worker_id=worker_id,
+                    node_type=self.node,
+                    runner=self
+                )
+
+    async def _handle_worker_request_aggregates(
+            self, aggregates: list, worker_id: str):
+        """
+        处理Worker上报的区间聚合数据，直接合并到Prometheus指标
+
+        参数：
+            aggregates: 聚合记录列表
+            worker_id: Worker节点ID
+        """
+        if self.metrics_collector:
+            self.metrics_collector.merge_aggregates(aggregates)
+        logger.debug(
+            "已合并来自 %s 的 %d 条聚合指标", worker_id, len(aggregates))
 
     async def _handle_command(self, data: dict, worker_id: str, command: str):
         """Master节点的统一命令处理器"""
@@ -723,8 +951,13 @@ class MasterRunner:
                 self._startup_completion_tracker["completed_workers"].add(
                     worker_id)
                 user_count = data.get("user_count", 0) if data else 0
+                start_skew = float(data.get("start_skew", 0.0)) if data else 0.0
+                if worker_id in self.workers:
+                    self.workers[worker_id].start_skew = start_skew
                 logger.info(
-                    "Worker %s 已完成启动，用户数: %d", worker_id, user_count)
+                    "Worker %s 已完成启动，用户数: %d，启动偏差: %.1f ms（时钟误差 ±%.1f ms）",
+                    worker_id, user_count, start_skew * 1000,
+                    float(data.get("clock_error", 0.0) if data else 0.0) * 1000)
         elif command == "stop":
             logger.info("Worker %s 已完成停止操作", worker_id)
 
@@ -750,6 +983,22 @@ class MasterRunner:
 
     async def apply_load(self, user_count: int, rate: float) -> None:
         """应用负载配置：从load_shape接收用户数和速率后执行"""
+        await self._apply_distributed_load(user_count, rate, EXECUTOR_USERS)
+
+    async def apply_arrival_rate(self, pool_size: int, rate: float) -> None:
+        """应用到达率负载配置：将用户池大小和到达率分配到各 Worker"""
+        await self._apply_distributed_load(pool_size, rate, EXECUTOR_ARRIVAL_RATE)
+
+    async def _apply_distributed_load(
+            self, user_count: int, rate: float, executor: str) -> None:
+        """
+        广播负载配置并在首次启动时等待 Worker 完成启动
+
+        参数：
+            user_count: 用户数（到达率模式下为用户池大小）
+            rate: 启动速率（到达率模式下为每秒迭代次数）
+            executor: 负载执行器类型
+        """
         current_state = self.state_manager.get_current_state()
 
         # 如果是从READY状态启动,需要先转换状态
@@ -768,7 +1017,7 @@ class MasterRunner:
                 }
 
                 # 广播启动命令到所有 Worker
-                await self._broadcast_startup(user_count, rate)
+                await self._broadcast_startup(user_count, rate, executor)
 
                 # 等待所有Worker启动完成(设置超时)
                 await self._wait_for_workers_startup_completion()
@@ -780,7 +1029,7 @@ class MasterRunner:
                 logger.info(
                     "调整负载: %d 个用户，速率: %.1f/s",
                     user_count, rate)
-                await self._broadcast_startup(user_count, rate)
+                await self._broadcast_startup(user_count, rate, executor)
 
         except Exception as e:
             # 获取当前实际状态
@@ -910,6 +1159,7 @@ class MasterRunner:
         if self.background_tasks:
             await asyncio.gather(*self.background_tasks, return_exceptions=True)
             self.background_tasks.clear()
+        await self.coordinator.close()
 
         logger.info("Master运行器已成功退出")
 
@@ -943,58 +1193,150 @@ class MasterRunner:
             logger.warning("发送恢复命令到Worker失败: %s", e)
         logger.info("测试已恢复")
 
-    def _distribute_resources(self, total_value: int,
-                              total_workers: int) -> List[int]:
+    def _distribute_resources(self, total_value: int, total_workers: int,
+                              weights: Optional[Sequence[float]] = None) -> List[int]:
         """
-        将总资源均匀分配给所有 Worker 节点
+        将总资源按权重分配给所有 Worker 节点
 
         参数：
-            total_value: 总资源值（用户数或速率）
+            total_value: 总资源值（用户数）
             total_workers: Worker 节点总数
+            weights: 每个 Worker 的权重，None 表示均匀分配
 
         返回：
-            List[int]: 每个 Worker 分配的资源值列表
+            List[int]: 每个 Worker 分配的资源值列表，总和等于 total_value
         """
         if total_workers == 0:
             return []
+        if not weights:
+            weights = [1.0] * total_workers
+
+        # 按权重计算精确份额，向下取整后剩余资源按小数部分从大到小分配
+        total_weight = sum(weights)
+        quotas = [total_value * weight / total_weight for weight in weights]
+        distribution = [int(quota) for quota in quotas]
+        remainder = total_value - sum(distribution)
+        order = sorted(range(total_workers),
+                       key=lambda i: quotas[i] - distribution[i], reverse=True)
+        for i in order[:remainder]:
+            distribution[i] += 1
+
+        return distribution
 
-        # 基础分配值
-        base_value = total_value // total_workers
-        # 剩余资源
-        remainder = total_value % total_workers
+    def _distribute_rate(self, rate: float, weights: Sequence[float],
+                         caps: Optional[Sequence[float]] = None) -> List[float]:
+        """
+        将速率按权重精确分配给所有 Worker 节点（不取整，小数速率不会丢失）
 
-        distribution = []
-        for i in range(total_workers):
-            # 基础分配 + 前几个Worker各分配1单位剩余资源
-            assigned_value = base_value + (1 if i < remainder else 0)
-            distribution.append(assigned_value)
+        参数：
+            rate: 总速率（启动速率或每秒迭代次数）
+            weights: 每个 Worker 的权重
+            caps: 每个 Worker 可分配速率的上限，None 表示不限；
+                  超出上限的部分按权重转给仍有余量的 Worker
 
+        返回：
+            List[float]: 每个 Worker 分配的速率列表
+        """
+        if caps is None:
+            total_weight = sum(weights)
+            return [rate * weight / total_weight for weight in weights]
+
+        distribution = [0.0] * len(weights)
+        open_workers = [i for i, cap in enumerate(caps) if cap > 0]
+        remaining = rate
+        while open_workers and remaining > 0:
+            total_weight = sum(weights[i] for i in open_workers)
+            capped = [i for i in open_workers
+                      if distribution[i] + remaining * weights[i] / total_weight >= caps[i]]
+            if not capped:
+                for i in open_workers:
+                    distribution[i] += remaining * weights[i] / total_weight
+                break
+            # 达到上限的 Worker 取满上限，剩余速率在其余 Worker 之间重新按权重分配
+            for i in capped:
+                remaining -= caps[i] - distribution[i]
+                distribution[i] = float(caps[i])
+            open_workers = [i for i in open_workers if i not in capped]
         return distribution
 
-    async def _broadcast_startup(self, user_count: int, rate: float) -> None:
-        """广播启动命令到所有 Worker 节点"""
+    async def _broadcast_startup(self, user_count: int, rate: float,
+                                 executor: str = EXECUTOR_USERS,
+                                 start_at: Optional[float] = None) -> None:
+        """
+        广播启动命令到所有 Worker 节点，按 Worker 的负载能力加权分配
+
+        参数：
+            user_count: 用户数（到达率模式下为用户池大小）
+            rate: 启动速率（到达率模式下为每秒迭代次数）
+            executor: 负载执行器类型
+            start_at: 计划开始时刻（Redis 服务器时间），None 表示由本节点重新计算
+        """
         if not self.workers:
             raise RunnerError("No ready workers available")
 
-        total_workers = len(self.workers)
+        worker_ids = sorted(self.workers.keys())
+        weights = [self.workers[worker_id].weight for worker_id in worker_ids]
 
         # 计算分配方案
         user_distribution = self._distribute_resources(
-            user_count, total_workers)
-        rate_distribution = self._distribute_resources(
-            int(rate), total_workers)
+            user_count, len(worker_ids), weights)
+        if executor == EXECUTOR_USERS:
+            # Worker 的启动速率不能超过分到的用户数（Worker 端按 validate_load_params 校验）
+            caps = user_distribution
+        else:
+            # 用户池为 0 的 Worker 无法执行迭代，其到达率转给其他 Worker
+            caps = [float("inf") if size > 0 else 0.0 for size in user_distribution]
+        rate_distribution = self._distribute_rate(rate, weights, caps)
+        self._current_load = (user_count, rate, executor)
+        if start_at is None:
+            start_at = await self._schedule_start(len(worker_ids))
 
         # 为每个 Worker 发送启动命令
-        worker_ids = sorted(self.workers.keys())
         for i, worker_id in enumerate(worker_ids):
             startup_data = {
                 "user_count": user_distribution[i],
                 "rate": rate_distribution[i]
             }
+            if executor != EXECUTOR_USERS:
+                startup_data["executor"] = executor
+            if start_at is not None:
+                # 各 Worker 的时间表错开 i/n 个间隔，合并后的启动节奏保持均匀
+                phase = i / (len(worker_ids) * rate_distribution[i]) if rate_distribution[i] > 0 else 0.0
+                startup_data["start_at"] = start_at + phase
 
             # 发送给指定的 Worker
             await self.coordinator.publish("command", startup_data, worker_id=worker_id, command="startup")
 
+    async def _schedule_start(self, total_workers: int) -> Optional[float]:
+        """
+        计算各 Worker 共同的计划开始时刻（Redis 服务器时间）
+
+        提前量需覆盖逐个发送启动命令的耗时，保证所有 Worker 在计划时刻之前收到命令。
+
+        参数：
+            total_workers: Worker 数量
+
+        返回：
+            float: 计划开始时刻；无法获取服务器时间时返回 None，Worker 收到命令后立即启动
+        """
+        try:
+            await self.coordinator.sync_clock()
+        except Exception as e:
+            logger.warning("获取 Redis 服务器时间失败，Worker 将在收到命令后立即启动: %s", e)
+            return None
+        return self.coordinator.server_time() + STARTUP_LEAD_TIME + \
+            total_workers * STARTUP_LEAD_PER_WORKER
+
+    async def _rebalance_load(self) -> None:
+        """按最新的 Worker 权重重新分配当前负载（仅在运行中生效）"""
+        if self._current_load is None or \
+                self.state_manager.get_current_state() != RunnerState.RUNNING:
+            return
+        try:
+            await self._broadcast_startup(*self._current_load)
+        except Exception as e:
+            logger.error("重新分配负载失败: %s", str(e))
+
     async def _update_worker_status(
             self, heartbeat_data: dict, worker_id: str):
         """
@@ -1012,7 +1354,19 @@ class MasterRunner:
 
         # 更新本地Worker状态缓存
         worker = self.workers[worker_id]
-        worker.update_from_heartbeat(heartbeat_data)
+        was_saturated = worker.saturated
+        factor_changed = worker.update_from_heartbeat(heartbeat_data)
+
+        # Worker 进入饱和后下调其权重，并将多出的负载转移给其他 Worker；
+        # 恢复正常后权重逐级回升，负载随之移回
+        if worker.saturated and not was_saturated:
+            logger.warning("Worker %s 已饱和，分配系数下调为 %.2f",
+                           worker_id, worker.load_factor)
+        elif factor_changed:
+            logger.info("Worker %s 持续健康，分配系数回升为 %.2f",
+                        worker_id, worker.load_factor)
+        if factor_changed:
+            await self._rebalance_load()
 
         # 记录Worker指标到Prometheus
         if self.metrics_collector:
@@ -1024,36 +1378,36 @@ class MasterRunner:
 
         逻辑：
         1. 检查节点状态是否健康（READY/RUNNING/STARTING/STOPPING）
-        2. 通过 DistributedCoordinator 检查节点心跳状态
+        2. 通过 DistributedCoordinator 批量检查节点心跳状态（一次往返）
         3. 清理长期失联的Worker（避免内存泄漏）
         """
         healthy_workers = []
         workers_to_remove = []
 
+        try:
+            # 通过 Redis 检查实际心跳状态
+            liveness = await self.coordinator.check_workers_heartbeat(self.workers)
+        except Exception as e:
+            logger.warning("批量检查 Worker 心跳失败: %s", e)
+            return healthy_workers
+
         for node_id, worker in list(self.workers.items()):
-            try:
-                # 通过 Redis 检查实际心跳状态
-                is_alive = await self.coordinator.check_worker_heartbeat(node_id)
-
-                if is_alive:
-                    # 节点存活，检查状态是否健康
-                    if worker.status in [
-                            RunnerState.READY, RunnerState.RUNNING, RunnerState.STARTING, RunnerState.STOPPING]:
-                        healthy_workers.append(worker)
+            if liveness.get(node_id, False):
+                # 节点存活，检查状态是否健康
+                if worker.status in [
+                        RunnerState.READY, RunnerState.RUNNING, RunnerState.STARTING, RunnerState.STOPPING]:
+                    healthy_workers.append(worker)
+            else:
+                # 节点失联，处理状态和清理
+                if worker.status != RunnerState.MISSING:
+                    worker.status = RunnerState.MISSING
+                    logger.warning("Worker %s 被标记为丢失", node_id)
                 else:
-                    # 节点失联，处理状态和清理
-                    if worker.status != RunnerState.MISSING:
-                        worker.status = RunnerState.MISSING
-                        logger.warning("Worker %s 被标记为丢失", node_id)
-                    else:
-                        # 已经是丢失状态，检查是否需要移除
-                        if worker.is_stale(60.0):  # 给Worker恢复机会
-                            workers_to_remove.append(node_id)
-                            logger.warning(
-                                "Worker %s 超时后将被移除", node_id)
-
-            except Exception as e:
-                logger.warning("检查 %s 的心跳失败: %s", node_id, e)
+                    # 已经是丢失状态，检查是否需要移除
+                    if worker.is_stale(60.0):  # 给Worker恢复机会
+                        workers_to_remove.append(node_id)
+                        logger.warning(
+                            "Worker %s 超时后将被移除", node_id)
 
         # 清理超时的死亡worker
         for node_id in workers_to_remove:
@@ -1061,3 +1415,297 @@ class MasterRunner:
             logger.info("Worker %s 超时后已被移除", node_id)
 
         return healthy_workers
+
+
+# =============================================================================
+# 运行器类 - 分布式聚合节点
+# =============================================================================
+
+class AggregatorRunner(MasterRunner):
+    """
+    聚合节点运行器（分层聚合）
+
+    职责：
+    - 对同组 Worker 扮演 Master：分配负载、转发命令、接收指标与心跳
+    - 对上游 Master 扮演 Worker：上报汇总心跳和合并后的区间聚合指标
+
+    组内 Worker 通过 aggregator_group 使用独立的命名空间，上游 Master 只处理各聚合节点的
+    汇总数据，Worker 数量增加时 Master 的 CPU 与网络开销与聚合节点数量成正比。
+    """
+
+    def __init__(self, user_types, load_shape, config, redis_client):
+        """
+        初始化聚合节点运行器
+
+        参数：
+            user_types: 用户类列表
+            load_shape: 负载形状类（聚合节点不使用，负载由上游 Master 下发）
+            config: 配置选项，必须包含 aggregator_group
+            redis_client: Redis 客户端（必需）
+
+        异常：
+            ValueError: 未指定 aggregator_group 或未使用 Redis 协调后端时抛出
+        """
+        group = getattr(config, 'aggregator_group', None)
+        if not group:
+            raise ValueError("聚合节点需要指定分组 (--aggregator-group)")
+        if getattr(config, 'coordinator', COORDINATOR_REDIS) != COORDINATOR_REDIS:
+            raise ValueError("聚合节点仅支持 Redis 协调后端")
+
+        super().__init__(user_types, None, config, redis_client)
+        self.node = NODE_TYPE_AGGREGATOR
+        self.group = group
+        self.client_id = f"aggregator_{group}"
+
+        # 下游：以 Master 身份管理组内 Worker
+        self.coordinator = create_coordinator(
+            config, redis_client, NODE_TYPE_MASTER, node_id=self.client_id, namespace=group)
+        # 上游：以 Worker 身份连接 Master
+        self.upstream = create_coordinator(
+            config, redis_client, NODE_TYPE_WORKER, node_id=self.client_id)
+
+        # 组内 Worker 的请求数据统一折叠为区间聚合记录后转发
+        self._aggregator = RequestAggregator(getattr(
+            config, 'latency_precision', DEFAULT_SIGNIFICANT_FIGURES))
+        self.flush_interval = getattr(config, 'metrics_flush_interval', 1.0)
+        self._stop_completion_tracker = None
+
+    async def initialize(self):
+        """初始化聚合节点：监听组内 Worker 的指标、命令和心跳，以及上游 Master 的命令"""
+        # 通告支持的指标编码，失败时组内 Worker 回退到 JSON 编码
+        try:
+            await self.coordinator.advertise_metrics_encodings()
+        except Exception as e:
+            logger.warning("通告指标编码失败，Worker 将使用 JSON 编码: %s", e)
+
+        self.background_tasks.extend([
+            asyncio.create_task(
+                self.coordinator.listen_request_metrics(
+                    batch_callback=self._handle_worker_request_batch,
+                    aggregate_callback=self._handle_worker_request_aggregates),
+                name="request_metrics_listener"),
+            asyncio.create_task(
+                self.coordinator.listen_commands(self._handle_command),
+                name="command_listener"),
+            asyncio.create_task(
+                self.coordinator.listen_heartbeats(
+                    callback=self._update_worker_status),
+                name="node_status_listener"),
+            asyncio.create_task(
+                self.upstream.listen_commands(self._handle_upstream_command),
+                name="upstream_command_listener"),
+            asyncio.create_task(
+                self._send_heartbeat(),
+                name="aggregator_heartbeat_sender"),
+            asyncio.create_task(
+                self._forward_aggregates(),
+                name="aggregate_forwarder"),
+        ])
+
+        logger.info("聚合节点初始化完成，ID: %s，分组: %s", self.client_id, self.group)
+
+    async def _handle_worker_request_batch(
+            self, batch: list, worker_id: str):
+        """
+        折叠组内 Worker 上报的原始请求数据
+
+        参数：
+            batch: 请求数据字典列表，或二进制消息解码得到的 MetricsBatch
+            worker_id: Worker节点ID
+        """
+        self._aggregator.add_batch(batch)
+
+    async def _handle_worker_request_aggregates(
+            self, aggregates: list, worker_id: str):
+        """
+        合并组内 Worker 上报的区间聚合数据
+
+        参数：
+            aggregates: 聚合记录列表
+            worker_id: Worker节点ID
+        """
+        self._aggregator.merge(aggregates)
+
+    async def _forward_aggregates(self) -> None:
+        """按刷新间隔将合并后的聚合数据转发给上游 Master"""
+        while not self.state_manager.is_in_quit_state():
+            await asyncio.sleep(self.flush_interval)
+            await self._flush_aggregates()
+
+    async def _flush_aggregates(self) -> None:
+        """发送当前区间的聚合记录，失败时合并回聚合器等待下次发送"""
+        aggregates = self._aggregator.drain()
+        if not aggregates:
+            return
+
+        try:
+            await self.upstream.publish(
+                "request_aggregates", aggregates, worker_id=self.client_id)
+        except Exception as e:
+            logger.warning("转发指标聚合数据失败: %s", e)
+            self._aggregator.merge(aggregates)
+
+    def _rollup_heartbeat(self, workers: List[WorkerNode]) -> dict:
+        """
+        汇总组内健康 Worker 的心跳数据
+
+        参数：
+            workers: 健康的 Worker 节点列表
+
+        返回：
+            dict: 上报给上游 Master 的心跳数据，capacity 为组内 Worker 权重之和，
+                  仅当组内 Worker 全部饱和时才报告饱和
+        """
+        return {
+            "cpu_percent": int(sum(worker.cpu_usage for worker in workers) / len(workers)) if workers else 0,
+            "active_users": sum(worker.active_users for worker in workers),
+            "status": str(self.state_manager.get_current_state()),
+            "worker_id": self.client_id,
+            "capacity": sum(worker.weight for worker in workers),
+            "workers": len(workers),
+            "saturated": int(bool(workers) and all(worker.saturated for worker in workers)),
+        }
+
+    async def _send_heartbeat(self) -> None:
+        """向上游 Master 发送汇总心跳"""
+        while not self.state_manager.is_in_quit_state():
+            try:
+                workers = await self.get_healthy_workers()
+                await self.upstream.publish("heartbeat", self._rollup_heartbeat(workers))
+            except Exception as e:
+                logger.error("心跳发送错误: %s", str(e))
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+
+    async def _handle_upstream_command(self, data: dict, worker_id: str, command: str):
+        """上游 Master 的命令处理器，转发给组内 Worker"""
+        if command == "startup":
+            await self._relay_startup(data or {})
+        elif command == "stop":
+            await self.stop()
+        elif command == "quit":
+            await self.quit()
+        elif command == "pause":
+            await self.pause()
+        elif command == "resume":
+            await self.resume()
+        else:
+            logger.warning("未知命令: %s", command)
+
+    async def _relay_startup(self, data: dict) -> None:
+        """
+        将上游分配的负载按组内 Worker 的权重继续分配，首次启动时等待全部完成后向上游确认
+
+        上游下发的计划开始时刻同样是 Redis 服务器时间，原样传给组内 Worker。
+
+        参数：
+            data: 上游启动命令数据（user_count、rate、executor、start_at）
+        """
+        user_count = data.get("user_count", 0)
+        rate = data.get("rate", 1.0)
+        executor = data.get("executor", EXECUTOR_USERS)
+        start_at = data.get("start_at")
+        current_state = self.state_manager.get_current_state()
+        first_start = current_state in [RunnerState.READY, RunnerState.STARTING]
+
+        try:
+            if current_state == RunnerState.READY:
+                await self.state_manager.transition_state(RunnerState.STARTING)
+            if first_start:
+                self._startup_completion_tracker = {
+                    "expected_workers": len(self.workers),
+                    "completed_workers": set(),
+                    "startup_data": {"user_count": user_count, "rate": rate}
+                }
+            await self._broadcast_startup(
+                user_count, rate, executor,
+                start_at=float(start_at) if start_at is not None else None)
+            if first_start:
+                await self._wait_for_workers_startup_completion()
+                await self.state_manager.transition_state(RunnerState.RUNNING)
+        except Exception as e:
+            # 失败时也要确认，避免上游 Master 等待超时
+            logger.error("聚合节点分配负载失败: %s", str(e))
+
+        await self._send_startup_completed(user_count)
+
+    async def _send_startup_completed(self, user_count: int) -> None:
+        """向上游发送启动完成确认，启动偏差取组内偏差绝对值最大的 Worker"""
+        start_skew = max((worker.start_skew for worker in self.workers.values()),
+                         key=abs, default=0.0)
+        await self.upstream.publish(
+            "command",
+            {"user_count": user_count, "start_skew": start_skew},
+            worker_id=self.client_id,
+            command="startup_completed"
+        )
+
+    async def _handle_command(self, data: dict, worker_id: str, command: str):
+        """组内 Worker 的命令处理器，全部 Worker 停止后向上游确认"""
+        if command != "stop":
+            await super()._handle_command(data, worker_id, command)
+            return
+
+        logger.info("Worker %s 已完成停止操作", worker_id)
+        tracker = self._stop_completion_tracker
+        if tracker is None:
+            return
+        tracker["stopped_workers"].add(worker_id)
+        if len(tracker["stopped_workers"]) >= tracker["total_workers"]:
+            await self._stop_completed()
+
+    async def stop(self) -> None:
+        """停止组内 Worker，全部确认后向上游确认"""
+        if not self.state_manager.can_stop():
+            return
+
+        await self.state_manager.transition_state(RunnerState.STOPPING)
+        try:
+            healthy_workers = await self.get_healthy_workers()
+            self._stop_completion_tracker = {
+                "stopped_workers": set(),
+                "total_workers": len(healthy_workers)
+            }
+            if not healthy_workers:
+                await self._stop_completed()
+                return
+
+            await self.coordinator.publish("command", {}, command="stop")
+            logger.info("已发送停止命令到 %d 个 Worker", len(healthy_workers))
+        except Exception as e:
+            logger.error("聚合节点停止失败: %s", str(e))
+            await self._stop_completed()
+
+    async def _stop_completed(self) -> None:
+        """组内 Worker 全部停止：发送剩余聚合数据并向上游确认"""
+        self._stop_completion_tracker = None
+        await self.state_manager.transition_state(RunnerState.READY)
+        await self._flush_aggregates()
+        await self.upstream.publish("command", {}, worker_id=self.client_id, command="stop")
+        logger.info("聚合节点 %s 所辖 Worker 已全部停止", self.client_id)
+
+    async def quit(self):
+        """通知组内 Worker 退出，转发最后一批聚合数据后退出"""
+        if self.state_manager.is_in_quit_state():
+            return
+
+        try:
+            await self.coordinator.publish("command", {}, command="quit")
+        except Exception as e:
+            logger.warning("发送退出命令到Worker失败: %s", e)
+
+        self.state_manager.set_quit_state()
+        await self.state_manager.transition_state(RunnerState.QUITTING)
+
+        async def stop_tasks():
+            # 等待组内 Worker 发送最后一批指标，转发后再取消后台任务
+            await asyncio.sleep(self.flush_interval)
+            await self._flush_aggregates()
+            for task in self.background_tasks:
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(*self.background_tasks, return_exceptions=True)
+            self.background_tasks.clear()
+            logger.info("聚合节点 %s 已成功退出", self.client_id)
+
+        # 由上游命令监听任务调用时不能等待自身被取消，在新任务中完成退出
+        asyncio.create_task(stop_tasks())
@@ -113,3 +113,35 @@ class LoadUserShape(metaclass=ABCMeta):
             - 通常用于动态调整负载测试的用户数量和速率。
         """
         return None
+
+
+class ArrivalRateShape(LoadUserShape):
+    """
+    开放负载模型（固定到达率）的形状控制基类。
+
+    功能：
+        - 与 LoadUserShape 的封闭模型不同，吞吐量不再受响应时间影响：
+          每秒按计划派发固定数量的场景迭代，被测服务变慢时负载不会随之下降。
+        - 迭代由预分配的用户池执行，池中没有空闲用户时该次迭代记为丢弃。
+
+    示例：
+        class FixedRateShape(ArrivalRateShape):
+            def tick(self):
+                if self.get_run_time() > 300:
+                    return None
+                return (200, 50.0)  # 用户池200个，每秒50次迭代
+    """
+
+    @abstractmethod
+    def tick(self) -> Optional[Tuple[int, float]]:
+        """
+        获取当前时刻的到达率控制参数。
+
+        返回：
+            Optional[Tuple[int, float]]:
+                - 当返回一个元组 (max_users, arrival_rate) 时：
+                    * max_users (int): 预分配用户池大小，即最大并发迭代数。
+                    * arrival_rate (float): 每秒派发的场景迭代次数。
+                - 当返回 None 时：停止当前的负载测试。
+        """
+        return None
@@ -0,0 +1,608 @@
+# encoding: utf-8
+"""
+基于 asyncio 流的 Master/Worker 直连协调后端
+
+单机多进程或局域网内运行时无需部署 Redis：Master 监听 TCP 端口，Worker 主动连接。
+接口与 DistributedCoordinator 一致（publish / listen_commands / listen_heartbeats /
+listen_request_metrics / check_workers_heartbeat / 时钟同步），运行器无需区分后端。
+
+帧格式：``<uint32 长度><uint8 类型><正文>``（网络字节序），长度为类型与正文的字节数：
+
+    - HELLO：Worker 控制连接的第一帧，正文为节点 ID
+    - COMMAND / HEARTBEAT：JSON 正文，与 Redis 后端的命令消息、心跳数据相同
+    - METRICS_HELLO：Worker 指标连接的第一帧，正文为节点 ID
+    - METRICS：与 Redis 指标频道相同的消息（JSON 或二进制编码的原始批次、区间聚合记录）
+    - TIME_REQUEST / TIME_REPLY：时钟同步，以 Master 的本地时间为准
+
+每个 Worker 使用两个连接：控制连接传输命令、心跳与时钟同步，指标连接只传输指标。
+Master 指标队列已满时只暂停读取指标连接，由 TCP 流量控制把背压传回 Worker，
+心跳与命令确认不受影响；控制连接断开的 Worker 立即视为失联，不必等待心跳超时。
+
+使用示例：
+    master = TcpCoordinator("0.0.0.0", 5557, role="master")
+    await master.start()
+    worker = TcpCoordinator("127.0.0.1", 5557, role="worker", node_id="worker_1")
+    await worker.publish("heartbeat", {"cpu_percent": 45.0})
+"""
+
+import asyncio
+import json
+import struct
+import time
+from collections import deque
+from typing import Deque, Dict, Iterable, Optional, Set, Tuple
+
+from aiotest.distributed_coordinator import (
+    COORDINATOR_TCP,
+    HEARTBEAT_INTERVAL,
+    HEARTBEAT_LIVENESS,
+    dispatch_metrics_message,
+    send_metrics_chunks,
+)
+from aiotest.logger import logger
+from aiotest.metrics_codec import WIRE_BINARY, encode_metrics_batch
+
+# 帧类型
+FRAME_HELLO = 1
+FRAME_COMMAND = 2
+FRAME_HEARTBEAT = 3
+FRAME_METRICS = 4
+FRAME_TIME_REQUEST = 5
+FRAME_TIME_REPLY = 6
+FRAME_METRICS_HELLO = 7
+
+DEFAULT_MASTER_PORT = 5557
+MAX_FRAME_SIZE = 64 * 1024 * 1024  # 单帧上限，防止异常长度耗尽内存
+METRICS_QUEUE_SIZE = 1000          # Master 待处理的指标消息上限，超过后暂停读取指标连接
+TIME_SYNC_TIMEOUT = 5.0            # 时钟同步等待 Master 回复的超时时间(秒)
+
+_HEADER = struct.Struct('!IB')
+_TIMESTAMP = struct.Struct('!d')
+
+
+def encode_frame(frame_type: int, payload: bytes = b"") -> bytes:
+    """
+    编码一帧
+
+    参数：
+        frame_type: 帧类型
+        payload: 帧正文
+
+    返回：
+        bytes: 带长度前缀的帧
+    """
+    return _HEADER.pack(len(payload) + 1, frame_type) + payload
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Tuple[int, bytes]:
+    """
+    读取一帧
+
+    参数：
+        reader: 连接的读取端
+
+    返回：
+        Tuple[int, bytes]: 帧类型与正文
+
+    异常：
+        asyncio.IncompleteReadError: 连接在帧中途关闭
+        ValueError: 帧长度无效
+    """
+    length, frame_type = _HEADER.unpack(await reader.readexactly(_HEADER.size))
+    if length < 1 or length > MAX_FRAME_SIZE:
+        raise ValueError(f"无效的帧长度: {length}")
+    return frame_type, await reader.readexactly(length - 1)
+
+
+class TcpCoordinator:
+    """
+    TCP 直连协调器，Master 监听端口，Worker 连接 Master。
+
+    功能：
+    1. 统一发布系统：Master 发布命令，Worker 发布命令确认、心跳和指标
+    2. 监听系统：监听命令、请求指标和心跳数据
+    3. 心跳检查：按最近一次心跳时间和连接状态判断 Worker 是否存活
+    4. 时钟同步：Worker 测量与 Master 本地时间的偏移
+
+    示例：
+        >>> master = TcpCoordinator("0.0.0.0", 5557, role="master")
+        >>> task = asyncio.create_task(master.listen_commands(handle_command))
+        >>> worker = TcpCoordinator("127.0.0.1", 5557, role="worker", node_id="worker_1")
+        >>> await worker.publish("command", {}, worker_id="worker_1", command="stop")
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = DEFAULT_MASTER_PORT,
+                 role: str = "master", node_id: str = None,
+                 metrics_encoding: str = WIRE_BINARY):
+        """
+        初始化 TCP 协调器。
+
+        参数：
+            host: Master 监听地址（Master）或 Master 的地址（Worker）
+            port: Master 端口，Master 使用 0 时由系统分配，启动后更新为实际端口
+            role: 节点角色，可选值为 "master" 或 "worker"
+            node_id: 节点 ID，默认自动生成
+            metrics_encoding: Worker 原始指标编码（json/binary），Master 总是同时支持两种编码
+        """
+        if role not in ("master", "worker"):
+            raise ValueError("无效的角色。必须是 'master' 或 'worker'。")
+        self.host = host
+        self.port = port
+        self.role = role
+        self.node_id = node_id or f"{role}_{id(self)}"
+        self.metrics_encoding = metrics_encoding
+        self.metrics_transport = COORDINATOR_TCP
+        self.stream_lag = 0  # 与 Redis Stream 传输的接口保持一致，TCP 由流量控制提供背压
+
+        # Master 的时间即为基准时间
+        self._clock_offset = 0.0 if role == "master" else None
+        self.clock_rtt = 0.0
+
+        self._commands: asyncio.Queue = asyncio.Queue()
+        # Master 端
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._start_lock = asyncio.Lock()
+        self._connections: Dict[str, asyncio.StreamWriter] = {}
+        self._metrics_connections: Set[asyncio.StreamWriter] = set()
+        self._last_seen: Dict[str, float] = {}  # Worker 最近一次心跳的事件循环时间
+        self._heartbeats: asyncio.Queue = asyncio.Queue()
+        self._metrics: asyncio.Queue = asyncio.Queue(maxsize=METRICS_QUEUE_SIZE)
+        # Worker 端
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._metrics_writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._connect_lock = asyncio.Lock()
+        self._time_requests: Deque[asyncio.Future] = deque()
+
+    # ------------------------------------------------------------------
+    # 连接管理
+    # ------------------------------------------------------------------
+
+    async def start(self) -> None:
+        """Master 开始监听 Worker 连接（重复调用无副作用）"""
+        async with self._start_lock:
+            if self._server is not None:
+                return
+            self._server = await asyncio.start_server(
+                self._handle_connection, self.host, self.port)
+            self.port = self._server.sockets[0].getsockname()[1]
+            logger.info("Master 开始在 %s:%d 上监听 Worker 连接", self.host, self.port)
+
+    async def close(self) -> None:
+        """关闭监听端口与全部连接"""
+        if self._server is not None:
+            self._server.close()
+            for writer in [*self._connections.values(), *self._metrics_connections]:
+                writer.close()
+            self._connections.clear()
+            self._metrics_connections.clear()
+            await self._server.wait_closed()
+            self._server = None
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            await asyncio.gather(self._reader_task, return_exceptions=True)
+            self._reader_task = None
+        if self._writer is not None:
+            self._disconnect(self._writer)
+        if self._metrics_writer is not None:
+            self._metrics_writer.close()
+            self._metrics_writer = None
+
+    async def _connect(self) -> asyncio.StreamWriter:
+        """Worker 建立与 Master 的控制连接并发送 HELLO，已连接时直接返回"""
+        async with self._connect_lock:
+            if self._writer is not None and not self._writer.is_closing():
+                return self._writer
+            reader, writer = await asyncio.open_connection(self.host, self.port)
+            writer.write(encode_frame(FRAME_HELLO, self.node_id.encode('utf-8')))
+            await writer.drain()
+            self._writer = writer
+            self._reader_task = asyncio.create_task(
+                self._read_from_master(reader, writer), name="tcp_coordinator_reader")
+            logger.info("已连接到 Master %s:%d", self.host, self.port)
+            return writer
+
+    async def _connect_metrics(self) -> asyncio.StreamWriter:
+        """Worker 建立与 Master 的指标连接并发送 METRICS_HELLO，已连接时直接返回"""
+        async with self._connect_lock:
+            if self._metrics_writer is not None and not self._metrics_writer.is_closing():
+                return self._metrics_writer
+            _, writer = await asyncio.open_connection(self.host, self.port)
+            writer.write(encode_frame(FRAME_METRICS_HELLO, self.node_id.encode('utf-8')))
+            await writer.drain()
+            self._metrics_writer = writer
+            return writer
+
+    def _disconnect(self, writer: asyncio.StreamWriter) -> None:
+        """关闭与 Master 的连接，未完成的时钟同步请求以连接错误结束"""
+        writer.close()
+        if self._writer is writer:
+            self._writer = None
+        while self._time_requests:
+            future = self._time_requests.popleft()
+            if not future.done():
+                future.set_exception(ConnectionError("与 Master 的连接已断开"))
+
+    async def _send(self, frame: bytes) -> None:
+        """Worker 经控制连接向 Master 发送一帧，连接断开时下次发送自动重连"""
+        writer = await self._connect()
+        try:
+            writer.write(frame)
+            await writer.drain()
+        except ConnectionError:
+            self._disconnect(writer)
+            raise
+
+    async def _send_metrics(self, frame: bytes) -> None:
+        """Worker 经指标连接向 Master 发送一帧，连接断开时下次发送自动重连"""
+        writer = await self._connect_metrics()
+        try:
+            writer.write(frame)
+            await writer.drain()
+        except ConnectionError:
+            writer.close()
+            if self._metrics_writer is writer:
+                self._metrics_writer = None
+            raise
+
+    async def _handle_connection(self, reader: asyncio.StreamReader,
+                                 writer: asyncio.StreamWriter) -> None:
+        """Master 处理一个 Worker 连接（控制连接或指标连接），直到连接关闭"""
+        worker_id = None
+        try:
+            frame_type, payload = await read_frame(reader)
+            if frame_type == FRAME_METRICS_HELLO:
+                worker_id = payload.decode('utf-8')
+                self._metrics_connections.add(writer)
+                try:
+                    await self._read_worker_metrics(worker_id, reader)
+                finally:
+                    self._metrics_connections.discard(writer)
+                return
+            if frame_type != FRAME_HELLO:
+                raise ValueError(f"连接的第一帧必须是 HELLO，收到类型 {frame_type}")
+            worker_id = payload.decode('utf-8')
+            previous = self._connections.get(worker_id)
+            if previous is not None:
+                previous.close()
+            self._connections[worker_id] = writer
+            logger.info("Worker %s 已连接: %s", worker_id, writer.get_extra_info('peername'))
+
+            while True:
+                frame_type, payload = await read_frame(reader)
+                await self._handle_worker_frame(worker_id, frame_type, payload, writer)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            logger.info("Worker %s 已断开连接", worker_id)
+        except ValueError as e:
+            logger.warning("Worker %s 发送了无效的帧，关闭连接: %s", worker_id, e)
+        finally:
+            if worker_id is not None and self._connections.get(worker_id) is writer:
+                del self._connections[worker_id]
+                self._last_seen.pop(worker_id, None)
+            writer.close()
+
+    async def _read_worker_metrics(self, worker_id: str,
+                                   reader: asyncio.StreamReader) -> None:
+        """Master 读取一个 Worker 指标连接上的指标帧，直到连接关闭"""
+        logger.info("Worker %s 的指标连接已建立", worker_id)
+        while True:
+            frame_type, payload = await read_frame(reader)
+            if frame_type != FRAME_METRICS:
+                logger.warning("忽略指标连接上来自 %s 的帧类型: %s", worker_id, frame_type)
+                continue
+            # 队列已满时在此等待，只暂停读取指标连接，背压经 TCP 传回 Worker
+            await self._metrics.put(payload)
+
+    async def _handle_worker_frame(self, worker_id: str, frame_type: int, payload: bytes,
+                                   writer: asyncio.StreamWriter) -> None:
+        """Master 按帧类型分发 Worker 控制连接上发来的数据"""
+        if frame_type == FRAME_HEARTBEAT:
+            heartbeat_data = json.loads(payload)
+            heartbeat_data["timestamp"] = time.time()
+            self._last_seen[worker_id] = asyncio.get_running_loop().time()
+            self._heartbeats.put_nowait((heartbeat_data, worker_id))
+        elif frame_type == FRAME_COMMAND:
+            message = json.loads(payload)
+            self._commands.put_nowait((
+                message.get("data"), message.get("worker_id", worker_id), message.get("command")))
+        elif frame_type == FRAME_TIME_REQUEST:
+            writer.write(encode_frame(FRAME_TIME_REPLY, _TIMESTAMP.pack(time.time())))
+        else:
+            logger.warning("忽略来自 %s 的未知帧类型: %s", worker_id, frame_type)
+
+    async def _read_from_master(self, reader: asyncio.StreamReader,
+                                writer: asyncio.StreamWriter) -> None:
+        """Worker 读取 Master 发来的命令与时钟同步回复"""
+        try:
+            while True:
+                frame_type, payload = await read_frame(reader)
+                if frame_type == FRAME_COMMAND:
+                    message = json.loads(payload)
+                    self._commands.put_nowait((
+                        message.get("data"), message.get("worker_id"), message.get("command")))
+                elif frame_type == FRAME_TIME_REPLY and self._time_requests:
+                    future = self._time_requests.popleft()
+                    if not future.done():
+                        future.set_result(_TIMESTAMP.unpack(payload)[0])
+                else:
+                    logger.warning("忽略来自 Master 的未知帧类型: %s", frame_type)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            logger.warning("与 Master 的连接已断开")
+        except ValueError as e:
+            logger.warning("Master 发送了无效的帧，关闭连接: %s", e)
+        finally:
+            self._disconnect(writer)
+
+    # ------------------------------------------------------------------
+    # 发布
+    # ------------------------------------------------------------------
+
+    async def publish(self, channel_type: str, data: dict,
+                      worker_id: str = None, **kwargs):
+        """
+        统一的数据发布方法，参数与 DistributedCoordinator.publish 相同
+
+        参数：
+            channel_type: 频道类型，支持 "command", "request_metrics", "request_aggregates", "heartbeat"
+            data: 要发布的数据
+            worker_id: Worker节点ID（Master 发布命令时指定目标 Worker，不指定时广播）
+            **kwargs: 额外参数，如command参数用于命令发布
+        """
+        if channel_type == "command":
+            command = kwargs.get("command")
+            if not command:
+                raise ValueError(
+                    "命令发布需要 'command' 参数")
+
+            payload = {"command": command}
+            if data:
+                payload["data"] = data
+            if worker_id:
+                payload["worker_id"] = worker_id
+            frame = encode_frame(FRAME_COMMAND, json.dumps(payload).encode('utf-8'))
+            if self.role == "master":
+                await self._send_to_workers(frame, worker_id)
+            else:
+                await self._send(frame)
+            return
+
+        if self.role == "master":
+            raise ValueError(f"Master 不支持发布 {channel_type}")
+
+        if channel_type == "request_metrics":
+            if not worker_id:
+                raise ValueError(
+                    "请求指标批量发布需要 'worker_id'")
+            timestamp = asyncio.get_event_loop().time()
+
+            def encode_chunk(chunk, chunk_index, total_chunks):
+                if self.metrics_encoding == WIRE_BINARY:
+                    return encode_metrics_batch(
+                        chunk, worker_id, timestamp=timestamp,
+                        chunk_index=chunk_index, total_chunks=total_chunks)
+                return json.dumps({
+                    'batch': chunk,
+                    'worker_id': worker_id,
+                    'timestamp': timestamp,
+                    'chunk_index': chunk_index,
+                    'total_chunks': total_chunks,
+                })
+
+            async def send(message):
+                await self._send_metrics(encode_frame(FRAME_METRICS, message.encode('utf-8')))
+
+            await send_metrics_chunks(data, encode_chunk, send)
+
+        elif channel_type == "request_aggregates":
+            if not worker_id:
+                raise ValueError(
+                    "请求指标聚合发布需要 'worker_id'")
+            message = json.dumps({
+                'aggregates': data,
+                'worker_id': worker_id,
+                'timestamp': asyncio.get_event_loop().time()
+            })
+            await self._send_metrics(encode_frame(FRAME_METRICS, message.encode('utf-8')))
+
+        elif channel_type == "heartbeat":
+            await self._send(encode_frame(FRAME_HEARTBEAT, json.dumps(data).encode('utf-8')))
+
+        else:
+            raise ValueError(f"不支持的 channel_type: {channel_type}")
+
+    async def _send_to_workers(self, frame: bytes, worker_id: str = None) -> None:
+        """Master 向指定 Worker 或全部 Worker 发送一帧，单个连接失败不影响其他 Worker"""
+        if worker_id:
+            writer = self._connections.get(worker_id)
+            if writer is None:
+                logger.warning("Worker %s 未连接，命令未发送", worker_id)
+                return
+            writers = [writer]
+        else:
+            writers = list(self._connections.values())
+
+        for writer in writers:
+            try:
+                writer.write(frame)
+                await writer.drain()
+            except ConnectionError as e:
+                logger.warning("向 Worker 发送命令失败: %s", e)
+
+    async def advertise_metrics_encodings(self) -> None:
+        """Master 开始监听；TCP 后端的 Master 总是同时支持 JSON 与二进制编码，无需通告"""
+        await self.start()
+
+    # ------------------------------------------------------------------
+    # 时钟同步
+    # ------------------------------------------------------------------
+
+    async def sync_clock(self) -> float:
+        """
+        测量 Master 时间与本地时间之差（Master 自身直接返回）
+
+        返回：
+            float: 本次测量的往返耗时（秒）
+        """
+        if self.role == "master":
+            return 0.0
+
+        future = asyncio.get_running_loop().create_future()
+        before = time.time()
+        self._time_requests.append(future)
+        try:
+            await self._send(encode_frame(FRAME_TIME_REQUEST))
+        except Exception:
+            if future in self._time_requests:
+                self._time_requests.remove(future)
+            raise
+        master_time = await asyncio.wait_for(future, TIME_SYNC_TIMEOUT)
+        after = time.time()
+        self._clock_offset = master_time - (before + after) / 2
+        self.clock_rtt = after - before
+        return self.clock_rtt
+
+    @property
+    def clock_synced(self) -> bool:
+        """是否已测量过时钟偏移"""
+        return self._clock_offset is not None
+
+    def server_time(self) -> float:
+        """
+        按最近一次测量的时钟偏移估算当前 Master 时间
+
+        返回：
+            float: Master 时间（秒）；尚未测量时钟偏移时返回本地时间
+        """
+        return time.time() + (self._clock_offset or 0.0)
+
+    def server_to_loop_time(self, server_timestamp: float) -> float:
+        """
+        将 Master 时间换算为当前事件循环的时间
+
+        参数：
+            server_timestamp: Master 时间（秒）
+
+        返回：
+            float: 对应的 loop.time() 时刻
+        """
+        return asyncio.get_running_loop().time() + server_timestamp - self.server_time()
+
+    # ------------------------------------------------------------------
+    # 心跳检查
+    # ------------------------------------------------------------------
+
+    async def check_worker_heartbeat(self, worker_id: str) -> bool:
+        """
+        检查Worker心跳是否存活
+
+        参数：
+            worker_id: Worker节点ID
+
+        返回：
+            bool: Worker 仍保持连接且心跳未超时
+        """
+        return (await self.check_workers_heartbeat([worker_id]))[worker_id]
+
+    async def check_workers_heartbeat(self, worker_ids: Iterable[str]) -> Dict[str, bool]:
+        """
+        批量检查多个Worker的心跳是否存活
+
+        参数：
+            worker_ids: Worker节点ID列表
+
+        返回：
+            Dict[str, bool]: 每个Worker是否存活，连接已断开的 Worker 立即视为失联
+        """
+        deadline = asyncio.get_running_loop().time() - HEARTBEAT_INTERVAL * HEARTBEAT_LIVENESS
+        return {
+            worker_id: worker_id in self._connections and
+            self._last_seen.get(worker_id, float('-inf')) >= deadline
+            for worker_id in worker_ids
+        }
+
+    # ------------------------------------------------------------------
+    # 监听
+    # ------------------------------------------------------------------
+
+    async def listen_heartbeats(self, callback=None):
+        """
+        监听Worker心跳数据（Master端使用），每收到一次心跳调用一次回调
+
+        参数：
+            callback: 可选的回调函数，格式为 async def callback(heartbeat_data: dict, worker_id: str)
+        """
+        await self.start()
+        try:
+            while True:
+                heartbeat_data, worker_id = await self._heartbeats.get()
+                if callback:
+                    try:
+                        await callback(heartbeat_data, worker_id)
+                    except Exception as e:
+                        logger.error("心跳监听器错误: %s", str(e))
+        except asyncio.CancelledError:
+            logger.info("心跳监听器已停止")
+            raise
+
+    async def listen_request_metrics(self, callback=None, aggregate_callback=None,
+                                     batch_callback=None):
+        """
+        监听Worker上报的请求数据，回调参数与 DistributedCoordinator.listen_request_metrics 相同
+
+        参数：
+            callback: 可选的逐条回调函数
+            aggregate_callback: 可选的聚合数据回调函数
+            batch_callback: 可选的批量回调函数，提供时每条消息只调用一次
+        """
+        await self.start()
+        logger.info("%s 开始通过 TCP 接收请求指标", self.role)
+        try:
+            while True:
+                payload = await self._metrics.get()
+                try:
+                    await dispatch_metrics_message(
+                        payload, callback, aggregate_callback, batch_callback)
+                except Exception as e:
+                    logger.warning("处理请求指标回调失败: %s", str(e))
+        except asyncio.CancelledError:
+            logger.info("请求指标监听器已停止")
+            raise
+
+    async def listen_commands(self, command_handler):
+        """
+        统一的命令监听器，收到 quit 命令后退出
+
+        参数：
+            command_handler: 命令处理函数，格式为 async def handler(data: dict, worker_id: str, command: str)
+        """
+        if self.role == "master":
+            await self.start()
+        else:
+            # Master 可能晚于 Worker 启动，连接失败时定期重试
+            while True:
+                try:
+                    await self._connect()
+                    break
+                except OSError as e:
+                    logger.warning("连接 Master %s:%d 失败，稍后重试: %s", self.host, self.port, e)
+                    await asyncio.sleep(HEARTBEAT_INTERVAL)
+
+        logger.info("%s 开始通过 TCP 监听命令", self.role)
+        try:
+            while True:
+                data, worker_id, command = await self._commands.get()
+                logger.info(
+                    "收到命令: %s, 数据: %s, worker_id: %s",
+                    command, data, worker_id)
+                try:
+                    await command_handler(data, worker_id, command)
+                except Exception as e:
+                    logger.error(
+                        "处理命令消息错误: %s", e)
+                if command == "quit":
+                    logger.info(
+                        "收到退出命令，退出命令监听器")
+                    break
+        except asyncio.CancelledError:
+            logger.info("命令监听器已停止")
+            raise
@@ -1,11 +1,83 @@
 # encoding: utf-8
 
 import asyncio
-from typing import Any, Callable, Dict, List, Optional, Type
+from functools import partial
+from itertools import islice
+from typing import Any, Callable, Dict, Iterator, List, Optional, Type
 
 from aiotest.logger import logger
 from aiotest.users import User
 
+# 启动每个用户前等待事件循环恢复的最长时间（秒），避免负载生成器持续饱和时启动停滞
+SPAWN_GATE_MAX_WAIT = 1.0
+# 单次调度最多连续处理的项目数，落后时分多批追赶，批间让出事件循环
+SPAWN_MAX_BATCH = 200
+# 实际速率低于请求速率的该比例时告警
+SPAWN_RATE_WARN_RATIO = 0.9
+# 批量停止用户时同时执行 stop_tasks() 的最大数量（on_stop 可能需要关闭 HTTP 会话）
+STOP_CONCURRENCY = 500
+
+
+class UserRegistry:
+    """
+    按用户类型索引的活跃用户登记表
+
+    每种用户类型一个按启动顺序排列的有序集合（dict 的键），用户任务结束时
+    由任务的完成回调自动移除，因此活跃用户数和各类型数量为 O(1)，
+    按启动顺序取出 k 个用户为 O(k)，无需扫描全部用户。
+    """
+
+    def __init__(self):
+        self._users_by_type: Dict[Type['User'], Dict['User', None]] = {}
+        self._count = 0
+
+    def add(self, user: 'User') -> None:
+        """登记已启动任务的用户，任务结束时自动移除"""
+        users = self._users_by_type.setdefault(type(user), {})
+        if user in users:
+            return
+        users[user] = None
+        self._count += 1
+        task = user.tasks
+        if task is not None:
+            task.add_done_callback(partial(self._on_task_done, user))
+
+    def discard(self, user: 'User') -> None:
+        """移除用户，未登记时忽略"""
+        users = self._users_by_type.get(type(user))
+        if users is not None and users.pop(user, False) is None:
+            self._count -= 1
+
+    def _on_task_done(self, user: 'User', task: asyncio.Task) -> None:
+        # 用户已重新启动时，旧任务的完成回调不应移除用户
+        if user.tasks is None or user.tasks is task:
+            self.discard(user)
+
+    def count(self, user_type: Type['User']) -> int:
+        """返回某一用户类型的活跃用户数"""
+        return len(self._users_by_type.get(user_type, ()))
+
+    def counts(self) -> Dict[Type['User'], int]:
+        """返回有活跃用户的各类型数量"""
+        return {user_type: len(users)
+                for user_type, users in self._users_by_type.items() if users}
+
+    def oldest(self, user_type: Type['User'], count: int) -> List['User']:
+        """按启动顺序返回某一类型最早启动的 count 个用户"""
+        return list(islice(self._users_by_type.get(user_type, ()), count))
+
+    def clear(self) -> None:
+        """清空登记表"""
+        self._users_by_type.clear()
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator['User']:
+        for users in list(self._users_by_type.values()):
+            yield from list(users)
+
 
 class UserManager:
     """用户管理器，负责用户创建、启动、停止和权重分配"""
@@ -13,7 +85,14 @@ class UserManager:
     def __init__(self, user_types: List[Type['User']], config: Dict[str, Any]):
         self.user_types: List[Type['User']] = user_types
         self.config: Dict[str, Any] = config
-        self.active_users: List['User'] = []
+        self.registry = UserRegistry()
+        # 可选的启动闸门（LoopLagMonitor），事件循环延迟超过阈值时暂缓启动用户
+        self.spawn_gate = None
+        # 共享暂停闸门：暂停/恢复全部用户只需一次 clear/set
+        self.pause_gate = asyncio.Event()
+        self.pause_gate.set()
+        # 最近一次批量启停的速率统计：count/requested_rate/achieved_rate/duration
+        self.last_spawn_stats: Dict[str, float] = {}
 
     def _calculate_weighted_counts(
         self,
@@ -171,52 +250,91 @@ class UserManager:
         await self._batch_execute(target_users, self._stop_user, rate)
 
     async def _batch_execute(
-            self, items: List, operation: Callable, rate: float):
+            self, items: List, operation: Callable, rate: float) -> float:
         """
-        批量操作执行器，支持速率控制
+        批量操作执行器，按固定时间线控制速率
+
+        第 k 个项目的计划时刻为 ``开始时刻 + k / rate``，而不是在每个操作后再等待 ``1 / rate``，
+        因此操作本身的耗时和事件循环延迟不会累积成漂移；落后于时间线时，
+        单次调度把所有已到期的项目分批（每批至多 SPAWN_MAX_BATCH 个）补齐。
 
         参数：
             items (List): 需要处理的项目列表
             operation (Callable): 执行的异步操作函数
             rate (float): 操作速率（个/秒），0表示无限制
 
+        返回：
+            float: 实际速率（个/秒），按首个到最后一个项目的间隔计算
+
         示例：
-            # rate=5.0时，每0.2秒处理一个项目
-            # 10个项目预计耗时：1.8秒（最后一个不延迟）
-            await _batch_execute([user1, user2], start_user, 5.0)
-            # 执行顺序：start_user(user1) -> sleep(0.2) -> start_user(user2)
+            # rate=5.0时，项目计划在 0、0.2、0.4 秒处理
+            await _batch_execute([user1, user2, user3], start_user, 5.0)
 
         逻辑说明：
-            1. 计算操作间隔：delay = 1.0 / rate
-               - rate=5.0 -> delay=0.2秒
-               - rate=0 -> delay=0（无限制）
-            2. 顺序处理每个项目：
-               - 执行操作并统计成功数
-               - 操作间按速率延迟（最后一个操作不延迟）
-               - 捕获单个操作异常，不影响其他操作
-            3. 记录处理结果（成功时记录debug日志）
+            1. 计算操作间隔：interval = 1.0 / rate（rate=0 时全部立即到期）
+            2. 按当前时刻计算已到期的项目数，没有到期项目时睡到下一个计划时刻
+            3. 处理到期项目，单个操作异常只记录告警，不影响其他操作
+            4. 记录请求速率与实际速率，实际速率明显偏低时告警
         """
+        loop = asyncio.get_running_loop()
+        total = len(items)
+        interval = 1.0 / rate if rate > 0 else 0
         success_count = 0
-        delay = 1.0 / rate if rate > 0 else 0
-
-        for i, item in enumerate(items):
-            try:
-                await operation(item)
-                success_count += 1
-
-                # 速率控制：最后一个操作后不需要延迟
-                if i < len(items) - 1 and delay > 0:
-                    await asyncio.sleep(delay)
-            except Exception as e:
-                logger.warning("操作失败，项目 %d: %s", i, e)
-                continue
+        start_time = loop.time()
+        index = 0
+
+        while index < total:
+            if interval > 0:
+                now = loop.time()
+                # 计划时刻不晚于当前时刻的项目数
+                due_count = min(total, int((now - start_time) / interval) + 1)
+                if due_count <= index:
+                    await asyncio.sleep(start_time + index * interval - now)
+                    continue
+            else:
+                due_count = total
+
+            batch_end = min(due_count, index + SPAWN_MAX_BATCH)
+            for i in range(index, batch_end):
+                try:
+                    await operation(items[i])
+                    success_count += 1
+                except Exception as e:
+                    logger.warning("操作失败，项目 %d: %s", i, e)
+            index = batch_end
+            if index < due_count:
+                # 批次已满但仍有到期项目，让出事件循环后继续追赶
+                await asyncio.sleep(0)
+
+        duration = loop.time() - start_time
+        achieved_rate = (total - 1) / duration if total > 1 and duration > 0 else float(rate)
+        self.last_spawn_stats = {
+            "count": success_count,
+            "requested_rate": float(rate),
+            "achieved_rate": achieved_rate,
+            "duration": duration,
+        }
 
         if success_count > 0:
             logger.debug(
-                "成功处理 %d/%d 个项目", success_count, len(items))
+                "成功处理 %d/%d 个项目，请求速率 %.2f/s，实际速率 %.2f/s",
+                success_count, total, rate, achieved_rate)
+        if rate > 0 and total > 1 and achieved_rate < rate * SPAWN_RATE_WARN_RATIO:
+            logger.warning(
+                "实际启停速率 %.2f/s 低于请求速率 %.2f/s，负载生成器可能已饱和",
+                achieved_rate, rate)
+        return achieved_rate
+
+    def create_user(self, user_class: Type['User']) -> 'User':
+        """
+        创建用户实例并设置 host（不启动任务）
 
-    async def _create_and_start_user(self, user_class: Type['User']):
-        """创建并启动单个用户"""
+        参数：
+            user_class (Type['User']): 用户类
+
+        返回：
+            User: 新建的用户实例
+        """
         new_user: 'User' = user_class()
         # 设置 host（如果用户类需要）
         # 兼容字典和 Namespace 对象
@@ -228,14 +346,23 @@ class UserManager:
             host = self.config.get('host', None)
         if host and hasattr(new_user, 'host'):
             new_user.host = host
+        new_user.pause_gate = self.pause_gate
+        return new_user
+
+    async def _create_and_start_user(self, user_class: Type['User']):
+        """创建并启动单个用户"""
+        if self.spawn_gate is not None and self.spawn_gate.saturated:
+            await self.spawn_gate.wait_until_healthy(SPAWN_GATE_MAX_WAIT)
 
+        new_user = self.create_user(user_class)
         new_user.start_tasks()
-        self.active_users.append(new_user)
+        self.registry.add(new_user)
 
     async def _stop_user(self, user: 'User'):
         """终止单个用户"""
         if user.tasks is not None and not user.tasks.done():
             await user.stop_tasks()
+        self.registry.discard(user)
 
     async def _select_users_to_stop(self, user_count: int):
         """
@@ -255,78 +382,78 @@ class UserManager:
             # 停止后剩余：MyUser1约28个，MyUser2约42个，保持2:3的权重比例
 
         逻辑说明：
-            1. 获取所有活跃用户（tasks未完成的）
-            2. 如果停止数量≥活跃数量，返回所有活跃用户
-            3. 按用户类型分组，统计各类型数量
-            4. 单一用户类型时，按启动顺序停止
-            5. 多用户类型：
-               - 计算当前各类型数量
-               - 计算停止后的目标总用户数
+            1. 如果停止数量≥活跃数量，返回所有活跃用户
+            2. 从登记表读取各类型数量（无需遍历用户）
+            3. 单一用户类型时，按启动顺序停止
+            4. 多用户类型：
                - 调用权重分配算法计算各类型应停止数量
-               - 按启动顺序选择要停止的用户
+               - 从各类型的有序集合中按启动顺序取出要停止的用户，总开销 O(k)
         """
-        active_users = [
-            user for user in self.active_users if user.tasks is not None and not user.tasks.done()]
+        registry = self.registry
+        if user_count >= len(registry):
+            return list(registry)
 
-        if user_count >= len(active_users):
-            return active_users
-
-        # 按用户类型分组
-        users_by_type: Dict[Type['User'], List['User']] = {}
-        for user in active_users:
-            user_type = type(user)
-            if user_type not in users_by_type:
-                users_by_type[user_type] = []
-            users_by_type[user_type].append(user)
+        current_counts = registry.counts()
 
         # 如果只有一种用户类型，按启动顺序停止
-        if len(users_by_type) == 1:
-            return active_users[:user_count]
-
-        # 计算当前各类型数量
-        current_counts = {
-            user_type: len(users) for user_type,
-            users in users_by_type.items()}
-        user_types = list(current_counts.keys())
+        if len(current_counts) == 1:
+            user_type = next(iter(current_counts))
+            return registry.oldest(user_type, user_count)
 
         # 直接使用权重分配算法计算各类型应停止的数量
         stop_counts = self._calculate_weighted_counts(
-            user_types, user_count, current_counts)
+            list(current_counts), user_count, current_counts)
 
         # 按启动顺序选择要停止的用户
         users_to_stop = []
         for user_type, stop_count in stop_counts.items():
             if stop_count > 0:
-                users_to_stop.extend(users_by_type[user_type][:stop_count])
+                users_to_stop.extend(registry.oldest(user_type, stop_count))
 
         return users_to_stop
 
+    @property
+    def active_users(self) -> List['User']:
+        """返回活跃用户列表（按用户类型、启动顺序排列的快照）"""
+        return list(self.registry)
+
     @property
     def active_user_count(self) -> int:
-        """返回当前活跃用户数量"""
-        return sum(
-            1 for user in self.active_users if user.tasks is not None and not user.tasks.done())
-
-    def cleanup_inactive_users(self):
-        """清理非活跃用户实例（已完成的任务）"""
-        self.active_users = [
-            user for user in self.active_users if user.tasks is not None and not user.tasks.done()]
-
-    async def stop_all_users(self):
-        """停止所有用户"""
-        for user in self.active_users:
-            if not user.tasks.done():
-                await user.stop_tasks()
-        self.active_users.clear()
+        """返回当前活跃用户数量（O(1)，由登记表维护）"""
+        return len(self.registry)
+
+    async def stop_all_users(self, concurrency: int = STOP_CONCURRENCY):
+        """
+        停止所有用户，最多 concurrency 个用户同时执行 stop_tasks()
+
+        参数：
+            concurrency (int): 最大并行数
+        """
+        users = list(self.registry)
+        pending = iter(users)
+
+        async def stop_worker():
+            # 各协程共享同一个迭代器，取出下一个用户时不会让出事件循环
+            for user in pending:
+                try:
+                    await self._stop_user(user)
+                except Exception as e:
+                    logger.warning("停止用户失败: %s", e)
+
+        await asyncio.gather(
+            *[stop_worker() for _ in range(min(max(concurrency, 1), len(users)))])
+        self.registry.clear()
+        # 停止后重新开始的用户不应沿用暂停状态
+        self.pause_gate.set()
+        if users:
+            logger.debug("已停止 %d 个用户", len(users))
 
     async def pause_all_users(self):
-        """暂停所有用户"""
-        for user in self.active_users:
-            if not user.tasks.done():
-                await user.pause_tasks()
+        """暂停所有用户（关闭共享暂停闸门，O(1)）"""
+        self.pause_gate.clear()
+        logger.info("已暂停 %d 个用户", self.active_user_count)
 
     async def resume_all_users(self):
-        """恢复所有用户"""
-        for user in self.active_users:
-            if not user.tasks.done():
-                await user.resume_tasks()
+        """恢复所有用户（打开共享暂停闸门，O(1)）"""
+        self.pause_gate.set()
+        logger.info("已恢复 %d 个用户", self.active_user_count)
@@ -8,10 +8,12 @@
 import asyncio
 import inspect
 import random
+from contextvars import Token
 from enum import Enum, auto
+from itertools import accumulate
 from typing import Awaitable, Callable, Coroutine, Dict, List, Optional, Tuple, Union
 
-from aiotest.clients import HTTPClient
+from aiotest.clients import BODY_MODE_FULL, HTTPClient, schedule_lag
 from aiotest.logger import logger
 
 # 等待时间类型定义：支持多种灵活的等待方式
@@ -156,6 +158,8 @@ class UserMeta(type):
 
         if "jobs" not in class_dict:
             class_dict["jobs"] = jobs
+        # 未传入 max_concurrent_tasks 时实例使用任务数（1~100），按类计算一次，不为每个用户写实例属性
+        class_dict["max_concurrent_tasks"] = max(min(len(class_dict["jobs"]), 100), 1)
 
         return super().__new__(mcs, classname, bases, class_dict)
 
@@ -208,6 +212,8 @@ class User(metaclass=UserMeta):
     - weight: 用户权重
     - max_concurrent_tasks: 最大并发任务数
     - execution_mode: 任务执行模式（SEQUENTIAL/CONCURRENT）
+    - pacing: 节奏调度间隔（秒），设置后按固定时间表开始任务并替代 wait_time，
+      同时记录协调遗漏校正耗时；None 表示不启用
 
 
     wait_time 支持的类型：
@@ -216,11 +222,16 @@ class User(metaclass=UserMeta):
     - 同步函数: 返回数值或范围元组的函数
     - 异步函数: 返回数值或范围元组的协程函数
     """
+    # 每个用户的固有状态放在槽位中；__dict__ 只在实例覆盖类属性（如 wait_time、host）
+    # 或添加自定义属性时才创建
+    __slots__ = ('tasks', '_own_pause_event', 'pause_gate', '_next_start', '__dict__', '__weakref__')
+
     host: Optional[str] = None
     wait_time: WaitTimeType = 1.0
     weight: int = 1
-    max_concurrent_tasks: Optional[int] = None  # 默认值将在初始化时设置为任务数
+    max_concurrent_tasks: Optional[int] = None  # 由元类按类设置为任务数（1~100）
     execution_mode: ExecutionMode = ExecutionMode.SEQUENTIAL
+    pacing: Optional[float] = None
 
     def __init__(
         self,
@@ -231,8 +242,11 @@ class User(metaclass=UserMeta):
     ) -> None:
         super().__init__()
         self.tasks: Optional[asyncio.Task[None]] = None
-        self._pause_event = asyncio.Event()
-        self._pause_event.set()  # 初始状态为非暂停
+        # 单个用户的暂停事件在首次使用时创建（见 _pause_event），空闲用户不持有 Event
+        self._own_pause_event: Optional[asyncio.Event] = None
+        # 可选的共享暂停闸门（由 UserManager 设置），一次 set/clear 即可暂停或恢复同一管理器下的全部用户
+        self.pause_gate: Optional[asyncio.Event] = None
+        self._next_start: Optional[float] = None  # 节奏调度的下一次计划开始时间
 
         if wait_time is not None:
             self.wait_time = wait_time
@@ -246,9 +260,11 @@ class User(metaclass=UserMeta):
             else:
                 self.max_concurrent_tasks = min(max_concurrent_tasks, 100)
         else:
-            # 自动设置为任务数量，最少为1
+            # 自动设置为任务数量，最少为1；与元类预先设置的类属性相同时不写实例属性
             jobs = getattr(self, 'jobs', [])
-            self.max_concurrent_tasks = max(min(len(jobs), 100), 1)
+            auto_max_concurrent = max(min(len(jobs), 100), 1)
+            if self.max_concurrent_tasks != auto_max_concurrent:
+                self.max_concurrent_tasks = auto_max_concurrent
 
         if execution_mode is not None:
             self.execution_mode = execution_mode
@@ -322,8 +338,36 @@ class User(metaclass=UserMeta):
     async def resume_tasks(self) -> None:
         """恢复用户任务"""
         self._pause_event.set()
+        # 暂停期间的时间不计入节奏调度延迟，以恢复时刻重新开始时间表
+        self._next_start = None
         logger.info("用户任务已恢复")
 
+    @property
+    def _pause_event(self) -> asyncio.Event:
+        """单个用户的暂停事件（首次访问时创建，初始为非暂停）"""
+        if self._own_pause_event is None:
+            self._own_pause_event = asyncio.Event()
+            self._own_pause_event.set()
+        return self._own_pause_event
+
+    def _is_paused(self) -> bool:
+        """自身暂停事件或共享暂停闸门任一处于暂停状态"""
+        event = self._own_pause_event
+        gate = self.pause_gate
+        return ((event is not None and not event.is_set()) or
+                (gate is not None and not gate.is_set()))
+
+    async def _wait_until_resumed(self) -> bool:
+        """等待自身暂停事件与共享暂停闸门都处于非暂停状态"""
+        while self._is_paused():
+            if not self._pause_event.is_set():
+                await self._pause_event.wait()
+            else:
+                await self.pause_gate.wait()
+        # 暂停期间的时间不计入节奏调度延迟，以恢复时刻重新开始时间表
+        self._next_start = None
+        return True
+
     async def _wait_if_paused(self, timeout: Optional[float] = None) -> bool:
         """等待直到任务恢复或超时
 
@@ -333,16 +377,48 @@ class User(metaclass=UserMeta):
         返回:
             bool: True表示成功恢复，False表示超时
         """
+        if not self._is_paused():
+            return True
         try:
             if timeout:
-                return await asyncio.wait_for(self._pause_event.wait(), timeout=timeout)
+                return await asyncio.wait_for(self._wait_until_resumed(), timeout=timeout)
             else:
-                await self._pause_event.wait()
-                return True
+                return await self._wait_until_resumed()
         except asyncio.TimeoutError:
             logger.warning("暂停等待超时")
             return False
 
+    async def _begin_scheduled_task(self, interval: Optional[float] = None) -> Optional[Token]:
+        """
+        节奏调度模式下等待到计划开始时间，并记录实际开始相对计划的延迟
+
+        参数：
+            interval: 本次占用的计划间隔，默认为 pacing（并发槽位使用 pacing / 槽位数）
+
+        说明：
+            - 计划开始时间按固定间隔递增，与任务耗时无关
+            - 先占用计划时刻再等待，多个槽位同时等待时不会占用同一时刻
+            - 任务耗时超过 pacing 时不再等待，延迟会累积到后续请求的校正耗时中，
+              反映真实客户端在服务端停顿期间的排队时间
+
+        返回：
+            Optional[Token]: schedule_lag 的重置令牌，未启用节奏调度时返回 None
+        """
+        if self.pacing is None:
+            return None
+
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        if self._next_start is None:
+            self._next_start = now
+        scheduled = self._next_start
+        self._next_start += self.pacing if interval is None else interval
+        if scheduled > now:
+            await asyncio.sleep(scheduled - now)
+            now = loop.time()
+
+        return schedule_lag.set(max(0.0, now - scheduled))
+
     async def _run(self) -> None:
         """
         用户任务主运行循环
@@ -378,6 +454,7 @@ class User(metaclass=UserMeta):
                 # 检查是否暂停
                 await self._wait_if_paused()
                 
+                token = await self._begin_scheduled_task()
                 try:
                     await job(self)
                 except AssertionError as e:
@@ -386,11 +463,20 @@ class User(metaclass=UserMeta):
                 except Exception as e:
                     await self._handle_error(e)
                     break  # 跳出本次循环，不执行后面的接口任务，因为后续任务依赖前面的结果
-                # 任务后等待
-                await WaitTimeResolver.wait(self.wait_time)
+                finally:
+                    if token is not None:
+                        schedule_lag.reset(token)
+                # 任务后等待（节奏调度模式下由下一次任务开始前等待）
+                if self.pacing is None:
+                    await WaitTimeResolver.wait(self.wait_time)
 
     async def _run_concurrent(self) -> None:
-        """并发执行任务，支持权重分配和并发限制。"""
+        """
+        并发执行任务：max_concurrent_tasks 个常驻槽位协程各自循环选取并执行任务
+
+        每个槽位执行完一个任务后立即选取下一个，不必等待同轮中最慢的任务，
+        也不再为每一轮创建新的协程和选择列表。
+        """
 
         # 获取任务列表
         jobs = getattr(self, 'jobs', [])
@@ -399,50 +485,110 @@ class User(metaclass=UserMeta):
 
         # 分离任务函数和权重
         jobs_list, weights_list = zip(*jobs)
+        slot_count = max(self.max_concurrent_tasks or 1, 1)
 
-        # 判断权重是否相同
-        first_weight = weights_list[0]
-        all_weights_same = all(w == first_weight for w in weights_list)
+        await asyncio.gather(*[
+            self._run_slot(jobs_list, weights_list, slot_count)
+            for _ in range(slot_count)
+        ])
 
-        # 创建信号量控制并发数
-        semaphore = asyncio.Semaphore(self.max_concurrent_tasks)
-
-        async def run_task(job: Callable[[], Coroutine]) -> None:
-            """执行单个任务"""
-            async with semaphore:  # 默认占用1个信号量
-                # 检查是否暂停
-                await self._wait_if_paused()
-                
-                try:
-                    await job(self)
-                except Exception as e:
-                    await self._handle_error(e)
-                finally:
-                    # 检查是否暂停
-                    await self._wait_if_paused()
-                    
-                    # 使用新的等待解析器，支持多种等待时间类型
-                    await WaitTimeResolver.wait(self.wait_time)
+    async def _run_slot(
+        self,
+        jobs_list: Tuple[Callable[['User'], Coroutine[None, None, None]], ...],
+        weights_list: Tuple[int, ...],
+        slot_count: int
+    ) -> None:
+        """
+        单个并发槽位的执行循环
+
+        参数：
+            jobs_list: 任务函数
+            weights_list: 任务权重
+            slot_count: 槽位总数
+
+        说明：
+            - 每个槽位每次独立选取一个任务：权重相同时均匀随机选取，权重不同时按累计权重抽取
+            - 槽位之间不协调选择，同一任务可能同时在多个槽位执行
+            - 节奏调度模式下所有槽位共享计划时间表，每个槽位占用 pacing / 槽位数 的间隔，
+              即每个 pacing 周期仍开始 max_concurrent_tasks 个任务
+        """
+        all_weights_same = all(w == weights_list[0] for w in weights_list)
+        cum_weights = None if all_weights_same else list(accumulate(weights_list))
+        interval = self.pacing / slot_count if self.pacing is not None else None
 
         while True:
             # 检查是否暂停
             await self._wait_if_paused()
-            
-            # 根据权重选择要执行的任务
-            if all_weights_same:
-                # 权重相同，直接随机选择
-                selected_count = min(len(jobs_list), self.max_concurrent_tasks)
-                selected_jobs = random.sample(jobs_list, selected_count)
+
+            if cum_weights is None:
+                job = random.choice(jobs_list)
             else:
-                # 权重不同，使用加权随机选择
-                selected_jobs = random.choices(
-                    jobs_list,
-                    weights=weights_list,
-                    k=self.max_concurrent_tasks
-                )
+                job = random.choices(jobs_list, cum_weights=cum_weights)[0]
+
+            token = await self._begin_scheduled_task(interval)
+            try:
+                await job(self)
+            except Exception as e:
+                await self._handle_error(e)
+            finally:
+                if token is not None:
+                    schedule_lag.reset(token)
+
+            # 使用新的等待解析器，支持多种等待时间类型（节奏调度模式下按计划时间表等待）
+            if self.pacing is None:
+                await WaitTimeResolver.wait(self.wait_time)
 
-            # 并发执行选中的任务
-            await asyncio.gather(*[run_task(job) for job in selected_jobs])
+    def _select_concurrent_jobs(
+        self,
+        jobs_list: Tuple[Callable[['User'], Coroutine[None, None, None]], ...],
+        weights_list: Tuple[int, ...],
+        all_weights_same: bool
+    ) -> List[Callable[['User'], Coroutine[None, None, None]]]:
+        """按权重选择一轮并发执行的任务"""
+        if all_weights_same:
+            # 权重相同，直接随机选择
+            selected_count = min(len(jobs_list), self.max_concurrent_tasks)
+            return random.sample(jobs_list, selected_count)
+        # 权重不同，使用加权随机选择
+        return random.choices(
+            jobs_list,
+            weights=weights_list,
+            k=self.max_concurrent_tasks
+        )
+
+    async def run_iteration(self) -> None:
+        """
+        执行一次场景迭代（开放负载模型使用）
+
+        - 顺序模式：按顺序执行所有任务一次，断言失败或异常时中止本次迭代
+        - 并发模式：按权重选择一轮任务并发执行
+        - 不执行 wait_time 等待，迭代节奏由 ArrivalRateExecutor 控制
+        """
+        jobs = getattr(self, 'jobs', [])
+        if not jobs:
+            return
+
+        if self.execution_mode == ExecutionMode.CONCURRENT:
+            jobs_list, weights_list = zip(*jobs)
+            all_weights_same = all(w == weights_list[0] for w in weights_list)
+            selected_jobs = self._select_concurrent_jobs(
+                jobs_list, weights_list, all_weights_same)
+            results = await asyncio.gather(
+                *[job(self) for job in selected_jobs], return_exceptions=True)
+            for result in results:
+                if isinstance(result, Exception):
+                    await self._handle_error(result)
+            return
+
+        for job, _ in jobs:
+            try:
+                await job(self)
+            except AssertionError as e:
+                logger.warning("任务中断言失败: %s", e)
+                return
+            except Exception as e:
+                await self._handle_error(e)
+                return
 
     async def _handle_error(self, error: Exception) -> None:
         """处理任务执行中的错误。"""
@@ -468,11 +614,16 @@ class HttpUser(User):
 
     属性：
     - host: HTTP服务地址
+    - body_mode: 响应体处理模式（full/lazy/bytes/discard/stream），默认 full
     - _client: HTTP客户端实例（延迟初始化）
     - _client_config: HTTP客户端配置参数
     - _client_initialized: 客户端是否已初始化标志
     """
 
+    __slots__ = ('_client', '_client_initialized', '_client_config')
+
+    body_mode: str = BODY_MODE_FULL
+
     def __init__(
         self,
         host: Optional[str] = None,
@@ -486,6 +637,7 @@ class HttpUser(User):
         timeout: int = 30,
         max_retries: int = 3,
         verify_ssl: bool = True,
+        body_mode: Optional[str] = None,
     ) -> None:
 
         super().__init__(
@@ -498,6 +650,8 @@ class HttpUser(User):
         # 设置主机地址
         if host is not None:
             self.host = host
+        if body_mode is not None:
+            self.body_mode = body_mode
 
         # 如果没有设置host且没有预配置客户端，抛出异常
         if self.host is None and client is None:
@@ -510,13 +664,18 @@ class HttpUser(User):
         else:
             self._client = None
             self._client_initialized = False
-            # 保存客户端配置，用于延迟初始化
-            self._client_config = {
-                'default_headers': default_headers,
-                'timeout': timeout,
-                'max_retries': max_retries,
-                'verify_ssl': verify_ssl,
-            }
+            # 保存客户端配置，用于延迟初始化；全部为默认值时不为每个用户保存字典
+            if (default_headers is None and timeout == 30 and max_retries == 3 and
+                    verify_ssl and body_mode is None):
+                self._client_config = None
+            else:
+                self._client_config = {
+                    'default_headers': default_headers,
+                    'timeout': timeout,
+                    'max_retries': max_retries,
+                    'verify_ssl': verify_ssl,
+                    'body_mode': self.body_mode,
+                }
 
     @property
     def client(self) -> HTTPClient:
@@ -532,8 +691,9 @@ class HttpUser(User):
             logger.debug("正在初始化HTTP客户端，主机: %s", self.host)
 
             # 创建新的客户端实例
+            client_config = self._client_config or {'body_mode': self.body_mode}
             self._client = HTTPClient(
-                base_url=self.host, **self._client_config)
+                base_url=self.host, **client_config)
 
             try:
                 # 直接调用__aenter__方法初始化，不使用上下文管理器
@@ -0,0 +1,82 @@
+# encoding: utf-8
+"""
+Worker → Master 原始指标批次编码基准
+
+比较 JSON 与列式二进制编码的消息大小、Worker 编码耗时和 Master 解码 + 写入收集器耗时。
+
+运行方式：
+    python benchmarks/metrics_wire.py [--batch-size 1000] [--rounds 50]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiotest.metrics import MetricsCollector  # noqa: E402
+from aiotest.metrics_codec import (  # noqa: E402
+    decode_metrics_message,
+    encode_metrics_batch,
+)
+
+
+def _records(count: int):
+    """生成 _convert_metrics_to_dict 格式的指标字典"""
+    return [
+        {
+            "request_id": f"req-3f2a9c-{i}",
+            "method": "GET",
+            "endpoint": f"/api/items/{i % 8}",
+            "status_code": 200,
+            "duration": 0.0123 + i * 1e-6,
+            "corrected_duration": None,
+            "response_size": 512,
+            "error": None,
+            "timestamp": 1700000000.0 + i / 1000,
+            "assertion_result": "pass",
+            "worker_id": "2b7c3e9a-5d41-4f0e-9a77-1c2d3e4f5a6b",
+        }
+        for i in range(count)
+    ]
+
+
+def _measure(encode, collector: MetricsCollector, records, rounds: int):
+    """返回 (消息字节数, 每条编码耗时 µs, 每条解码 + 写入耗时 µs)"""
+    payload = encode(records)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        encode(records)
+    encode_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        collector.ingest_worker_batch(decode_metrics_message(payload)["batch"])
+    ingest_time = time.perf_counter() - start
+
+    per_record = 1e6 / (rounds * len(records))
+    return len(payload), encode_time * per_record, ingest_time * per_record
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="原始指标批次编码基准")
+    parser.add_argument("--batch-size", type=int, default=1000, help="每批记录数")
+    parser.add_argument("--rounds", type=int, default=50, help="重复次数")
+    args = parser.parse_args()
+
+    records = _records(args.batch_size)
+    collector = MetricsCollector(node_type="master", node_id="bench")
+    encoders = {
+        "json": lambda batch: json.dumps({"batch": batch, "worker_id": "worker", "timestamp": 0.0}),
+        "binary": lambda batch: encode_metrics_batch(batch, "worker"),
+    }
+    for name, encode in encoders.items():
+        size, encode_us, ingest_us = _measure(encode, collector, records, args.rounds)
+        print(f"{name:<6} {size:>9} 字节/批  编码 {encode_us:6.2f} µs/条  "
+              f"解码+写入 {ingest_us:6.2f} µs/条")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# encoding: utf-8
+"""
+HTTPClient 请求热路径框架开销基准
+
+用内存中的假会话替代网络，测量一次 `async with client.get(...)` 的纯框架开销
+（请求 ID、日志、脱敏、响应处理、指标事件），分别在 INFO 与 DEBUG 日志级别下运行。
+
+运行方式：
+    python benchmarks/request_overhead.py [--requests 50000] [--body-mode full]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiotest.clients import BODY_MODES, HTTPClient  # noqa: E402
+from aiotest.logger import logger  # noqa: E402
+
+BODY = b'{"message": "Hello, HTTP!"}'
+
+
+class _MemoryStream:
+    """模拟 aiohttp.StreamReader，只提供 total_bytes 与 iter_chunked"""
+
+    def __init__(self, body: bytes):
+        self._body = body
+        self.total_bytes = len(body)
+
+    async def iter_chunked(self, chunk_size: int):
+        for offset in range(0, len(self._body), chunk_size):
+            yield self._body[offset:offset + chunk_size]
+
+
+class _MemoryResponse:
+    """模拟 aiohttp.ClientResponse"""
+
+    status = 200
+    headers = {"Content-Type": "application/json"}
+    cookies = {}
+
+    def __init__(self):
+        self.content = _MemoryStream(BODY)
+
+    async def read(self) -> bytes:
+        return BODY
+
+    def close(self) -> None:
+        pass
+
+
+class _MemorySession:
+    """模拟 aiohttp.ClientSession，立即返回内存响应"""
+
+    async def request(self, method, url, **kwargs):
+        return _MemoryResponse()
+
+
+async def _run(requests: int, body_mode: str) -> float:
+    """执行指定次数的请求，返回每次请求的平均耗时（微秒）"""
+    client = HTTPClient(max_retries=0, body_mode=body_mode)
+    client._session = _MemorySession()
+    payload = {"username": "bench", "password": "secret"}
+
+    # 预热
+    for _ in range(1000):
+        async with client.post("/api/users/1", data=payload) as response:
+            assert response.status == 200
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        async with client.post("/api/users/1", data=payload) as response:
+            assert response.status == 200
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="HTTPClient 请求热路径框架开销基准")
+    parser.add_argument("--requests", type=int, default=50000, help="每个场景的请求次数")
+    parser.add_argument("--body-mode", default="full", choices=BODY_MODES, help="响应体处理模式")
+    args = parser.parse_args()
+
+    # 日志输出到空设备，只测量格式化与处理开销
+    devnull = open(os.devnull, "w")
+    for handler in logger.handlers:
+        if isinstance(handler, logging.StreamHandler):
+            handler.setStream(devnull)
+
+    for level in (logging.INFO, logging.DEBUG):
+        logger.setLevel(level)
+        per_request = asyncio.run(_run(args.requests, args.body_mode))
+        print(f"{logging.getLevelName(level):<5} body_mode={args.body_mode:<7} "
+              f"{per_request:8.2f} µs/请求")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# encoding: utf-8
+"""
+空闲虚拟用户内存基准
+
+通过 UserManager 启动指定数量的用户，用户任务停在 wait_time 等待中（空闲用户），
+用 tracemalloc 统计启动前后新增的内存，报告每个空闲用户占用的字节数。
+HttpUser 在 on_start 中创建 HTTP 会话，但不发起请求。
+
+运行方式：
+    python benchmarks/user_memory.py [--users 20000] [--kind user] [--shared-connector]
+"""
+
+import argparse
+import asyncio
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiotest.clients import close_shared_connectors, configure_connector  # noqa: E402
+from aiotest.user_manager import UserManager  # noqa: E402
+from aiotest.users import HttpUser, User  # noqa: E402
+
+
+class IdleUser(User):
+    """启动后一直停在 wait_time 等待中的用户"""
+
+    wait_time = 3600
+
+    async def test_idle(self):
+        pass
+
+
+class IdleHttpUser(HttpUser):
+    """创建 HTTP 会话后一直停在 wait_time 等待中的用户"""
+
+    host = "http://127.0.0.1:9"
+    wait_time = 3600
+
+    async def test_idle(self):
+        pass
+
+
+USER_KINDS = {"user": IdleUser, "http": IdleHttpUser}
+
+
+async def _run(users: int, user_class) -> float:
+    """启动空闲用户，返回每个用户新增的字节数"""
+    manager = UserManager([user_class], {})
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+
+    await manager.manage_users(users, 0, "start")
+    # 让所有用户任务运行到第一次 wait_time 等待
+    await asyncio.sleep(0.5)
+    gc.collect()
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    await manager.stop_all_users()
+    await close_shared_connectors()
+    return (after - before) / users
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="空闲虚拟用户内存基准")
+    parser.add_argument("--users", type=int, default=20000, help="启动的用户数")
+    parser.add_argument("--kind", default="user", choices=sorted(USER_KINDS), help="用户类型")
+    parser.add_argument("--shared-connector", action="store_true",
+                        help="HttpUser 共享进程级连接池（默认每个用户独占连接池）")
+    args = parser.parse_args()
+
+    configure_connector(shared=args.shared_connector)
+
+    per_user = asyncio.run(_run(args.users, USER_KINDS[args.kind]))
+    connector = "shared" if args.shared_connector else "per-user"
+    print(f"{args.kind:<4} users={args.users:<7} connector={connector:<8} "
+          f"{per_user:10.0f} 字节/空闲用户")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+# encoding: utf-8
+
+import asyncio
+import time
+
+import allure
+import pytest
+
+from aiotest.arrival_executor import ArrivalRateExecutor
+from aiotest.clients import schedule_lag
+from aiotest.user_manager import UserManager
+from aiotest.users import User
+
+
+# 测试用的用户类
+class FastUser(User):
+    """迭代耗时很短的用户类"""
+
+    async def test_task(self):
+        await asyncio.sleep(0.001)
+
+
+class LagRecordingUser(User):
+    """记录每次迭代计划延迟的用户类"""
+
+    lags = []
+
+    async def test_task(self):
+        self.lags.append(schedule_lag.get())
+
+
+class SlowUser(User):
+    """迭代耗时较长的用户类"""
+
+    async def test_task(self):
+        await asyncio.sleep(0.5)
+
+
+@pytest.fixture
+async def fast_executor():
+    """快速用户的执行器，测试结束后停止"""
+    executor = ArrivalRateExecutor(UserManager([FastUser], {}))
+    yield executor
+    await executor.stop()
+
+
+@pytest.fixture
+async def slow_executor():
+    """慢速用户的执行器，测试结束后停止"""
+    executor = ArrivalRateExecutor(UserManager([SlowUser], {}))
+    yield executor
+    await executor.stop()
+
+
+@allure.feature("ArrivalRateExecutor")
+class TestArrivalRateExecutor:
+    """ArrivalRateExecutor 类的测试用例"""
+
+    @allure.story("派发")
+    @allure.title("测试按固定到达率派发迭代")
+    @allure.severity(allure.severity_level.CRITICAL)
+    async def test_rate_accuracy(self, fast_executor):
+        """测试派发次数与到达率和运行时长一致"""
+        await fast_executor.apply(pool_size=10, rate=100.0)
+        await asyncio.sleep(0.5)
+
+        stats = fast_executor.get_stats()
+        assert 45 <= stats["arrival_scheduled"] <= 56
+        assert stats["arrival_dropped"] == 0
+        assert stats["arrival_completed"] >= stats["arrival_scheduled"] - 2
+
+    @allure.story("派发")
+    @allure.title("测试按计划时刻开始派发")
+    @allure.severity(allure.severity_level.NORMAL)
+    async def test_start_at(self, fast_executor):
+        """测试时间表以计划时刻为起点，之前不派发迭代"""
+        loop = asyncio.get_running_loop()
+        await fast_executor.apply(pool_size=10, rate=100.0, start_at=loop.time() + 0.3)
+        await asyncio.sleep(0.2)
+        assert fast_executor.get_stats()["arrival_scheduled"] == 0
+
+        await asyncio.sleep(0.3)
+        assert 15 <= fast_executor.get_stats()["arrival_scheduled"] <= 26
+
+    @allure.story("派发")
+    @allure.title("测试用户池耗尽时丢弃迭代")
+    @allure.severity(allure.severity_level.CRITICAL)
+    async def test_drop_when_pool_exhausted(self, slow_executor):
+        """测试迭代耗时超过池容量时，多余迭代被丢弃而不是排队"""
+        await slow_executor.apply(pool_size=2, rate=50.0)
+        await asyncio.sleep(0.2)
+
+        stats = slow_executor.get_stats()
+        assert stats["arrival_busy"] == 2
+        assert stats["arrival_dropped"] == stats["arrival_scheduled"] - 2
+        assert stats["arrival_dropped"] > 0
+
+    @allure.story("派发")
+    @allure.title("测试事件循环阻塞时记录迟到并补派")
+    @allure.severity(allure.severity_level.NORMAL)
+    async def test_late_dispatch_catch_up(self, fast_executor):
+        """测试事件循环被阻塞后补派到期迭代并计为迟到"""
+        await fast_executor.apply(pool_size=50, rate=100.0)
+        await asyncio.sleep(0.05)
+        time.sleep(0.2)  # 故意阻塞事件循环
+        await asyncio.sleep(0.01)
+
+        stats = fast_executor.get_stats()
+        assert stats["arrival_late"] >= 15
+        assert stats["arrival_scheduled"] >= 25
+
+    @allure.story("派发")
+    @allure.title("测试迭代内请求携带计划延迟")
+    @allure.severity(allure.severity_level.NORMAL)
+    async def test_iteration_schedule_lag(self):
+        """测试每次迭代以计划时间为基准设置 schedule_lag"""
+        LagRecordingUser.lags = []
+        executor = ArrivalRateExecutor(UserManager([LagRecordingUser], {}))
+        try:
+            await executor.apply(pool_size=2, rate=50.0)
+            await asyncio.sleep(0.1)
+        finally:
+            await executor.stop()
+
+        assert LagRecordingUser.lags
+        assert all(lag is not None and lag >= 0 for lag in LagRecordingUser.lags)
+        assert schedule_lag.get() is None
+
+    @allure.story("用户池")
+    @allure.title("测试用户池扩容与缩容")
+    @allure.severity(allure.severity_level.NORMAL)
+    async def test_resize_pool(self, fast_executor):
+        """测试调整用户池大小时创建或退役用户"""
+        await fast_executor.apply(pool_size=5, rate=0.0)
+        assert len(fast_executor._pool) == 5
+        assert len(fast_executor._idle) == 5
+
+        await fast_executor.apply(pool_size=2, rate=0.0)
+        assert len(fast_executor._pool) == 2
+        assert fast_executor.pool_size == 2
+
+    @allure.story("用户池")
+    @allure.title("测试忙碌用户完成迭代后退役")
+    @allure.severity(allure.severity_level.NORMAL)
+    async def test_shrink_retires_busy_users(self, slow_executor):
+        """测试缩容时忙碌用户在完成当前迭代后退役"""
+        await slow_executor.apply(pool_size=2, rate=50.0)
+        await asyncio.sleep(0.05)
+        assert slow_executor.busy_count == 2
+
+        await slow_executor.apply(pool_size=1, rate=0.0)
+        assert slow_executor._retire_count == 1
+        await asyncio.sleep(0.6)
+        assert len(slow_executor._pool) == 1
+        assert slow_executor._retire_count == 0
+
+    @allure.story("控制")
+    @allure.title("测试暂停与恢复派发")
+    @allure.severity(allure.severity_level.NORMAL)
+    async def test_pause_resume(self, fast_executor):
+        """测试暂停期间不派发迭代"""
+        await fast_executor.apply(pool_size=5, rate=100.0)
+        fast_executor.pause()
+        await asyncio.sleep(0.01)
+        scheduled = fast_executor.scheduled
+        await asyncio.sleep(0.2)
+        assert fast_executor.scheduled == scheduled
+
+        fast_executor.resume()
+        await asyncio.sleep(0.25)
+        assert fast_executor.scheduled > scheduled
+
+    @allure.story("控制")
+    @allure.title("测试停止执行器")
+    @allure.severity(allure.severity_level.CRITICAL)
+    async def test_stop(self, slow_executor):
+        """测试停止时取消进行中的迭代并清空用户池"""
+        await slow_executor.apply(pool_size=3, rate=50.0)
+        await asyncio.sleep(0.05)
+
+        await slow_executor.stop()
+        assert slow_executor._pool == []
+        assert len(slow_executor._inflight) == 0
+        assert slow_executor._scheduler_task is None
+        assert slow_executor.get_stats()["arrival_rate"] == 0.0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
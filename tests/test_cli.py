@@ -31,6 +31,14 @@ class TestParseOptions:
         assert options.master is False
         assert options.worker is False
         assert options.expect_workers == 1
+        assert options.worker_capacity == 1.0
+        assert options.aggregator is False
+        assert options.aggregator_group is None
+        assert options.coordinator == "redis"
+        assert options.master_host == "127.0.0.1"
+        assert options.master_bind_host == "0.0.0.0"
+        assert options.master_port == 5557
+        assert options.processes == 1
         assert options.loglevel == "INFO"
         assert options.logfile is None
         assert options.prometheus_port == 8089
@@ -1,10 +1,19 @@
 # encoding: utf-8
 
+import logging
+
 import allure
 import pytest
 
-from aiotest import HTTPClient, configure_connector
-from aiotest.clients import CONNECTOR_SETTINGS, ResponseContextManager
+from aiotest import HTTPClient, configure_connector, configure_request_logging
+from aiotest.clients import (
+    CONNECTOR_SETTINGS,
+    REQUEST_LOG_SETTINGS,
+    ResponseContextManager,
+    close_shared_connectors,
+    schedule_lag,
+)
+from aiotest.logger import logger
 from aiotest.metrics import RequestMetrics
 
 
@@ -241,6 +250,42 @@ class TestHTTPClient:
         # 这里主要测试方法是否能正常执行，不抛出异常
         assert True
 
+    @allure.story("日志记录")
+    @allure.title("测试未开启请求明细日志时跳过脱敏")
+    @allure.severity(allure.severity_level.CRITICAL)
+    async def test_request_logging_fast_path(self, http_client, monkeypatch):
+        """测试 INFO 级别下不做脱敏和日志记录，开启采样后记录请求明细"""
+        sanitized = []
+        monkeypatch.setattr(
+            http_client, "_sanitize_headers", lambda headers: sanitized.append(headers) or headers)
+        original_level = logger.level
+        logger.setLevel(logging.INFO)
+        try:
+            async with http_client.get("/") as first:
+                assert first.log_level is None
+            async with http_client.get("/") as second:
+                pass
+            assert first.log.extra is None
+            assert sanitized == []
+
+            configure_request_logging(sample_rate=1.0)
+            async with http_client.get("/") as sampled:
+                assert sampled.log_level == logging.INFO
+            assert "headers" in sampled.log.extra
+            assert "response_data" in sampled.log.extra
+            assert len(sanitized) == 1
+        finally:
+            configure_request_logging(sample_rate=0.0)
+            logger.setLevel(original_level)
+
+        # 请求 ID 由进程前缀和递增计数组成
+        prefix, number = first.log.request_id.rsplit("-", 1)
+        assert second.log.request_id == f"{prefix}-{int(number) + 1}"
+
+        with pytest.raises(ValueError):
+            configure_request_logging(sample_rate=1.5)
+        assert REQUEST_LOG_SETTINGS["sample_rate"] == 0.0
+
     @allure.story("HTTP 请求")
     @allure.title("测试 request 方法的完整逻辑")
     @allure.severity(allure.severity_level.CRITICAL)
@@ -305,16 +350,6 @@ class TestResponseContextManager:
             json_data = await response.json()
             assert json_data == {"message": "Hello, HTTP!"}
 
-    @allure.story("数据处理")
-    @allure.title("测试 _estimate_size 方法")
-    @allure.severity(allure.severity_level.NORMAL)
-    def test_estimate_size(self):
-        assert ResponseContextManager._estimate_size(None) == 0
-        assert ResponseContextManager._estimate_size("test") == 4
-        assert ResponseContextManager._estimate_size({"key": "value"}) == 16
-        assert ResponseContextManager._estimate_size([1, 2, 3]) == 9
-        assert ResponseContextManager._estimate_size(b"bytes") == 8
-
     @allure.story("数据处理")
     @allure.title("测试 _safe_get_headers 方法")
     @allure.severity(allure.severity_level.NORMAL)
@@ -385,25 +420,6 @@ class TestResponseContextManager:
                 # 如果发生异常，确保客户端仍然可用
                 pass
 
-    @allure.story("数据处理")
-    @allure.title("测试 _estimate_size 方法的边界情况")
-    @allure.severity(allure.severity_level.NORMAL)
-    def test_estimate_size_boundary(self):
-        """测试 _estimate_size 方法的边界情况"""
-        # 测试空值
-        assert ResponseContextManager._estimate_size(None) == 0
-        # 测试空字符串
-        assert ResponseContextManager._estimate_size("") == 0
-        # 测试空字典（转换为字符串后为"{}"，编码后长度为2）
-        assert ResponseContextManager._estimate_size({}) == 2
-        # 测试空列表（转换为字符串后为"[]"，编码后长度为2）
-        assert ResponseContextManager._estimate_size([]) == 2
-        # 测试字节串（str(b"test") = "b'test'"，编码后长度为7）
-        assert ResponseContextManager._estimate_size(b"test") == 7
-        # 测试嵌套字典
-        nested_dict = {"key": {"nested": "value"}}
-        assert ResponseContextManager._estimate_size(nested_dict) > 0
-
     @allure.story("错误处理")
     @allure.title("测试错误处理功能")
     @allure.severity(allure.severity_level.NORMAL)
@@ -538,6 +554,92 @@ class TestResponseContextManager:
             assert isinstance(headers, dict)
             assert "Content-Type" in headers
 
+    @allure.story("协调遗漏校正")
+    @allure.title("测试按计划开始时间记录校正耗时")
+    @allure.severity(allure.severity_level.CRITICAL)
+    async def test_corrected_duration(self, http_client):
+        """测试设置 schedule_lag 后，校正耗时 = 原始耗时 + 计划延迟；未设置时为 None"""
+        recorded = []
+
+        async def capture_metrics(**kwargs):
+            recorded.append(kwargs)
+
+        http_client._record_request_metrics = capture_metrics
+
+        async with http_client.get("/") as response:
+            assert response.status == 200
+
+        token = schedule_lag.set(0.5)
+        try:
+            async with http_client.get("/") as response:
+                assert response.status == 200
+        finally:
+            schedule_lag.reset(token)
+
+        assert recorded[0]["corrected_duration"] is None
+        assert recorded[1]["corrected_duration"] == pytest.approx(
+            recorded[1]["duration"] + 0.5)
+
+    @allure.story("响应体处理模式")
+    @allure.title("测试各模式的响应大小均为实际接收字节数")
+    @allure.severity(allure.severity_level.CRITICAL)
+    @pytest.mark.parametrize("body_mode", ["full", "lazy", "bytes", "discard", "stream"])
+    async def test_body_mode_response_size(self, http_client, body_mode):
+        """测试响应大小取自实际接收的字节数，而不是解析结果重新序列化的长度"""
+        recorded = []
+
+        async def capture_metrics(**kwargs):
+            recorded.append(kwargs)
+
+        http_client._record_request_metrics = capture_metrics
+        async with http_client.get("/", body_mode=body_mode) as response:
+            assert response.status == 200
+            if body_mode == "stream":
+                chunks = [chunk async for chunk in response.iter_chunked(8)]
+                assert b"".join(chunks) == b'{"message": "Hello, HTTP!"}'
+
+        assert recorded[0]["response_size"] == len(b'{"message": "Hello, HTTP!"}')
+
+    @allure.story("响应体处理模式")
+    @allure.title("测试 lazy 模式按需解析")
+    @allure.severity(allure.severity_level.NORMAL)
+    async def test_lazy_body_mode(self, http_client):
+        """测试 lazy 模式只保存原始字节，json() 首次调用时解析，响应头首次访问时复制"""
+        async with http_client.get("/", body_mode="lazy") as response:
+            assert response._processed_data["data"] == b'{"message": "Hello, HTTP!"}'
+            assert response._processed_data["headers"] is None
+            assert response._parsed is None
+
+            assert await response.json() == {"message": "Hello, HTTP!"}
+            assert response._parsed == {"message": "Hello, HTTP!"}
+            assert "Content-Type" in response.headers
+            assert await response.text() == '{"message": "Hello, HTTP!"}'
+
+    @allure.story("响应体处理模式")
+    @allure.title("测试 bytes 与 discard 模式")
+    @allure.severity(allure.severity_level.NORMAL)
+    async def test_bytes_and_discard_body_mode(self):
+        """测试客户端级 bytes 模式返回原始字节，单个请求可覆盖为 discard 模式"""
+        async with HTTPClient(base_url="http://localhost:8080", body_mode="bytes") as client:
+            async with client.get("/text") as response:
+                assert await response.read() == b"This is plain text response"
+                assert await response.json() == "This is plain text response"
+
+            async with client.get("/text", body_mode="discard") as response:
+                assert response.status == 200
+                assert await response.read() == b""
+                assert await response.json() is None
+
+    @allure.story("响应体处理模式")
+    @allure.title("测试无效的响应体处理模式")
+    @allure.severity(allure.severity_level.NORMAL)
+    async def test_invalid_body_mode(self, http_client):
+        """测试客户端和单个请求传入无效模式时抛出 ValueError"""
+        with pytest.raises(ValueError):
+            HTTPClient(body_mode="unknown")
+        with pytest.raises(ValueError):
+            http_client.get("/", body_mode="unknown")
+
     @allure.story("错误处理")
     @allure.title("测试 _handle_error 方法的重复错误处理检查")
     @allure.severity(allure.severity_level.NORMAL)
@@ -780,6 +882,51 @@ class TestResponseContextManager:
                 force_close=False,
                 enable_cleanup_closed=True)
 
+    @allure.story("共享连接池")
+    @allure.title("测试共享模式下客户端复用同一连接池")
+    @allure.severity(allure.severity_level.CRITICAL)
+    async def test_shared_connector(self):
+        """测试共享模式下多个客户端共用连接池，而 Cookie 仍相互隔离"""
+        configure_connector(shared=True)
+        try:
+            first = HTTPClient(base_url="http://localhost:8080")
+            second = HTTPClient(base_url="http://localhost:8080")
+            await first.__aenter__()
+            await second.__aenter__()
+
+            assert first._connector is second._connector
+            assert first._session.cookie_jar is not second._session.cookie_jar
+
+            async with first.get("/cookies") as response:
+                assert response.status == 200
+            assert len(first._session.cookie_jar) == 2
+            assert len(second._session.cookie_jar) == 0
+
+            # 关闭单个客户端不会关闭共享连接池
+            await first.close()
+            assert not second._connector.closed
+            async with second.get("/") as response:
+                assert response.status == 200
+            await second.close()
+
+            connector = second._connector
+            await close_shared_connectors()
+            assert connector.closed
+        finally:
+            configure_connector(shared=False)
+            await close_shared_connectors()
+
+    @allure.story("共享连接池")
+    @allure.title("测试默认模式下客户端独占连接池")
+    @allure.severity(allure.severity_level.NORMAL)
+    async def test_exclusive_connector_by_default(self):
+        """测试未开启共享模式时，每个客户端创建并关闭自己的连接池"""
+        assert CONNECTOR_SETTINGS['shared'] is False
+        async with HTTPClient(base_url="http://localhost:8080") as first, \
+                HTTPClient(base_url="http://localhost:8080") as second:
+            assert first._connector is not second._connector
+        assert first._connector.closed
+
     @allure.story("会话管理")
     @allure.title("测试会话关闭超时")
     @allure.severity(allure.severity_level.NORMAL)
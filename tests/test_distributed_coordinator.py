@@ -1,15 +1,175 @@
 # encoding: utf-8
 
 import asyncio
+import time
 
 import allure
 import pytest
 
+from redis.exceptions import ResponseError
+
 from aiotest.distributed_coordinator import (HEARTBEAT_INTERVAL,
                                              HEARTBEAT_LIVENESS,
+                                             HEARTBEAT_REGISTRY_KEY,
+                                             HEARTBEAT_TTL,
                                              MAX_BATCH_SIZE,
+                                             METRICS_DEAD_LETTER_KEY,
+                                             METRICS_STREAM_CONSUMER,
+                                             METRICS_STREAM_GROUP,
+                                             METRICS_STREAM_KEY,
+                                             METRICS_TRANSPORT_STREAM,
                                              DistributedCoordinator,
                                              DistributedLock, RedisConnection)
+from aiotest.exception import MetricsBackpressureError, MetricsPublishError
+from aiotest.metrics_codec import (WIRE_BINARY, WIRE_JSON, MetricsBatch,
+                                   decode_metrics_message)
+
+
+class MemoryRedis:
+    """
+    内存 Redis，支持 get/set/publish、单消费组的 Stream 命令、心跳相关的
+    hash/有序集合命令与流水线，用于编码协商、Stream 传输与心跳注册表测试
+    """
+
+    def __init__(self):
+        self.values = {}
+        self.published = []
+        self.streams = {}     # key -> [(entry_id, fields)]
+        self.groups = {}      # (key, group) -> {"delivered": 最后投递的序号, "pending": {entry_id: consumer}}
+        self.hashes = {}
+        self.zsets = {}
+        self.skew = -30.0        # 服务器时间与本地时间之差
+        self.legacy_parser = False  # 模拟较旧的 redis-py：解析已删除的未确认消息时抛出 TypeError
+        self.round_trips = 0     # 流水线按一次往返计
+        self._sequence = 0
+
+    def pipeline(self, transaction=True):
+        return MemoryPipeline(self)
+
+    async def time(self):
+        now = time.time() + self.skew
+        return [int(now), int(round(now % 1 * 1_000_000))]
+
+    async def hset(self, key, mapping):
+        self.hashes.setdefault(key, {}).update({k: str(v) for k, v in mapping.items()})
+
+    async def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    async def expire(self, key, seconds):
+        return key in self.hashes
+
+    async def zadd(self, key, mapping):
+        self.zsets.setdefault(key, {}).update(mapping)
+
+    async def zscore(self, key, member):
+        return self.zsets.get(key, {}).get(member)
+
+    async def zrange(self, key, start, end, withscores=False):
+        items = sorted(self.zsets.get(key, {}).items(), key=lambda item: item[1])
+        return items if withscores else [member for member, _ in items]
+
+    async def zremrangebyscore(self, key, min, max):
+        bound = float(max.lstrip("("))
+        zset = self.zsets.get(key, {})
+        removed = [m for m, score in zset.items() if score < bound]
+        for member in removed:
+            del zset[member]
+        return len(removed)
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def set(self, key, value):
+        self.values[key] = value
+
+    async def publish(self, channel, message):
+        self.published.append((channel, message))
+
+    async def xadd(self, key, fields, maxlen=None, approximate=True):
+        self._sequence += 1
+        entry_id = f"{self._sequence}-0"
+        entries = self.streams.setdefault(key, [])
+        entries.append((entry_id, dict(fields)))
+        if maxlen is not None and len(entries) > maxlen:
+            del entries[:len(entries) - maxlen]
+        return entry_id
+
+    async def xlen(self, key):
+        return len(self.streams.get(key, []))
+
+    async def xgroup_create(self, key, group, id="$", mkstream=False):
+        if (key, group) in self.groups:
+            raise ResponseError("BUSYGROUP Consumer Group name already exists")
+        self.streams.setdefault(key, [])
+        self.groups[(key, group)] = {"delivered": 0, "pending": {}}
+
+    async def xreadgroup(self, group, consumer, streams, count=None, block=None):
+        (key, stream_id), = streams.items()
+        state = self.groups[(key, group)]
+        entries = self.streams[key]
+        if stream_id == ">":
+            fresh = [e for e in entries if int(e[0].split("-")[0]) > state["delivered"]][:count]
+            if not fresh:
+                await asyncio.sleep(0.01)
+                return []
+            for entry_id, _ in fresh:
+                state["pending"][entry_id] = consumer
+            state["delivered"] = int(fresh[-1][0].split("-")[0])
+            return [[key, fresh]]
+        # 未确认但已被裁剪删除的消息，Redis 返回 [id, nil]
+        fields_by_id = dict(entries)
+        pending = [(entry_id, fields_by_id.get(entry_id))
+                   for entry_id, owner in sorted(state["pending"].items(),
+                                                 key=lambda item: int(item[0].split("-")[0]))
+                   if owner == consumer][:count]
+        if self.legacy_parser and any(fields is None for _, fields in pending):
+            raise TypeError("'NoneType' object is not iterable")
+        return [[key, pending]]
+
+    async def xpending_range(self, key, group, min, max, count, consumername=None):
+        pending = self.groups[(key, group)]["pending"]
+        return [{"message_id": entry_id, "consumer": owner}
+                for entry_id, owner in pending.items()
+                if consumername is None or owner == consumername][:count]
+
+    async def xrange(self, key, min="-", max="+"):
+        return [e for e in self.streams.get(key, []) if e[0] == min == max]
+
+    async def xack(self, key, group, *entry_ids):
+        pending = self.groups[(key, group)]["pending"]
+        for entry_id in entry_ids:
+            pending.pop(entry_id, None)
+        return len(entry_ids)
+
+    async def xinfo_groups(self, key):
+        if key not in self.streams:
+            raise ResponseError("no such key")
+        result = []
+        for (stream_key, name), state in self.groups.items():
+            if stream_key == key:
+                lag = sum(1 for e in self.streams[key]
+                          if int(e[0].split("-")[0]) > state["delivered"])
+                result.append({"name": name, "pending": len(state["pending"]), "lag": lag})
+        return result
+
+
+class MemoryPipeline:
+    """MemoryRedis 的流水线，execute 时按顺序执行排队的命令"""
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.commands.append((getattr(self.redis, name), args, kwargs))
+            return self
+        return queue
+
+    async def execute(self):
+        self.redis.round_trips += 1
+        return [await command(*args, **kwargs) for command, args, kwargs in self.commands]
 
 
 @allure.feature("RedisConnection")
@@ -290,6 +450,269 @@ class TestDistributedCoordinator:
         # 验证发布成功
         assert True
 
+    @allure.story("编码协商")
+    @allure.title("测试 Master 通告后 Worker 使用二进制编码")
+    @allure.severity(allure.severity_level.CRITICAL)
+    async def test_request_metrics_encoding_negotiation(self):
+        """测试 Master 通告前使用 JSON，通告后按二进制编码分块发布"""
+        redis = MemoryRedis()
+        worker = DistributedCoordinator(redis, role="worker", node_id="worker_1")
+        records = [{"method": "GET", "endpoint": "/test", "status_code": 200,
+                    "duration": 0.1, "response_size": 10}] * (MAX_BATCH_SIZE + 1)
+
+        await worker.publish("request_metrics", records[:1], worker_id="worker_1")
+        assert decode_metrics_message(redis.published[-1][1])["batch"] == records[:1]
+
+        await DistributedCoordinator(redis, role="master").advertise_metrics_encodings()
+        redis.published.clear()
+        await worker.publish("request_metrics", records, worker_id="worker_1")
+
+        assert len(redis.published) == 2
+        messages = [decode_metrics_message(payload) for _, payload in redis.published]
+        assert all(isinstance(m["batch"], MetricsBatch) for m in messages)
+        assert [m["chunk_index"] for m in messages] == [0, 1]
+        assert sum(len(m["batch"]) for m in messages) == len(records)
+
+    @allure.story("发布")
+    @allure.title("测试分块发送中途失败时报告已送达条数")
+    @allure.severity(allure.severity_level.CRITICAL)
+    @pytest.mark.parametrize("advertise", [False, True])
+    async def test_publish_request_metrics_partial_failure(self, advertise):
+        """测试后续分块失败时抛出 MetricsPublishError 并报告已送达条数，首块失败时原样抛出"""
+        redis = MemoryRedis()
+        if advertise:
+            await DistributedCoordinator(redis, role="master").advertise_metrics_encodings()
+        worker = DistributedCoordinator(redis, role="worker", node_id="worker_1")
+        records = [{"method": "GET", "endpoint": "/test", "status_code": 200,
+                    "duration": 0.1, "response_size": 10}] * (MAX_BATCH_SIZE * 2 + 1)
+        publish = redis.publish
+
+        async def flaky_publish(channel, message):
+            if len(redis.published) == 2:
+                raise ConnectionError("redis down")
+            await publish(channel, message)
+
+        redis.publish = flaky_publish
+        with pytest.raises(MetricsPublishError) as exc_info:
+            await worker.publish("request_metrics", records, worker_id="worker_1")
+        assert exc_info.value.sent == MAX_BATCH_SIZE * 2
+        assert isinstance(exc_info.value.__cause__, ConnectionError)
+
+        with pytest.raises(ConnectionError):
+            await worker.publish("request_metrics", records, worker_id="worker_1")
+
+    @allure.story("编码协商")
+    @allure.title("测试 Worker 指定 JSON 编码")
+    @allure.severity(allure.severity_level.NORMAL)
+    async def test_request_metrics_encoding_json(self):
+        """测试 Worker 指定 JSON 时即使 Master 支持二进制也使用 JSON"""
+        redis = MemoryRedis()
+        await DistributedCoordinator(redis, role="master").advertise_metrics_encodings()
+        worker = DistributedCoordinator(
+            redis, role="worker", node_id="worker_1", metrics_encoding=WIRE_JSON)
+
+        await worker.publish("request_metrics", [{"method": "GET"}], worker_id="worker_1")
+        assert redis.published[-1][1].startswith("{")
+        assert worker._negotiated_encoding == WIRE_JSON
+        assert worker.metrics_encoding != WIRE_BINARY
+
+    @allure.story("Stream 传输")
+    @allure.title("测试无效的指标传输方式")
+    @allure.severity(allure.severity_level.NORMAL)
+    def test_invalid_metrics_transport(self):
+        """测试指标传输方式不是 pubsub/stream 时抛出异常"""
+        with pytest.raises(ValueError):
+            DistributedCoordinator(None, role="worker", metrics_transport="kafka")
+
+    @allure.story("Stream 传输")
+    @allure.title("测试 Stream 传输读取并确认指标")
+    @allure.severity(allure.severity_level.CRITICAL)
+    async def test_stream_transport_round_trip(self):
+        """测试 Master 启动前写入的指标在启动后被读取，处理后确认"""
+        redis = MemoryRedis()
+        worker = DistributedCoordinator(
+            redis, role="worker", node_id="worker_1", metrics_transport=METRICS_TRANSPORT_STREAM)
+        master = DistributedCoordinator(
+            redis, role="master", metrics_transport=METRICS_TRANSPORT_STREAM)
+
+        await worker.publish("request_metrics", [{"method": "GET"}], worker_id="worker_1")
+        await worker.publish("request_aggregates", [{"count": 3}], worker_id="worker_1")
+        assert redis.published == []
+        assert await worker.get_stream_lag() == 2
+
+        batches, aggregates = [], []
+
+        async def on_batch(batch, worker_id):
+            batches.append((batch, worker_id))
+
+        async def on_aggregates(records, worker_id):
+            aggregates.append(records)
+
+        task = asyncio.create_task(master.listen_request_metrics(
+            aggregate_callback=on_aggregates, batch_callback=on_batch))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        assert batches == [([{"method": "GET"}], "worker_1")]
+        assert aggregates == [[{"count": 3}]]
+        assert await worker.get_stream_lag() == 0
+
+    @allure.story("Stream 传输")
+    @allure.title("测试 Master 重启后处理未确认的指标")
+    @allure.severity(allure.severity_level.CRITICAL)
+    async def test_stream_transport_redelivers_pending(self):
+        """测试已投递但未确认的消息在 Master 重启后重新处理"""
+        redis = MemoryRedis()
+        worker = DistributedCoordinator(
+            redis, role="worker", node_id="worker_1", metrics_transport=METRICS_TRANSPORT_STREAM)
+        master = DistributedCoordinator(
+            redis, role="master", metrics_transport=METRICS_TRANSPORT_STREAM)
+        await master._ensure_metrics_group()
+        await worker.publish("request_metrics", [{"method": "POST"}], worker_id="worker_1")
+
+        # 模拟 Master 读取后未确认即退出
+        await redis.xreadgroup(METRICS_STREAM_GROUP, METRICS_STREAM_CONSUMER,
+                               {METRICS_STREAM_KEY: ">"}, count=10)
+        assert await worker.get_stream_lag() == 1
+
+        received = []
+
+        async def on_batch(batch, worker_id):
+            received.extend(batch)
+
+        task = asyncio.create_task(master.listen_request_metrics(batch_callback=on_batch))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        assert received == [{"method": "POST"}]
+        assert await worker.get_stream_lag() == 0
+
+    @allure.story("Stream 传输")
+    @allure.title("测试处理失败的指标不确认并重试")
+    @allure.severity(allure.severity_level.CRITICAL)
+    async def test_stream_transport_retries_failed_batch(self):
+        """测试回调失败的消息保持未确认并重新处理，成功后才确认"""
+        redis = MemoryRedis()
+        worker = DistributedCoordinator(
+            redis, role="worker", node_id="worker_1", metrics_transport=METRICS_TRANSPORT_STREAM)
+        master = DistributedCoordinator(
+            redis, role="master", metrics_transport=METRICS_TRANSPORT_STREAM)
+        await worker.publish("request_metrics", [{"method": "GET"}], worker_id="worker_1")
+
+        calls, received = [], []
+
+        async def on_batch(batch, worker_id):
+            calls.append(batch)
+            if len(calls) == 1:
+                raise RuntimeError("ingest failed")
+            received.extend(batch)
+
+        task = asyncio.create_task(master.listen_request_metrics(batch_callback=on_batch))
+        await asyncio.sleep(0.3)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        assert len(calls) == 2
+        assert received == [{"method": "GET"}]
+        assert redis.groups[(METRICS_STREAM_KEY, METRICS_STREAM_GROUP)]["pending"] == {}
+        assert METRICS_DEAD_LETTER_KEY not in redis.streams
+
+    @allure.story("Stream 传输")
+    @allure.title("测试多次处理失败的指标转入死信 Stream")
+    @allure.severity(allure.severity_level.CRITICAL)
+    async def test_stream_transport_dead_letters_failed_batch(self):
+        """测试始终处理失败的消息在达到最大尝试次数后转入死信 Stream 并确认，后续消息继续处理"""
+        redis = MemoryRedis()
+        worker = DistributedCoordinator(
+            redis, role="worker", node_id="worker_1", metrics_transport=METRICS_TRANSPORT_STREAM)
+        master = DistributedCoordinator(
+            redis, role="master", metrics_transport=METRICS_TRANSPORT_STREAM)
+        await worker.publish("request_metrics", [{"method": "BAD"}], worker_id="worker_1")
+        await worker.publish("request_metrics", [{"method": "GET"}], worker_id="worker_1")
+
+        calls, received = [], []
+
+        async def on_batch(batch, worker_id):
+            calls.append(batch)
+            if batch[0]["method"] == "BAD":
+                raise RuntimeError("ingest failed")
+            received.extend(batch)
+
+        task = asyncio.create_task(master.listen_request_metrics(batch_callback=on_batch))
+        await asyncio.sleep(0.5)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        assert calls.count([{"method": "BAD"}]) == 3
+        assert received == [{"method": "GET"}]
+        assert redis.groups[(METRICS_STREAM_KEY, METRICS_STREAM_GROUP)]["pending"] == {}
+        (_, dead_fields), = redis.streams[METRICS_DEAD_LETTER_KEY]
+        assert dead_fields["entry_id"] == "1-0"
+        assert dead_fields["attempts"] == 3
+        assert decode_metrics_message(dead_fields["data"])["batch"] == [{"method": "BAD"}]
+
+    @allure.story("Stream 传输")
+    @allure.title("测试跳过已被裁剪删除的未确认指标")
+    @allure.severity(allure.severity_level.CRITICAL)
+    @pytest.mark.parametrize("legacy_parser", [False, True])
+    async def test_stream_transport_skips_trimmed_pending(self, legacy_parser):
+        """测试未确认期间被 maxlen 裁剪的消息被确认跳过，Master 继续读取新消息"""
+        redis = MemoryRedis()
+        redis.legacy_parser = legacy_parser
+        worker = DistributedCoordinator(
+            redis, role="worker", node_id="worker_1", metrics_transport=METRICS_TRANSPORT_STREAM)
+        master = DistributedCoordinator(
+            redis, role="master", metrics_transport=METRICS_TRANSPORT_STREAM)
+        await master._ensure_metrics_group()
+        await worker.publish("request_metrics", [{"method": "OLD"}], worker_id="worker_1")
+
+        # 模拟 Master 读取后未确认即退出，期间消息被裁剪删除
+        await redis.xreadgroup(METRICS_STREAM_GROUP, METRICS_STREAM_CONSUMER,
+                               {METRICS_STREAM_KEY: ">"}, count=10)
+        redis.streams[METRICS_STREAM_KEY].clear()
+        await worker.publish("request_metrics", [{"method": "NEW"}], worker_id="worker_1")
+
+        received = []
+
+        async def on_batch(batch, worker_id):
+            received.extend(batch)
+
+        task = asyncio.create_task(master.listen_request_metrics(batch_callback=on_batch))
+        await asyncio.sleep(0.1)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        assert received == [{"method": "NEW"}]
+        assert redis.groups[(METRICS_STREAM_KEY, METRICS_STREAM_GROUP)]["pending"] == {}
+
+    @allure.story("Stream 传输")
+    @allure.title("测试消费滞后时 Worker 暂缓发送")
+    @allure.severity(allure.severity_level.CRITICAL)
+    async def test_stream_transport_backpressure(self):
+        """测试消费滞后达到 Stream 容量一半时拒绝发送，而不是被裁剪丢弃"""
+        redis = MemoryRedis()
+        worker = DistributedCoordinator(
+            redis, role="worker", node_id="worker_1",
+            metrics_transport=METRICS_TRANSPORT_STREAM, stream_maxlen=4)
+
+        for _ in range(2):
+            worker._lag_checked_at = float("-inf")
+            await worker.publish("request_metrics", [{"method": "GET"}], worker_id="worker_1")
+
+        worker._lag_checked_at = float("-inf")
+        with pytest.raises(MetricsBackpressureError) as exc_info:
+            await worker.publish("request_metrics", [{"method": "GET"}], worker_id="worker_1")
+        assert exc_info.value.backlog == 2
+        assert worker.stream_lag == 2
+        assert await redis.xlen(METRICS_STREAM_KEY) == 2
+
     @allure.story("发布")
     @allure.title("测试发布命令缺少参数")
     @allure.severity(allure.severity_level.NORMAL)
@@ -403,6 +826,110 @@ class TestDistributedCoordinator:
         # 清理
         await redis_client.delete("aiotest:heartbeat:worker_1")
 
+    @allure.story("心跳检查")
+    @allure.title("测试心跳写入注册表并批量检查")
+    @allure.severity(allure.severity_level.CRITICAL)
+    async def test_batch_heartbeat_liveness(self, monkeypatch):
+        """测试每次心跳一次往返，批量检查的往返次数与 Worker 数量无关"""
+        clock = [1700000000.0]
+        monkeypatch.setattr(time, "time", lambda: clock[0])
+        redis = MemoryRedis()
+        workers = [DistributedCoordinator(redis, role="worker", node_id=f"worker_{i}")
+                   for i in range(50)]
+        for worker in workers:
+            await worker.publish("heartbeat", {"cpu_percent": 45.0})
+        assert redis.round_trips == 50
+        assert redis.hashes["aiotest:heartbeat:worker_0"]["cpu_percent"] == "45.0"
+        assert set(redis.zsets[HEARTBEAT_REGISTRY_KEY]) == {f"worker_{i}" for i in range(50)}
+
+        master = DistributedCoordinator(redis, role="master")
+        redis.round_trips = 0
+        liveness = await master.check_workers_heartbeat(
+            [f"worker_{i}" for i in range(50)] + ["worker_unknown"])
+        assert redis.round_trips == 1
+        assert all(liveness[f"worker_{i}"] for i in range(50))
+        assert liveness["worker_unknown"] is False
+
+        # 超过存活窗口后只有重新发送心跳的 Worker 存活
+        clock[0] += HEARTBEAT_INTERVAL * HEARTBEAT_LIVENESS + 1
+        await workers[0].publish("heartbeat", {"cpu_percent": 50.0})
+        liveness = await master.check_workers_heartbeat(["worker_0", "worker_1"])
+        assert liveness == {"worker_0": True, "worker_1": False}
+        assert await master.check_workers_heartbeat([]) == {}
+
+    @allure.story("命名空间")
+    @allure.title("测试聚合分组使用独立的频道和键")
+    @allure.severity(allure.severity_level.NORMAL)
+    async def test_namespace_isolation(self):
+        """测试分组内的心跳只对同组的 Master（聚合节点）可见"""
+        redis = MemoryRedis()
+        grouped = DistributedCoordinator(redis, role="worker", node_id="worker_1", namespace="g1")
+        assert grouped.publish_channel == "aiotest:g1:command:worker_to_master"
+        assert grouped.metrics_stream_key == "aiotest:g1:metrics:stream"
+
+        await grouped.publish("heartbeat", {"cpu_percent": 10.0})
+        assert "aiotest:g1:heartbeat:worker_1" in redis.hashes
+        assert set(redis.zsets["aiotest:g1:heartbeats"]) == {"worker_1"}
+        assert HEARTBEAT_REGISTRY_KEY not in redis.zsets
+
+        aggregator = DistributedCoordinator(redis, role="master", namespace="g1")
+        master = DistributedCoordinator(redis, role="master")
+        assert await aggregator.check_workers_heartbeat(["worker_1"]) == {"worker_1": True}
+        assert await master.check_workers_heartbeat(["worker_1"]) == {"worker_1": False}
+
+    @allure.story("时钟同步")
+    @allure.title("测试同步 Redis 服务器时钟")
+    @allure.severity(allure.severity_level.NORMAL)
+    async def test_sync_clock(self):
+        """测试按服务器时间估算的时刻可换算为本地事件循环时间"""
+        redis = MemoryRedis()
+        coordinator = DistributedCoordinator(redis, role="worker", node_id="worker_1")
+        assert coordinator.clock_synced is False
+
+        rtt = await coordinator.sync_clock()
+        assert coordinator.clock_synced is True
+        assert rtt == coordinator.clock_rtt >= 0
+        assert coordinator.server_time() == pytest.approx(time.time() + redis.skew, abs=0.01)
+
+        loop = asyncio.get_running_loop()
+        loop_time = coordinator.server_to_loop_time(coordinator.server_time() + 2.0)
+        assert loop_time == pytest.approx(loop.time() + 2.0, abs=0.01)
+
+    @allure.story("监听")
+    @allure.title("测试轮询心跳注册表")
+    @allure.severity(allure.severity_level.CRITICAL)
+    async def test_poll_heartbeats(self, monkeypatch):
+        """测试只返回心跳时间有变化的 Worker，并清理过期的注册表成员"""
+        clock = [1700000000.0]
+        monkeypatch.setattr(time, "time", lambda: clock[0])
+        redis = MemoryRedis()
+        worker_1 = DistributedCoordinator(redis, role="worker", node_id="worker_1")
+        worker_2 = DistributedCoordinator(redis, role="worker", node_id="worker_2")
+        master = DistributedCoordinator(redis, role="master")
+        await worker_1.publish("heartbeat", {"active_users": 1})
+        await worker_2.publish("heartbeat", {"active_users": 2})
+
+        last_seen = {}
+        changed = await master._poll_heartbeats(last_seen)
+        assert set(changed) == {"worker_1", "worker_2"}
+        assert changed["worker_2"]["active_users"] == "2"
+        assert await master._poll_heartbeats(last_seen) == {}
+
+        clock[0] += 1
+        await worker_1.publish("heartbeat", {"active_users": 3})
+        redis.round_trips = 0
+        changed = await master._poll_heartbeats(last_seen)
+        assert redis.round_trips == 2
+        assert list(changed) == ["worker_1"]
+
+        # worker_2 停止发送心跳，超过过期时间后从注册表移除
+        clock[0] += HEARTBEAT_TTL + 1
+        await worker_1.publish("heartbeat", {"active_users": 3})
+        await master._poll_heartbeats(last_seen)
+        assert set(redis.zsets[HEARTBEAT_REGISTRY_KEY]) == {"worker_1"}
+        await master._poll_heartbeats(last_seen)
+        assert set(last_seen) == {"worker_1"}
+
     @allure.story("监听")
     @allure.title("测试监听命令")
     @allure.severity(allure.severity_level.NORMAL)
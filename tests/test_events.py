@@ -12,13 +12,14 @@ AioTest 事件系统测试模块
 - 事件触发和批量触发
 - 异常处理
 - 去重机制
+- 高频事件直接调用与按周期批量交付
 """
 
 import asyncio
 
 import pytest
 
-from aiotest.events import EventHook, Events
+from aiotest.events import BatchEventHook, EventHook, Events
 
 # ============================================================================
 # EventHook 基础功能测试
@@ -216,6 +217,25 @@ class TestEventHookHandlerTypes:
 
         assert called, "同步处理器应该被调用"
 
+    @pytest.mark.asyncio
+    async def test_sync_handler_called_once(self):
+        """测试同步处理器每次触发只被调用一次"""
+        event_hook = EventHook()
+        call_count = 0
+
+        def sync_handler(**kwargs):
+            nonlocal call_count
+            call_count += 1
+
+        async def async_handler(**kwargs):
+            pass
+
+        await event_hook.add_handler(sync_handler)
+        await event_hook.add_handler(async_handler)
+        await event_hook.fire()
+
+        assert call_count == 1, f"同步处理器应该只被调用一次，实际调用了 {call_count} 次"
+
     @pytest.mark.asyncio
     async def test_mixed_handlers(self):
         """测试混合同步和异步处理器"""
@@ -404,6 +424,130 @@ class TestEventHookBatchFire:
             await event_hook.fire_batch(events)
 
 
+# ============================================================================
+# BatchEventHook 高频事件测试
+# ============================================================================
+
+class TestBatchEventHook:
+    """测试高频事件的直接调用与批量交付"""
+
+    @pytest.mark.asyncio
+    async def test_direct_call_in_priority_order(self):
+        """测试普通处理器按优先级顺序直接调用，不创建任务"""
+        event_hook = BatchEventHook()
+        results = []
+
+        def sync_handler(**kwargs):
+            results.append(("sync", kwargs["value"]))
+
+        async def async_handler(**kwargs):
+            results.append(("async", kwargs["value"]))
+
+        await event_hook.add_handler(sync_handler, priority=0)
+        await event_hook.add_handler(async_handler, priority=10)
+
+        tasks_before = len(asyncio.all_tasks())
+        await event_hook.fire(value=1)
+
+        assert results == [("async", 1), ("sync", 1)], f"执行顺序错误, 实际: {results}"
+        assert len(asyncio.all_tasks()) == tasks_before, "直接调用不应该创建任务"
+
+    @pytest.mark.asyncio
+    async def test_batch_delivery_per_tick(self):
+        """测试同一事件循环周期内的事件合并后一次性交付"""
+        event_hook = BatchEventHook()
+        batches = []
+
+        await event_hook.add_batch_handler(batches.append)
+
+        for i in range(3):
+            await event_hook.fire(value=i)
+        assert batches == [], "批量处理器应该在下一个周期才被调用"
+
+        await asyncio.sleep(0)
+        assert batches == [[{"value": 0}, {"value": 1}, {"value": 2}]]
+
+        await event_hook.fire(value=3)
+        await asyncio.sleep(0)
+        assert len(batches) == 2 and batches[1] == [{"value": 3}]
+
+    @pytest.mark.asyncio
+    async def test_async_batch_handler_and_flush(self):
+        """测试异步批量处理器，flush 立即交付并等待处理完成"""
+        event_hook = BatchEventHook()
+        received = []
+
+        async def batch_handler(records):
+            await asyncio.sleep(0.01)
+            received.extend(records)
+
+        await event_hook.add_batch_handler(batch_handler)
+        await event_hook.fire(value=1)
+        await event_hook.fire(value=2)
+        await event_hook.flush()
+
+        assert received == [{"value": 1}, {"value": 2}]
+
+    @pytest.mark.asyncio
+    async def test_handler_errors_isolated(self):
+        """测试普通处理器和批量处理器的异常不影响其他处理器"""
+        event_hook = BatchEventHook()
+        results = []
+
+        def failing_handler(**kwargs):
+            raise ValueError("Test error")
+
+        def failing_batch_handler(records):
+            raise ValueError("Test error")
+
+        await event_hook.add_handler(failing_handler, priority=10)
+        await event_hook.add_handler(lambda **kwargs: results.append("normal"))
+        await event_hook.add_batch_handler(failing_batch_handler, priority=10)
+        await event_hook.add_batch_handler(lambda records: results.append(len(records)))
+
+        await event_hook.fire()
+        await event_hook.flush()
+
+        assert results == ["normal", 1]
+
+    @pytest.mark.asyncio
+    async def test_remove_batch_handler(self):
+        """测试移除批量处理器"""
+        event_hook = BatchEventHook()
+        batches = []
+
+        await event_hook.add_batch_handler(batches.append)
+        await event_hook.remove_handler(batches.append)
+        await event_hook.fire(value=1)
+        await event_hook.flush()
+
+        assert batches == []
+
+    @pytest.mark.asyncio
+    async def test_has_handlers(self):
+        """测试 has_handlers 同时考虑普通处理器和批量处理器"""
+        event_hook = BatchEventHook()
+        assert not event_hook.has_handlers
+
+        await event_hook.add_batch_handler(len)
+        assert event_hook.has_handlers
+
+        await event_hook.remove_handler(len)
+        assert not event_hook.has_handlers
+
+        plain_hook = EventHook()
+        await plain_hook.add_handler(len)
+        assert plain_hook.has_handlers
+
+    def test_register_hook_class(self):
+        """测试按指定类型注册事件钩子，request_metrics 为高频事件"""
+        from aiotest.events import request_metrics
+
+        events = Events()
+        assert isinstance(events.register("hot_event", BatchEventHook), BatchEventHook)
+        assert isinstance(request_metrics, BatchEventHook)
+
+
 # ============================================================================
 # Events 类测试
 # ============================================================================
@@ -4,7 +4,8 @@ import allure
 import pytest
 
 from aiotest.exception import (AioTestError, InvalidRateError,
-                               InvalidUserCountError, RunnerError,
+                               InvalidUserCountError, MetricsBackpressureError,
+                               MetricsPublishError, RunnerError,
                                create_exception)
 
 
@@ -177,6 +178,30 @@ class TestCreateException:
         assert error.error_code == "INVALID_RATE"
         assert error.rate == 10.5
 
+    @allure.story("创建异常")
+    @allure.title("测试创建 MetricsBackpressureError")
+    @allure.severity(allure.severity_level.NORMAL)
+    def test_create_metrics_backpressure_error(self):
+        """测试创建 MetricsBackpressureError"""
+        error = create_exception(
+            "METRICS_BACKPRESSURE", "Master lagging", {"backlog": 5000})
+        assert isinstance(error, MetricsBackpressureError)
+        assert error.error_code == "METRICS_BACKPRESSURE"
+        assert error.backlog == 5000
+        assert error.context == {"backlog": 5000}
+
+    @allure.story("创建异常")
+    @allure.title("测试创建 MetricsPublishError")
+    @allure.severity(allure.severity_level.NORMAL)
+    def test_create_metrics_publish_error(self):
+        """测试创建 MetricsPublishError"""
+        error = create_exception(
+            "METRICS_PUBLISH", "Chunk failed", {"sent": 2000})
+        assert isinstance(error, MetricsPublishError)
+        assert error.error_code == "METRICS_PUBLISH"
+        assert error.sent == 2000
+        assert error.context == {"sent": 2000}
+
     @allure.story("创建异常")
     @allure.title("测试创建异常时上下文为 None")
     @allure.severity(allure.severity_level.NORMAL)
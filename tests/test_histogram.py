@@ -0,0 +1,136 @@
+# encoding: utf-8
+
+import math
+import random
+
+import allure
+import pytest
+
+from aiotest.histogram import LatencyHistogram, derive_prometheus_buckets
+
+
+def exact_percentile(values, percent):
+    """按最近秩法计算精确百分位"""
+    ordered = sorted(values)
+    return ordered[max(1, math.ceil(percent / 100 * len(ordered))) - 1]
+
+
+@allure.feature("LatencyHistogram")
+class TestLatencyHistogram:
+    """LatencyHistogram 类的测试用例"""
+
+    @allure.story("初始化")
+    @allure.title("测试有效数字位数校验")
+    @allure.severity(allure.severity_level.NORMAL)
+    @pytest.mark.parametrize("significant_figures", [0, 6])
+    def test_invalid_precision(self, significant_figures):
+        """测试有效数字位数超出 1-5 时抛出异常"""
+        with pytest.raises(ValueError):
+            LatencyHistogram(significant_figures)
+
+    @allure.story("百分位")
+    @allure.title("测试百分位在精度范围内准确")
+    @allure.severity(allure.severity_level.CRITICAL)
+    @pytest.mark.parametrize("significant_figures", [2, 3])
+    def test_percentile_accuracy(self, significant_figures):
+        """测试百分位相对误差不超过 10^-significant_figures"""
+        rng = random.Random(42)
+        values = [rng.expovariate(50) for _ in range(20000)]
+        histogram = LatencyHistogram(significant_figures)
+        for value in values:
+            histogram.record(value)
+
+        tolerance = 10 ** -significant_figures
+        for percent in (50, 90, 99, 99.9):
+            exact = exact_percentile(values, percent)
+            assert histogram.percentile(percent) == pytest.approx(exact, rel=tolerance)
+
+        assert histogram.count == len(values)
+        assert histogram.total == pytest.approx(sum(values))
+        assert histogram.min == min(values)
+        assert histogram.max == max(values)
+
+    @allure.story("百分位")
+    @allure.title("测试空直方图")
+    @allure.severity(allure.severity_level.MINOR)
+    def test_empty(self):
+        """测试空直方图的百分位与汇总"""
+        histogram = LatencyHistogram()
+        assert histogram.percentile(99) == 0.0
+        assert histogram.mean == 0.0
+        assert histogram.summary() is None
+
+    @allure.story("合并")
+    @allure.title("测试相同精度直方图合并")
+    @allure.severity(allure.severity_level.CRITICAL)
+    def test_merge(self):
+        """测试合并结果与直接记录全部数据一致"""
+        first, second, combined = LatencyHistogram(), LatencyHistogram(), LatencyHistogram()
+        for i in range(1, 1001):
+            value = i / 10000
+            (first if i % 2 else second).record(value)
+            combined.record(value)
+
+        first.merge(second)
+        assert first.count == combined.count
+        assert first.min == combined.min
+        assert first.max == combined.max
+        assert first.percentiles() == combined.percentiles()
+
+    @allure.story("合并")
+    @allure.title("测试不同精度直方图合并")
+    @allure.severity(allure.severity_level.NORMAL)
+    def test_merge_different_precision(self):
+        """测试精度不同时按桶重新记录，结果保持在较低精度范围内"""
+        fine = LatencyHistogram(3)
+        for i in range(1, 1001):
+            fine.record(i / 1000)
+
+        coarse = LatencyHistogram(2)
+        coarse.merge(fine)
+        assert coarse.count == 1000
+        assert coarse.total == pytest.approx(fine.total)
+        assert coarse.percentile(99) == pytest.approx(0.99, rel=1e-2)
+
+    @allure.story("序列化")
+    @allure.title("测试序列化与还原")
+    @allure.severity(allure.severity_level.CRITICAL)
+    def test_round_trip(self):
+        """测试 to_dict 只包含非零桶，from_dict 还原后统计一致"""
+        histogram = LatencyHistogram()
+        for value in (0.001, 0.001, 0.25, 3.0):
+            histogram.record(value)
+
+        data = histogram.to_dict()
+        assert len(data["counts"]) == 6  # 3 个非零桶，每个为 [下标, 计数]
+
+        restored = LatencyHistogram.from_dict(data)
+        assert restored.count == 4
+        assert restored.min == 0.001
+        assert restored.max == 3.0
+        assert restored.percentiles() == histogram.percentiles()
+
+    @allure.story("Prometheus")
+    @allure.title("测试折算到 Prometheus 桶")
+    @allure.severity(allure.severity_level.NORMAL)
+    def test_bucket_counts(self):
+        """测试按边界折算计数，超过最大边界的计入 +Inf 桶"""
+        histogram = LatencyHistogram()
+        for value in (0.0005, 0.003, 0.004, 0.5, 100.0):
+            histogram.record(value)
+
+        assert histogram.bucket_counts((0.001, 0.005, 1.0)) == [1, 2, 1, 1]
+
+    @allure.story("Prometheus")
+    @allure.title("测试按 1-2-5 序列生成桶边界")
+    @allure.severity(allure.severity_level.NORMAL)
+    def test_derive_prometheus_buckets(self):
+        """测试桶边界覆盖指定区间，最大边界总会包含在内"""
+        assert derive_prometheus_buckets(0.001, 0.1) == (0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1)
+        assert derive_prometheus_buckets(0.01, 30.0)[-3:] == (10.0, 20.0, 30.0)
+        with pytest.raises(ValueError):
+            derive_prometheus_buckets(0, 1.0)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,85 @@
+# encoding: utf-8
+
+import asyncio
+import os
+import sys
+from argparse import Namespace
+
+import allure
+import pytest
+
+from aiotest.local_processes import (
+    build_worker_args,
+    configure_local_master,
+    has_exited_process,
+    resolve_process_count,
+    stop_worker_processes,
+)
+
+
+async def spawn_sleeper(seconds):
+    """启动一个睡眠指定秒数的 Python 子进程"""
+    return await asyncio.create_subprocess_exec(
+        sys.executable, "-c", f"import time; time.sleep({seconds})")
+
+
+@allure.feature("本地多进程")
+class TestLocalProcesses:
+    """本地多进程模式的测试用例"""
+
+    @allure.story("参数解析")
+    @allure.title("测试进程数解析")
+    @allure.severity(allure.severity_level.NORMAL)
+    def test_resolve_process_count(self):
+        """测试正整数原样返回，-1 为 CPU 核数，其他值抛出 ValueError"""
+        assert resolve_process_count(1) == 1
+        assert resolve_process_count(4) == 4
+        assert resolve_process_count(-1) == (os.cpu_count() or 1)
+        with pytest.raises(ValueError):
+            resolve_process_count(0)
+        with pytest.raises(ValueError):
+            resolve_process_count(-2)
+
+    @allure.story("参数解析")
+    @allure.title("测试本地主节点配置")
+    @allure.severity(allure.severity_level.NORMAL)
+    def test_configure_local_master(self):
+        """测试配置改写为监听本机随机端口的 tcp 主节点"""
+        options = Namespace(master=False, coordinator="redis", master_bind_host="0.0.0.0",
+                            master_port=5557, expect_workers=1)
+        configure_local_master(options, 3)
+        assert options.master is True
+        assert options.coordinator == "tcp"
+        assert options.master_bind_host == "127.0.0.1"
+        assert options.master_port == 0
+        assert options.expect_workers == 3
+
+    @allure.story("子进程参数")
+    @allure.title("测试 Worker 子进程参数")
+    @allure.severity(allure.severity_level.CRITICAL)
+    @pytest.mark.parametrize("argv", [
+        ["-f", "demo.py", "--processes", "4", "-H", "http://localhost"],
+        ["-f", "demo.py", "--processes=4", "-H", "http://localhost"],
+    ])
+    def test_build_worker_args(self, argv):
+        """测试去掉 --processes 并追加连接本机主节点的 Worker 参数"""
+        assert build_worker_args(argv, 40001) == [
+            "-f", "demo.py", "-H", "http://localhost",
+            "--worker", "--coordinator", "tcp",
+            "--master-host", "127.0.0.1", "--master-port", "40001",
+        ]
+
+    @allure.story("子进程管理")
+    @allure.title("测试子进程退出检测与等待")
+    @allure.severity(allure.severity_level.NORMAL)
+    async def test_stop_worker_processes(self):
+        """测试已退出的子进程被检测到，未退出的子进程超时后被终止"""
+        finished = await spawn_sleeper(0)
+        await finished.wait()
+        running = await spawn_sleeper(30)
+        assert has_exited_process([running]) is False
+        assert has_exited_process([finished, running]) is True
+
+        await stop_worker_processes([finished, running], timeout=0.2)
+        assert running.returncode is not None
+        await stop_worker_processes([])
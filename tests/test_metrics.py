@@ -6,9 +6,13 @@ import time
 import allure
 import pytest
 
-from aiotest.metrics import (MetricsCollector, RequestMetrics,
+from aiotest.events import request_metrics
+from aiotest.exception import MetricsPublishError
+from aiotest.metrics import (METRICS_MODE_AGGREGATE, REGISTRY, MetricsCollector,
+                             RequestAggregator, RequestMetrics,
                              get_unified_collector, init_unified_collector,
                              is_unified_collector_initialized)
+from aiotest.metrics_codec import decode_metrics_message, encode_metrics_batch
 
 
 @allure.feature("RequestMetrics")
@@ -94,7 +98,7 @@ class TestMetricsCollector:
         assert collector.batch_size == 50
         assert collector.flush_interval == 2.0
         assert collector.buffer_size == 5000
-        assert collector._metrics_buffer == []
+        assert len(collector._metrics_buffer) == 0
         assert collector._buffer_lock is not None
         assert collector._flush_task is None
 
@@ -238,6 +242,90 @@ class TestRequestMetricsProcessing:
 
         await collector.stop()
 
+    @allure.story("处理请求")
+    @allure.title("测试按事件循环周期批量处理请求事件")
+    @allure.severity(allure.severity_level.CRITICAL)
+    async def test_process_request_batch(self):
+        """测试 request_metrics 事件合并后交付给收集器的批量处理器"""
+        collector = MetricsCollector(node_type="local", node_id="test-batch")
+        await collector.start()
+
+        for i in range(3):
+            await request_metrics.fire(metrics=RequestMetrics(
+                request_id=f"req-batch-{i}",
+                method="GET",
+                endpoint="/api/batch",
+                status_code=200,
+                duration=0.01 * (i + 1),
+                response_size=10
+            ))
+        assert ("GET", "/api/batch") not in collector._latency
+
+        await asyncio.sleep(0)
+        assert collector._latency[("GET", "/api/batch")].count == 3
+
+        await collector.stop()
+
+    @allure.story("处理请求")
+    @allure.title("测试 Master 整批写入 Worker 请求数据")
+    @allure.severity(allure.severity_level.CRITICAL)
+    async def test_ingest_worker_batch(self):
+        """测试整批写入时更新计数、耗时直方图和错误指标，并保留断言结果"""
+        collector = MetricsCollector(node_type="master", node_id="test-ingest")
+        labels = {"method": "POST", "endpoint": "/api/ingest",
+                  "status_code": "200", "assertion_result": "fail"}
+        before = REGISTRY.get_sample_value("aiotest_http_requests_total", labels) or 0
+
+        batch = [
+            {"method": "POST", "endpoint": "/api/ingest", "status_code": 200,
+             "duration": 0.01 * (i + 1), "response_size": 100,
+             "assertion_result": "fail", "corrected_duration": 0.05,
+             "error": {"exc_type": "AssertionError", "message": "boom"}}
+            for i in range(4)
+        ]
+        assert collector.ingest_worker_batch(batch) == 4
+
+        after = REGISTRY.get_sample_value("aiotest_http_requests_total", labels)
+        assert after - before == 4
+        assert collector._latency[("POST", "/api/ingest")].count == 4
+        assert collector._corrected_latency[("POST", "/api/ingest")].count == 4
+        # 子指标句柄按接口缓存，重复写入不再调用 labels()
+        assert len(collector._series) == 1
+        assert len(collector._counter_children) == 1
+
+    @allure.story("处理请求")
+    @allure.title("测试整批写入二进制编码的批次")
+    @allure.severity(allure.severity_level.NORMAL)
+    async def test_ingest_worker_binary_batch(self):
+        """测试二进制消息解码后的列式批次与字典批次写入结果一致"""
+        collector = MetricsCollector(node_type="master", node_id="test-ingest-binary")
+        records = [
+            {"method": "GET", "endpoint": "/api/binary", "status_code": 500,
+             "duration": 0.03, "response_size": 20, "corrected_duration": None,
+             "error": {"exc_type": "HTTPError", "message": "boom"}},
+            {"method": "GET", "endpoint": "/api/binary", "status_code": 200,
+             "duration": 0.01, "response_size": 20, "corrected_duration": 0.04},
+        ]
+        batch = decode_metrics_message(encode_metrics_batch(records, "worker_1"))["batch"]
+
+        assert collector.ingest_worker_batch(batch) == 2
+        assert collector._latency[("GET", "/api/binary")].count == 2
+        assert collector._corrected_latency[("GET", "/api/binary")].count == 1
+
+    @allure.story("处理请求")
+    @allure.title("测试整批写入跳过格式错误的记录")
+    @allure.severity(allure.severity_level.NORMAL)
+    async def test_ingest_worker_batch_invalid_record(self):
+        """测试格式错误的记录被跳过，不影响同批其他记录"""
+        collector = MetricsCollector(node_type="master", node_id="test-ingest-invalid")
+        batch = [
+            {"method": "GET", "endpoint": "/api/ok", "status_code": 200,
+             "duration": 0.02, "response_size": 10},
+            "not-a-dict",
+        ]
+        assert collector.ingest_worker_batch(batch) == 1
+        assert collector._latency[("GET", "/api/ok")].count == 1
+
     @allure.story("处理请求")
     @allure.title("测试请求指标包含错误信息")
     @allure.severity(allure.severity_level.NORMAL)
@@ -530,9 +618,467 @@ class TestBufferManagement:
             await collector.process_request_metrics(metrics=metrics)
 
         assert len(collector._metrics_buffer) <= 2
+        assert collector.get_buffer_stats()["metrics_dropped"] == 3
+
+        await collector.stop()
+
+    @allure.story("缓冲区")
+    @allure.title("测试单次刷新清空全部积压数据")
+    @allure.severity(allure.severity_level.CRITICAL)
+    async def test_flush_drains_whole_backlog(self):
+        """测试积压超过 batch_size 时，一次刷新按批次全部发送"""
+        published = []
+
+        class MockCoordinator:
+            async def publish(self, channel, data, worker_id=None):
+                published.append(len(data))
+
+        collector = MetricsCollector(
+            node_type="worker",
+            node_id="drain-test",
+            batch_size=100,
+            flush_interval=10.0,
+            coordinator=MockCoordinator()
+        )
+        await collector.start()
+
+        for i in range(1050):
+            await collector.process_request_metrics(metrics=RequestMetrics(
+                request_id=f"req-{i}", method="GET", endpoint="/api/drain",
+                status_code=200, duration=0.01, response_size=10))
+
+        await collector._do_flush()
+
+        assert len(collector._metrics_buffer) == 0
+        assert published == [100] * 10 + [50]
+        assert collector.get_buffer_stats() == {
+            "metrics_backlog": 0, "metrics_dropped": 0, "metrics_published": 1050}
 
         await collector.stop()
 
+    @allure.story("缓冲区")
+    @allure.title("测试发送失败的批次放回缓冲区头部")
+    @allure.severity(allure.severity_level.NORMAL)
+    async def test_failed_chunks_requeued(self):
+        """测试某个批次发送失败时停止发送，该批次及之后的数据按原顺序放回缓冲区"""
+        calls = []
+
+        class FlakyCoordinator:
+            async def publish(self, channel, data, worker_id=None):
+                calls.append(data[0]["request_id"])
+                if data[0]["request_id"] == "req-2":
+                    raise ConnectionError("redis down")
+
+        collector = MetricsCollector(
+            node_type="worker",
+            node_id="requeue-test",
+            batch_size=2,
+            flush_interval=10.0,
+            coordinator=FlakyCoordinator()
+        )
+
+        for i in range(6):
+            await collector.process_request_metrics(metrics=RequestMetrics(
+                request_id=f"req-{i}", method="GET", endpoint="/api/requeue",
+                status_code=200))
+
+        await collector._do_flush()
+
+        assert calls == ["req-0", "req-2"]
+        assert [m["request_id"] for m in collector._metrics_buffer] == [
+            "req-2", "req-3", "req-4", "req-5"]
+        stats = collector.get_buffer_stats()
+        assert stats["metrics_backlog"] == 4
+        assert stats["metrics_published"] == 2
+
+    @allure.story("缓冲区")
+    @allure.title("测试分块部分送达时只放回未送达的数据")
+    @allure.severity(allure.severity_level.CRITICAL)
+    async def test_partial_publish_requeues_unsent(self):
+        """测试协调器分块发送中途失败时，已送达的分块计入发送统计，只放回其余部分"""
+        class PartialCoordinator:
+            async def publish(self, channel, data, worker_id=None):
+                raise MetricsPublishError("chunk 2 failed", sent=3)
+
+        collector = MetricsCollector(
+            node_type="worker",
+            node_id="partial-test",
+            batch_size=10,
+            flush_interval=10.0,
+            coordinator=PartialCoordinator()
+        )
+        for i in range(5):
+            collector._append_to_buffer({"request_id": f"req-{i}"})
+
+        await collector._do_flush()
+
+        assert [m["request_id"] for m in collector._metrics_buffer] == ["req-3", "req-4"]
+        assert collector.get_buffer_stats()["metrics_published"] == 3
+
+    @allure.story("缓冲区")
+    @allure.title("测试放回缓冲区超出容量时丢弃最旧的数据")
+    @allure.severity(allure.severity_level.NORMAL)
+    async def test_requeue_overflow_drops_oldest(self):
+        """测试发送期间缓冲区写满时，放回的数据中最旧的部分被丢弃并计入丢弃统计"""
+        collector = MetricsCollector(
+            node_type="worker",
+            node_id="requeue-overflow",
+            batch_size=10,
+            buffer_size=4,
+            flush_interval=10.0
+        )
+
+        class FillingCoordinator:
+            async def publish(self, channel, data, worker_id=None):
+                # 发送期间新数据写满缓冲区的一半
+                for i in range(2):
+                    collector._append_to_buffer({"request_id": f"new-{i}"})
+                raise ConnectionError("redis down")
+
+        for i in range(4):
+            collector._append_to_buffer({"request_id": f"old-{i}"})
+        collector.coordinator = FillingCoordinator()
+
+        await collector._do_flush()
+
+        assert [m["request_id"] for m in collector._metrics_buffer] == [
+            "old-2", "old-3", "new-0", "new-1"]
+        assert collector.dropped_count == 2
+        assert collector._dropped_since_flush == 2
+
+    @allure.story("缓冲区")
+    @allure.title("测试 Master 记录 Worker 缓冲区统计")
+    @allure.severity(allure.severity_level.NORMAL)
+    async def test_record_worker_buffer_stats(self):
+        """测试心跳中的缓冲区统计被记录为 Prometheus 指标"""
+        collector = MetricsCollector(node_type="master", node_id="master-stats")
+        await collector.record_node_metrics({
+            "cpu_percent": "10",
+            "active_users": "5",
+            "worker_id": "stats-worker",
+            "metrics_backlog": "42",
+            "metrics_dropped": "7",
+        })
+
+        export = collector.get_metrics_export()
+        assert 'aiotest_worker_metrics_backlog{worker_id="stats-worker"} 42.0' in export
+        assert 'aiotest_worker_metrics_dropped{worker_id="stats-worker"} 7.0' in export
+
+    @allure.story("资源指标")
+    @allure.title("测试记录资源采样指标")
+    @allure.severity(allure.severity_level.NORMAL)
+    async def test_record_resource_usage(self):
+        """测试节点指标中的资源采样字段被记录为 Prometheus 指标"""
+        collector = MetricsCollector(node_type="master", node_id="master-resource")
+        await collector.record_node_metrics({
+            "cpu_percent": "20",
+            "active_users": "3",
+            "worker_id": "resource-worker",
+            "process_cpu_percent": "55.5",
+            "memory_rss": "2048",
+            "open_fds": "40",
+            "sockets": "12",
+            "loop_lag": "0.25",
+        })
+
+        export = collector.get_metrics_export()
+        assert 'aiotest_worker_process_cpu_percent{worker_id="resource-worker"} 55.5' in export
+        assert 'aiotest_worker_memory_rss_bytes{worker_id="resource-worker"} 2048.0' in export
+        assert 'aiotest_worker_open_fds{worker_id="resource-worker"} 40.0' in export
+        assert 'aiotest_worker_sockets{worker_id="resource-worker"} 12.0' in export
+        assert 'aiotest_worker_loop_lag_seconds{worker_id="resource-worker"} 0.25' in export
+
+    @allure.story("资源指标")
+    @allure.title("测试记录到达率执行器指标")
+    @allure.severity(allure.severity_level.NORMAL)
+    async def test_record_arrival_stats(self):
+        """测试节点指标中的到达率执行器字段被记录为 Prometheus 指标"""
+        collector = MetricsCollector(node_type="master", node_id="master-arrival")
+        await collector.record_node_metrics({
+            "cpu_percent": "10",
+            "active_users": "5",
+            "worker_id": "arrival-worker",
+            "arrival_rate": 20.0,
+            "arrival_busy": 4,
+            "arrival_scheduled": 100,
+            "arrival_dropped": 7,
+            "arrival_late": 2,
+        })
+
+        export = collector.get_metrics_export()
+        assert 'aiotest_worker_arrival_rate{worker_id="arrival-worker"} 20.0' in export
+        assert 'aiotest_worker_arrival_busy_users{worker_id="arrival-worker"} 4.0' in export
+        assert 'aiotest_worker_arrival_scheduled{worker_id="arrival-worker"} 100.0' in export
+        assert 'aiotest_worker_arrival_dropped{worker_id="arrival-worker"} 7.0' in export
+        assert 'aiotest_worker_arrival_late{worker_id="arrival-worker"} 2.0' in export
+
+
+@allure.feature("区间聚合")
+class TestRequestAggregation:
+    """Worker 聚合模式相关的测试用例"""
+
+    @allure.story("聚合器")
+    @allure.title("测试按标签组合折叠请求数据")
+    @allure.severity(allure.severity_level.CRITICAL)
+    def test_aggregator_fold_and_drain(self):
+        """测试聚合器按 (method, endpoint, status_code, assertion_result) 折叠并取出"""
+        aggregator = RequestAggregator()
+        for duration in (0.05, 0.3, 2.0):
+            aggregator.add(RequestMetrics(
+                request_id="req", method="GET", endpoint="/api/agg",
+                status_code=200, duration=duration, response_size=500,
+                assertion_result="pass"))
+        aggregator.add(RequestMetrics(
+            request_id="req", method="GET", endpoint="/api/agg",
+            status_code=500, duration=0.1, response_size=0,
+            error={"exc_type": "AssertionError", "message": "boom"},
+            assertion_result="fail"))
+
+        assert len(aggregator) == 2
+        records = {r["status_code"]: r for r in aggregator.drain()}
+        assert len(aggregator) == 0
+
+        ok = records[200]
+        assert ok["count"] == 3
+        assert ok["duration_min"] == 0.05
+        assert ok["duration_max"] == 2.0
+        assert ok["duration_sum"] == pytest.approx(2.35)
+        assert ok["latency"]["count"] == 3
+        assert ok["size_sum"] == 1500
+        assert ok["errors"] == []
+
+        failed = records[500]
+        assert failed["assertion_result"] == "fail"
+        assert failed["errors"] == [
+            {"error_type": "AssertionError", "error_message": "boom", "count": 1}]
+
+    @allure.story("聚合器")
+    @allure.title("测试聚合记录合并")
+    @allure.severity(allure.severity_level.NORMAL)
+    def test_aggregator_merge(self):
+        """测试聚合记录可以跨区间合并"""
+        first = RequestAggregator()
+        first.add(RequestMetrics(request_id="a", method="GET", endpoint="/m",
+                                 status_code=200, duration=0.2, response_size=10))
+        second = RequestAggregator()
+        second.add(RequestMetrics(request_id="b", method="GET", endpoint="/m",
+                                  status_code=200, duration=0.6, response_size=30))
+
+        merged = RequestAggregator()
+        merged.merge(first.drain())
+        merged.merge(second.drain())
+        (record,) = merged.drain()
+
+        assert record["count"] == 2
+        assert record["duration_min"] == 0.2
+        assert record["duration_max"] == 0.6
+        assert record["size_max"] == 30
+
+    @allure.story("聚合器")
+    @allure.title("测试折叠 Worker 上报的原始数据批次")
+    @allure.severity(allure.severity_level.NORMAL)
+    def test_aggregator_add_batch(self):
+        """测试聚合节点将 JSON 与二进制编码的原始批次折叠为相同的聚合记录"""
+        records = [
+            {"method": "GET", "endpoint": "/b", "status_code": 200, "duration": 0.1,
+             "corrected_duration": 0.15, "response_size": 10, "error": None,
+             "assertion_result": "pass"},
+            {"method": "GET", "endpoint": "/b", "status_code": 200, "duration": 0.3,
+             "corrected_duration": None, "response_size": 30, "error": None,
+             "assertion_result": "pass"},
+        ]
+        from_json = RequestAggregator()
+        assert from_json.add_batch(records + ["invalid"]) == 2
+
+        from_binary = RequestAggregator()
+        batch = decode_metrics_message(encode_metrics_batch(records, "worker-1"))["batch"]
+        assert from_binary.add_batch(batch) == 2
+
+        (json_record,) = from_json.drain()
+        (binary_record,) = from_binary.drain()
+        assert json_record["count"] == binary_record["count"] == 2
+        assert json_record["size_sum"] == binary_record["size_sum"] == 40
+        assert json_record["duration_max"] == pytest.approx(binary_record["duration_max"])
+
+    @allure.story("Worker 聚合模式")
+    @allure.title("测试 Worker 聚合模式只发布聚合记录")
+    @allure.severity(allure.severity_level.CRITICAL)
+    async def test_worker_aggregate_mode_flush(self):
+        """测试 Worker 聚合模式下刷新时发布一条聚合消息"""
+        published = []
+
+        class MockCoordinator:
+            async def publish(self, channel, data, worker_id=None):
+                published.append((channel, data, worker_id))
+
+        collector = MetricsCollector(
+            node_type="worker",
+            node_id="agg-worker",
+            coordinator=MockCoordinator(),
+            flush_interval=10.0,
+            metrics_mode=METRICS_MODE_AGGREGATE
+        )
+        await collector.start()
+
+        for i in range(50):
+            await collector.process_request_metrics(metrics=RequestMetrics(
+                request_id=f"req-{i}", method="GET", endpoint="/api/agg",
+                status_code=200, duration=0.01, response_size=100))
+
+        assert len(collector._metrics_buffer) == 0
+        await collector._do_flush()
+
+        assert len(published) == 1
+        channel, data, worker_id = published[0]
+        assert channel == "request_aggregates"
+        assert worker_id == "agg-worker"
+        assert data[0]["count"] == 50
+
+        await collector.stop()
+
+    @allure.story("Worker 聚合模式")
+    @allure.title("测试发布失败时保留聚合数据")
+    @allure.severity(allure.severity_level.NORMAL)
+    async def test_worker_aggregate_mode_publish_failure(self):
+        """测试发布失败时聚合数据合并回聚合器"""
+        class FailingCoordinator:
+            async def publish(self, *args, **kwargs):
+                raise ConnectionError("redis down")
+
+        collector = MetricsCollector(
+            node_type="worker",
+            node_id="agg-worker",
+            coordinator=FailingCoordinator(),
+            metrics_mode=METRICS_MODE_AGGREGATE
+        )
+        await collector.process_request_metrics(metrics=RequestMetrics(
+            request_id="req", method="GET", endpoint="/api/agg",
+            status_code=200, duration=0.01, response_size=100))
+
+        await collector._do_flush()
+
+        assert len(collector._aggregator) == 1
+
+    @allure.story("Master 合并")
+    @allure.title("测试 Master 合并聚合记录到 Prometheus")
+    @allure.severity(allure.severity_level.CRITICAL)
+    async def test_merge_aggregates(self):
+        """测试聚合记录直接合并到 Prometheus 指标"""
+        aggregator = RequestAggregator()
+        for _ in range(3):
+            aggregator.add(RequestMetrics(
+                request_id="req", method="POST", endpoint="/api/merged",
+                status_code=201, duration=0.3, response_size=2048,
+                assertion_result="pass"))
+
+        collector = MetricsCollector(node_type="master", node_id="master")
+        collector.merge_aggregates(aggregator.drain())
+
+        export = collector.get_metrics_export()
+        assert ('aiotest_http_requests_total{assertion_result="pass",'
+                'endpoint="/api/merged",method="POST",status_code="201"} 3.0') in export
+        assert ('aiotest_http_request_duration_seconds_count{'
+                'endpoint="/api/merged",method="POST"} 3.0') in export
+
+    @allure.story("协调遗漏校正")
+    @allure.title("测试校正耗时记录到独立直方图")
+    @allure.severity(allure.severity_level.CRITICAL)
+    async def test_corrected_duration_histogram(self):
+        """测试带校正耗时的请求同时记录原始与校正直方图，未带校正耗时的请求只记录原始直方图"""
+        collector = MetricsCollector(node_type="local", node_id="co-local")
+        await collector.process_request_metrics(metrics=RequestMetrics(
+            request_id="req-1", method="GET", endpoint="/api/corrected",
+            status_code=200, duration=0.05, corrected_duration=2.05))
+        await collector.process_request_metrics(metrics=RequestMetrics(
+            request_id="req-2", method="GET", endpoint="/api/corrected",
+            status_code=200, duration=0.05))
+
+        export = collector.get_metrics_export()
+        assert ('aiotest_http_request_duration_seconds_count{'
+                'endpoint="/api/corrected",method="GET"} 2.0') in export
+        assert ('aiotest_http_request_corrected_duration_seconds_count{'
+                'endpoint="/api/corrected",method="GET"} 1.0') in export
+        assert ('aiotest_http_request_corrected_duration_seconds_sum{'
+                'endpoint="/api/corrected",method="GET"} 2.05') in export
+
+    @allure.story("协调遗漏校正")
+    @allure.title("测试聚合模式携带校正耗时")
+    @allure.severity(allure.severity_level.NORMAL)
+    async def test_corrected_duration_aggregate(self):
+        """测试聚合记录折叠校正耗时并由 Master 合并到校正直方图"""
+        aggregator = RequestAggregator()
+        for corrected in (0.3, 3.0, None):
+            aggregator.add(RequestMetrics(
+                request_id="req", method="GET", endpoint="/api/co-merged",
+                status_code=200, duration=0.3, corrected_duration=corrected))
+        (record,) = aggregator.drain()
+        assert record["corrected"]["count"] == 2
+        assert record["corrected"]["total"] == pytest.approx(3.3)
+
+        collector = MetricsCollector(node_type="master", node_id="master")
+        collector.merge_aggregates([record])
+
+        export = collector.get_metrics_export()
+        assert ('aiotest_http_request_corrected_duration_seconds_count{'
+                'endpoint="/api/co-merged",method="GET"} 2.0') in export
+
+    @allure.story("耗时统计")
+    @allure.title("测试按接口输出耗时百分位")
+    @allure.severity(allure.severity_level.CRITICAL)
+    async def test_latency_stats(self):
+        """测试 Local 节点按 (method, endpoint) 统计耗时，100ms 以内的百分位依然可区分"""
+        collector = MetricsCollector(node_type="local", node_id="latency-local")
+        for i in range(1, 101):
+            await collector.process_request_metrics(metrics=RequestMetrics(
+                request_id=f"req-{i}", method="GET", endpoint="/api/fast",
+                status_code=200, duration=i / 1000))
+
+        (stats,) = collector.get_latency_stats()
+        assert stats["method"] == "GET"
+        assert stats["endpoint"] == "/api/fast"
+        assert stats["count"] == 100
+        assert stats["p50"] == pytest.approx(0.050, rel=1e-3)
+        assert stats["p99"] == pytest.approx(0.099, rel=1e-3)
+        assert stats["max"] == pytest.approx(0.1)
+        assert "corrected" not in stats
+
+        report = collector.format_latency_report()
+        assert "/api/fast" in report
+        assert "p99.9" in report
+
+    @allure.story("耗时统计")
+    @allure.title("测试 Master 合并聚合记录后的耗时统计")
+    @allure.severity(allure.severity_level.NORMAL)
+    async def test_latency_stats_from_aggregates(self):
+        """测试 Master 合并多个 Worker 的聚合记录后，百分位与 Prometheus 桶一致"""
+        collector = MetricsCollector(node_type="master", node_id="master")
+        for worker_durations in ((0.002, 0.004), (0.006, 0.8)):
+            aggregator = RequestAggregator()
+            for duration in worker_durations:
+                aggregator.add(RequestMetrics(
+                    request_id="req", method="GET", endpoint="/api/hdr-merged",
+                    status_code=200, duration=duration, assertion_result="pass"))
+            collector.merge_aggregates(aggregator.drain())
+
+        (stats,) = collector.get_latency_stats()
+        assert stats["count"] == 4
+        assert stats["p50"] == pytest.approx(0.004, rel=1e-3)
+        assert stats["max"] == pytest.approx(0.8)
+
+        export = collector.get_metrics_export()
+        assert ('aiotest_http_request_duration_seconds_bucket{'
+                'endpoint="/api/hdr-merged",le="0.005",method="GET"} 2.0') in export
+        assert ('aiotest_http_request_duration_seconds_bucket{'
+                'endpoint="/api/hdr-merged",le="1.0",method="GET"} 4.0') in export
+
+    @allure.story("初始化")
+    @allure.title("测试无效的指标上报模式")
+    @allure.severity(allure.severity_level.MINOR)
+    def test_invalid_metrics_mode(self):
+        """测试无效的上报模式"""
+        with pytest.raises(ValueError):
+            MetricsCollector(node_type="worker", metrics_mode="invalid")
+
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -0,0 +1,114 @@
+# encoding: utf-8
+
+import json
+
+import allure
+import pytest
+
+from aiotest.metrics_codec import (
+    WIRE_BINARY,
+    WIRE_JSON,
+    WIRE_MAGIC,
+    WIRE_VERSION,
+    MetricsBatch,
+    decode_metrics_message,
+    encode_metrics_batch,
+    negotiate_encoding,
+)
+
+
+def make_records(count):
+    """生成 _convert_metrics_to_dict 格式的指标字典"""
+    return [
+        {
+            "request_id": f"req-abc-{i}",
+            "method": "GET" if i % 2 else "POST",
+            "endpoint": f"/api/items/{i % 3}",
+            "status_code": 200 if i % 5 else 500,
+            "duration": 0.001 * (i + 1),
+            "corrected_duration": 0.002 * (i + 1) if i % 4 == 0 else None,
+            "response_size": 100 + i,
+            "error": {"exc_type": "HTTPError", "message": "boom"} if i % 5 == 0 else None,
+            "timestamp": 1700000000.0 + i,
+            "assertion_result": "fail" if i % 5 == 0 else "pass",
+            "worker_id": "worker_1",
+        }
+        for i in range(count)
+    ]
+
+
+@allure.feature("指标编码")
+class TestMetricsCodec:
+    """metrics_codec 模块的测试用例"""
+
+    @allure.story("二进制编码")
+    @allure.title("测试编码与解码还原全部字段")
+    @allure.severity(allure.severity_level.CRITICAL)
+    @pytest.mark.parametrize("count", [1, 3, 200])
+    def test_round_trip(self, count):
+        """测试解码结果与原始字典一致（不含 request_id 与 timestamp）"""
+        records = make_records(count)
+        payload = encode_metrics_batch(records, "worker_1", timestamp=12.5,
+                                       chunk_index=1, total_chunks=2)
+        assert payload.startswith(f"{WIRE_MAGIC}{WIRE_VERSION}")
+
+        message = decode_metrics_message(payload)
+        assert message["worker_id"] == "worker_1"
+        assert message["timestamp"] == 12.5
+        assert message["chunk_index"] == 1
+        assert message["total_chunks"] == 2
+
+        batch = message["batch"]
+        assert isinstance(batch, MetricsBatch)
+        assert len(batch) == count
+        for original, decoded in zip(records, batch.to_records()):
+            for key in ("method", "endpoint", "status_code", "duration",
+                        "corrected_duration", "response_size", "error",
+                        "assertion_result", "worker_id"):
+                assert decoded[key] == original[key]
+
+    @allure.story("二进制编码")
+    @allure.title("测试二进制编码显著小于 JSON")
+    @allure.severity(allure.severity_level.NORMAL)
+    def test_size_reduction(self):
+        """测试大批次的二进制消息体积不到 JSON 的十分之一"""
+        records = make_records(1000)
+        json_size = len(json.dumps({"batch": records, "worker_id": "worker_1"}))
+        binary_size = len(encode_metrics_batch(records, "worker_1"))
+        assert binary_size * 10 < json_size
+
+    @allure.story("解码")
+    @allure.title("测试 JSON 消息按原格式解析")
+    @allure.severity(allure.severity_level.NORMAL)
+    def test_decode_json(self):
+        """测试非二进制前缀的消息按 JSON 解析，兼容旧版本 Worker"""
+        message = decode_metrics_message(json.dumps({"batch": [], "worker_id": "w"}))
+        assert message == {"batch": [], "worker_id": "w"}
+
+    @allure.story("解码")
+    @allure.title("测试无效消息")
+    @allure.severity(allure.severity_level.NORMAL)
+    @pytest.mark.parametrize("payload", [
+        f"{WIRE_MAGIC}{WIRE_VERSION + 1}r:AAAA",
+        f"{WIRE_MAGIC}xr:AAAA",
+        f"{WIRE_MAGIC}{WIRE_VERSION}z:bm90LXpsaWI=",
+    ])
+    def test_decode_invalid(self, payload):
+        """测试版本不支持或正文损坏时抛出 ValueError"""
+        with pytest.raises(ValueError):
+            decode_metrics_message(payload)
+
+    @allure.story("协商")
+    @allure.title("测试编码协商")
+    @allure.severity(allure.severity_level.CRITICAL)
+    def test_negotiate_encoding(self):
+        """测试只有 Master 通告支持当前版本时才使用二进制编码"""
+        assert negotiate_encoding(WIRE_JSON, None) == WIRE_JSON
+        assert negotiate_encoding(WIRE_BINARY, None) is None
+        assert negotiate_encoding(WIRE_BINARY, "json") == WIRE_JSON
+        assert negotiate_encoding(WIRE_BINARY, f"json,binary/{WIRE_VERSION + 1}") == WIRE_JSON
+        assert negotiate_encoding(WIRE_BINARY, f"json,binary/{WIRE_VERSION}") == WIRE_BINARY
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
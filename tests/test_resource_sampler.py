@@ -0,0 +1,149 @@
+# encoding: utf-8
+
+import asyncio
+import time
+
+import allure
+import pytest
+
+from aiotest.resource_sampler import LoopLagMonitor, ResourceSampler
+
+
+@allure.feature("ResourceSampler")
+class TestResourceSampler:
+    """ResourceSampler 类的测试用例"""
+
+    @allure.story("采样")
+    @allure.title("测试资源快照字段")
+    @allure.severity(allure.severity_level.CRITICAL)
+    def test_sample_fields(self):
+        """测试一次采样包含全部资源字段"""
+        sampler = ResourceSampler(interval=1.0)
+        snapshot = sampler.sample()
+
+        assert set(snapshot) == {
+            "cpu_percent", "process_cpu_percent", "memory_rss", "open_fds", "sockets"}
+        assert snapshot["memory_rss"] > 0
+        assert snapshot["open_fds"] > 0
+        assert snapshot["sockets"] >= 0
+        assert 0 <= snapshot["cpu_percent"] <= 100
+
+    @allure.story("采样循环")
+    @allure.title("测试采样循环回调")
+    @allure.severity(allure.severity_level.NORMAL)
+    async def test_run_invokes_callback(self):
+        """测试采样循环立即采样并调用回调，包含事件循环延迟字段"""
+        received = []
+
+        async def callback(snapshot):
+            received.append(snapshot)
+
+        sampler = ResourceSampler(interval=0.05)
+        task = asyncio.create_task(sampler.run(callback))
+        await asyncio.sleep(0.2)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        assert len(received) >= 2
+        assert received[0]["loop_lag"] == 0.0
+        assert sampler.latest is received[-1]
+
+    @allure.story("采样循环")
+    @allure.title("测试采样不阻塞事件循环并记录延迟")
+    @allure.severity(allure.severity_level.CRITICAL)
+    async def test_loop_lag_detected(self):
+        """测试事件循环被阻塞时，下一次采样的 loop_lag 反映阻塞时长"""
+        received = []
+
+        async def callback(snapshot):
+            received.append(snapshot)
+
+        sampler = ResourceSampler(interval=0.05)
+        task = asyncio.create_task(sampler.run(callback))
+        await asyncio.sleep(0.01)
+        time.sleep(0.2)  # 故意阻塞事件循环
+        await asyncio.sleep(0.1)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        assert max(s["loop_lag"] for s in received) >= 0.1
+
+    @allure.story("异常处理")
+    @allure.title("测试回调异常不终止采样循环")
+    @allure.severity(allure.severity_level.NORMAL)
+    async def test_callback_error_does_not_stop_loop(self):
+        """测试回调抛出异常后采样循环继续运行"""
+        calls = []
+
+        async def failing_callback(snapshot):
+            calls.append(snapshot)
+            raise RuntimeError("callback failed")
+
+        sampler = ResourceSampler(interval=0.05)
+        task = asyncio.create_task(sampler.run(failing_callback))
+        await asyncio.sleep(0.2)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        assert len(calls) >= 2
+
+
+@allure.feature("LoopLagMonitor")
+class TestLoopLagMonitor:
+    """LoopLagMonitor 类的测试用例"""
+
+    @allure.story("延迟统计")
+    @allure.title("测试延迟分布汇总")
+    @allure.severity(allure.severity_level.CRITICAL)
+    async def test_snapshot_percentiles(self):
+        """测试汇总结果包含分位数、最大值、就绪队列和任务数，且汇总后清空窗口"""
+        monitor = LoopLagMonitor(threshold=0.5)
+        for i in range(100):
+            monitor.record(i / 1000)
+
+        snapshot = monitor.snapshot()
+        assert snapshot["loop_lag_p50"] == pytest.approx(0.05)
+        assert snapshot["loop_lag_p99"] == pytest.approx(0.099)
+        assert snapshot["loop_lag_max"] == pytest.approx(0.099)
+        assert snapshot["ready_queue"] >= 0
+        assert snapshot["tasks"] >= 1
+
+        assert monitor.snapshot()["loop_lag_max"] == 0.0
+
+    @allure.story("延迟探测")
+    @allure.title("测试探测到事件循环阻塞")
+    @allure.severity(allure.severity_level.CRITICAL)
+    async def test_run_detects_blocking(self):
+        """测试事件循环被阻塞时探测到超过阈值的延迟"""
+        monitor = LoopLagMonitor(interval=0.01, threshold=0.05)
+        task = asyncio.create_task(monitor.run())
+        await asyncio.sleep(0.02)
+        time.sleep(0.1)  # 故意阻塞事件循环
+        await asyncio.sleep(0.005)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        assert monitor.snapshot()["loop_lag_max"] >= 0.05
+
+    @allure.story("启动闸门")
+    @allure.title("测试饱和状态与等待恢复")
+    @allure.severity(allure.severity_level.NORMAL)
+    async def test_wait_until_healthy(self):
+        """测试延迟超过阈值时进入饱和状态，回落后等待方被唤醒"""
+        monitor = LoopLagMonitor(threshold=0.1)
+        assert monitor.saturated is False
+        assert await monitor.wait_until_healthy(timeout=0.01) is True
+
+        monitor.record(0.5)
+        assert monitor.saturated is True
+        assert await monitor.wait_until_healthy(timeout=0.01) is False
+
+        waiter = asyncio.create_task(monitor.wait_until_healthy(timeout=1.0))
+        await asyncio.sleep(0)
+        monitor.record(0.01)
+        assert await waiter is True
+        assert monitor.saturated is False
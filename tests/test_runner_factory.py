@@ -7,12 +7,10 @@ import allure
 import pytest
 
 from aiotest.exception import InvalidRateError, InvalidUserCountError
-from aiotest.metrics import MetricsCollector
 from aiotest.runner_factory import (NODE_TYPE_LOCAL, NODE_TYPE_MASTER,
                                     NODE_TYPE_WORKER, BaseRunner,
                                     EventHandlerRegistry, RunnerFactory,
                                     on_startup_completed,
-                                    on_worker_request_metrics,
                                     validate_load_params, validate_params)
 from aiotest.shape import LoadUserShape
 from aiotest.state_manager import RunnerState
@@ -251,50 +249,6 @@ class TestEventHandlers:
             runner=runner
         )
 
-    @allure.story("指标处理")
-    @allure.title("测试Worker请求指标处理")
-    @allure.severity(allure.severity_level.NORMAL)
-    async def test_on_worker_request_metrics(self):
-        """测试Worker请求指标处理"""
-        class MockRunner:
-            node = NODE_TYPE_MASTER
-
-            def __init__(self):
-                self.metrics_collector = MetricsCollector()
-
-        runner = MockRunner()
-
-        metrics_data = {
-            "request_id": "test-123",
-            "method": "GET",
-            "endpoint": "/test",
-            "status_code": 200,
-            "duration": 0.1,
-            "response_size": 100
-        }
-
-        await on_worker_request_metrics(
-            node_type=NODE_TYPE_MASTER,
-            runner=runner,
-            data=metrics_data
-        )
-
-    @allure.story("指标处理")
-    @allure.title("测试非Master节点忽略指标")
-    @allure.severity(allure.severity_level.NORMAL)
-    async def test_on_worker_request_metrics_non_master(self):
-        """测试非Master节点忽略Worker请求指标"""
-        class MockRunner:
-            node = NODE_TYPE_WORKER
-
-        runner = MockRunner()
-
-        await on_worker_request_metrics(
-            node_type=NODE_TYPE_WORKER,
-            runner=runner,
-            data={"test": "data"}
-        )
-
 
 @allure.feature("运行器工厂")
 class TestRunnerFactory:
@@ -326,6 +280,11 @@ class TestRunnerFactory:
         assert runner is not None
         assert runner.node == NODE_TYPE_LOCAL
 
+        # 清理（释放 Prometheus 端口，避免影响后续用例）
+        await runner.quit()
+        if runner.prometheus_runner:
+            await runner.prometheus_runner.cleanup()
+
     @allure.story("创建运行器")
     @allure.title("测试创建无效运行器类型")
     @allure.severity(allure.severity_level.NORMAL)
@@ -552,6 +511,26 @@ class TestBaseRunnerAsyncMethods:
         # 验证CPU使用率被收集
         assert isinstance(runner.cpu_usage, (int, float))
 
+    @allure.story("CPU指标收集")
+    @allure.title("测试资源采样结果更新运行器属性")
+    @allure.severity(allure.severity_level.NORMAL)
+    async def test_on_resource_sample(self, base_config):
+        """测试资源采样回调更新 cpu_usage 和 resource_stats"""
+        runner = BaseRunner([TestUser], TestLoadShape(), base_config)
+        snapshot = {
+            "cpu_percent": 95.0,
+            "process_cpu_percent": 80.0,
+            "memory_rss": 1024,
+            "open_fds": 12,
+            "sockets": 3,
+            "loop_lag": 0.002,
+        }
+
+        await runner._on_resource_sample(snapshot)
+
+        assert runner.cpu_usage == 95.0
+        assert runner.resource_stats == snapshot
+
 
 @allure.feature("高速率警告")
 class TestHighRateWarning:
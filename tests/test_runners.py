@@ -1,19 +1,28 @@
 # encoding: utf-8
 
 import asyncio
+import time
 
 import allure
 import pytest
 from aiohttp.test_utils import TestClient, TestServer
 
 from aiotest import runners
+from aiotest.events import worker_request_metrics
 from aiotest.exception import RunnerError
-from aiotest.runner_factory import (NODE_TYPE_LOCAL, NODE_TYPE_MASTER,
-                                    NODE_TYPE_WORKER)
-from aiotest.runners import (LocalRunner, MasterRunner, WorkerNode,
-                             WorkerRunner, create_prometheus_app,
-                             init_metrics_collector, start_prometheus_service)
+from aiotest.metrics import MetricsCollector
+from aiotest.runner_factory import (EXECUTOR_ARRIVAL_RATE, NODE_TYPE_LOCAL,
+                                    NODE_TYPE_MASTER, NODE_TYPE_WORKER)
+from aiotest.distributed_coordinator import DistributedCoordinator
+from aiotest.runner_factory import validate_arrival_params, validate_load_params
+from aiotest.runners import (LOAD_FACTOR_RECOVERY_INTERVAL, SATURATION_BACKOFF,
+                             STARTUP_LEAD_TIME, AggregatorRunner, LocalRunner, MasterRunner,
+                             WorkerNode, WorkerRunner, create_coordinator,
+                             create_prometheus_app, init_metrics_collector,
+                             start_prometheus_service)
+from aiotest.shape import ArrivalRateShape
 from aiotest.state_manager import RunnerState
+from aiotest.tcp_coordinator import TcpCoordinator
 
 
 @allure.feature("辅助函数")
@@ -31,6 +40,34 @@ class TestHelperFunctions:
         routes = [route.resource.canonical for route in app.router.routes()]
         assert "/metrics" in routes
 
+    @allure.story("协调器")
+    @allure.title("测试按配置选择协调后端")
+    @allure.severity(allure.severity_level.NORMAL)
+    def test_create_coordinator(self):
+        """测试默认使用 Redis 协调器，coordinator 为 tcp 时 Master 监听、Worker 连接 Master 地址"""
+        class RedisConfig:
+            pass
+
+        class TcpConfig:
+            coordinator = "tcp"
+            master_host = "10.0.0.2"
+            master_bind_host = "0.0.0.0"
+            master_port = 6000
+            metrics_encoding = "json"
+
+        assert isinstance(create_coordinator(RedisConfig(), None, NODE_TYPE_MASTER),
+                          DistributedCoordinator)
+
+        master = create_coordinator(TcpConfig(), None, NODE_TYPE_MASTER)
+        worker = create_coordinator(TcpConfig(), None, NODE_TYPE_WORKER, node_id="worker_1")
+        assert isinstance(master, TcpCoordinator)
+        assert (master.host, master.port) == ("0.0.0.0", 6000)
+        assert (worker.host, worker.port, worker.node_id) == ("10.0.0.2", 6000, "worker_1")
+        assert worker.metrics_encoding == "json"
+
+        with pytest.raises(ValueError):
+            AggregatorRunner([], None, type("Config", (TcpConfig,), {"aggregator_group": "g1"})(), None)
+
     @allure.story("指标收集器")
     @allure.title("测试初始化指标收集器")
     @allure.severity(allure.severity_level.NORMAL)
@@ -103,6 +140,31 @@ class TestHelperFunctions:
             # 恢复原始的generate_latest函数
             runners.generate_latest = original_generate_latest
 
+    @allure.story("Prometheus服务")
+    @allure.title("测试耗时统计接口")
+    @allure.severity(allure.severity_level.NORMAL)
+    async def test_stats_handler(self):
+        """测试/stats端点返回指标收集器的接口耗时统计"""
+        class MockCollector:
+            def get_latency_stats(self):
+                return [{"method": "GET", "endpoint": "/api", "count": 1, "p99": 0.01}]
+
+        class MockRunner:
+            metrics_collector = MockCollector()
+
+        server = TestServer(create_prometheus_app(runner=MockRunner()))
+        async with server:
+            async with TestClient(server) as client:
+                response = await client.get('/stats')
+                assert response.status == 200
+                assert (await response.json())[0]["p99"] == 0.01
+
+                server_no_runner = TestServer(create_prometheus_app())
+                async with server_no_runner:
+                    async with TestClient(server_no_runner) as client_no_runner:
+                        response = await client_no_runner.get('/stats')
+                        assert await response.json() == []
+
 
 @allure.feature("WorkerNode")
 class TestWorkerNode:
@@ -171,6 +233,49 @@ class TestWorkerNode:
         assert worker_node.status == original_status
         assert worker_node.last_update > 0.0
 
+    @allure.story("更新状态")
+    @allure.title("测试从心跳数据更新负载能力与饱和状态")
+    @allure.severity(allure.severity_level.NORMAL)
+    def test_update_from_heartbeat_capacity(self):
+        """测试通告的负载能力计入权重，每次进入饱和时下调分配系数"""
+        worker_node = WorkerNode("test_worker")
+        assert worker_node.weight == 1.0
+
+        worker_node.update_from_heartbeat({"capacity": "4.0", "saturated": "1"})
+        assert worker_node.saturated is True
+        assert worker_node.weight == pytest.approx(4.0 * SATURATION_BACKOFF)
+
+        # 持续饱和不会重复下调
+        worker_node.update_from_heartbeat({"capacity": "4.0", "saturated": "1"})
+        assert worker_node.load_factor == SATURATION_BACKOFF
+
+        worker_node.update_from_heartbeat({"capacity": "invalid", "saturated": "0"})
+        worker_node.update_from_heartbeat({"capacity": "-1", "saturated": "1"})
+        assert worker_node.capacity == 4.0
+        assert worker_node.load_factor == pytest.approx(SATURATION_BACKOFF ** 2)
+
+    @allure.story("更新状态")
+    @allure.title("测试恢复正常后分配系数逐级回升")
+    @allure.severity(allure.severity_level.NORMAL)
+    def test_update_from_heartbeat_recovers_load_factor(self):
+        """测试饱和解除并持续健康后分配系数每个回升间隔上调一级，最高回到 1.0"""
+        worker_node = WorkerNode("test_worker")
+        assert worker_node.update_from_heartbeat({"saturated": "1"}) is True
+        assert worker_node.update_from_heartbeat({"saturated": "1"}) is False
+
+        # 刚恢复正常时不回升
+        assert worker_node.update_from_heartbeat({"saturated": "0"}) is False
+        assert worker_node.load_factor == SATURATION_BACKOFF
+
+        worker_node.healthy_since -= LOAD_FACTOR_RECOVERY_INTERVAL
+        assert worker_node.update_from_heartbeat({"saturated": "0"}) is True
+        assert worker_node.load_factor == 1.0
+
+        # 已回到 1.0 后不再变化
+        worker_node.healthy_since -= LOAD_FACTOR_RECOVERY_INTERVAL
+        assert worker_node.update_from_heartbeat({"saturated": "0"}) is False
+        assert worker_node.load_factor == 1.0
+
     @allure.story("状态检查")
     @allure.title("测试节点是否过期")
     @allure.severity(allure.severity_level.NORMAL)
@@ -823,6 +928,146 @@ class TestMasterRunner:
         assert sum(distribution) == 10
         assert 4 in distribution  # 10 / 3 = 3 余 1，所以有一个节点会分配到 4
 
+    @allure.story("资源分配")
+    @allure.title("测试MasterRunner按权重分配资源")
+    @allure.severity(allure.severity_level.CRITICAL)
+    async def test_master_runner_distribute_weighted(self):
+        """测试用户数按权重分配且总和不变，速率按权重精确分配不取整"""
+        class MockConfig:
+            prometheus_port = 8000
+
+        runner = MasterRunner([], None, MockConfig(), None)
+
+        assert runner._distribute_resources(8, 3, [1.0, 2.0, 1.0]) == [2, 4, 2]
+        assert runner._distribute_resources(10, 3, [1.0, 1.0, 1.0]) == [4, 3, 3]
+        assert runner._distribute_resources(5, 2, [4.0, 32.0]) == [1, 4]
+        assert runner._distribute_rate(0.5, [1.0, 1.0, 2.0]) == [0.125, 0.125, 0.25]
+        # 超出上限的速率转给仍有余量的 Worker，上限为 0 的 Worker 不分配
+        assert runner._distribute_rate(10, [1.0, 1.0, 1.0], [4, 3, 3]) == pytest.approx([4, 3, 3])
+        assert runner._distribute_rate(2, [1.0, 1.0, 1.0], [1, 1, 0]) == pytest.approx([1, 1, 0])
+        assert runner._distribute_rate(
+            3, [1.0, 1.0, 1.0], [float("inf"), float("inf"), 0.0]) == pytest.approx([1.5, 1.5, 0])
+
+    @allure.story("资源分配")
+    @allure.title("测试用户数不能整除时每个Worker的速率不超过其用户数")
+    @allure.severity(allure.severity_level.CRITICAL)
+    async def test_master_runner_broadcast_rate_within_user_share(self):
+        """测试 10 个用户、速率 10 分给 3 个 Worker 时，每个 Worker 的份额都能通过参数校验"""
+        class MockConfig:
+            prometheus_port = 8000
+
+        runner = MasterRunner([], None, MockConfig(), None)
+        for worker_id in ("worker1", "worker2", "worker3"):
+            runner.workers[worker_id] = WorkerNode(worker_id)
+
+        published = {}
+
+        async def mock_publish(channel, data, worker_id=None, command=None):
+            published[worker_id] = data
+
+        runner.coordinator.publish = mock_publish
+        runner.coordinator.sync_clock = None  # 不计算计划开始时刻
+
+        await runner._broadcast_startup(10, 10)
+
+        assert [published[w]["user_count"] for w in sorted(published)] == [4, 3, 3]
+        assert [published[w]["rate"] for w in sorted(published)] == pytest.approx([4, 3, 3])
+        for data in published.values():
+            validate_load_params(data["user_count"], data["rate"])
+
+    @allure.story("资源分配")
+    @allure.title("测试份额为0的Worker")
+    @allure.severity(allure.severity_level.CRITICAL)
+    @pytest.mark.parametrize("executor", ["users", EXECUTOR_ARRIVAL_RATE])
+    async def test_master_runner_broadcast_zero_share(self, executor):
+        """测试用户数少于 Worker 数时，份额为 0 的 Worker 不分配速率，其余 Worker 的份额通过校验"""
+        class MockConfig:
+            prometheus_port = 8000
+
+        runner = MasterRunner([], None, MockConfig(), None)
+        for worker_id in ("worker1", "worker2", "worker3"):
+            runner.workers[worker_id] = WorkerNode(worker_id)
+
+        published = {}
+
+        async def mock_publish(channel, data, worker_id=None, command=None):
+            published[worker_id] = data
+
+        runner.coordinator.publish = mock_publish
+        runner.coordinator.sync_clock = None  # 不计算计划开始时刻
+
+        await runner._broadcast_startup(2, 2, executor=executor)
+
+        shares = [published[w] for w in sorted(published)]
+        assert [data["user_count"] for data in shares] == [1, 1, 0]
+        assert [data["rate"] for data in shares] == pytest.approx([1, 1, 0])
+        validate = validate_load_params if executor == "users" else validate_arrival_params
+        for data in shares[:2]:
+            validate(data["user_count"], data["rate"])
+
+    @allure.story("命令处理")
+    @allure.title("测试Worker份额为0时停止用户并确认启动")
+    @allure.severity(allure.severity_level.CRITICAL)
+    async def test_worker_runner_zero_share(self):
+        """测试 Worker 收到用户数为 0 的启动命令时不报参数错误，停止已有用户并发送启动完成"""
+        class MockConfig:
+            prometheus_port = 8000
+
+        runner = WorkerRunner([], None, MockConfig(), None)
+        published = []
+
+        async def mock_publish(channel, data, worker_id=None, command=None):
+            published.append(command)
+
+        stopped = []
+
+        async def mock_stop_all_users():
+            stopped.append(True)
+
+        runner.coordinator.publish = mock_publish
+        runner.user_manager.stop_all_users = mock_stop_all_users
+
+        await runner._handle_command({"user_count": 0, "rate": 0.0}, "master", "startup")
+
+        assert stopped == [True]
+        assert published == ["startup_completed"]
+
+    @allure.story("资源分配")
+    @allure.title("测试Worker饱和后重新分配负载")
+    @allure.severity(allure.severity_level.CRITICAL)
+    async def test_master_runner_rebalance_on_saturation(self):
+        """测试运行中的Worker报告饱和时，其份额转移给其他Worker，总负载不变"""
+        class MockConfig:
+            prometheus_port = 8000
+
+        runner = MasterRunner([], None, MockConfig(), None)
+        for worker_id in ("worker1", "worker2"):
+            runner.workers[worker_id] = WorkerNode(worker_id)
+
+        published = {}
+
+        async def mock_publish(channel, data, worker_id=None, command=None):
+            published[worker_id] = data
+
+        runner.coordinator.publish = mock_publish
+
+        await runner._broadcast_startup(20, 2)
+        assert published["worker1"] == {"user_count": 10, "rate": 1.0}
+
+        # 未运行时只更新权重，不重新分配
+        await runner._update_worker_status({"saturated": "1"}, "worker1")
+        assert published["worker1"]["user_count"] == 10
+
+        await runner.state_manager.transition_state(RunnerState.STARTING)
+        await runner.state_manager.transition_state(RunnerState.RUNNING)
+        await runner._update_worker_status({"saturated": "0"}, "worker1")
+        await runner._update_worker_status({"saturated": "1"}, "worker1")
+
+        # worker1 权重下调为 0.5625，worker2 为 1.0
+        assert published["worker1"]["user_count"] + published["worker2"]["user_count"] == 20
+        assert published["worker1"]["user_count"] == 7
+        assert published["worker1"]["rate"] + published["worker2"]["rate"] == pytest.approx(2)
+
     @allure.story("命令处理")
     @allure.title("测试MasterRunner处理命令")
     @allure.severity(allure.severity_level.NORMAL)
@@ -947,6 +1192,41 @@ class TestMasterRunner:
         # 清理资源
         await runner.quit()
 
+    @allure.story("指标处理")
+    @allure.title("测试MasterRunner整批处理Worker请求数据")
+    @allure.severity(allure.severity_level.CRITICAL)
+    async def test_master_runner_handle_worker_request_batch(self):
+        """测试整批写入指标收集器，仅在注册了处理器时逐条触发事件"""
+        class MockRedisClient:
+            pass
+
+        runner = MasterRunner([], None, object(), MockRedisClient())
+        runner.metrics_collector = MetricsCollector(
+            node_type="master", node_id="test-master-batch")
+
+        batch = [
+            {"method": "GET", "endpoint": "/api/master-batch", "status_code": 200,
+             "duration": 0.01, "response_size": 10},
+            {"method": "GET", "endpoint": "/api/master-batch", "status_code": 200,
+             "duration": 0.02, "response_size": 10},
+        ]
+        await runner._handle_worker_request_batch(batch, "worker1")
+        assert runner.metrics_collector._latency[("GET", "/api/master-batch")].count == 2
+
+        received = []
+
+        async def on_worker_metrics(**kwargs):
+            received.append(kwargs["worker_id"])
+
+        await worker_request_metrics.add_handler(on_worker_metrics)
+        try:
+            await runner._handle_worker_request_batch(batch, "worker2")
+        finally:
+            await worker_request_metrics.remove_handler(on_worker_metrics)
+
+        assert received == ["worker2", "worker2"]
+        assert runner.metrics_collector._latency[("GET", "/api/master-batch")].count == 4
+
     @allure.story("Worker管理")
     @allure.title("测试MasterRunner获取健康Worker")
     @allure.severity(allure.severity_level.NORMAL)
@@ -1009,6 +1289,37 @@ class TestMasterRunner:
         # 清理资源
         await runner.quit()
 
+    @allure.story("Worker管理")
+    @allure.title("测试MasterRunner批量检查Worker心跳")
+    @allure.severity(allure.severity_level.NORMAL)
+    async def test_master_runner_get_healthy_workers_batch(self):
+        """测试所有Worker的心跳通过一次批量调用检查，失联的Worker被标记为丢失"""
+        class MockCoordinator:
+            def __init__(self):
+                self.calls = []
+
+            async def check_workers_heartbeat(self, worker_ids):
+                worker_ids = list(worker_ids)
+                self.calls.append(worker_ids)
+                return {worker_id: worker_id != "worker3" for worker_id in worker_ids}
+
+        class MockConfig:
+            prometheus_port = 8006
+
+        runner = MasterRunner([], None, MockConfig(), None)
+        runner.coordinator = MockCoordinator()
+        for worker_id, status in (("worker1", RunnerState.RUNNING),
+                                  ("worker2", RunnerState.PAUSED),
+                                  ("worker3", RunnerState.RUNNING)):
+            runner.workers[worker_id] = WorkerNode(worker_id)
+            runner.workers[worker_id].status = status
+
+        healthy_workers = await runner.get_healthy_workers()
+
+        assert runner.coordinator.calls == [["worker1", "worker2", "worker3"]]
+        assert [worker.node_id for worker in healthy_workers] == ["worker1"]
+        assert runner.workers["worker3"].status == RunnerState.MISSING
+
     @allure.story("退出")
     @allure.title("测试MasterRunner退出")
     @allure.severity(allure.severity_level.CRITICAL)
@@ -1296,6 +1607,114 @@ class TestMasterRunner:
         # 清理资源
         await runner.quit()
 
+    @allure.story("资源分配")
+    @allure.title("测试MasterRunner按到达率广播启动命令")
+    @allure.severity(allure.severity_level.CRITICAL)
+    async def test_master_runner_broadcast_arrival_rate(self):
+        """测试到达率模式下速率按比例精确分配，并携带执行器类型"""
+        class TestArrivalShape(ArrivalRateShape):
+            def tick(self):
+                return None
+
+        class MockRedisClient:
+            async def publish(self, *args, **kwargs):
+                pass
+
+        class MockConfig:
+            def __init__(self):
+                self.prometheus_port = 8016  # 使用不同端口避免冲突
+                self.metrics_batch_size = 100
+                self.metrics_flush_interval = 1.0
+                self.metrics_buffer_size = 10000
+
+        runner = MasterRunner([], TestArrivalShape(), MockConfig(), MockRedisClient())
+        await runner.initialize()
+
+        # 到达率形状使用 apply_arrival_rate 作为回调
+        assert runner.load_shape_manager.apply_load_callback == runner.apply_arrival_rate
+
+        for worker_id in ("worker1", "worker2", "worker3"):
+            runner.workers[worker_id] = WorkerNode(worker_id)
+            runner.workers[worker_id].status = RunnerState.READY
+
+        published_commands = []
+
+        async def mock_publish(channel, data, worker_id=None, command=None):
+            published_commands.append(data)
+
+        runner.coordinator.publish = mock_publish
+
+        await runner._broadcast_startup(7, 10, executor=EXECUTOR_ARRIVAL_RATE)
+
+        assert len(published_commands) == 3
+        assert sum(data["user_count"] for data in published_commands) == 7
+        assert sum(data["rate"] for data in published_commands) == pytest.approx(10)
+        assert all(data["executor"] == EXECUTOR_ARRIVAL_RATE for data in published_commands)
+
+        await runner.quit()
+
+    @allure.story("资源分配")
+    @allure.title("测试MasterRunner广播计划开始时刻")
+    @allure.severity(allure.severity_level.CRITICAL)
+    async def test_master_runner_broadcast_start_at(self):
+        """测试启动命令携带共同的计划时刻（Redis 服务器时间），各 Worker 的时间表错开"""
+        class MockRedisClient:
+            async def time(self):
+                now = time.time() + 30.0  # 服务器时钟比本地快 30 秒
+                return [int(now), int(now % 1 * 1_000_000)]
+
+        class MockConfig:
+            prometheus_port = 8000
+
+        runner = MasterRunner([], None, MockConfig(), MockRedisClient())
+        for worker_id in ("worker1", "worker2"):
+            runner.workers[worker_id] = WorkerNode(worker_id)
+
+        published = {}
+
+        async def mock_publish(channel, data, worker_id=None, command=None):
+            published[worker_id] = data
+
+        runner.coordinator.publish = mock_publish
+        await runner._broadcast_startup(10, 4)
+
+        start_at = published["worker1"]["start_at"]
+        assert start_at == pytest.approx(time.time() + 30.0 + STARTUP_LEAD_TIME, abs=0.1)
+        # 每个 Worker 速率为 2/s，worker2 错开半个间隔
+        assert published["worker2"]["start_at"] - start_at == pytest.approx(0.25)
+
+    @allure.story("命令处理")
+    @allure.title("测试Worker按计划时刻启动")
+    @allure.severity(allure.severity_level.CRITICAL)
+    async def test_worker_runner_startup_start_at(self):
+        """测试Worker将计划时刻换算为本地事件循环时间，并上报实际启动偏差"""
+        class MockRedisClient:
+            async def time(self):
+                now = time.time() - 30.0  # 服务器时钟比本地慢 30 秒
+                return [int(now), int(now % 1 * 1_000_000)]
+
+        class MockConfig:
+            prometheus_port = 8000
+
+        runner = WorkerRunner([], None, MockConfig(), MockRedisClient())
+        published = []
+
+        async def mock_publish(channel, data, worker_id=None, command=None):
+            published.append(data)
+
+        runner.coordinator.publish = mock_publish
+
+        loop = asyncio.get_running_loop()
+        await runner.coordinator.sync_clock()
+        start_at = runner.coordinator.server_time() + 0.2
+        await runner._handle_command({"user_count": 1, "rate": 1.0, "start_at": start_at},
+                                     "master", "startup")
+
+        assert loop.time() >= runner.coordinator.server_to_loop_time(start_at) - 0.01
+        assert 0 <= runner.start_skew < 0.1
+        assert published[-1]["start_skew"] == runner.start_skew
+        assert "clock_error" in published[-1]
+
     @allure.story("资源分配")
     @allure.title("测试MasterRunner广播启动命令无Worker时抛出异常")
     @allure.severity(allure.severity_level.NORMAL)
@@ -1349,6 +1768,137 @@ class TestMasterRunner:
         await runner.quit()
 
 
+
+@allure.feature("AggregatorRunner")
+class TestAggregatorRunner:
+    """AggregatorRunner测试类"""
+
+    class MockConfig:
+        prometheus_port = 8000
+        metrics_flush_interval = 1.0
+        aggregator_group = "g1"
+
+    @allure.story("初始化")
+    @allure.title("测试AggregatorRunner初始化")
+    @allure.severity(allure.severity_level.CRITICAL)
+    def test_aggregator_runner_initialization(self):
+        """测试聚合节点下游使用分组命名空间，上游以Worker身份连接Master"""
+        runner = AggregatorRunner([], None, self.MockConfig(), None)
+
+        assert runner.node == "aggregator"
+        assert runner.client_id == "aggregator_g1"
+        assert runner.coordinator.role == NODE_TYPE_MASTER
+        assert runner.coordinator.subscribe_channel == "aiotest:g1:command:worker_to_master"
+        assert runner.coordinator.metrics_channel == "aiotest:g1:metrics"
+        assert runner.upstream.role == NODE_TYPE_WORKER
+        assert runner.upstream.node_id == "aggregator_g1"
+        assert runner.upstream.publish_channel == "aiotest:command:worker_to_master"
+
+        class NoGroupConfig:
+            prometheus_port = 8000
+
+        with pytest.raises(ValueError):
+            AggregatorRunner([], None, NoGroupConfig(), None)
+
+    @allure.story("数据汇总")
+    @allure.title("测试汇总心跳与转发聚合指标")
+    @allure.severity(allure.severity_level.CRITICAL)
+    async def test_aggregator_runner_rollup(self):
+        """测试组内Worker的心跳被汇总，原始数据和聚合数据合并后一次转发给上游"""
+        runner = AggregatorRunner([], None, self.MockConfig(), None)
+        workers = []
+        for worker_id, cpu, users, capacity in (("w1", 20.0, 10, 1.0), ("w2", 40.0, 30, 3.0)):
+            worker = WorkerNode(worker_id)
+            worker.update_from_heartbeat({
+                "cpu_percent": cpu, "active_users": users, "capacity": capacity, "saturated": "1"})
+            workers.append(worker)
+
+        heartbeat = runner._rollup_heartbeat(workers)
+        assert heartbeat["cpu_percent"] == 30
+        assert heartbeat["active_users"] == 40
+        assert heartbeat["capacity"] == pytest.approx(4.0 * SATURATION_BACKOFF)
+        assert heartbeat["workers"] == 2
+        assert heartbeat["saturated"] == 1
+        assert runner._rollup_heartbeat([])["saturated"] == 0
+
+        record = {"method": "GET", "endpoint": "/a", "status_code": 200,
+                  "assertion_result": "success", "duration": 0.1,
+                  "response_size": 10, "error": None}
+        await runner._handle_worker_request_batch([record, record], "w1")
+        await runner._handle_worker_request_batch([record], "w2")
+
+        published = []
+
+        async def mock_publish(channel, data, worker_id=None, **kwargs):
+            published.append((channel, data, worker_id))
+
+        runner.upstream.publish = mock_publish
+        await runner._flush_aggregates()
+
+        assert len(published) == 1
+        channel, aggregates, worker_id = published[0]
+        assert channel == "request_aggregates"
+        assert worker_id == "aggregator_g1"
+        assert len(aggregates) == 1
+        assert aggregates[0]["count"] == 3
+
+        # 上游发送失败时合并回聚合器，等待下次发送
+        async def failing_publish(*args, **kwargs):
+            raise ConnectionError("redis down")
+
+        await runner._handle_worker_request_aggregates(aggregates, "w2")
+        runner.upstream.publish = failing_publish
+        await runner._flush_aggregates()
+        assert len(runner._aggregator) == 1
+
+    @allure.story("命令处理")
+    @allure.title("测试转发启动与停止命令")
+    @allure.severity(allure.severity_level.CRITICAL)
+    async def test_aggregator_runner_relay_commands(self):
+        """测试上游启动命令按组内Worker权重分配并原样传递计划时刻，停止在全部Worker确认后上报"""
+        runner = AggregatorRunner([], None, self.MockConfig(), None)
+        for worker_id in ("w1", "w2"):
+            runner.workers[worker_id] = WorkerNode(worker_id)
+
+        downstream = {}
+        upstream = []
+
+        async def mock_downstream_publish(channel, data, worker_id=None, command=None):
+            downstream[(command, worker_id)] = data
+            if command == "startup":
+                skew = 0.004 if worker_id == "w2" else -0.001
+                await runner._handle_command({"start_skew": skew}, worker_id, "startup_completed")
+
+        async def mock_upstream_publish(channel, data, worker_id=None, command=None):
+            upstream.append((command, data))
+
+        async def mock_check_workers_heartbeat(worker_ids):
+            return {worker_id: True for worker_id in worker_ids}
+
+        runner.coordinator.publish = mock_downstream_publish
+        runner.coordinator.check_workers_heartbeat = mock_check_workers_heartbeat
+        runner.upstream.publish = mock_upstream_publish
+
+        await runner._handle_upstream_command(
+            {"user_count": 5, "rate": 2.0, "start_at": 1000.0}, "aggregator_g1", "startup")
+
+        assert downstream[("startup", "w1")] == {"user_count": 3, "rate": 1.0, "start_at": 1000.0}
+        assert downstream[("startup", "w2")]["user_count"] == 2
+        assert downstream[("startup", "w2")]["start_at"] == pytest.approx(1000.5)
+        assert runner.state_manager.get_current_state() == RunnerState.RUNNING
+        assert upstream == [("startup_completed", {"user_count": 5, "start_skew": 0.004})]
+
+        await runner._handle_upstream_command({}, "aggregator_g1", "stop")
+        assert ("stop", None) in downstream
+        assert len(upstream) == 1
+
+        await runner._handle_command({}, "w1", "stop")
+        assert len(upstream) == 1
+        await runner._handle_command({}, "w2", "stop")
+        assert upstream[-1] == ("stop", {})
+        assert runner.state_manager.get_current_state() == RunnerState.READY
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
 
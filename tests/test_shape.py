@@ -6,7 +6,7 @@ from timeit import default_timer
 import allure
 import pytest
 
-from aiotest.shape import LoadUserShape
+from aiotest.shape import ArrivalRateShape, LoadUserShape
 
 
 # 测试用的负载形状类（在测试文件中定义，避免导入问题）
@@ -331,5 +331,34 @@ class TestLoadUserShape:
         assert shape.pause_time == 0.0
 
 
+@allure.feature("ArrivalRateShape")
+class TestArrivalRateShape:
+    """ArrivalRateShape 类的测试用例"""
+
+    @allure.story("抽象方法")
+    @allure.title("测试到达率形状必须实现 tick")
+    @allure.severity(allure.severity_level.NORMAL)
+    def test_abstract_tick(self):
+        """测试未实现 tick 的子类不能实例化"""
+        class IncompleteShape(ArrivalRateShape):
+            pass
+
+        with pytest.raises(TypeError):
+            IncompleteShape()
+
+    @allure.story("控制参数")
+    @allure.title("测试到达率形状返回用户池大小和到达率")
+    @allure.severity(allure.severity_level.NORMAL)
+    def test_tick(self):
+        """测试到达率形状是 LoadUserShape 的子类并返回 (max_users, arrival_rate)"""
+        class FixedRateShape(ArrivalRateShape):
+            def tick(self):
+                return (20, 12.5)
+
+        shape = FixedRateShape()
+        assert isinstance(shape, LoadUserShape)
+        assert shape.tick() == (20, 12.5)
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
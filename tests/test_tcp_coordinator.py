@@ -0,0 +1,261 @@
+# encoding: utf-8
+
+import asyncio
+import time
+
+import allure
+import pytest
+
+from aiotest.metrics_codec import WIRE_JSON, MetricsBatch
+from aiotest.tcp_coordinator import (
+    FRAME_COMMAND,
+    FRAME_HEARTBEAT,
+    MAX_FRAME_SIZE,
+    TcpCoordinator,
+    encode_frame,
+    read_frame,
+)
+
+
+async def wait_until(predicate, timeout=2.0):
+    """轮询直到条件成立"""
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline, "等待超时"
+        await asyncio.sleep(0.01)
+
+
+@pytest.fixture
+async def master():
+    """监听本机随机端口的 Master 协调器"""
+    coordinator = TcpCoordinator("127.0.0.1", 0, role="master")
+    await coordinator.start()
+    yield coordinator
+    await coordinator.close()
+
+
+@pytest.fixture
+async def worker(master):
+    """连接到 Master 的 Worker 协调器"""
+    coordinator = TcpCoordinator("127.0.0.1", master.port, role="worker", node_id="worker_1")
+    yield coordinator
+    await coordinator.close()
+
+
+def make_records(count):
+    """生成 _convert_metrics_to_dict 格式的指标字典"""
+    return [
+        {"method": "GET", "endpoint": "/tcp", "status_code": 200, "duration": 0.01 * (i + 1),
+         "corrected_duration": None, "response_size": 10, "error": None,
+         "assertion_result": "pass"}
+        for i in range(count)
+    ]
+
+
+@allure.feature("TCP协调器")
+class TestTcpCoordinator:
+    """TcpCoordinator 的测试用例（全部在本机回环地址上运行）"""
+
+    @allure.story("帧格式")
+    @allure.title("测试长度前缀帧的编码与读取")
+    @allure.severity(allure.severity_level.NORMAL)
+    async def test_frame_round_trip(self):
+        """测试连续帧可逐个读出，长度无效时抛出 ValueError"""
+        reader = asyncio.StreamReader()
+        reader.feed_data(encode_frame(FRAME_COMMAND, b'{"command":"stop"}') +
+                         encode_frame(FRAME_HEARTBEAT))
+        assert await read_frame(reader) == (FRAME_COMMAND, b'{"command":"stop"}')
+        assert await read_frame(reader) == (FRAME_HEARTBEAT, b"")
+
+        reader.feed_data((MAX_FRAME_SIZE + 1).to_bytes(4, 'big') + b"\x02")
+        with pytest.raises(ValueError):
+            await read_frame(reader)
+
+        reader.feed_eof()
+        with pytest.raises(asyncio.IncompleteReadError):
+            await read_frame(reader)
+
+    @allure.story("命令")
+    @allure.title("测试双向命令传递")
+    @allure.severity(allure.severity_level.CRITICAL)
+    async def test_commands(self, master, worker):
+        """测试 Master 定向与广播命令、Worker 确认命令，收到 quit 后监听器退出"""
+        master_received = []
+        worker_received = []
+
+        async def master_handler(data, worker_id, command):
+            master_received.append((data, worker_id, command))
+
+        async def worker_handler(data, worker_id, command):
+            worker_received.append((data, worker_id, command))
+
+        master_task = asyncio.create_task(master.listen_commands(master_handler))
+        worker_task = asyncio.create_task(worker.listen_commands(worker_handler))
+        await wait_until(lambda: "worker_1" in master._connections)
+
+        await master.publish("command", {"user_count": 3}, worker_id="worker_1", command="startup")
+        await master.publish("command", {}, worker_id="worker_unknown", command="startup")
+        await wait_until(lambda: worker_received)
+        assert worker_received == [({"user_count": 3}, "worker_1", "startup")]
+
+        await worker.publish("command", {"user_count": 3}, worker_id="worker_1",
+                             command="startup_completed")
+        await wait_until(lambda: master_received)
+        assert master_received == [({"user_count": 3}, "worker_1", "startup_completed")]
+
+        await master.publish("command", {}, command="quit")
+        await asyncio.wait_for(worker_task, 2.0)
+        assert worker_received[-1] == (None, None, "quit")
+
+        master_task.cancel()
+        await asyncio.gather(master_task, return_exceptions=True)
+
+    @allure.story("心跳")
+    @allure.title("测试心跳与连接状态决定存活")
+    @allure.severity(allure.severity_level.CRITICAL)
+    async def test_heartbeats(self, master, worker):
+        """测试心跳回调收到 Worker 数据，连接断开的 Worker 立即视为失联"""
+        received = []
+
+        async def callback(heartbeat_data, worker_id):
+            received.append((heartbeat_data, worker_id))
+
+        task = asyncio.create_task(master.listen_heartbeats(callback))
+        assert await master.check_worker_heartbeat("worker_1") is False
+
+        await worker.publish("heartbeat", {"cpu_percent": 45.0, "active_users": 10})
+        await wait_until(lambda: received)
+        heartbeat_data, worker_id = received[0]
+        assert worker_id == "worker_1"
+        assert heartbeat_data["active_users"] == 10
+        assert "timestamp" in heartbeat_data
+        assert await master.check_workers_heartbeat(["worker_1", "worker_2"]) == {
+            "worker_1": True, "worker_2": False}
+
+        await worker.close()
+        await wait_until(lambda: "worker_1" not in master._connections)
+        assert await master.check_worker_heartbeat("worker_1") is False
+
+        # 下次发送时自动重连
+        await worker.publish("heartbeat", {"cpu_percent": 50.0})
+        await wait_until(lambda: len(received) == 2)
+        assert await master.check_worker_heartbeat("worker_1") is True
+
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    @allure.story("指标")
+    @allure.title("测试原始批次与聚合记录的传输")
+    @allure.severity(allure.severity_level.CRITICAL)
+    @pytest.mark.parametrize("encoding", ["binary", WIRE_JSON])
+    async def test_request_metrics(self, master, encoding):
+        """测试原始批次按编码分块发送，聚合记录原样到达"""
+        worker = TcpCoordinator("127.0.0.1", master.port, role="worker",
+                                node_id="worker_1", metrics_encoding=encoding)
+        batches = []
+        aggregates = []
+
+        async def batch_callback(batch, worker_id):
+            batches.append((batch, worker_id))
+
+        async def aggregate_callback(records, worker_id):
+            aggregates.append((records, worker_id))
+
+        task = asyncio.create_task(master.listen_request_metrics(
+            batch_callback=batch_callback, aggregate_callback=aggregate_callback))
+
+        await worker.publish("request_metrics", make_records(1500), worker_id="worker_1")
+        await worker.publish("request_aggregates", [{"count": 3}], worker_id="worker_1")
+        await wait_until(lambda: len(batches) == 2 and aggregates)
+
+        assert [len(batch) for batch, _ in batches] == [1000, 500]
+        assert all(worker_id == "worker_1" for _, worker_id in batches)
+        assert isinstance(batches[0][0], MetricsBatch) == (encoding == "binary")
+        assert aggregates == [([{"count": 3}], "worker_1")]
+
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        await worker.close()
+
+    @allure.story("指标")
+    @allure.title("测试回调失败后继续接收指标")
+    @allure.severity(allure.severity_level.NORMAL)
+    async def test_request_metrics_callback_failure(self, master, worker):
+        """测试批量回调抛出异常时监听器记录警告并继续处理后续消息"""
+        batches = []
+
+        async def batch_callback(batch, worker_id):
+            batches.append(len(batch))
+            if len(batches) == 1:
+                raise RuntimeError("ingest failed")
+
+        task = asyncio.create_task(master.listen_request_metrics(batch_callback=batch_callback))
+
+        await worker.publish("request_metrics", make_records(1), worker_id="worker_1")
+        await worker.publish("request_metrics", make_records(2), worker_id="worker_1")
+        await wait_until(lambda: len(batches) == 2)
+
+        assert batches == [1, 2]
+        assert not task.done()
+
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    @allure.story("指标")
+    @allure.title("测试指标积压时心跳与命令照常传输")
+    @allure.severity(allure.severity_level.CRITICAL)
+    async def test_metrics_backpressure_keeps_control_frames(self, master, worker):
+        """测试 Master 指标队列已满时只暂停指标连接，心跳与命令确认不受影响"""
+        master._metrics = asyncio.Queue(maxsize=1)
+        heartbeats = []
+
+        async def callback(heartbeat_data, worker_id):
+            heartbeats.append(worker_id)
+
+        heartbeat_task = asyncio.create_task(master.listen_heartbeats(callback))
+        for _ in range(3):
+            await worker.publish("request_metrics", make_records(1), worker_id="worker_1")
+        await wait_until(master._metrics.full)
+
+        await worker.publish("heartbeat", {"cpu_percent": 45.0})
+        await worker.publish("command", {}, worker_id="worker_1", command="stop")
+        await wait_until(lambda: heartbeats)
+        assert await master.check_worker_heartbeat("worker_1") is True
+        assert master._commands.get_nowait() == (None, "worker_1", "stop")
+
+        # 消费积压后剩余指标继续到达
+        for _ in range(3):
+            await asyncio.wait_for(master._metrics.get(), 2.0)
+
+        heartbeat_task.cancel()
+        await asyncio.gather(heartbeat_task, return_exceptions=True)
+
+    @allure.story("时钟同步")
+    @allure.title("测试以 Master 时间为准同步时钟")
+    @allure.severity(allure.severity_level.NORMAL)
+    async def test_sync_clock(self, master, worker):
+        """测试 Worker 测量的偏移可把 Master 时间换算为本地事件循环时间"""
+        assert master.clock_synced is True
+        assert await master.sync_clock() == 0.0
+        assert worker.clock_synced is False
+
+        rtt = await worker.sync_clock()
+        assert worker.clock_synced is True
+        assert rtt == worker.clock_rtt >= 0
+        assert worker.server_time() == pytest.approx(time.time(), abs=0.05)
+
+        loop = asyncio.get_running_loop()
+        assert worker.server_to_loop_time(master.server_time() + 1.0) == pytest.approx(
+            loop.time() + 1.0, abs=0.05)
+
+    @allure.story("参数校验")
+    @allure.title("测试无效参数")
+    @allure.severity(allure.severity_level.MINOR)
+    async def test_invalid_usage(self, master):
+        """测试无效角色、Master 发布心跳与缺少 command 参数"""
+        with pytest.raises(ValueError):
+            TcpCoordinator(role="observer")
+        with pytest.raises(ValueError):
+            await master.publish("heartbeat", {})
+        with pytest.raises(ValueError):
+            await master.publish("command", {})
@@ -1,11 +1,13 @@
 # encoding: utf-8
 
 import asyncio
+import time
 
 import allure
 import pytest
 
-from aiotest.user_manager import UserManager
+from aiotest.resource_sampler import LoopLagMonitor
+from aiotest.user_manager import UserManager, UserRegistry
 from aiotest.users import User, weight
 
 
@@ -296,6 +298,66 @@ class TestBatchExecute:
 
         assert len(executed) == 3
 
+    @allure.story("批量执行")
+    @allure.title("测试固定时间线补偿操作耗时")
+    @allure.severity(allure.severity_level.CRITICAL)
+    async def test_batch_execute_compensates_drift(self):
+        """测试操作耗时不累积到间隔中，实际速率接近请求速率"""
+        manager = UserManager([TestUser], {})
+        executed = []
+
+        async def slow_operation(item):
+            executed.append(item)
+            await asyncio.sleep(0.005)
+
+        loop = asyncio.get_running_loop()
+        start_time = loop.time()
+        achieved_rate = await manager._batch_execute(list(range(21)), slow_operation, 100.0)
+        duration = loop.time() - start_time
+
+        assert len(executed) == 21
+        # 逐个等待 1/rate 时至少需要 20 × (0.01 + 0.005) = 0.3 秒
+        assert 0.2 <= duration < 0.28
+        assert achieved_rate == pytest.approx(100.0, rel=0.1)
+        assert manager.last_spawn_stats["count"] == 21
+        assert manager.last_spawn_stats["requested_rate"] == 100.0
+
+    @allure.story("批量执行")
+    @allure.title("测试落后时按批追赶")
+    @allure.severity(allure.severity_level.CRITICAL)
+    async def test_batch_execute_catches_up(self):
+        """测试事件循环被阻塞后，一次调度补齐所有到期项目"""
+        manager = UserManager([TestUser], {})
+        loop = asyncio.get_running_loop()
+        executed_at = []
+
+        async def operation(item):
+            executed_at.append(loop.time())
+            if item == 0:
+                time.sleep(0.05)  # 阻塞事件循环，模拟负载生成器短暂饱和
+
+        start_time = loop.time()
+        achieved_rate = await manager._batch_execute(list(range(1000)), operation, 2000.0)
+
+        assert len(executed_at) == 1000
+        # 阻塞期间到期的约 100 个项目在阻塞结束后立即补齐
+        assert sum(1 for t in executed_at if t - start_time < 0.06) >= 90
+        assert achieved_rate == pytest.approx(2000.0, rel=0.1)
+
+    @allure.story("批量执行")
+    @allure.title("测试操作异常不中断批量执行")
+    @allure.severity(allure.severity_level.NORMAL)
+    async def test_batch_execute_operation_error(self):
+        """测试单个操作失败时其余项目照常处理，统计只计成功数"""
+        manager = UserManager([TestUser], {})
+
+        async def operation(item):
+            if item == 1:
+                raise RuntimeError("boom")
+
+        await manager._batch_execute([0, 1, 2], operation, 0)
+        assert manager.last_spawn_stats["count"] == 2
+
 
 @allure.feature("用户操作")
 class TestUserOperations:
@@ -330,6 +392,25 @@ class TestUserOperations:
         # 停止用户
         await manager._stop_user(user)
 
+    @allure.story("启动闸门")
+    @allure.title("测试事件循环饱和时暂缓启动用户")
+    @allure.severity(allure.severity_level.NORMAL)
+    async def test_spawn_gate_delays_start(self):
+        """测试启动闸门饱和时，启动用户需等待事件循环恢复"""
+        manager = UserManager([TestUser], {"host": "http://localhost:8080"})
+        monitor = LoopLagMonitor(threshold=0.1)
+        monitor.record(0.5)
+        manager.spawn_gate = monitor
+
+        start_task = asyncio.create_task(manager._create_and_start_user(TestUser))
+        await asyncio.sleep(0.05)
+        assert len(manager.active_users) == 0
+
+        monitor.record(0.0)
+        await start_task
+        assert len(manager.active_users) == 1
+        await manager.stop_all_users()
+
 
 @allure.feature("用户选择")
 class TestUserSelection:
@@ -390,23 +471,6 @@ class TestStateManagement:
         await manager._start_users(5, 10.0)
         assert manager.active_user_count >= 0
 
-    @allure.story("状态管理")
-    @allure.title("测试清理非活跃用户")
-    @allure.severity(allure.severity_level.NORMAL)
-    async def test_cleanup_inactive_users(self):
-        """测试清理非活跃用户"""
-        user_types = [TestUser]
-        config = {"host": "http://localhost:8080"}
-        manager = UserManager(user_types, config)
-
-        # 启动用户
-        await manager._start_users(3, 10.0)
-        initial_count = len(manager.active_users)
-
-        # 清理非活跃用户
-        manager.cleanup_inactive_users()
-        # 活跃用户数应该保持不变或减少
-
     @allure.story("状态管理")
     @allure.title("测试停止所有用户")
     @allure.severity(allure.severity_level.NORMAL)
@@ -496,5 +560,131 @@ class TestStateManagement:
         assert len(manager.active_users) == 0
 
 
+
+@allure.feature("用户登记表")
+class TestUserRegistry:
+    """UserRegistry 及其在 UserManager 中使用的测试用例"""
+
+    @allure.story("计数")
+    @allure.title("测试任务结束时自动移除用户")
+    @allure.severity(allure.severity_level.CRITICAL)
+    async def test_done_callback_removes_user(self):
+        """测试用户任务自行结束或被停止后，计数随之更新"""
+        registry = UserRegistry()
+        users = [TestUser() for _ in range(3)]
+        for user in users:
+            user.start_tasks()
+            registry.add(user)
+        registry.add(users[0])  # 重复登记被忽略
+        assert len(registry) == 3
+        assert registry.count(TestUser) == 3
+
+        users[0].tasks.cancel()
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        assert len(registry) == 2
+        assert registry.counts() == {TestUser: 2}
+        assert list(registry) == users[1:]
+
+        await users[1].stop_tasks()
+        assert len(registry) == 1
+        registry.discard(users[1])  # 已移除时忽略
+        assert len(registry) == 1
+
+        await users[2].stop_tasks()
+        assert len(registry) == 0
+        assert registry.counts() == {}
+
+    @allure.story("用户选择")
+    @allure.title("测试按启动顺序和权重选择要停止的用户")
+    @allure.severity(allure.severity_level.CRITICAL)
+    async def test_select_oldest_by_weight(self):
+        """测试各类型按启动顺序取最早的用户，数量按当前比例分配"""
+        manager = UserManager([WeightedUser1, WeightedUser2], {})
+        await manager._start_users(10, 0)
+        assert manager.registry.counts() == {WeightedUser1: 4, WeightedUser2: 6}
+
+        users_to_stop = await manager._select_users_to_stop(5)
+        assert len(users_to_stop) == 5
+        assert users_to_stop[:2] == manager.registry.oldest(WeightedUser1, 2)
+        assert users_to_stop[2:] == manager.registry.oldest(WeightedUser2, 3)
+
+        await manager._stop_users(5, 0)
+        assert manager.active_user_count == 5
+        assert manager.registry.counts() == {WeightedUser1: 2, WeightedUser2: 3}
+        await manager.stop_all_users()
+        assert manager.active_user_count == 0
+
+
+
+@allure.feature("批量启停")
+class TestGroupOperations:
+    """停止、暂停、恢复全部用户的测试用例"""
+
+    @allure.story("停止")
+    @allure.title("测试并行数受限的批量停止")
+    @allure.severity(allure.severity_level.CRITICAL)
+    async def test_stop_all_users_bounded(self):
+        """测试 on_stop 较慢时多个用户并行停止，且同时停止的数量不超过上限"""
+        state = {"running": 0, "peak": 0}
+
+        class SlowStopUser(User):
+            async def test_task(self):
+                await asyncio.sleep(0.1)
+
+            async def on_stop(self):
+                state["running"] += 1
+                state["peak"] = max(state["peak"], state["running"])
+                await asyncio.sleep(0.05)
+                state["running"] -= 1
+
+        manager = UserManager([SlowStopUser], {})
+        await manager._start_users(20, 0)
+
+        loop = asyncio.get_running_loop()
+        start_time = loop.time()
+        await manager.stop_all_users(concurrency=5)
+        duration = loop.time() - start_time
+
+        assert manager.active_user_count == 0
+        assert state["peak"] == 5
+        # 逐个停止至少需要 20 × 0.05 = 1 秒
+        assert duration < 0.5
+
+    @allure.story("暂停/恢复")
+    @allure.title("测试共享闸门暂停与恢复全部用户")
+    @allure.severity(allure.severity_level.CRITICAL)
+    async def test_pause_resume_gate(self):
+        """测试暂停/恢复只切换共享闸门，用户任务随之停下和继续"""
+        executed = []
+
+        class CountingUser(User):
+            wait_time = 0.01
+
+            async def test_task(self):
+                executed.append(1)
+
+        manager = UserManager([CountingUser], {})
+        await manager._start_users(3, 0)
+        await asyncio.sleep(0.05)
+        assert executed
+
+        await manager.pause_all_users()
+        assert not manager.pause_gate.is_set()
+        assert all(user._pause_event.is_set() for user in manager.active_users)
+        await asyncio.sleep(0.03)
+        count = len(executed)
+        await asyncio.sleep(0.05)
+        assert len(executed) == count
+
+        await manager.resume_all_users()
+        await asyncio.sleep(0.05)
+        assert len(executed) > count
+
+        await manager.pause_all_users()
+        await manager.stop_all_users()
+        assert manager.pause_gate.is_set()
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
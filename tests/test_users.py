@@ -1,11 +1,13 @@
 # encoding: utf-8
 
 import asyncio
+from unittest.mock import patch
 
 import allure
 import pytest
 
 from aiotest import ExecutionMode, HttpUser, User, WaitTimeResolver, weight
+from aiotest.clients import schedule_lag
 
 
 @allure.feature("WaitTimeResolver")
@@ -618,6 +620,216 @@ class TestUser:
 
         await user.stop_tasks()
 
+    @allure.story("任务执行")
+    @allure.title("测试并发槽位不被慢任务阻塞")
+    @allure.severity(allure.severity_level.CRITICAL)
+    async def test_run_concurrent_slots_independent(self):
+        """测试某个槽位执行慢任务时，其他槽位继续执行快任务，不等待同轮最慢的任务"""
+        class TestUserClass(User):
+            wait_time = 0
+            execution_mode = ExecutionMode.CONCURRENT
+
+            def __init__(self):
+                super().__init__()
+                self.fast_count = 0
+
+            async def test_slow(self):
+                await asyncio.sleep(0.2)
+
+            async def test_fast(self):
+                await asyncio.sleep(0.01)
+                self.fast_count += 1
+
+        user = TestUserClass()
+        assert user.max_concurrent_tasks == 2
+        # 第一个槽位选中慢任务，之后的选择都是快任务
+        picks = iter([TestUserClass.test_slow])
+        with patch("aiotest.users.random.choice",
+                   side_effect=lambda jobs: next(picks, TestUserClass.test_fast)):
+            user.start_tasks()
+            await asyncio.sleep(0.25)
+            await user.stop_tasks()
+        # 按轮 gather 时 0.25 秒内只能完成两轮，快任务至多 2 次
+        assert user.fast_count >= 6
+
+    @allure.story("任务执行")
+    @allure.title("测试并发槽位数等于 max_concurrent_tasks")
+    @allure.severity(allure.severity_level.NORMAL)
+    async def test_run_concurrent_slot_count(self):
+        """测试权重相同时槽位数不受任务数限制，每个槽位独立选取任务"""
+        class TestUserClass(User):
+            wait_time = 0
+            execution_mode = ExecutionMode.CONCURRENT
+
+            def __init__(self):
+                super().__init__(max_concurrent_tasks=4)
+                self.running = 0
+                self.peak = 0
+
+            async def test_only(self):
+                self.running += 1
+                self.peak = max(self.peak, self.running)
+                await asyncio.sleep(0.02)
+                self.running -= 1
+
+        user = TestUserClass()
+        user.start_tasks()
+        await asyncio.sleep(0.1)
+        await user.stop_tasks()
+        assert user.peak == 4
+
+    @allure.story("节奏调度")
+    @allure.title("测试并发槽位共享节奏调度时间表")
+    @allure.severity(allure.severity_level.NORMAL)
+    async def test_run_concurrent_pacing(self):
+        """测试每个 pacing 周期开始 max_concurrent_tasks 个任务，且按时开始时延迟为 0"""
+        class TestUserClass(User):
+            pacing = 0.1
+            execution_mode = ExecutionMode.CONCURRENT
+
+            def __init__(self):
+                super().__init__()
+                self.lags = []
+
+            async def test_task1(self):
+                self.lags.append(schedule_lag.get())
+
+            async def test_task2(self):
+                self.lags.append(schedule_lag.get())
+
+        user = TestUserClass()
+        task = asyncio.create_task(user._run_concurrent())
+        await asyncio.sleep(0.32)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+        # 计划时刻 0、0.05、0.10 ... 0.30
+        assert 6 <= len(user.lags) <= 8
+        assert all(lag < 0.02 for lag in user.lags)
+
+    @allure.story("节奏调度")
+    @allure.title("测试节奏调度记录计划延迟")
+    @allure.severity(allure.severity_level.CRITICAL)
+    async def test_pacing_schedule_lag(self):
+        """测试任务耗时超过 pacing 时不再等待，后续任务的计划延迟逐步累积"""
+        class TestUserClass(User):
+            pacing = 0.05
+
+            def __init__(self):
+                super().__init__()
+                self.lags = []
+
+            async def test_slow_task(self):
+                self.lags.append(schedule_lag.get())
+                await asyncio.sleep(0.1)
+
+        user = TestUserClass()
+        task = asyncio.create_task(user._run_sequential())
+        await asyncio.sleep(0.35)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        assert len(user.lags) >= 3
+        assert user.lags[0] == pytest.approx(0.0, abs=0.01)
+        # 每次任务耗时 0.1 秒，计划间隔 0.05 秒，延迟每次增加约 0.05 秒
+        assert user.lags[2] == pytest.approx(0.1, abs=0.03)
+        assert user.lags[2] > user.lags[1] > user.lags[0]
+
+    @allure.story("节奏调度")
+    @allure.title("测试节奏调度按计划时间开始任务")
+    @allure.severity(allure.severity_level.NORMAL)
+    async def test_pacing_waits_for_schedule(self):
+        """测试任务耗时小于 pacing 时按固定间隔开始任务，且未启用时不设置计划延迟"""
+        class TestUserClass(User):
+            pacing = 0.05
+
+            def __init__(self):
+                super().__init__()
+                self.lags = []
+
+            async def test_fast_task(self):
+                self.lags.append(schedule_lag.get())
+
+        user = TestUserClass()
+        task = asyncio.create_task(user._run_sequential())
+        await asyncio.sleep(0.22)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        assert 4 <= len(user.lags) <= 6
+        assert all(lag < 0.02 for lag in user.lags)
+
+        user.pacing = None
+        assert await user._begin_scheduled_task() is None
+        assert schedule_lag.get() is None
+
+    @allure.story("单次迭代")
+    @allure.title("测试顺序模式单次迭代")
+    @allure.severity(allure.severity_level.CRITICAL)
+    async def test_run_iteration_sequential(self):
+        """测试单次迭代按顺序执行全部任务一次，且不等待 wait_time"""
+        class TestUserClass(User):
+            wait_time = 10
+
+            def __init__(self):
+                super().__init__()
+                self.calls = []
+
+            async def test_first_task(self):
+                self.calls.append("first")
+
+            async def test_second_task(self):
+                self.calls.append("second")
+
+        user = TestUserClass()
+        await asyncio.wait_for(user.run_iteration(), timeout=1)
+        assert user.calls == ["first", "second"]
+
+    @allure.story("单次迭代")
+    @allure.title("测试单次迭代中断言失败时中止")
+    @allure.severity(allure.severity_level.NORMAL)
+    async def test_run_iteration_assertion_error(self):
+        """测试单次迭代中断言失败后不再执行后续任务，也不向外抛出"""
+        class TestUserClass(User):
+            def __init__(self):
+                super().__init__()
+                self.second_task_executed = False
+
+            async def test_first_task(self):
+                raise AssertionError("Test assertion error")
+
+            async def test_second_task(self):
+                self.second_task_executed = True
+
+        user = TestUserClass()
+        await user.run_iteration()
+        assert not user.second_task_executed
+
+    @allure.story("单次迭代")
+    @allure.title("测试并发模式单次迭代")
+    @allure.severity(allure.severity_level.NORMAL)
+    async def test_run_iteration_concurrent(self):
+        """测试并发模式单次迭代并发执行一轮任务，单个任务异常不影响其他任务"""
+        class TestUserClass(User):
+            execution_mode = ExecutionMode.CONCURRENT
+
+            def __init__(self):
+                super().__init__()
+                self.task2_executed = False
+
+            async def test_task1(self):
+                raise Exception("Test error")
+
+            async def test_task2(self):
+                await asyncio.sleep(0.01)
+                self.task2_executed = True
+
+        user = TestUserClass()
+        await user.run_iteration()
+        assert user.task2_executed
+
     @allure.story("错误处理")
     @allure.title("测试错误处理逻辑")
     @allure.severity(allure.severity_level.NORMAL)
@@ -949,6 +1161,31 @@ class TestUser:
         # 验证_pause_event初始状态为已设置（非暂停）
         assert user._pause_event.is_set()
 
+    @allure.story("内存占用")
+    @allure.title("测试空闲用户的精简状态")
+    @allure.severity(allure.severity_level.NORMAL)
+    async def test_lean_user_state(self):
+        """测试固有状态位于槽位、暂停事件延迟创建、默认配置不写实例属性"""
+        class TestUserClass(User):
+            async def test_task(self):
+                pass
+
+        user = TestUserClass()
+        assert {'tasks', 'pause_gate', '_next_start', '_own_pause_event'} <= set(User.__slots__)
+        assert vars(user) == {}
+        assert user._own_pause_event is None
+        assert user._is_paused() is False
+
+        await user.pause_tasks()
+        assert user._own_pause_event is not None
+        assert user._is_paused() is True
+        await user.resume_tasks()
+        assert user._is_paused() is False
+
+        http_user = HttpUser(host="http://localhost:8080")
+        assert http_user._client_config is None
+        assert HttpUser(host="http://localhost:8080", timeout=60)._client_config["timeout"] == 60
+
     @allure.story("暂停/恢复功能")
     @allure.title("测试_wait_if_paused方法")
     @allure.severity(allure.severity_level.NORMAL)
@@ -981,6 +1218,28 @@ class TestUser:
         result = await user._wait_if_paused(timeout=0.1)
         assert result is True
 
+    @allure.story("暂停/恢复功能")
+    @allure.title("测试共享暂停闸门")
+    @allure.severity(allure.severity_level.NORMAL)
+    async def test_wait_if_paused_shared_gate(self):
+        """测试共享闸门关闭时等待，自身事件与闸门都打开后才恢复"""
+        class TestUserClass(User):
+            async def test_task(self):
+                pass
+
+        user = TestUserClass()
+        user.pause_gate = asyncio.Event()
+        assert await user._wait_if_paused(timeout=0.05) is False
+
+        waiter = asyncio.create_task(user._wait_if_paused())
+        await user.pause_tasks()
+        user.pause_gate.set()
+        await asyncio.sleep(0.01)
+        assert not waiter.done()
+
+        await user.resume_tasks()
+        assert await asyncio.wait_for(waiter, 1.0) is True
+
     @allure.story("暂停/恢复功能")
     @allure.title("测试暂停状态下的任务执行")
     @allure.severity(allure.severity_level.NORMAL)
@@ -1241,6 +1500,26 @@ class TestHttpUser:
         await user.on_stop()
         assert not user._client_initialized
 
+    @allure.story("客户端配置")
+    @allure.title("测试响应体处理模式传递给客户端")
+    @allure.severity(allure.severity_level.NORMAL)
+    async def test_http_user_body_mode(self):
+        """测试类属性 body_mode 和初始化参数都会传递给 HTTP 客户端"""
+
+        class DownloadUser(HttpUser):
+            host = "http://localhost:8080"
+            body_mode = "discard"
+
+        user = DownloadUser()
+        await user._ensure_client_initialized()
+        assert user.client.body_mode == "discard"
+        await user.on_stop()
+
+        user = DownloadUser(body_mode="lazy")
+        await user._ensure_client_initialized()
+        assert user.client.body_mode == "lazy"
+        await user.on_stop()
+
     @allure.story("客户端配置")
     @allure.title("测试使用预配置客户端的情况")
     @allure.severity(allure.severity_level.NORMAL)